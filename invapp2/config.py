@@ -11,6 +11,73 @@ class Config:
     ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "joshbaldus")
     ADMIN_SESSION_TIMEOUT = int(os.getenv("ADMIN_SESSION_TIMEOUT", 300))
     BACKUP_DIR_AUTO = os.getenv("BACKUP_DIR_AUTO")
+    # pg_dump archive format for automated backups: "plain" (.sql), "custom"
+    # (.dump) or "directory" (.dumpdir, dumped and restored with parallel jobs).
+    # The default used to be plain SQL; set "plain" to keep producing .sql files
+    # for tooling that applies them with psql. Custom and directory dumps need
+    # pg_restore, and directory dumps download from the admin pages as a .tar.
+    BACKUP_DB_FORMAT = os.getenv("BACKUP_DB_FORMAT", "custom")
+    BACKUP_DB_JOBS = int(os.getenv("BACKUP_DB_JOBS", 4))
+    BACKUP_DB_COMPRESSION = int(os.getenv("BACKUP_DB_COMPRESSION", 6))
+    # "incremental" keeps a content-addressed attachment store with per-run
+    # manifests; "archive" writes a full tar.gz of the upload folders each run.
+    BACKUP_ATTACHMENT_MODE = os.getenv("BACKUP_ATTACHMENT_MODE", "incremental")
+    BACKUP_ATTACHMENT_RETENTION_DAYS = int(os.getenv("BACKUP_ATTACHMENT_RETENTION_DAYS", 30))
+    BACKUP_ATTACHMENT_KEEP_MIN = int(os.getenv("BACKUP_ATTACHMENT_KEEP_MIN", 6))
+    # Only one worker (the holder of a PostgreSQL advisory lock, or a file lock
+    # on SQLite) runs scheduled jobs; the others retry on this interval.
+    SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1").lower() in {"1", "true", "yes", "on"}
+    SCHEDULER_LOCK_NAME = os.getenv("SCHEDULER_LOCK_NAME", "invapp-scheduler")
+    SCHEDULER_LOCK_FILE = os.getenv("SCHEDULER_LOCK_FILE")
+    SCHEDULER_LEADER_CHECK_SECONDS = float(os.getenv("SCHEDULER_LEADER_CHECK_SECONDS", 30))
+
+    # Connection pool (per gunicorn worker). Size/overflow default to
+    # GUNICORN_THREADS + DB_POOL_BACKGROUND_CONNECTIONS / GUNICORN_THREADS;
+    # DB_PGBOUNCER=1 hands pooling to PgBouncer (NullPool, no session locks).
+    GUNICORN_WORKERS = int(os.getenv("GUNICORN_WORKERS", 2))
+    GUNICORN_THREADS = int(os.getenv("GUNICORN_THREADS", 1))
+    DB_POOL_SIZE = os.getenv("DB_POOL_SIZE")
+    DB_MAX_OVERFLOW = os.getenv("DB_MAX_OVERFLOW")
+    DB_POOL_BACKGROUND_CONNECTIONS = int(os.getenv("DB_POOL_BACKGROUND_CONNECTIONS", 2))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "0").lower() in {"1", "true", "yes", "on"}
+    DB_POOL_SLOW_CHECKOUT_MS = float(os.getenv("DB_POOL_SLOW_CHECKOUT_MS", 100))
+    DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "0").lower() in {"1", "true", "yes", "on"}
+
+    # Per-worker request/SQL/render metrics served at /metrics (Prometheus) and
+    # /metrics.json to loopback clients or bearers of METRICS_TOKEN.
+    REQUEST_METRICS_ENABLED = os.getenv("REQUEST_METRICS_ENABLED", "1").lower() in {"1", "true", "yes", "on"}
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+    # Available-to-promise allocation of stock to active orders; changed items
+    # are recomputed every ATP_REFRESH_MINUTES and the snapshot rebuilt daily.
+    ATP_ENABLED = os.getenv("ATP_ENABLED", "1").lower() in {"1", "true", "yes", "on"}
+    ATP_REFRESH_MINUTES = int(os.getenv("ATP_REFRESH_MINUTES", 5))
+
+    # Fingerprinted static assets written by `flask assets build`; hashed URLs
+    # are only emitted once a manifest exists there.
+    STATIC_BUILD_DIR = os.getenv(
+        "STATIC_BUILD_DIR",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "build", "static"),
+    )
+
+    # Compiled Jinja templates are cached as bytecode here and shared by all
+    # workers; `flask templates compile` warms it at deploy time. Empty disables.
+    JINJA_BYTECODE_CACHE_DIR = os.getenv(
+        "JINJA_BYTECODE_CACHE_DIR",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "build", "jinja"),
+    )
+
+    # Log storage: monthly partitions on PostgreSQL, retention in days (0 keeps
+    # rows forever) and the window used by the access log summary widgets.
+    # Access and error history is audit data, so pruning it is opt-in; expired
+    # access_log partitions are dropped outright and cannot be recovered.
+    LOG_PARTITION_MONTHS_AHEAD = int(os.getenv("LOG_PARTITION_MONTHS_AHEAD", 2))
+    ACCESS_LOG_RETENTION_DAYS = int(os.getenv("ACCESS_LOG_RETENTION_DAYS", 0))
+    ERROR_REPORT_RETENTION_DAYS = int(os.getenv("ERROR_REPORT_RETENTION_DAYS", 0))
+    ACCESS_LOG_ROLLUP_RETENTION_DAYS = int(os.getenv("ACCESS_LOG_ROLLUP_RETENTION_DAYS", 730))
+    ACCESS_LOG_SUMMARY_DAYS = int(os.getenv("ACCESS_LOG_SUMMARY_DAYS", 30))
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
     WORK_INSTRUCTION_UPLOAD_FOLDER = os.path.join(
         BASE_DIR, "invapp", "static", "work_instructions"
@@ -64,6 +131,18 @@ class Config:
         os.getenv("PURCHASING_ATTACHMENT_MAX_SIZE_MB", 25)
     )
 
+    # Attachment downloads can be handed to the front-end web server instead of
+    # being streamed by a worker.  ATTACHMENT_ACCEL_REDIRECT_PREFIX is the nginx
+    # internal location (``<prefix>/<namespace>/`` aliases each upload folder);
+    # ATTACHMENT_X_SENDFILE enables the Apache/lighttpd X-Sendfile header.
+    ATTACHMENT_ACCEL_REDIRECT_PREFIX = os.getenv("ATTACHMENT_ACCEL_REDIRECT_PREFIX")
+    ATTACHMENT_X_SENDFILE = os.getenv("ATTACHMENT_X_SENDFILE", "0").lower() in {
+        "1",
+        "true",
+        "yes",
+        "on",
+    }
+
     ENABLE_USAGE_TRACING = os.getenv("ENABLE_USAGE_TRACING")
     USAGE_TRACE_LOG_PATH = os.getenv("USAGE_TRACE_LOG_PATH")
 
@@ -77,8 +156,33 @@ class Config:
 
     ZEBRA_PRINTER_HOST = os.getenv("ZEBRA_PRINTER_HOST", "localhost")
     ZEBRA_PRINTER_PORT = int(os.getenv("ZEBRA_PRINTER_PORT", 9100))
+    ZEBRA_PRINTER_TIMEOUT_SECONDS = float(os.getenv("ZEBRA_PRINTER_TIMEOUT_SECONDS", "5"))
     PRINT_DRY_RUN = os.getenv("PRINT_DRY_RUN", "0").lower() in {"1", "true", "yes", "on"}
+    PRINTER_HEALTH_FAILURE_THRESHOLD = int(os.getenv("PRINTER_HEALTH_FAILURE_THRESHOLD", "3"))
+    PRINTER_HEALTH_RESET_SECONDS = float(os.getenv("PRINTER_HEALTH_RESET_SECONDS", "60"))
+    PRINTER_HEALTH_PROBE_INTERVAL_SECONDS = float(
+        os.getenv("PRINTER_HEALTH_PROBE_INTERVAL_SECONDS", "30")
+    )
+    PRINTER_HEALTH_PROBE_TIMEOUT_SECONDS = float(
+        os.getenv("PRINTER_HEALTH_PROBE_TIMEOUT_SECONDS", "2")
+    )
+    LABEL_PREVIEW_DPI = int(os.getenv("LABEL_PREVIEW_DPI", "203"))
+    LABEL_PREVIEW_CACHE_SIZE = int(os.getenv("LABEL_PREVIEW_CACHE_SIZE", "256"))
     INVENTORY_MOVE_AUTO_PRINT_DEFAULT = (
         os.getenv("INVENTORY_MOVE_AUTO_PRINT_DEFAULT", "0").lower()
         in {"1", "true", "yes", "on"}
     )
+
+    PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", 60))
+    HOME_CUBE_CACHE_TTL_SECONDS = int(os.getenv("HOME_CUBE_CACHE_TTL_SECONDS", 30))
+    MDI_MATERIALS_CACHE_MAX_ENTRIES = int(os.getenv("MDI_MATERIALS_CACHE_MAX_ENTRIES", 2000))
+    STATUS_BUS_BUFFER_SIZE = int(os.getenv("STATUS_BUS_BUFFER_SIZE", 1000))
+    STATUS_BUS_BATCH_SIZE = int(os.getenv("STATUS_BUS_BATCH_SIZE", 100))
+    STATUS_BUS_FLUSH_INTERVAL_SECONDS = float(
+        os.getenv("STATUS_BUS_FLUSH_INTERVAL_SECONDS", 2)
+    )
+    STATUS_BUS_DEDUPE_TTL_SECONDS = int(os.getenv("STATUS_BUS_DEDUPE_TTL_SECONDS", 300))
+    STATUS_BUS_DEDUPE_MAX_ENTRIES = int(os.getenv("STATUS_BUS_DEDUPE_MAX_ENTRIES", 1000))
+    OPS_EVENT_LOG_RETENTION_DAYS = int(os.getenv("OPS_EVENT_LOG_RETENTION_DAYS", 30))
+    SEARCH_INDEX_ENABLED = os.getenv("SEARCH_INDEX_ENABLED", "1").lower() in {"1", "true", "yes", "on"}
+    SEARCH_INDEX_TTL_SECONDS = int(os.getenv("SEARCH_INDEX_TTL_SECONDS", 300))
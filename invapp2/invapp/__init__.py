@@ -1,4 +1,4 @@
-from datetime import date, timedelta
+import json
 import os
 import logging
 from logging.handlers import RotatingFileHandler
@@ -7,7 +7,8 @@ from pathlib import Path
 import click
 
 from flask import Flask, current_app, jsonify, render_template, request, session, url_for
-from sqlalchemy import func, inspect, text
+from flask.cli import AppGroup
+from sqlalchemy import inspect, text
 from sqlalchemy.exc import IntegrityError, NoSuchTableError, OperationalError, SQLAlchemyError
 from sqlalchemy.pool import StaticPool
 from sqlalchemy.orm.exc import DetachedInstanceError
@@ -41,21 +42,54 @@ from .routes import (
 )
 from .mdi import init_blueprint, mdi_bp
 from .mdi import models as mdi_models
+from .mdi.materials_cache import init_materials_cache
 from config import Config
 from . import models  # ensure models are registered with SQLAlchemy
+from . import perf
 from .audit import record_access_event, resolve_client_ip
 from .db_maintenance import repair_primary_key_sequences
-from .home_overview import get_incoming_and_overdue_items
+from .home_fragments import (
+    cached_home_cube,
+    data_version,
+    init_home_fragment_cache,
+    render_home_cube,
+)
 from .home_layout import (
     allowed_home_cube_keys,
     build_home_layout_response,
     normalize_layout_payload,
     save_home_layout,
 )
+from .printing.health import init_printer_health
+from .printing.previews import init_label_preview_cache
+from .principals import (
+    current_principal,
+    init_principal_cache,
+    load_principal,
+    load_principal_user,
+)
 from .superuser import is_superuser
 from .services import backup_service, status_bus
-from .services.db_schema import ensure_app_setting_schema
+from .services.atp import init_atp, register_atp_jobs
+from .services.production_metrics import init_production_metrics
+from .services.db_pool import configure_engine_options, init_pool_metrics
+from .services.db_schema import (
+    ensure_app_setting_schema,
+    ensure_backup_run_schema,
+    ensure_item_dictionary_schema,
+    ensure_search_trigram_indexes,
+)
+from .services.log_storage import (
+    apply_retention,
+    ensure_log_partitions,
+    register_log_jobs,
+)
+from .services.scheduler import init_scheduler, start_leader_scheduler
+from .services.search_index import init_search_index
 from .usage_tracing import init_usage_tracing
+from .request_metrics import METRICS_ENDPOINTS, init_request_metrics
+from .static_assets import build_assets, excluded_folders, init_static_assets
+from .template_cache import clear_template_cache, compile_templates, init_template_cache
 
 
 NAVIGATION_PAGES: tuple[tuple[str, str, str], ...] = (
@@ -768,6 +802,7 @@ def create_app(config_override=None):
         )
         app.logger.addHandler(handler)
     app.logger.setLevel(logging.INFO)
+    status_bus.init_status_bus(app)
     if not any(isinstance(handler, status_bus.StatusBusHandler) for handler in app.logger.handlers):
         app.logger.addHandler(status_bus.StatusBusHandler(level=logging.WARNING))
 
@@ -798,8 +833,7 @@ def create_app(config_override=None):
         ),
     )
 
-    engine_options = app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", {})
-    engine_options.setdefault("pool_pre_ping", True)
+    engine_options = configure_engine_options(app.config)
 
     database_uri = app.config.get("SQLALCHEMY_DATABASE_URI", "")
     if database_uri.startswith("sqlite:///:memory:"):
@@ -813,19 +847,17 @@ def create_app(config_override=None):
     login_manager.anonymous_user = OfflineAdminUser
     login_manager.login_view = "auth.login"
 
-    @login_manager.user_loader
-    def load_user(user_id: str):
-        if not user_id:
-            return None
-        try:
-            return models.User.query.get(int(user_id))
-        except (TypeError, ValueError):
-            return None
-        except OperationalError:
-            current_app.logger.warning(
-                "Skipped user lookup during login_manager load because the database is unavailable."
-            )
-            return None
+    init_principal_cache(app)
+    init_home_fragment_cache(app)
+    init_materials_cache(app)
+    init_search_index(app)
+    init_atp(app)
+    init_production_metrics(app)
+    init_printer_health(app)
+    init_label_preview_cache(app)
+    init_scheduler(app)
+    init_pool_metrics(app)
+    login_manager.user_loader(load_principal_user)
 
     database_available = True
     database_error_message: str | None = None
@@ -861,12 +893,20 @@ def create_app(config_override=None):
             try:
                 db.create_all()
                 ensure_app_setting_schema(db.engine, current_app.logger)
+                ensure_backup_run_schema(db.engine, current_app.logger)
+                ensure_item_dictionary_schema(db.engine, current_app.logger)
+                ensure_log_partitions(
+                    db.engine,
+                    current_app.logger,
+                    months_ahead=int(app.config.get("LOG_PARTITION_MONTHS_AHEAD", 2)),
+                )
                 _ensure_inventory_schema(db.engine)
                 _ensure_purchasing_schema(db.engine)
                 _ensure_order_schema(db.engine)
                 _ensure_home_layout_schema(db.engine)
                 _ensure_user_schema(db.engine)
                 _ensure_production_schema(db.engine)
+                ensure_search_trigram_indexes(db.engine, current_app.logger)
                 mdi_models.ensure_schema()
                 mdi_models.seed_data()
                 # ✅ ensure default production customers at startup
@@ -924,6 +964,8 @@ def create_app(config_override=None):
         )
 
     init_usage_tracing(app)
+    init_request_metrics(app)
+    init_template_cache(app)
 
     @app.context_processor
     def inject_permission_helpers():
@@ -1001,6 +1043,7 @@ def create_app(config_override=None):
     app.register_blueprint(admin.bp)
     app.register_blueprint(useful_links.bp)
     app.register_blueprint(users.bp)
+    init_static_assets(app)
 
     def _should_log_request() -> bool:
         if not request.endpoint:
@@ -1009,6 +1052,8 @@ def create_app(config_override=None):
             return False
         if request.endpoint.startswith("static"):
             return False
+        if request.endpoint in METRICS_ENDPOINTS:
+            return False
         if request.path.startswith("/static/"):
             return False
         return True
@@ -1035,16 +1080,18 @@ def create_app(config_override=None):
             return None, None
 
         try:
-            username = getattr(current_user, "username", None)
+            principal = current_principal()
         except DetachedInstanceError:
-            username = None
+            principal = None
         except SQLAlchemyError:
             db.session.rollback()
             return user_id, None
+        if principal is not None:
+            username = principal.username
 
         if username is None and user_id is not None:
             try:
-                refreshed = models.User.query.get(user_id)
+                refreshed = load_principal(user_id, verify=False)
             except SQLAlchemyError:
                 db.session.rollback()
                 refreshed = None
@@ -1087,152 +1134,51 @@ def create_app(config_override=None):
         if not current_app.config.get("DATABASE_AVAILABLE", True):
             return render_template(
                 "home.html",
-                order_summary=None,
-                inventory_summary=None,
-                overdue_items=None,
-                incoming_items=None,
+                cube_fragments={},
                 useful_links=useful_links,
                 home_layout=[],
                 home_layout_data=None,
                 home_layout_available=[],
             )
 
-        order_summary = None
-        inventory_summary = None
-        overdue_items = None
-        incoming_items = None
-
-        can_view_orders = principal_has_any_role(resolve_view_roles("orders"))
-        can_view_inventory = principal_has_any_role(resolve_view_roles("inventory"))
-
-        if can_view_orders:
-            today = date.today()
-            due_soon_window = timedelta(days=3)
-            soon_cutoff = today + due_soon_window
-            active_statuses = tuple(models.OrderStatus.ACTIVE_STATES)
-
-            due_soon_query = models.Order.query.filter(
-                models.Order.status.in_(active_statuses),
-                models.Order.promised_date.isnot(None),
-                models.Order.promised_date >= today,
-                models.Order.promised_date <= soon_cutoff,
-            )
-            due_soon_count = due_soon_query.count()
-            due_soon_preview = (
-                due_soon_query.order_by(
-                    models.Order.promised_date.asc(),
-                    models.Order.order_number.asc(),
-                )
-                .limit(5)
-                .all()
-            )
-
-            overdue_query = models.Order.query.filter(
-                models.Order.status.in_(active_statuses),
-                models.Order.promised_date.isnot(None),
-                models.Order.promised_date < today,
-            )
-            overdue_count = overdue_query.count()
-            overdue_preview = (
-                overdue_query.order_by(
-                    models.Order.promised_date.asc(),
-                    models.Order.order_number.asc(),
-                )
-                .limit(5)
-                .all()
-            )
-
-            waiting_material_count = (
-                models.Order.query.filter(
-                    models.Order.status == models.OrderStatus.WAITING_MATERIAL
-                ).count()
-            )
-
-            order_summary = {
-                "due_soon_window_days": due_soon_window.days,
-                "due_soon_count": due_soon_count,
-                "due_soon_preview": due_soon_preview,
-                "overdue_count": overdue_count,
-                "overdue_preview": overdue_preview,
-                "waiting_material_count": waiting_material_count,
-                "preview_limit": 5,
-            }
-
-        if can_view_inventory:
-            movement_totals = (
-                db.session.query(
-                    models.Movement.item_id,
-                    func.coalesce(func.sum(models.Movement.quantity), 0).label(
-                        "on_hand"
-                    ),
-                )
-                .group_by(models.Movement.item_id)
-                .all()
-            )
-            on_hand_map = {
-                item_id: int(total or 0) for item_id, total in movement_totals
-            }
-
-            items = models.Item.query.order_by(models.Item.sku).all()
-
-            low_items = []
-            out_items = []
-            for item in items:
-                min_stock_raw = item.min_stock or 0
-                try:
-                    min_stock = int(min_stock_raw)
-                except (TypeError, ValueError):
-                    min_stock = 0
-                if min_stock <= 0:
-                    continue
-                on_hand = on_hand_map.get(item.id, 0)
-                shortage = max(min_stock - on_hand, 0)
-                entry = {
-                    "item": item,
-                    "on_hand": on_hand,
-                    "min_stock": min_stock,
-                    "shortage": shortage,
-                }
-                if on_hand <= 0:
-                    entry["is_out"] = True
-                    out_items.append(entry)
-                elif on_hand < min_stock:
-                    entry["is_out"] = False
-                    low_items.append(entry)
-
-            out_items.sort(key=lambda entry: (-entry["shortage"], entry["item"].sku))
-            low_items.sort(key=lambda entry: (-entry["shortage"], entry["item"].sku))
-
-            preview_limit = 5
-            inventory_preview = (out_items + low_items)[:preview_limit]
-
-            inventory_summary = {
-                "out_count": len(out_items),
-                "low_count": len(low_items),
-                "preview": inventory_preview,
-                "preview_limit": preview_limit,
-                "total_alerts": len(out_items) + len(low_items),
-            }
-
-        can_view_purchasing = principal_has_any_role(resolve_view_roles("purchasing"))
-        if can_view_purchasing:
-            overdue_items, incoming_items = get_incoming_and_overdue_items()
-
         useful_links = models.UsefulLink.ordered()
         home_layout_data = build_home_layout_response(current_user)
+        cube_fragments = {
+            cube["key"]: cached_home_cube(cube["key"])
+            for cube in home_layout_data["layout"]
+        }
 
         return render_template(
             "home.html",
-            order_summary=order_summary,
-            inventory_summary=inventory_summary,
-            overdue_items=overdue_items,
-            incoming_items=incoming_items,
+            cube_fragments=cube_fragments,
             useful_links=useful_links,
             home_layout=home_layout_data["layout"],
             home_layout_data=home_layout_data,
             home_layout_available=home_layout_data["available_cubes"],
         )
 
+    @app.get("/api/home_cubes/<cube_key>")
+    def home_cube_api(cube_key: str):
+        guard_response = ensure_page_access("home")
+        if guard_response is not None:
+            return guard_response
+
+        if not current_app.config.get("DATABASE_AVAILABLE", True):
+            return jsonify({"error": "Database is unavailable."}), 503
+
+        if cube_key not in allowed_home_cube_keys():
+            return jsonify({"error": "Unknown cube."}), 404
+
+        response = jsonify(
+            {
+                "key": cube_key,
+                "html": str(render_home_cube(cube_key)),
+                "version": data_version(cube_key),
+            }
+        )
+        response.headers["Cache-Control"] = "private, no-cache"
+        return response
+
     @app.get("/api/home_layout")
     @login_required
     def get_home_layout_api():
@@ -1267,6 +1213,46 @@ def create_app(config_override=None):
         updated_layout = build_home_layout_response(current_user)
         return jsonify(updated_layout)
 
+    @app.cli.command("ops-events-prune")
+    def prune_ops_events_command() -> None:
+        """Apply the log retention policy now, including ``ops_event_log``."""
+
+        status_bus.flush_pending()
+        removed = apply_retention(db.engine, app.config)
+        for name, count in sorted(removed.items()):
+            click.echo(f"{name}\t{count}")
+
+    @app.cli.command("attachments-snapshots")
+    def list_attachment_snapshots_command() -> None:
+        """List incremental attachment backup snapshots, newest first."""
+
+        backup_dir = backup_service.get_backup_dir(app)
+        for snapshot in backup_service.list_attachment_snapshots(backup_dir):
+            stats = snapshot["stats"]
+            click.echo(
+                f"{snapshot['name']}\t{snapshot['created_at']}\t"
+                f"{stats.get('files', 0)} files\t{stats.get('new_bytes', 0)} new bytes"
+            )
+
+    @app.cli.command("attachments-restore")
+    @click.argument("snapshot")
+    @click.option(
+        "--target",
+        type=click.Path(file_okay=False),
+        default=None,
+        help="Restore beneath this directory instead of the live upload folders.",
+    )
+    def restore_attachments_command(snapshot: str, target: str | None) -> None:
+        """Rebuild the attachment folders from an incremental backup snapshot."""
+
+        restored = backup_service.restore_attachment_snapshot(
+            app,
+            snapshot,
+            app.logger,
+            target_dir=Path(target) if target else None,
+        )
+        click.echo(f"Restored {restored} attachment files from {snapshot}.")
+
     @app.cli.command("db-repair-sequences")
     def repair_sequences_command() -> None:
         """Reset primary key sequences that may have fallen behind table data."""
@@ -1275,15 +1261,123 @@ def create_app(config_override=None):
         _repair_rma_status_event_sequence(db.engine)
         click.echo("Sequence repair completed.")
 
-    if not app.config.get("TESTING", False) and app.config.get("BACKUP_SCHEDULER_ENABLED", True):
+    perf_cli = AppGroup("perf", help="Scale-test data and endpoint benchmarks.")
+
+    @perf_cli.command("seed")
+    @click.option("--items", type=int, default=0, show_default=True)
+    @click.option("--locations", type=int, default=0, show_default=True)
+    @click.option("--movements", type=int, default=0, show_default=True)
+    @click.option("--orders", type=int, default=0, show_default=True)
+    @click.option("--production-days", type=int, default=0, show_default=True)
+    @click.option("--seed", type=int, default=1, show_default=True, help="Random seed.")
+    def perf_seed_command(items, locations, movements, orders, production_days, seed) -> None:
+        """Bulk-load PERF- prefixed items, locations, movements, orders and production days."""
+
+        added = perf.seed_perf_data(
+            items=items,
+            locations=locations,
+            movements=movements,
+            orders=orders,
+            production_days=production_days,
+            seed=seed,
+        )
+        click.echo(", ".join(f"{count} {table}" for table, count in added.items()))
+
+    @perf_cli.command("bench")
+    @click.option("--repeat", type=int, default=5, show_default=True)
+    @click.option("--warmup", type=int, default=1, show_default=True)
+    @click.option("--only", multiple=True, help="Benchmark case to run (repeatable).")
+    @click.option(
+        "--baseline",
+        type=click.Path(dir_okay=False),
+        default=str(perf.DEFAULT_BASELINE_PATH),
+        show_default=True,
+    )
+    @click.option("--write-baseline", is_flag=True, help="Store this run as the new baseline.")
+    @click.option("--output", type=click.Path(dir_okay=False), default=None)
+    @click.option("--tolerance", type=float, default=perf.DEFAULT_TOLERANCE, show_default=True)
+    def perf_bench_command(
+        repeat, warmup, only, baseline, write_baseline, output, tolerance
+    ) -> None:
+        """Time the hot inventory/order pages and compare against the baseline."""
+
+        report = perf.run_benchmarks(
+            app,
+            perf.login_client(app),
+            repeat=repeat,
+            warmup=warmup,
+            only=set(only) or None,
+        )
+        baseline_path = Path(baseline)
+        stored = None
+        if baseline_path.exists() and not write_baseline:
+            stored = json.loads(baseline_path.read_text())
+        click.echo(perf.format_report(report, stored))
+        if output:
+            Path(output).write_text(json.dumps(report, indent=2) + "\n")
+        if write_baseline:
+            baseline_path.write_text(json.dumps(report, indent=2) + "\n")
+            click.echo(f"Baseline written to {baseline_path}.")
+            return
+        if stored is None:
+            click.echo(f"No baseline at {baseline_path}; run with --write-baseline first.")
+            return
+        if stored.get("meta", {}).get("dataset") != report["meta"]["dataset"]:
+            click.echo("Warning: dataset row counts differ from the baseline run.", err=True)
+        regressions = perf.compare_to_baseline(report, stored, tolerance=tolerance)
+        for regression in regressions:
+            click.echo(f"REGRESSION {regression}", err=True)
+        if regressions:
+            raise SystemExit(1)
+
+    app.cli.add_command(perf_cli)
+
+    assets_cli = AppGroup("assets", help="Fingerprinted static asset build.")
+
+    @assets_cli.command("build")
+    def assets_build_command() -> None:
+        """Write hashed, precompressed copies of the static assets."""
+
+        build_dir = app.config["STATIC_BUILD_DIR"]
+        manifest = build_assets(
+            app.static_folder, build_dir, excluded=excluded_folders(app)
+        )
+        app.extensions["static_assets"].load()
+        click.echo(f"Fingerprinted {len(manifest)} assets into {build_dir}.")
+
+    app.cli.add_command(assets_cli)
+
+    templates_cli = AppGroup("templates", help="Jinja template bytecode cache.")
+
+    @templates_cli.command("compile")
+    @click.option("--clear", is_flag=True, help="Drop cached bytecode before compiling.")
+    def templates_compile_command(clear: bool) -> None:
+        """Compile every template into the shared bytecode cache."""
+
+        if app.jinja_env.bytecode_cache is None:
+            click.echo("JINJA_BYTECODE_CACHE_DIR is not set; nothing is persisted.", err=True)
+        elif clear:
+            clear_template_cache(app)
+        result = compile_templates(app)
+        for name, error in sorted(result.failed.items()):
+            click.echo(f"FAILED {name}: {error}", err=True)
+        target = app.config["JINJA_BYTECODE_CACHE_DIR"] if app.jinja_env.bytecode_cache else None
+        suffix = f" into {target}" if target else ""
+        click.echo(f"Compiled {len(result.compiled)} templates{suffix}.")
+        if result.failed:
+            raise SystemExit(1)
+
+    app.cli.add_command(templates_cli)
+
+    # Periodic jobs only run in whichever worker holds the scheduler lock.
+    register_log_jobs(app)
+    if app.config.get("ATP_ENABLED", True):
+        register_atp_jobs(app)
+    if app.config.get("BACKUP_SCHEDULER_ENABLED", True):
+        backup_service.register_backup_jobs(app)
+
+    if not app.config.get("TESTING", False) and app.config.get("SCHEDULER_ENABLED", True):
         if not app.debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
-            try:
-                backup_service.initialize_backup_scheduler(app)
-            except Exception as exc:  # pragma: no cover - defensive guard
-                app.config["BACKUPS_ENABLED"] = False
-                app.logger.exception("Backups disabled due to error: %s", exc)
-                app.logger.warning(
-                    "Backups disabled due to error; app will continue. Set BACKUP_DIR to a writable path."
-                )
+            start_leader_scheduler(app, db.get_engine(app))
 
     return app
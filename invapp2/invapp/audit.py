@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import weakref
 from typing import Any, Mapping, MutableMapping
 
 from flask import current_app, request
@@ -43,10 +44,22 @@ def resolve_client_ip() -> str | None:
     return None
 
 
-def _sessionmaker():
-    """Return a session factory bound to the active engine."""
+_SESSION_FACTORIES: "weakref.WeakKeyDictionary[Engine, sessionmaker]" = weakref.WeakKeyDictionary()
+
 
-    return sessionmaker(bind=db.engine, future=True)
+def _sessionmaker():
+    """Return the session factory bound to the active engine.
+
+    Factories are cached per engine; sessions still draw connections from the
+    application's pool, so audit writes share its sizing and metrics.
+    """
+
+    engine = db.engine
+    factory = _SESSION_FACTORIES.get(engine)
+    if factory is None:
+        factory = sessionmaker(bind=engine, future=True)
+        _SESSION_FACTORIES[engine] = factory
+    return factory
 
 
 def _resolve_engine(bind: Connection | Engine | None) -> Engine | None:
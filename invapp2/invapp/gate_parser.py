@@ -8,8 +8,13 @@ input cannot be interpreted.
 
 from __future__ import annotations
 
+import copy
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+#: Maximum number of distinct normalized part numbers kept by the decoder cache.
+GATE_PARSER_CACHE_SIZE = 4096
 
 
 class GatePartNumberError(ValueError):
@@ -236,6 +241,28 @@ _ADDERS = {
     "I": "Add to Inclinator #",
 }
 
+_TWO_CHAR_ADDER_CODES = frozenset(code for code in _ADDERS if len(code) == 2)
+_SINGLE_CHAR_ADDER_CODES = frozenset(code for code in _ADDERS if len(code) == 1)
+
+_FRACTION_DISPLAY = {
+    1 / 16: "1/16",
+    1 / 8: "1/8",
+    3 / 16: "3/16",
+    1 / 4: "1/4",
+    5 / 16: "5/16",
+    3 / 8: "3/8",
+    7: "7",  # As provided by the spec
+    1 / 2: "1/2",
+    9 / 16: "9/16",
+    5 / 8: "5/8",
+    11 / 16: "11/16",
+    3 / 4: "3/4",
+    13 / 16: "13/16",
+    7 / 8: "7/8",
+    15 / 16: "15/16",
+    5 / 6: "5/6",
+}
+
 
 @dataclass
 class ParsedGatePart:
@@ -283,46 +310,26 @@ def _format_height(integer_inches: int, fraction_value: float) -> tuple[float, s
         return total_height, f"{integer_inches}\""
 
     # Build a readable fraction string when possible
-    fraction_map = {
-        1 / 16: "1/16",
-        1 / 8: "1/8",
-        3 / 16: "3/16",
-        1 / 4: "1/4",
-        5 / 16: "5/16",
-        3 / 8: "3/8",
-        7: "7",  # As provided by the spec
-        1 / 2: "1/2",
-        9 / 16: "9/16",
-        5 / 8: "5/8",
-        11 / 16: "11/16",
-        3 / 4: "3/4",
-        13 / 16: "13/16",
-        7 / 8: "7/8",
-        15 / 16: "15/16",
-        5 / 6: "5/6",
-    }
-    fraction_str = fraction_map.get(fraction_value, str(fraction_value))
+    fraction_str = _FRACTION_DISPLAY.get(fraction_value, str(fraction_value))
     return total_height, f"{integer_inches} {fraction_str}\""
 
 
 def _parse_adders(segment: str) -> List[str]:
     adders: List[str] = []
     idx = 0
-    # Prefer two-character adders when they exist to avoid ambiguity.
-    two_char_codes = [code for code in _ADDERS if len(code) == 2]
-    single_char_codes = [code for code in _ADDERS if len(code) == 1]
 
     while idx < len(segment):
         matched = None
+        # Prefer two-character adders when they exist to avoid ambiguity.
         if idx + 1 < len(segment):
             pair = segment[idx : idx + 2]
-            if pair in two_char_codes:
+            if pair in _TWO_CHAR_ADDER_CODES:
                 matched = pair
                 idx += 2
 
         if matched is None:
             code = segment[idx]
-            if code in single_char_codes:
+            if code in _SINGLE_CHAR_ADDER_CODES:
                 matched = code
                 idx += 1
             else:
@@ -556,17 +563,7 @@ def parse_legacy_numeric(
     )
 
 
-def parse_gate_part_number(part_number: str) -> ParsedGatePart:
-    """Parse a gate part number into structured attributes.
-
-    Raises:
-        GatePartNumberError: if the part number fails validation.
-    """
-
-    normalized = (part_number or "").strip().upper()
-    if not normalized:
-        raise GatePartNumberError("Item Number is required.")
-
+def _parse_normalized(normalized: str) -> ParsedGatePart:
     prefix, digits = split_prefix_digits(normalized)
 
     if digits and digits.isdigit() and len(digits) >= 3 and prefix:
@@ -602,3 +599,67 @@ def parse_gate_part_number(part_number: str) -> ParsedGatePart:
     # part number, prefer the decoded value (including fraction) without override.
     return parsed
 
+
+@lru_cache(maxsize=GATE_PARSER_CACHE_SIZE)
+def _decode_cached(normalized: str) -> ParsedGatePart | str:
+    # Failures are memoized as their message: order entry forms re-submit the
+    # same partial part numbers on every keystroke.
+    try:
+        return _parse_normalized(normalized)
+    except GatePartNumberError as exc:
+        return str(exc)
+
+
+def parse_gate_part_number(part_number: str) -> ParsedGatePart:
+    """Parse a gate part number into structured attributes.
+
+    Results are memoized per normalized part number in a bounded LRU cache, so
+    repeated SKUs only pay for a dictionary lookup and a shallow copy.
+
+    Raises:
+        GatePartNumberError: if the part number fails validation.
+    """
+
+    normalized = (part_number or "").strip().upper()
+    if not normalized:
+        raise GatePartNumberError("Item Number is required.")
+
+    decoded = _decode_cached(normalized)
+    if isinstance(decoded, str):
+        raise GatePartNumberError(decoded)
+
+    # Hand out fresh lists so callers cannot mutate the cached entry.
+    parsed = copy.copy(decoded)
+    parsed.adders = list(decoded.adders)
+    parsed.warnings = list(decoded.warnings)
+    return parsed
+
+
+def parse_gate_part_numbers(
+    part_numbers: Iterable[str],
+) -> List[ParsedGatePart | GatePartNumberError]:
+    """Parse several part numbers, returning the error in place of failures.
+
+    The output preserves the input order so callers can zip it with their
+    source rows.
+    """
+
+    results: List[ParsedGatePart | GatePartNumberError] = []
+    for part_number in part_numbers:
+        try:
+            results.append(parse_gate_part_number(part_number))
+        except GatePartNumberError as exc:
+            results.append(exc)
+    return results
+
+
+def clear_gate_parser_cache() -> None:
+    """Drop every memoized decode result."""
+
+    _decode_cached.cache_clear()
+
+
+def gate_parser_cache_info():
+    """Return ``functools`` cache statistics for the memoized decoder."""
+
+    return _decode_cached.cache_info()
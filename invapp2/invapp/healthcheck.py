@@ -10,6 +10,7 @@ from alembic.script import ScriptDirectory
 from sqlalchemy import create_engine, text
 from sqlalchemy.engine.url import make_url
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.pool import NullPool
 
 from config import Config
 from invapp.db_maintenance import repair_primary_key_sequences
@@ -42,10 +43,8 @@ def _render_banner(lines: list[str]) -> str:
 
 
 def _build_engine(config: Config):
-    return create_engine(
-        config.SQLALCHEMY_DATABASE_URI,
-        pool_pre_ping=True,
-    )
+    # One-shot checks: no pool to keep warm, so no pre-ping round trips either.
+    return create_engine(config.SQLALCHEMY_DATABASE_URI, poolclass=NullPool)
 
 
 def _check_database(engine, logger: logging.Logger) -> tuple[bool, str | None]:
@@ -0,0 +1,280 @@
+"""Cached HTML fragments for the home dashboard cubes.
+
+Every cube on ``/`` summarises a few tables (orders, stock levels, incoming
+purchase requests).  Kiosks refresh the home page constantly, so the rendered
+body of each cube is cached per application and keyed by the cube, the
+viewer's permission set, the data version of the tables the cube reads and the
+current day.  Flushes that touch one of those tables bump its data version so
+the next request renders fresh numbers; other workers pick up the change once
+``HOME_CUBE_CACHE_TTL_SECONDS`` elapses.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+
+from flask import current_app, render_template
+from markupsafe import Markup
+from sqlalchemy import event, func
+
+from invapp import models
+from invapp.extensions import db
+from invapp.home_overview import get_incoming_and_overdue_items
+from invapp.principals import current_principal
+
+
+DEFAULT_CACHE_TTL_SECONDS = 30
+DEFAULT_CACHE_MAX_ENTRIES = 128
+PREVIEW_LIMIT = 5
+DUE_SOON_WINDOW_DAYS = 3
+
+#: Models whose writes invalidate each cube.
+CUBE_SOURCES: dict[str, tuple[type, ...]] = {
+    "orders": (models.Order,),
+    "inventory": (models.Item, models.Movement),
+    "incoming_items": (models.PurchaseRequest,),
+}
+
+CUBE_TEMPLATES: dict[str, str] = {
+    "orders": "home/_orders_cube.html",
+    "inventory": "home/_inventory_cube.html",
+    "incoming_items": "home/_incoming_items_cube.html",
+}
+
+_SOURCE_VERSIONS: dict[str, int] = {}
+_SOURCE_VERSIONS_LOCK = threading.Lock()
+
+
+def data_version(cube_key: str) -> int:
+    """Return the combined write counter of the tables ``cube_key`` reads."""
+
+    with _SOURCE_VERSIONS_LOCK:
+        return sum(
+            _SOURCE_VERSIONS.get(model.__tablename__, 0)
+            for model in CUBE_SOURCES.get(cube_key, ())
+        )
+
+
+def bump_data_version(*models_written: type) -> None:
+    with _SOURCE_VERSIONS_LOCK:
+        for model in models_written:
+            name = model.__tablename__
+            _SOURCE_VERSIONS[name] = _SOURCE_VERSIONS.get(name, 0) + 1
+
+
+_WATCHED_MODELS = tuple({model for sources in CUBE_SOURCES.values() for model in sources})
+
+
+def _bump_flushed_sources(session, _flush_context) -> None:
+    written = {
+        type(instance)
+        for instance in (*session.new, *session.dirty, *session.deleted)
+        if isinstance(instance, _WATCHED_MODELS)
+    }
+    if written:
+        bump_data_version(*written)
+
+
+class FragmentCache:
+    """Thread-safe, TTL-bounded mapping of cache keys to rendered HTML."""
+
+    def __init__(
+        self,
+        *,
+        ttl_seconds: float = DEFAULT_CACHE_TTL_SECONDS,
+        max_entries: int = DEFAULT_CACHE_MAX_ENTRIES,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, int(max_entries))
+        self._entries: OrderedDict[tuple, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> str | None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, html = entry
+            if expires_at <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return html
+
+    def put(self, key: tuple, html: str) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._entries[key] = (expires_at, html)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+def init_home_fragment_cache(app) -> FragmentCache:
+    """Attach a fresh fragment cache to ``app``."""
+
+    if not event.contains(db.session, "after_flush", _bump_flushed_sources):
+        event.listen(db.session, "after_flush", _bump_flushed_sources)
+
+    cache = FragmentCache(
+        ttl_seconds=float(
+            app.config.get("HOME_CUBE_CACHE_TTL_SECONDS", DEFAULT_CACHE_TTL_SECONDS)
+        ),
+        max_entries=int(
+            app.config.get("HOME_CUBE_CACHE_MAX_ENTRIES", DEFAULT_CACHE_MAX_ENTRIES)
+        ),
+    )
+    app.extensions["home_fragment_cache"] = cache
+    return cache
+
+
+def get_home_fragment_cache() -> FragmentCache | None:
+    return current_app.extensions.get("home_fragment_cache")
+
+
+def build_order_summary(today: date) -> dict[str, object]:
+    soon_cutoff = today + timedelta(days=DUE_SOON_WINDOW_DAYS)
+    active_statuses = tuple(models.OrderStatus.ACTIVE_STATES)
+    ordering = (models.Order.promised_date.asc(), models.Order.order_number.asc())
+
+    due_soon_query = models.Order.query.filter(
+        models.Order.status.in_(active_statuses),
+        models.Order.promised_date.isnot(None),
+        models.Order.promised_date >= today,
+        models.Order.promised_date <= soon_cutoff,
+    )
+    overdue_query = models.Order.query.filter(
+        models.Order.status.in_(active_statuses),
+        models.Order.promised_date.isnot(None),
+        models.Order.promised_date < today,
+    )
+    waiting_material_count = models.Order.query.filter(
+        models.Order.status == models.OrderStatus.WAITING_MATERIAL
+    ).count()
+
+    return {
+        "due_soon_window_days": DUE_SOON_WINDOW_DAYS,
+        "due_soon_count": due_soon_query.count(),
+        "due_soon_preview": due_soon_query.order_by(*ordering).limit(PREVIEW_LIMIT).all(),
+        "overdue_count": overdue_query.count(),
+        "overdue_preview": overdue_query.order_by(*ordering).limit(PREVIEW_LIMIT).all(),
+        "waiting_material_count": waiting_material_count,
+        "preview_limit": PREVIEW_LIMIT,
+    }
+
+
+def build_inventory_summary() -> dict[str, object]:
+    """Summarise items below their minimum stock level.
+
+    Only items with a positive ``min_stock`` are monitored, so on-hand totals
+    are aggregated for those items alone instead of for every movement row.
+    """
+
+    rows = (
+        db.session.query(
+            models.Item.sku,
+            models.Item.name,
+            models.Item.min_stock,
+            func.coalesce(func.sum(models.Movement.quantity), 0),
+        )
+        .outerjoin(models.Movement, models.Movement.item_id == models.Item.id)
+        .filter(models.Item.min_stock > 0)
+        .group_by(models.Item.id, models.Item.sku, models.Item.name, models.Item.min_stock)
+        .all()
+    )
+
+    low_items = []
+    out_items = []
+    for sku, name, min_stock, total in rows:
+        min_stock = int(min_stock or 0)
+        on_hand = int(total or 0)
+        entry = {
+            "item": {"sku": sku, "name": name},
+            "on_hand": on_hand,
+            "min_stock": min_stock,
+            "shortage": max(min_stock - on_hand, 0),
+        }
+        if on_hand <= 0:
+            entry["is_out"] = True
+            out_items.append(entry)
+        elif on_hand < min_stock:
+            entry["is_out"] = False
+            low_items.append(entry)
+
+    out_items.sort(key=lambda entry: (-entry["shortage"], entry["item"]["sku"]))
+    low_items.sort(key=lambda entry: (-entry["shortage"], entry["item"]["sku"]))
+
+    return {
+        "out_count": len(out_items),
+        "low_count": len(low_items),
+        "preview": (out_items + low_items)[:PREVIEW_LIMIT],
+        "preview_limit": PREVIEW_LIMIT,
+        "total_alerts": len(out_items) + len(low_items),
+    }
+
+
+def _cube_context(cube_key: str, today: date) -> dict[str, object]:
+    if cube_key == "orders":
+        return {"order_summary": build_order_summary(today)}
+    if cube_key == "inventory":
+        return {"inventory_summary": build_inventory_summary()}
+    if cube_key == "incoming_items":
+        overdue_items, incoming_items = get_incoming_and_overdue_items(
+            today=today, window_days=DUE_SOON_WINDOW_DAYS
+        )
+        return {"overdue_items": overdue_items, "incoming_items": incoming_items}
+    raise KeyError(cube_key)
+
+
+def _permission_signature() -> tuple[str, ...]:
+    principal = current_principal()
+    if principal is None:
+        return ("anonymous",)
+    if principal.is_emergency:
+        return ("emergency",)
+    return principal.role_names
+
+
+def _cache_key(cube_key: str, today: date) -> tuple:
+    return (cube_key, _permission_signature(), data_version(cube_key), today.isoformat())
+
+
+def cached_home_cube(cube_key: str) -> Markup | None:
+    """Return the cached body of ``cube_key`` without rendering on a miss."""
+
+    cache = get_home_fragment_cache()
+    if cache is None or cube_key not in CUBE_TEMPLATES:
+        return None
+    html = cache.get(_cache_key(cube_key, date.today()))
+    return Markup(html) if html is not None else None
+
+
+def render_home_cube(cube_key: str) -> Markup:
+    """Return the body of ``cube_key``, rendering and caching it on a miss.
+
+    Callers are responsible for checking that the viewer may see the cube.
+    """
+
+    today = date.today()
+    cache = get_home_fragment_cache()
+    key = _cache_key(cube_key, today)
+    html = cache.get(key) if cache is not None else None
+    if html is None:
+        html = render_template(CUBE_TEMPLATES[cube_key], **_cube_context(cube_key, today))
+        if cache is not None:
+            cache.put(key, html)
+    return Markup(html)
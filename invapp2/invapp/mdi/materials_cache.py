@@ -0,0 +1,172 @@
+"""Cached Item Shortage cards for the MDI meeting board.
+
+Every meeting-room screen and every ``main.js`` auto-refresh lists the open
+purchase requests as "Materials" cards.  Building a card parses the SKU out of
+the title and formats a dozen fields, so the built cards are cached per
+application keyed by ``(request id, updated_at)``.  A board refresh selects
+only ``id``/``updated_at`` for the matching requests and loads full rows just
+for the cards that changed since they were cached.
+
+The status/count summary is cached against a ``(row count, max(updated_at))``
+fingerprint of the ``purchase_request`` table, which changes on every insert,
+update and delete from any worker.  Flushes in this process also drop the
+affected cards and the summary right away.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, func
+
+from invapp.extensions import db
+from invapp.mdi.materials_summary import (
+    build_materials_base_card,
+    build_materials_summary,
+    materials_card_variant,
+)
+from invapp.models import PurchaseRequest
+
+
+DEFAULT_MAX_ENTRIES = 2000
+LOAD_CHUNK_SIZE = 500
+
+
+class MaterialsCardCache:
+    """Thread-safe LRU of built cards plus the last materials summary."""
+
+    def __init__(self, *, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.max_entries = max(1, int(max_entries))
+        self._cards: OrderedDict[int, tuple[datetime, dict]] = OrderedDict()
+        self._summary: tuple[tuple, dict] | None = None
+        self._lock = threading.Lock()
+
+    def get_card(self, request_id: int, updated_at: datetime) -> dict | None:
+        with self._lock:
+            entry = self._cards.get(request_id)
+            if entry is None or entry[0] != updated_at:
+                return None
+            self._cards.move_to_end(request_id)
+            return entry[1]
+
+    def put_card(self, request_id: int, updated_at: datetime, card: dict) -> None:
+        with self._lock:
+            self._cards[request_id] = (updated_at, card)
+            self._cards.move_to_end(request_id)
+            while len(self._cards) > self.max_entries:
+                self._cards.popitem(last=False)
+
+    def get_summary(self, fingerprint: tuple) -> dict | None:
+        with self._lock:
+            if self._summary is None or self._summary[0] != fingerprint:
+                return None
+            return self._summary[1]
+
+    def put_summary(self, fingerprint: tuple, summary: dict) -> None:
+        with self._lock:
+            self._summary = (fingerprint, summary)
+
+    def invalidate(self, request_ids=()) -> None:
+        with self._lock:
+            for request_id in request_ids:
+                self._cards.pop(request_id, None)
+            self._summary = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cards.clear()
+            self._summary = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._cards)
+
+
+def _invalidate_flushed_requests(session, _flush_context) -> None:
+    if not has_app_context():
+        return
+    cache = get_materials_cache()
+    if cache is None:
+        return
+    written = [
+        instance
+        for instance in (*session.new, *session.dirty, *session.deleted)
+        if isinstance(instance, PurchaseRequest)
+    ]
+    if written:
+        cache.invalidate(
+            instance.id for instance in written if instance.id is not None
+        )
+
+
+def init_materials_cache(app) -> MaterialsCardCache:
+    """Attach a fresh materials card cache to ``app``."""
+
+    if not event.contains(db.session, "after_flush", _invalidate_flushed_requests):
+        event.listen(db.session, "after_flush", _invalidate_flushed_requests)
+
+    cache = MaterialsCardCache(
+        max_entries=int(
+            app.config.get("MDI_MATERIALS_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)
+        )
+    )
+    app.extensions["mdi_materials_cache"] = cache
+    return cache
+
+
+def get_materials_cache() -> MaterialsCardCache | None:
+    return current_app.extensions.get("mdi_materials_cache")
+
+
+def load_materials_cards(query, *, for_api: bool) -> list[dict[str, object]]:
+    """Cards for the purchase requests matched by ``query``, newest first."""
+
+    rows = (
+        query.with_entities(PurchaseRequest.id, PurchaseRequest.updated_at)
+        .order_by(PurchaseRequest.created_at.desc(), PurchaseRequest.id.desc())
+        .all()
+    )
+    cache = get_materials_cache()
+    cards: dict[int, dict] = {}
+    missing: list[int] = []
+    for request_id, updated_at in rows:
+        card = cache.get_card(request_id, updated_at) if cache is not None else None
+        if card is None:
+            missing.append(request_id)
+        else:
+            cards[request_id] = card
+
+    for start in range(0, len(missing), LOAD_CHUNK_SIZE):
+        chunk = missing[start : start + LOAD_CHUNK_SIZE]
+        for record in PurchaseRequest.query.filter(PurchaseRequest.id.in_(chunk)):
+            card = build_materials_base_card(record)
+            cards[record.id] = card
+            if cache is not None:
+                cache.put_card(record.id, record.updated_at, card)
+
+    return [
+        materials_card_variant(cards[request_id], for_api=for_api)
+        for request_id, _ in rows
+        if request_id in cards
+    ]
+
+
+def cached_materials_summary() -> dict[str, object]:
+    """:func:`build_materials_summary`, rebuilt only when requests change."""
+
+    cache = get_materials_cache()
+    if cache is None:
+        return build_materials_summary()
+
+    count, latest = db.session.query(
+        func.count(PurchaseRequest.id), func.max(PurchaseRequest.updated_at)
+    ).one()
+    fingerprint = (int(count or 0), latest)
+    summary = cache.get_summary(fingerprint)
+    if summary is None:
+        summary = build_materials_summary()
+        cache.put_summary(fingerprint, summary)
+    return summary
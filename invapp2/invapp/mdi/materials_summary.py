@@ -122,9 +122,9 @@ def build_materials_summary() -> dict[str, object]:
     }
 
 
-def build_materials_card(request: PurchaseRequest, *, for_api: bool) -> dict[str, object]:
-    sku = extract_sku_from_title(request.title)
-    date_logged = request.created_at.date() if request.created_at else None
+def build_materials_base_card(request: PurchaseRequest) -> dict[str, object]:
+    """Card fields for ``request``; see :func:`materials_card_variant`."""
+
     quantity = None if request.quantity is None else float(request.quantity)
     return {
         "id": request.id,
@@ -133,18 +133,36 @@ def build_materials_card(request: PurchaseRequest, *, for_api: bool) -> dict[str
         "owner": request.requested_by,
         "status": status_display_label(request.status),
         "status_badge": status_badge(request.status),
-        "item_part_number": sku,
+        "item_part_number": extract_sku_from_title(request.title),
         "vendor": request.supplier_name,
         "eta": request.eta_date.isoformat() if request.eta_date else None,
         "po_number": request.purchase_order_number,
         "quantity": quantity,
         "unit": request.unit,
-        "date_logged": date_logged.isoformat() if for_api and date_logged else date_logged,
-        "created_at": request.created_at.isoformat() if for_api and request.created_at else None,
+        "date_logged": request.created_at.date() if request.created_at else None,
+        "created_at": request.created_at,
         "is_material_shortage": True,
     }
 
 
+def materials_card_variant(base: dict[str, object], *, for_api: bool) -> dict[str, object]:
+    """Copy of a base card formatted for the API (ISO dates) or the board."""
+
+    card = dict(base)
+    date_logged = card["date_logged"]
+    created_at = card["created_at"]
+    if for_api:
+        card["date_logged"] = date_logged.isoformat() if date_logged else None
+        card["created_at"] = created_at.isoformat() if created_at else None
+    else:
+        card["created_at"] = None
+    return card
+
+
+def build_materials_card(request: PurchaseRequest, *, for_api: bool) -> dict[str, object]:
+    return materials_card_variant(build_materials_base_card(request), for_api=for_api)
+
+
 def build_open_shortage_counts(date_range: Iterable[date]) -> List[int]:
     date_list = list(date_range)
     if not date_list:
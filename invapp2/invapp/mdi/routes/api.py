@@ -4,7 +4,7 @@ from datetime import datetime, date
 from flask import jsonify, request, url_for
 
 from invapp.extensions import db
-from invapp.mdi.materials_summary import build_materials_card, build_materials_summary
+from invapp.mdi.materials_cache import cached_materials_summary, load_materials_cards
 from invapp.mdi.models import MDIEntry
 from invapp.models import PurchaseRequest
 
@@ -140,7 +140,7 @@ def delete_entry(entry_id):
 
 def materials_summary():
     """Return aggregated Item Shortage data for the MDI materials dashboard."""
-    return jsonify(build_materials_summary())
+    return jsonify(cached_materials_summary())
 
 
 def _materials_entries(status_filter: str | None, date_filter: str | None) -> list[dict[str, object]]:
@@ -167,10 +167,10 @@ def _materials_entries(status_filter: str | None, date_filter: str | None) -> li
 
     return [
         {
-            **build_materials_card(request_record, for_api=True),
-            "detail_url": url_for("purchasing.view_request", request_id=request_record.id),
+            **card,
+            "detail_url": url_for("purchasing.view_request", request_id=card["id"]),
         }
-        for request_record in materials_query.order_by(PurchaseRequest.created_at.desc()).all()
+        for card in load_materials_cards(materials_query, for_api=True)
     ]
 
 
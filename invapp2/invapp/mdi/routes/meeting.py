@@ -3,7 +3,7 @@ from datetime import datetime
 from flask import render_template, request, url_for
 from sqlalchemy import case
 
-from invapp.mdi.materials_summary import build_materials_card
+from invapp.mdi.materials_cache import load_materials_cards
 from invapp.mdi.models import CATEGORY_DISPLAY, MDIEntry, STATUS_BADGES
 from invapp.models import PurchaseRequest
 
@@ -67,13 +67,9 @@ def meeting_view():
                 end_dt = datetime.combine(filter_date, datetime.max.time())
                 materials_query = materials_query.filter(PurchaseRequest.created_at >= start_dt)
                 materials_query = materials_query.filter(PurchaseRequest.created_at <= end_dt)
-        materials_entries = []
-        for request_record in materials_query.order_by(PurchaseRequest.created_at.desc()).all():
-            entry = build_materials_card(request_record, for_api=False)
-            entry["detail_url"] = url_for(
-                "purchasing.view_request", request_id=request_record.id
-            )
-            materials_entries.append(entry)
+        materials_entries = load_materials_cards(materials_query, for_api=False)
+        for entry in materials_entries:
+            entry["detail_url"] = url_for("purchasing.view_request", request_id=entry["id"])
     grouped_entries["Materials"] = materials_entries
 
     for category, category_entries in grouped_entries.items():
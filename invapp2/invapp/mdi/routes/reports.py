@@ -12,8 +12,13 @@ from invapp.routes.purchasing import (
     build_purchase_request_from_form,
     purchase_request_form_defaults,
 )
+from invapp.utils.tabular_import import TabularImportError, open_tabular_upload
 
 
+# Imported rows are flushed in batches so the session does not hold every
+# pending entry of a large upload at once.
+IMPORT_FLUSH_ROWS = 500
+
 DEFAULT_STATUS_OPTIONS = ["Open", "In Progress", "Closed"]
 CATEGORY_STATUS_OPTIONS = {
     "Safety": DEFAULT_STATUS_OPTIONS,
@@ -251,119 +256,66 @@ def import_csv():
         flash("Please choose a CSV file to upload.", "warning")
         return redirect(url_for("mdi.meeting_view"))
 
-    try:
-        payload = upload.stream.read().decode("utf-8-sig")
-    except UnicodeDecodeError:
-        flash("Unable to decode the uploaded file. Please ensure it is UTF-8 encoded.", "danger")
-        return redirect(url_for("mdi.meeting_view"))
-
-    reader = csv.reader(StringIO(payload))
-
     entries_header = None
     metrics_header = None
-    entries_rows = []
-    metrics_rows = []
+    entries_count = 0
+    metrics_count = 0
     section = None
 
-    for row in reader:
-        if not any(cell.strip() for cell in row):
-            continue
-
-        first_cell = row[0].strip().lower()
-        if first_cell == "entries":
-            section = "entries_header"
-            continue
-        if first_cell == "category metrics":
-            section = "metrics_header"
-            continue
-
-        if section is None and entries_header is None:
-            entries_header = [cell.strip() for cell in row]
-            section = "entries"
-            continue
-
-        if section == "entries_header":
-            entries_header = [cell.strip() for cell in row]
-            section = "entries"
-            continue
-        if section == "metrics_header":
-            metrics_header = [cell.strip() for cell in row]
-            section = "metrics"
-            continue
-
-        if section == "entries":
-            entries_rows.append(row)
-        elif section == "metrics":
-            metrics_rows.append(row)
-
     try:
-        if entries_rows:
-            db.session.query(MDIEntry).delete(synchronize_session=False)
-            for row in entries_rows:
-                entry_data = _map_row(entries_header, row)
-                category = _clean_string(entry_data.get("Category"))
-                if not category:
+        with open_tabular_upload(upload) as reader:
+            for row in reader.rows():
+                if not any(cell.strip() for cell in row):
+                    continue
+
+                first_cell = row[0].strip().lower()
+                if first_cell == "entries":
+                    section = "entries_header"
+                    continue
+                if first_cell == "category metrics":
+                    section = "metrics_header"
+                    continue
+
+                if section is None and entries_header is None:
+                    entries_header = [cell.strip() for cell in row]
+                    section = "entries"
+                    continue
+
+                if section == "entries_header":
+                    entries_header = [cell.strip() for cell in row]
+                    section = "entries"
+                    continue
+                if section == "metrics_header":
+                    metrics_header = [cell.strip() for cell in row]
+                    section = "metrics"
                     continue
 
-                entry = MDIEntry(
-                    category=category,
-                    status=_clean_string(entry_data.get("Status")),
-                    priority=_clean_string(entry_data.get("Priority")),
-                    owner=_clean_string(entry_data.get("Owner")),
-                    description=_clean_string(entry_data.get("Description")),
-                    area=_clean_string(entry_data.get("Area")),
-                    related_reference=_clean_string(entry_data.get("Related Reference")),
-                    notes=_clean_string(entry_data.get("Notes")),
-                    item_description=_clean_string(entry_data.get("Item Description")),
-                    order_number=_clean_string(entry_data.get("Order Number")),
-                    customer=_clean_string(entry_data.get("Customer")),
-                    due_date=_parse_date(entry_data.get("Due Date")),
-                    number_absentees=_parse_int(entry_data.get("Number of Absentees")),
-                    open_positions=_parse_int(entry_data.get("Open Positions")),
-                    item_part_number=_clean_string(entry_data.get("Item / Part Number")),
-                    vendor=_clean_string(entry_data.get("Vendor")),
-                    eta=_clean_string(entry_data.get("ETA")),
-                    po_number=_clean_string(entry_data.get("PO Number")),
-                    metric_name=_clean_string(entry_data.get("Metric Name")),
-                    metric_value=_parse_float(entry_data.get("Metric Value")),
-                    metric_target=_parse_float(entry_data.get("Metric Target")),
-                    metric_unit=_clean_string(entry_data.get("Metric Unit")),
-                    date_logged=_parse_date(entry_data.get("Date Logged")),
-                )
-                if entry.category == "Delivery" and not entry.description:
-                    entry.description = entry.item_description or entry.notes or "Delivery update"
-                elif entry.category == "People" and not entry.description:
-                    entry.description = "People update"
-                entry.created_at = _parse_datetime(entry_data.get("Created At"))
-                entry.updated_at = _parse_datetime(entry_data.get("Updated At"))
-                db.session.add(entry)
-
-        if metrics_rows:
-            db.session.query(CategoryMetric).delete(synchronize_session=False)
-            for row in metrics_rows:
-                metric_data = _map_row(metrics_header, row)
-                category = metric_data.get("Category")
-                metric_name = metric_data.get("Metric Name")
-                if not category or not metric_name:
+                if section == "entries":
+                    if not entries_count:
+                        db.session.query(MDIEntry).delete(synchronize_session=False)
+                    entries_count += 1
+                    record = _entry_from_row(entries_header, row)
+                elif section == "metrics":
+                    if not metrics_count:
+                        db.session.query(CategoryMetric).delete(synchronize_session=False)
+                    metrics_count += 1
+                    record = _metric_from_row(metrics_header, row)
+                else:
                     continue
 
-                metric = CategoryMetric(
-                    category=category,
-                    metric_name=metric_name,
-                    dimension=metric_data.get("Dimension"),
-                    value=_parse_float(metric_data.get("Value")) or 0.0,
-                    target=_parse_float(metric_data.get("Target")),
-                    unit=metric_data.get("Unit"),
-                    recorded_date=_parse_date(metric_data.get("Recorded Date")) or datetime.utcnow().date(),
-                )
-                metric.created_at = _parse_datetime(metric_data.get("Created At"))
-                db.session.add(metric)
-
-        if entries_rows or metrics_rows:
+                if record is not None:
+                    db.session.add(record)
+                if (entries_count + metrics_count) % IMPORT_FLUSH_ROWS == 0:
+                    db.session.flush()
+
+        if entries_count or metrics_count:
             db.session.commit()
             flash("CSV data imported successfully.", "success")
         else:
             flash("No data rows found in the uploaded CSV.", "warning")
+    except TabularImportError as exc:
+        db.session.rollback()
+        flash(str(exc), "danger")
     except Exception as exc:  # noqa: BLE001
         db.session.rollback()
         flash(f"Failed to import CSV data: {exc}", "danger")
@@ -371,6 +323,66 @@ def import_csv():
     return redirect(url_for("mdi.meeting_view"))
 
 
+def _entry_from_row(header, row):
+    entry_data = _map_row(header, row)
+    category = _clean_string(entry_data.get("Category"))
+    if not category:
+        return None
+
+    entry = MDIEntry(
+        category=category,
+        status=_clean_string(entry_data.get("Status")),
+        priority=_clean_string(entry_data.get("Priority")),
+        owner=_clean_string(entry_data.get("Owner")),
+        description=_clean_string(entry_data.get("Description")),
+        area=_clean_string(entry_data.get("Area")),
+        related_reference=_clean_string(entry_data.get("Related Reference")),
+        notes=_clean_string(entry_data.get("Notes")),
+        item_description=_clean_string(entry_data.get("Item Description")),
+        order_number=_clean_string(entry_data.get("Order Number")),
+        customer=_clean_string(entry_data.get("Customer")),
+        due_date=_parse_date(entry_data.get("Due Date")),
+        number_absentees=_parse_int(entry_data.get("Number of Absentees")),
+        open_positions=_parse_int(entry_data.get("Open Positions")),
+        item_part_number=_clean_string(entry_data.get("Item / Part Number")),
+        vendor=_clean_string(entry_data.get("Vendor")),
+        eta=_clean_string(entry_data.get("ETA")),
+        po_number=_clean_string(entry_data.get("PO Number")),
+        metric_name=_clean_string(entry_data.get("Metric Name")),
+        metric_value=_parse_float(entry_data.get("Metric Value")),
+        metric_target=_parse_float(entry_data.get("Metric Target")),
+        metric_unit=_clean_string(entry_data.get("Metric Unit")),
+        date_logged=_parse_date(entry_data.get("Date Logged")),
+    )
+    if entry.category == "Delivery" and not entry.description:
+        entry.description = entry.item_description or entry.notes or "Delivery update"
+    elif entry.category == "People" and not entry.description:
+        entry.description = "People update"
+    entry.created_at = _parse_datetime(entry_data.get("Created At"))
+    entry.updated_at = _parse_datetime(entry_data.get("Updated At"))
+    return entry
+
+
+def _metric_from_row(header, row):
+    metric_data = _map_row(header, row)
+    category = metric_data.get("Category")
+    metric_name = metric_data.get("Metric Name")
+    if not category or not metric_name:
+        return None
+
+    metric = CategoryMetric(
+        category=category,
+        metric_name=metric_name,
+        dimension=metric_data.get("Dimension"),
+        value=_parse_float(metric_data.get("Value")) or 0.0,
+        target=_parse_float(metric_data.get("Target")),
+        unit=metric_data.get("Unit"),
+        recorded_date=_parse_date(metric_data.get("Recorded Date")) or datetime.utcnow().date(),
+    )
+    metric.created_at = _parse_datetime(metric_data.get("Created At"))
+    return metric
+
+
 def _populate_entry_from_form(entry, form):
     entry.category = form.get("category")
     entry.status = _clean_string(form.get("status"))
@@ -1,15 +1,16 @@
 import logging
 import secrets
+import weakref
 from decimal import Decimal
 from datetime import datetime
 from typing import ClassVar
 
 from flask import current_app
 from flask_sqlalchemy import BaseQuery
-from sqlalchemy import inspect
+from sqlalchemy import event, func, inspect, text
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.ext.associationproxy import association_proxy
-from sqlalchemy.orm import synonym
+from sqlalchemy.orm import object_session, synonym
 from sqlalchemy.orm.exc import DetachedInstanceError
 from werkzeug.security import check_password_hash, generate_password_hash
 
@@ -196,6 +197,20 @@ class AccessLog(db.Model):
         return cls.EVENT_LABELS.get(event_type, event_type.title())
 
 
+class AccessLogHourly(db.Model):
+    """Hourly access_log counts per event type and IP address."""
+
+    __tablename__ = "access_log_hourly"
+
+    id = db.Column(db.Integer, primary_key=True)
+    hour = db.Column(db.DateTime, nullable=False)
+    event_type = db.Column(db.String(64), nullable=False)
+    ip_address = db.Column(db.String(64), nullable=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (db.Index("ix_access_log_hourly_hour", "hour"),)
+
+
 
 class ErrorReport(db.Model):
     __tablename__ = "error_report"
@@ -295,6 +310,10 @@ class BackupRun(db.Model):
     filepath = db.Column(db.String(512), nullable=True)
     bytes = db.Column(db.BigInteger, nullable=True)
     message = db.Column(db.Text, nullable=True)
+    dump_format = db.Column(db.String(16), nullable=True)
+    duration_seconds = db.Column(db.Float, nullable=True)
+    archive_bytes = db.Column(db.BigInteger, nullable=True)
+    archive_new_bytes = db.Column(db.BigInteger, nullable=True)
 
     __table_args__ = (db.Index("ix_backup_run_started_at", "started_at"),)
 
@@ -427,6 +446,7 @@ class Item(db.Model):
     __table_args__ = (
         db.Index("ix_item_secondary_location_id", "secondary_location_id"),
         db.Index("ix_item_point_of_use_location_id", "point_of_use_location_id"),
+        db.Index("ix_item_change_version", "change_version"),
     )
     id = db.Column(db.Integer, primary_key=True)  # system key
     sku = db.Column(db.String, unique=True, nullable=False)  # part number
@@ -464,6 +484,13 @@ class Item(db.Model):
         foreign_keys=[point_of_use_location_id],
         lazy="joined",
     )
+    # Bumped whenever a field served by the scanner dictionary changes.
+    change_version = db.Column(
+        db.BigInteger,
+        nullable=False,
+        default=lambda context: statement_dictionary_version(context),
+        server_default="0",
+    )
     # NOTE: ``default_location_id`` is backfilled for legacy databases in
     # ``_ensure_inventory_schema`` to avoid model/schema drift.
 
@@ -536,9 +563,16 @@ class PhysicalInventorySnapshotLine(db.Model):
 
 class Location(db.Model):
     __tablename__ = "location"
+    __table_args__ = (db.Index("ix_location_change_version", "change_version"),)
     id = db.Column(db.Integer, primary_key=True)
     code = db.Column(db.String, unique=True, nullable=False)
     description = db.Column(db.String)
+    change_version = db.Column(
+        db.BigInteger,
+        nullable=False,
+        default=lambda context: statement_dictionary_version(context),
+        server_default="0",
+    )
 
     @property
     def parsed_code(self):
@@ -559,6 +593,177 @@ class Location(db.Model):
         return self.parsed_code.bay
 
 
+# Case-insensitive SKU lookups (scanner and receiving) filter on lower(sku).
+db.Index("ix_item_sku_lower", func.lower(Item.sku))
+
+
+class DictionaryVersion(db.Model):
+    """Single-row counter behind the item/location dictionary change versions.
+
+    Writers increment the row inside their own transaction, so the row lock
+    orders commits: once a reader sees value ``N`` committed, every change
+    stamped ``<= N`` is visible too and delta sync never skips a row.
+
+    The price of that guarantee is that transactions writing items or
+    locations are serialized from their first dictionary flush until commit.
+    To keep that window and the counter traffic small, a flush (or a bulk
+    ``INSERT`` statement) takes a single version for all of its rows instead
+    of one per row.
+    """
+
+    __tablename__ = "dictionary_version"
+
+    id = db.Column(db.Integer, primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+class DictionaryTombstone(db.Model):
+    __tablename__ = "dictionary_tombstone"
+    __table_args__ = (db.Index("ix_dictionary_tombstone_version", "version"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(16), nullable=False)  # "item" or "location"
+    entity_id = db.Column(db.Integer, nullable=False)
+    version = db.Column(db.BigInteger, nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+event.listen(
+    DictionaryVersion.__table__,
+    "after_create",
+    db.DDL("INSERT INTO dictionary_version (id, value) VALUES (1, 0)"),
+)
+
+
+def next_dictionary_version(connection) -> int:
+    """Increment and return the dictionary change counter on ``connection``."""
+
+    updated = connection.execute(
+        text("UPDATE dictionary_version SET value = value + 1 WHERE id = 1")
+    )
+    if not updated.rowcount:
+        connection.execute(text("INSERT INTO dictionary_version (id, value) VALUES (1, 1)"))
+        return 1
+    return connection.execute(text("SELECT value FROM dictionary_version WHERE id = 1")).scalar()
+
+
+_STATEMENT_VERSIONS: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def statement_dictionary_version(context) -> int:
+    """Column default: one version per statement, even for ``executemany``."""
+
+    version = _STATEMENT_VERSIONS.get(context)
+    if version is None:
+        version = _STATEMENT_VERSIONS[context] = next_dictionary_version(context.connection)
+    return version
+
+
+_FLUSH_VERSION_KEY = "dictionary_flush_version"
+
+
+def _flush_dictionary_version(connection, target) -> int:
+    """The version shared by every item/location row written in this flush."""
+
+    session = object_session(target)
+    if session is None:
+        return next_dictionary_version(connection)
+    version = session.info.get(_FLUSH_VERSION_KEY)
+    if version is None:
+        version = session.info[_FLUSH_VERSION_KEY] = next_dictionary_version(connection)
+    return version
+
+
+def _reset_flush_dictionary_version(session, flush_context, instances):
+    # A failed flush rolls its version back, so never carry one over.
+    session.info.pop(_FLUSH_VERSION_KEY, None)
+
+
+def record_dictionary_deletions(model, ids) -> int:
+    """Tombstone rows removed by a bulk ``Query.delete()``.
+
+    Bulk deletes bypass the mapper events, so callers collect the ids first
+    and record them here in the same transaction.
+    """
+
+    ids = list(ids)
+    if not ids:
+        return 0
+    connection = db.session.connection()
+    version = next_dictionary_version(connection)
+    deleted_at = datetime.utcnow()
+    connection.execute(
+        DictionaryTombstone.__table__.insert(),
+        [
+            {
+                "entity": model.__tablename__,
+                "entity_id": entity_id,
+                "version": version,
+                "deleted_at": deleted_at,
+            }
+            for entity_id in ids
+        ],
+    )
+    return version
+
+
+def stamp_dictionary_rows(model, ids) -> int:
+    """Re-stamp rows changed by a bulk ``Query.update()`` of dictionary fields."""
+
+    ids = list(ids)
+    if not ids:
+        return 0
+    connection = db.session.connection()
+    version = next_dictionary_version(connection)
+    table = model.__table__
+    for start in range(0, len(ids), 500):
+        connection.execute(
+            table.update()
+            .where(table.c.id.in_(ids[start : start + 500]))
+            .values(change_version=version)
+        )
+    return version
+
+
+DICTIONARY_FIELDS = {
+    Item: ("sku", "name", "description", "unit", "type", "default_location_id"),
+    Location: ("code", "description"),
+}
+
+
+def _stamp_new_dictionary_row(mapper, connection, target):
+    target.change_version = _flush_dictionary_version(connection, target)
+
+
+def _bump_dictionary_version(mapper, connection, target):
+    state = inspect(target)
+    if any(
+        state.attrs[name].history.has_changes()
+        for name in DICTIONARY_FIELDS[mapper.class_]
+    ):
+        target.change_version = _flush_dictionary_version(connection, target)
+
+
+def _record_dictionary_tombstone(mapper, connection, target):
+    connection.execute(
+        DictionaryTombstone.__table__.insert().values(
+            entity=mapper.class_.__tablename__,
+            entity_id=target.id,
+            version=_flush_dictionary_version(connection, target),
+            deleted_at=datetime.utcnow(),
+        )
+    )
+
+
+# Mapper events only see ORM unit-of-work writes; bulk ``Query.update()`` and
+# ``Query.delete()`` callers use stamp_dictionary_rows/record_dictionary_deletions.
+for _model in DICTIONARY_FIELDS:
+    event.listen(_model, "before_insert", _stamp_new_dictionary_row)
+    event.listen(_model, "before_update", _bump_dictionary_version)
+    event.listen(_model, "after_delete", _record_dictionary_tombstone)
+event.listen(db.session, "before_flush", _reset_flush_dictionary_version)
+
+
 class Batch(db.Model):
     __tablename__ = "batch"
     query_class = SoftDeleteQuery
@@ -1041,6 +1246,44 @@ class ProductionOutputFormula(db.Model):
     )
 
 
+class ProductionDailyMetric(db.Model):
+    """Derived history metrics for one ``ProductionDailyRecord``.
+
+    Maintained by ``invapp.services.production_metrics``; the ``cumulative_*``
+    columns are month-to-date running totals.
+    """
+
+    __tablename__ = "production_daily_metric"
+
+    id = db.Column(db.Integer, primary_key=True)
+    record_id = db.Column(
+        db.Integer,
+        db.ForeignKey("production_daily_record.id", ondelete="CASCADE"),
+        nullable=False,
+        unique=True,
+    )
+    entry_date = db.Column(db.Date, nullable=False, unique=True, index=True)
+    produced_total = db.Column(db.Integer, nullable=False, default=0)
+    packaged_total = db.Column(db.Integer, nullable=False, default=0)
+    controllers_total = db.Column(db.Integer, nullable=False, default=0)
+    door_locks_total = db.Column(db.Integer, nullable=False, default=0)
+    operators_total = db.Column(db.Integer, nullable=False, default=0)
+    cops_total = db.Column(db.Integer, nullable=False, default=0)
+    packaged_by_customer = db.Column(db.JSON, nullable=False, default=dict)
+    stack_packaged = db.Column(db.JSON, nullable=False, default=dict)
+    output_value = db.Column(db.Float, nullable=True)
+    output_display = db.Column(db.String(32), nullable=True)
+    output_variables = db.Column(db.JSON, nullable=False, default=list)
+    additional_output_total = db.Column(db.Float, nullable=True)
+    additional_per_hour = db.Column(db.JSON, nullable=False, default=list)
+    cumulative_packaged = db.Column(db.Integer, nullable=False, default=0)
+    cumulative_controllers = db.Column(db.Integer, nullable=False, default=0)
+    cumulative_door_locks = db.Column(db.Integer, nullable=False, default=0)
+    cumulative_operators = db.Column(db.Integer, nullable=False, default=0)
+    cumulative_cops = db.Column(db.Integer, nullable=False, default=0)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
 user_roles = db.Table(
     "user_role",
     db.Column("user_id", db.Integer, db.ForeignKey("user.id"), primary_key=True),
@@ -1603,6 +1846,70 @@ class Reservation(db.Model):
         )
 
 
+class AtpAllocation(db.Model):
+    """Available-to-promise result for one component item of one active order."""
+
+    __tablename__ = "atp_allocation"
+    __table_args__ = (
+        db.UniqueConstraint("order_id", "item_id", name="uq_atp_allocation_order_item"),
+        db.Index("ix_atp_allocation_item", "item_id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(
+        db.Integer, db.ForeignKey("order.id", ondelete="CASCADE"), nullable=False
+    )
+    item_id = db.Column(db.Integer, db.ForeignKey("item.id"), nullable=False)
+    rank = db.Column(db.Integer, nullable=False)
+    required = db.Column(db.Numeric(14, 3), nullable=False, default=0)
+    consumed = db.Column(db.Numeric(14, 3), nullable=False, default=0)
+    reserved = db.Column(db.Numeric(14, 3), nullable=False, default=0)
+    allocated = db.Column(db.Numeric(14, 3), nullable=False, default=0)
+    shortage = db.Column(db.Numeric(14, 3), nullable=False, default=0)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    order = db.relationship("Order")
+    item = db.relationship("Item")
+
+
+class AtpItem(db.Model):
+    """Per-item totals of the available-to-promise snapshot."""
+
+    __tablename__ = "atp_item"
+
+    item_id = db.Column(db.Integer, db.ForeignKey("item.id"), primary_key=True)
+    on_hand = db.Column(db.Numeric(14, 3), nullable=False, default=0)
+    demand = db.Column(db.Numeric(14, 3), nullable=False, default=0)
+    allocated = db.Column(db.Numeric(14, 3), nullable=False, default=0)
+    available = db.Column(db.Numeric(14, 3), nullable=False, default=0)
+    shortage = db.Column(db.Numeric(14, 3), nullable=False, default=0)
+    short_orders = db.Column(db.Integer, nullable=False, default=0)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    item = db.relationship("Item")
+
+
+class AtpDirtyMark(db.Model):
+    """Item or order whose allocations must be recomputed on the next refresh."""
+
+    __tablename__ = "atp_dirty_mark"
+
+    id = db.Column(db.Integer, primary_key=True)
+    item_id = db.Column(db.Integer, nullable=True)
+    order_id = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+class AtpSnapshot(db.Model):
+    """Single row recording when the allocation snapshot was built/refreshed."""
+
+    __tablename__ = "atp_snapshot"
+
+    id = db.Column(db.Integer, primary_key=True)
+    built_at = db.Column(db.DateTime, nullable=True)
+    refreshed_at = db.Column(db.DateTime, nullable=True)
+
+
 # Backwards compatibility aliases for legacy imports
 OrderItem = OrderLine
 OrderBOMComponent = OrderComponent
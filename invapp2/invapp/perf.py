@@ -0,0 +1,712 @@
+"""Scale-test data and endpoint benchmarks (``flask perf seed`` / ``flask perf bench``).
+
+``seed_perf_data`` bulk-loads items, locations, lots, stock movements and
+orders (with lines and BOM components) through the application's models.  Every
+generated key carries the ``PERF-`` prefix, and numbering continues from
+whatever a previous run left, so seeding can be repeated to grow a dataset.
+Daily production records (one per date, with a total per active customer) are
+added on the days before the earliest existing record and marked with a
+``PERF-`` daily note; their persisted metrics are computed as part of seeding.
+
+``run_benchmarks`` drives the Flask test client through ``BENCHMARK_CASES``,
+the hot inventory, order and production history pages, and records per-case latency percentiles,
+SQL statements per request and the process's peak RSS.  It also audits the
+render-blocking scripts and stylesheets of the first-paint pages.
+``compare_to_baseline`` checks a run against a stored baseline JSON
+(``scripts/perf_baseline.json`` by default).  Query counts and render-blocking
+resources must not grow at all; latency and RSS may drift by the given
+tolerance.  The benchmark works against whatever database the app is
+configured for, so the same catalogue runs on local SQLite or PostgreSQL.
+
+The committed baseline was recorded on SQLite after::
+
+    flask perf seed --items 2000 --locations 300 --movements 20000 --orders 300 \
+        --production-days 730
+    flask perf bench --repeat 5 --write-baseline
+
+Latency numbers are machine specific; re-record the baseline on the machine
+that runs the comparison before relying on the latency checks.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import platform
+import random
+import re
+import resource
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from sqlalchemy import event, func
+
+from invapp.extensions import db
+from invapp.models import (
+    Batch,
+    Item,
+    Location,
+    Movement,
+    Order,
+    OrderComponent,
+    OrderLine,
+    OrderStatus,
+    ProductionCustomer,
+    ProductionDailyCustomerTotal,
+    ProductionDailyRecord,
+)
+from invapp.services import production_metrics
+
+
+PERF_PREFIX = "PERF-"
+DEFAULT_BASELINE_PATH = Path(__file__).resolve().parent.parent / "scripts" / "perf_baseline.json"
+DEFAULT_TOLERANCE = 0.25
+# Latency differences below this many milliseconds are treated as noise.
+LATENCY_NOISE_FLOOR_MS = 5.0
+INSERT_BATCH_SIZE = 5000
+# Span of the production history benchmark, ending at the newest record.
+PRODUCTION_HISTORY_DAYS = 90
+# Reference stamped on the adjustments created by the import benchmark so the
+# run can remove them again and leave the dataset unchanged.
+BENCH_IMPORT_REFERENCE = f"{PERF_PREFIX}BENCH"
+
+ITEM_TYPES = ("Raw Material", "Component", "Hardware", "Finished Good", "Consumable")
+ITEM_UNITS = ("ea", "ft", "lb", "box")
+ITEM_WORDS = (
+    "Bracket", "Hinge", "Panel", "Bolt", "Washer", "Latch", "Post", "Rail",
+    "Picket", "Cap", "Spring", "Bearing", "Gasket", "Plate", "Channel", "Tube",
+)
+ITEM_FINISHES = ("Zinc", "Black", "Galvanized", "Stainless", "Powder Coat", "Raw")
+MOVEMENT_TYPES = (("RECEIPT", 0.35), ("ISSUE", 0.35), ("MOVE", 0.2), ("ADJUST", 0.1))
+PEOPLE = ("alex", "sam", "jordan", "casey", "riley", "morgan")
+CUSTOMERS = ("Acme Fence", "Northside Builders", "Harbor Gate Co", "Summit Supply")
+
+
+# ---------------------------------------------------------------------------
+# Seeding
+# ---------------------------------------------------------------------------
+
+
+def _next_index(column, prefix: str) -> int:
+    return db.session.query(func.count(column)).filter(column.like(f"{prefix}%")).scalar() or 0
+
+
+def _bulk_insert(model, rows: list[dict[str, Any]]) -> None:
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        db.session.bulk_insert_mappings(model, rows[start : start + INSERT_BATCH_SIZE])
+    db.session.commit()
+
+
+def _ids(column, prefix: str, offset: int) -> list[int]:
+    model = column.class_
+    return [
+        row[0]
+        for row in db.session.query(model.id)
+        .filter(column.like(f"{prefix}%"))
+        .order_by(model.id)
+        .offset(offset)
+        .all()
+    ]
+
+
+def _weighted_choice(rng: random.Random, choices) -> str:
+    threshold = rng.random()
+    cumulative = 0.0
+    for value, weight in choices:
+        cumulative += weight
+        if threshold <= cumulative:
+            return value
+    return choices[-1][0]
+
+
+def seed_perf_data(
+    *,
+    items: int = 0,
+    locations: int = 0,
+    movements: int = 0,
+    orders: int = 0,
+    production_days: int = 0,
+    seed: int = 1,
+    now: datetime | None = None,
+) -> dict[str, int]:
+    """Bulk-load synthetic data; return the number of rows added per table."""
+
+    rng = random.Random(seed)
+    now = now or datetime.utcnow()
+    added = {"locations": 0, "items": 0, "batches": 0, "movements": 0, "orders": 0,
+             "order_lines": 0, "order_components": 0, "production_days": 0,
+             "production_customer_totals": 0}
+
+    location_prefix = PERF_PREFIX
+    if locations:
+        offset = _next_index(Location.code, location_prefix)
+        rows = []
+        for index in range(offset, offset + locations):
+            level, remainder = divmod(index, 26 * 40)
+            row, bay = divmod(remainder, 40)
+            rows.append(
+                {
+                    "code": f"{PERF_PREFIX}{level + 1}-{chr(65 + row)}-{bay + 1:02d}",
+                    "description": f"Perf rack {level + 1} row {chr(65 + row)}",
+                }
+            )
+        _bulk_insert(Location, rows)
+        added["locations"] = len(rows)
+    location_ids = _ids(Location.code, location_prefix, 0)
+
+    if items:
+        offset = _next_index(Item.sku, PERF_PREFIX)
+        rows = []
+        for index in range(offset, offset + items):
+            word = ITEM_WORDS[index % len(ITEM_WORDS)]
+            finish = ITEM_FINISHES[(index // len(ITEM_WORDS)) % len(ITEM_FINISHES)]
+            rows.append(
+                {
+                    "sku": f"{PERF_PREFIX}{index:06d}",
+                    "name": f"{word} {finish} {index:06d}",
+                    "type": ITEM_TYPES[index % len(ITEM_TYPES)],
+                    "unit": ITEM_UNITS[index % len(ITEM_UNITS)],
+                    "description": f"{finish} {word.lower()} for scale testing",
+                    "min_stock": rng.choice((0, 0, 5, 10, 25)),
+                    "list_price": Decimal(rng.randint(100, 50000)) / 100,
+                    "last_unit_cost": Decimal(rng.randint(50, 25000)) / 100,
+                    "default_location_id": rng.choice(location_ids) if location_ids else None,
+                }
+            )
+        _bulk_insert(Item, rows)
+        added["items"] = len(rows)
+
+        new_item_ids = _ids(Item.sku, PERF_PREFIX, offset)
+        batch_rows = [
+            {
+                "item_id": item_id,
+                "lot_number": f"{PERF_PREFIX}LOT-{item_id}-{lot}",
+                "quantity": Decimal(rng.randint(1, 500)),
+                "received_date": now - timedelta(days=rng.randint(0, 365)),
+                "supplier_name": rng.choice(CUSTOMERS),
+            }
+            for item_id in new_item_ids
+            if rng.random() < 0.3
+            for lot in range(rng.randint(1, 2))
+        ]
+        _bulk_insert(Batch, batch_rows)
+        added["batches"] = len(batch_rows)
+
+    item_ids = _ids(Item.sku, PERF_PREFIX, 0)
+    if movements and item_ids and location_ids:
+        batches_by_item: dict[int, list[int]] = {}
+        for batch_id, item_id in (
+            db.session.query(Batch.id, Batch.item_id)
+            .filter(Batch.lot_number.like(f"{PERF_PREFIX}%"))
+            .all()
+        ):
+            batches_by_item.setdefault(item_id, []).append(batch_id)
+        rows = []
+        for index in range(movements):
+            item_id = rng.choice(item_ids)
+            movement_type = _weighted_choice(rng, MOVEMENT_TYPES)
+            quantity = Decimal(rng.randint(1, 100))
+            if movement_type == "ISSUE" or (movement_type == "ADJUST" and rng.random() < 0.5):
+                quantity = -quantity
+            lots = batches_by_item.get(item_id)
+            rows.append(
+                {
+                    "item_id": item_id,
+                    "batch_id": rng.choice(lots) if lots else None,
+                    "location_id": rng.choice(location_ids),
+                    "quantity": quantity,
+                    "movement_type": movement_type,
+                    "person": rng.choice(PEOPLE),
+                    "reference": f"{PERF_PREFIX}{movement_type}-{index}",
+                    "date": now - timedelta(minutes=rng.randint(0, 365 * 24 * 60)),
+                }
+            )
+        _bulk_insert(Movement, rows)
+        added["movements"] = len(rows)
+
+    if orders and item_ids:
+        order_prefix = f"{PERF_PREFIX}ORD-"
+        offset = _next_index(Order.order_number, order_prefix)
+        statuses = (OrderStatus.SCHEDULED, OrderStatus.OPEN, OrderStatus.WAITING_MATERIAL,
+                    OrderStatus.CLOSED)
+        order_rows = []
+        for index in range(offset, offset + orders):
+            start = (now + timedelta(days=rng.randint(-60, 60))).date()
+            completion = start + timedelta(days=rng.randint(1, 14))
+            order_rows.append(
+                {
+                    "order_number": f"{order_prefix}{index:06d}",
+                    "purchase_order_number": f"PO-{index:06d}",
+                    "priority": rng.randint(0, 5),
+                    "status": rng.choice(statuses),
+                    "customer_name": rng.choice(CUSTOMERS),
+                    "created_by": rng.choice(PEOPLE),
+                    "scheduled_start_date": start,
+                    "scheduled_completion_date": completion,
+                    "promised_date": completion + timedelta(days=rng.randint(0, 7)),
+                }
+            )
+        _bulk_insert(Order, order_rows)
+        added["orders"] = len(order_rows)
+
+        order_ids = _ids(Order.order_number, order_prefix, offset)
+        line_rows = [
+            {
+                "order_id": order_id,
+                "item_id": rng.choice(item_ids),
+                "quantity": rng.randint(1, 50),
+            }
+            for order_id in order_ids
+            for _ in range(rng.randint(1, 4))
+        ]
+        _bulk_insert(OrderLine, line_rows)
+        added["order_lines"] = len(line_rows)
+
+        line_ids = [
+            row[0]
+            for row in db.session.query(OrderLine.id)
+            .join(Order, OrderLine.order_id == Order.id)
+            .filter(Order.order_number.like(f"{order_prefix}%"))
+            .filter(Order.id >= order_ids[0])
+            .all()
+        ] if order_ids else []
+        component_rows = []
+        for line_id in line_ids:
+            for component_id in rng.sample(item_ids, min(len(item_ids), rng.randint(0, 3))):
+                component_rows.append(
+                    {
+                        "order_line_id": line_id,
+                        "component_item_id": component_id,
+                        "quantity": Decimal(rng.randint(1, 12)),
+                    }
+                )
+        _bulk_insert(OrderComponent, component_rows)
+        added["order_components"] = len(component_rows)
+
+    if production_days:
+        added.update(_seed_production_days(rng, production_days, now.date()))
+
+    return added
+
+
+def _seed_production_days(rng: random.Random, days: int, today: date) -> dict[str, int]:
+    customer_ids = [
+        row[0]
+        for row in db.session.query(ProductionCustomer.id)
+        .filter(ProductionCustomer.is_active.is_(True))
+        .order_by(ProductionCustomer.id)
+    ]
+    if not customer_ids:
+        _bulk_insert(
+            ProductionCustomer,
+            [{"name": f"{PERF_PREFIX}{name}"} for name in CUSTOMERS],
+        )
+        customer_ids = [
+            row[0]
+            for row in db.session.query(ProductionCustomer.id)
+            .filter(ProductionCustomer.name.like(f"{PERF_PREFIX}%"))
+            .order_by(ProductionCustomer.id)
+        ]
+
+    earliest = db.session.query(func.min(ProductionDailyRecord.entry_date)).scalar()
+    last_day = earliest - timedelta(days=1) if earliest else today
+    dates = [last_day - timedelta(days=offset) for offset in range(days)]
+    _bulk_insert(
+        ProductionDailyRecord,
+        [
+            {
+                "entry_date": entry_date,
+                "day_of_week": entry_date.strftime("%A"),
+                "gates_employees": rng.randint(4, 12),
+                "gates_hours_ot": Decimal(rng.randint(0, 16)),
+                "controllers_4_stop": rng.randint(0, 20),
+                "controllers_6_stop": rng.randint(0, 10),
+                "door_locks_lh": rng.randint(0, 15),
+                "door_locks_rh": rng.randint(0, 15),
+                "operators_produced": rng.randint(0, 8),
+                "cops_produced": rng.randint(0, 8),
+                "additional_employees": rng.randint(0, 4),
+                "additional_hours_ot": Decimal(rng.randint(0, 8)),
+                "daily_notes": f"{PERF_PREFIX}seed",
+            }
+            for entry_date in dates
+        ],
+    )
+    record_ids = [
+        row[0]
+        for row in db.session.query(ProductionDailyRecord.id).filter(
+            ProductionDailyRecord.entry_date.between(dates[-1], dates[0])
+        )
+    ] if dates else []
+    total_rows = []
+    for record_id in record_ids:
+        for customer_id in customer_ids:
+            produced = rng.randint(0, 40)
+            total_rows.append(
+                {
+                    "record_id": record_id,
+                    "customer_id": customer_id,
+                    "gates_produced": produced,
+                    "gates_packaged": rng.randint(0, produced),
+                }
+            )
+    _bulk_insert(ProductionDailyCustomerTotal, total_rows)
+    # Bulk inserts skip the flush hook that keeps daily metrics current.
+    production_metrics.refresh_daily_metrics(*dates)
+    return {"production_days": len(dates), "production_customer_totals": len(total_rows)}
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class BenchmarkCase:
+    name: str
+    run: Callable[[Any, dict[str, Any]], Any]
+    description: str = ""
+
+
+def _get(path: str) -> Callable[[Any, dict[str, Any]], Any]:
+    return lambda client, context: client.get(path.format(**context))
+
+
+_IMPORT_TOKEN_RE = re.compile(r'name="import_token" value="([^"]+)"')
+
+
+def _import_stock(client, context):
+    """Upload a stock CSV and confirm the column mapping (adds +1 adjustments)."""
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["sku", "location_code", "quantity", "reference"])
+    for sku, code in context["import_rows"]:
+        writer.writerow([sku, code, 1, BENCH_IMPORT_REFERENCE])
+    upload = client.post(
+        "/inventory/stock/import",
+        data={"file": (io.BytesIO(buffer.getvalue().encode("utf-8")), "perf.csv")},
+        content_type="multipart/form-data",
+    )
+    match = _IMPORT_TOKEN_RE.search(upload.get_data(as_text=True))
+    if not match:
+        return upload
+    return client.post(
+        "/inventory/stock/import",
+        data={
+            "step": "mapping",
+            "import_token": match.group(1),
+            "mapping_sku": "sku",
+            "mapping_location_code": "location_code",
+            "mapping_quantity": "quantity",
+            "mapping_reference": "reference",
+        },
+    )
+
+
+BENCHMARK_CASES: tuple[BenchmarkCase, ...] = (
+    BenchmarkCase("inventory_home", _get("/inventory/"), "Inventory dashboard"),
+    BenchmarkCase("list_items", _get("/inventory/items"), "Item list, first page"),
+    BenchmarkCase("list_stock", _get("/inventory/stock"), "Stock overview, first page"),
+    BenchmarkCase(
+        "list_stock_search",
+        _get("/inventory/stock?search={search_term}"),
+        "Stock overview filtered by SKU fragment",
+    ),
+    BenchmarkCase("list_locations", _get("/inventory/locations"), "Location list"),
+    BenchmarkCase("history", _get("/inventory/history"), "Movement history page"),
+    BenchmarkCase("export_history", _get("/inventory/history/export"), "Full history CSV"),
+    BenchmarkCase("orders_home", _get("/orders/"), "Open orders list"),
+    BenchmarkCase("view_order", _get("/orders/{order_id}"), "Order detail"),
+    BenchmarkCase("import_stock", _import_stock, "Stock CSV upload and import"),
+    BenchmarkCase(
+        "production_history",
+        _get("/production/history?start_date={production_start}&end_date={production_end}"),
+        "Production history page over the newest 90 days",
+    ),
+    BenchmarkCase(
+        "production_export",
+        _get(
+            "/production/history/export"
+            "?start_date={production_start}&end_date={production_end}"
+        ),
+        "Production history CSV over the newest 90 days",
+    ),
+)
+
+
+# Pages whose first paint the render-blocking audit tracks (home.html and the
+# inventory pages the plant floor opens most).
+FIRST_PAINT_PATHS = ("/", "/inventory/", "/inventory/items", "/inventory/stock")
+
+
+class _BlockingResourceParser(HTMLParser):
+    """Collect the scripts and stylesheets a browser must fetch before painting."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.scripts: list[str] = []
+        self.stylesheets: list[str] = []
+
+    def handle_starttag(self, tag, attrs) -> None:
+        attributes = dict(attrs)
+        if tag == "script" and attributes.get("src"):
+            if "defer" in attributes or "async" in attributes:
+                return
+            if attributes.get("type") == "module":
+                return
+            self.scripts.append(attributes["src"])
+        elif tag == "link" and (attributes.get("rel") or "").lower() == "stylesheet":
+            if (attributes.get("media") or "").lower() == "print":
+                return
+            self.stylesheets.append(attributes.get("href") or "")
+
+
+def _is_external(url: str) -> bool:
+    return url.startswith(("http://", "https://", "//"))
+
+
+def audit_first_paint(client, paths=FIRST_PAINT_PATHS) -> dict[str, dict[str, Any]]:
+    """Render-blocking resources of each page in ``paths``.
+
+    Synchronous scripts and stylesheets hold up the first paint until they are
+    fetched, and external ones stall for as long as the CDN is unreachable.
+    The audit reads the rendered HTML, so it runs without a browser.
+    """
+
+    audit: dict[str, dict[str, Any]] = {}
+    for path in paths:
+        response = client.get(path)
+        parser = _BlockingResourceParser()
+        parser.feed(response.get_data(as_text=True))
+        blocking = parser.scripts + parser.stylesheets
+        audit[path] = {
+            "status": response.status_code,
+            "blocking_scripts": parser.scripts,
+            "blocking_stylesheets": len(parser.stylesheets),
+            "external_blocking": sum(1 for url in blocking if _is_external(url)),
+        }
+    return audit
+
+
+def _benchmark_context(import_rows: int) -> dict[str, Any]:
+    first_order = (
+        db.session.query(Order.id)
+        .filter(Order.order_number.like(f"{PERF_PREFIX}%"))
+        .order_by(Order.id)
+        .first()
+    ) or db.session.query(Order.id).order_by(Order.id).first()
+    pairs = (
+        db.session.query(Item.sku, Location.code)
+        .join(Location, Item.default_location_id == Location.id)
+        .order_by(Item.id)
+        .limit(import_rows)
+        .all()
+    )
+    production_end = (
+        db.session.query(func.max(ProductionDailyRecord.entry_date)).scalar()
+        or date.today()
+    )
+    production_start = production_end - timedelta(days=PRODUCTION_HISTORY_DAYS - 1)
+    return {
+        "order_id": first_order[0] if first_order else 0,
+        "production_start": production_start.isoformat(),
+        "production_end": production_end.isoformat(),
+        "search_term": f"{PERF_PREFIX}0001",
+        "import_rows": [(sku, code) for sku, code in pairs],
+    }
+
+
+@contextmanager
+def count_queries(engine) -> Iterator[list[int]]:
+    counter = [0]
+
+    def _count(*_args, **_kwargs):
+        counter[0] += 1
+
+    event.listen(engine, "before_cursor_execute", _count)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", _count)
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _percentile(samples: list[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def dataset_counts() -> dict[str, int]:
+    return {
+        "items": db.session.query(func.count(Item.id)).scalar() or 0,
+        "locations": db.session.query(func.count(Location.id)).scalar() or 0,
+        "movements": db.session.query(func.count(Movement.id)).scalar() or 0,
+        "orders": db.session.query(func.count(Order.id)).scalar() or 0,
+        "production_days": db.session.query(func.count(ProductionDailyRecord.id)).scalar()
+        or 0,
+    }
+
+
+def run_benchmarks(
+    app,
+    client,
+    *,
+    repeat: int = 5,
+    warmup: int = 1,
+    only: set[str] | None = None,
+    import_rows: int = 100,
+) -> dict[str, Any]:
+    """Time each benchmark case; ``client`` must already be logged in."""
+
+    engine = db.get_engine(app)
+    with app.app_context():
+        context = _benchmark_context(import_rows)
+        counts = dataset_counts()
+    results: dict[str, dict[str, Any]] = {}
+    for case in BENCHMARK_CASES:
+        if only and case.name not in only:
+            continue
+        for _ in range(max(0, warmup)):
+            case.run(client, context)
+        samples: list[float] = []
+        queries: list[int] = []
+        status = None
+        rss_before = peak_rss_mb()
+        for _ in range(max(1, repeat)):
+            with count_queries(engine) as counter:
+                started = time.perf_counter()
+                response = case.run(client, context)
+                samples.append((time.perf_counter() - started) * 1000)
+            queries.append(counter[0])
+            status = response.status_code
+        peak = peak_rss_mb()
+        results[case.name] = {
+            "status": status,
+            "p50_ms": round(statistics.median(samples), 2),
+            "p95_ms": round(_percentile(samples, 0.95), 2),
+            "mean_ms": round(statistics.fmean(samples), 2),
+            "queries": max(queries),
+            "peak_rss_mb": round(peak, 1),
+            "rss_growth_mb": round(peak - rss_before, 1),
+        }
+    with app.app_context():
+        Movement.query.filter_by(reference=BENCH_IMPORT_REFERENCE).delete(
+            synchronize_session=False
+        )
+        db.session.commit()
+    return {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "database": engine.dialect.name,
+            "python": platform.python_version(),
+            "repeat": max(1, repeat),
+            "dataset": counts,
+        },
+        "results": results,
+        "first_paint": audit_first_paint(client),
+    }
+
+
+def compare_to_baseline(
+    report: dict[str, Any],
+    baseline: dict[str, Any],
+    *,
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> list[str]:
+    """Human-readable regressions of ``report`` against ``baseline``."""
+
+    regressions: list[str] = []
+    base_results = baseline.get("results", {})
+    for name, result in report.get("results", {}).items():
+        base = base_results.get(name)
+        if not base:
+            continue
+        if result["status"] != base.get("status"):
+            regressions.append(f"{name}: status {result['status']} (baseline {base.get('status')})")
+        if result["queries"] > base.get("queries", result["queries"]):
+            regressions.append(
+                f"{name}: {result['queries']} queries per request (baseline {base['queries']})"
+            )
+        base_p50 = float(base.get("p50_ms", 0))
+        if (
+            result["p50_ms"] > base_p50 * (1 + tolerance)
+            and result["p50_ms"] - base_p50 > LATENCY_NOISE_FLOOR_MS
+        ):
+            regressions.append(f"{name}: p50 {result['p50_ms']:.1f} ms (baseline {base_p50:.1f} ms)")
+        base_rss = float(base.get("peak_rss_mb", 0))
+        if base_rss and result["peak_rss_mb"] > base_rss * (1 + tolerance):
+            regressions.append(
+                f"{name}: peak RSS {result['peak_rss_mb']:.0f} MB (baseline {base_rss:.0f} MB)"
+            )
+    base_paint = baseline.get("first_paint", {})
+    for path, audit in report.get("first_paint", {}).items():
+        base = base_paint.get(path)
+        if not base:
+            continue
+        if audit["external_blocking"] > base["external_blocking"]:
+            regressions.append(
+                f"{path}: {audit['external_blocking']} external render-blocking resources "
+                f"(baseline {base['external_blocking']})"
+            )
+        if len(audit["blocking_scripts"]) > len(base["blocking_scripts"]):
+            regressions.append(
+                f"{path}: {len(audit['blocking_scripts'])} blocking scripts "
+                f"(baseline {len(base['blocking_scripts'])})"
+            )
+    return regressions
+
+
+def format_report(report: dict[str, Any], baseline: dict[str, Any] | None = None) -> str:
+    base_results = (baseline or {}).get("results", {})
+    lines = [
+        f"{'case':<20} {'status':>6} {'p50 ms':>9} {'p95 ms':>9} {'queries':>8} "
+        f"{'rss MB':>8} {'base p50':>9} {'base q':>7}"
+    ]
+    for name, result in report["results"].items():
+        base = base_results.get(name, {})
+        lines.append(
+            f"{name:<20} {result['status']:>6} {result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} "
+            f"{result['queries']:>8} {result['peak_rss_mb']:>8.0f} "
+            f"{base.get('p50_ms', ''):>9} {base.get('queries', ''):>7}"
+        )
+    first_paint = report.get("first_paint", {})
+    if first_paint:
+        lines.append("")
+        lines.append(f"{'first paint':<20} {'blocking js':>11} {'css':>4} {'external':>8}")
+        for path, audit in first_paint.items():
+            lines.append(
+                f"{path:<20} {len(audit['blocking_scripts']):>11} "
+                f"{audit['blocking_stylesheets']:>4} {audit['external_blocking']:>8}"
+            )
+    return "\n".join(lines)
+
+
+def login_client(app):
+    """Test client signed in as the configured admin account."""
+
+    client = app.test_client()
+    response = client.post(
+        "/auth/login",
+        data={
+            "username": app.config.get("ADMIN_USER", "superuser"),
+            "password": app.config.get("ADMIN_PASSWORD", "joshbaldus"),
+        },
+    )
+    if response.status_code != 302:
+        raise RuntimeError("Unable to sign in with ADMIN_USER / ADMIN_PASSWORD for benchmarking.")
+    return client
@@ -11,6 +11,7 @@ from flask import abort, current_app, request
 from invapp.extensions import login_manager
 from invapp.login import current_user
 from invapp.models import PageAccessRule, Role, db
+from invapp.principals import current_principal
 
 SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
 
@@ -223,10 +224,12 @@ def current_principal_roles() -> tuple[str, ...]:
     if not current_user.is_authenticated:
         return ("public",)
     try:
-        roles = getattr(current_user, "roles", [])
-        return tuple(sorted({role.name for role in roles}))
+        principal = current_principal()
     except Exception:  # pragma: no cover - defensive fallback
         return ()
+    if principal is None:
+        return ()
+    return principal.role_names
 
 
 def principal_has_any_role(role_names: Sequence[str], *, require_auth: bool = False) -> bool:
@@ -237,9 +240,12 @@ def principal_has_any_role(role_names: Sequence[str], *, require_auth: bool = Fa
     if not current_user.is_authenticated:
         return any(role == "public" for role in role_names)
     try:
-        return current_user.has_any_role(role_names)
+        principal = current_principal()
     except Exception:  # pragma: no cover - defensive fallback
         return False
+    if principal is None:
+        return False
+    return principal.has_any_role(role_names)
 
 
 def ensure_page_access(
@@ -0,0 +1,363 @@
+"""Cached principal snapshots used to authenticate requests cheaply.
+
+Flask-Login resolves ``current_user`` on every request.  Loading the full
+``User`` row (and its joined ``roles``) for each request is wasteful because the
+permission helpers only ever need the identifier, username, role names and
+default printer.  This module keeps an immutable :class:`PrincipalSnapshot` per
+user in a small per-application cache and exposes :class:`PrincipalUser`, a
+lightweight stand-in that answers those questions without touching the
+database.  Any other attribute access transparently loads the ORM row.
+
+Each gunicorn worker keeps its own cache.  Any flush that touches a ``User``
+row (role, password, printer or username edits from the user management
+routes) drops the local entry immediately and bumps ``User.updated_at``.  The
+other workers compare that column with the cached snapshot once per request
+(a single-column primary key lookup), so a revoked role or deleted user stops
+being authorized everywhere on the next request rather than after
+``PRINCIPAL_CACHE_TTL_SECONDS``.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable
+
+from flask import current_app
+from sqlalchemy import event, inspect, select
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+from sqlalchemy.orm.exc import DetachedInstanceError
+
+from invapp.extensions import db
+from invapp.login import UserMixin, current_user
+from invapp.models import Role, User
+from invapp.offline import OfflineAdminUser, is_emergency_mode_active
+
+
+DEFAULT_CACHE_TTL_SECONDS = 60
+DEFAULT_CACHE_MAX_ENTRIES = 512
+
+
+@dataclass(frozen=True)
+class PrincipalSnapshot:
+    """Immutable view of the attributes permission checks rely on."""
+
+    id: int | None
+    username: str | None
+    role_names: tuple[str, ...]
+    default_printer_id: int | None = None
+    is_emergency: bool = False
+    version: datetime | None = None
+
+    def has_any_role(self, role_names: Iterable[str]) -> bool:
+        normalized = tuple(name for name in role_names if name)
+        if not normalized:
+            return False
+        if self.is_emergency:
+            return True
+        return any(name in self.role_names for name in normalized)
+
+
+EMERGENCY_PRINCIPAL = PrincipalSnapshot(
+    id=None,
+    username=OfflineAdminUser.username,
+    role_names=tuple(sorted(OfflineAdminUser._ROLE_NAMES)),
+    is_emergency=True,
+)
+
+
+def build_snapshot(user: User) -> PrincipalSnapshot:
+    """Return a snapshot for a loaded ``User`` row."""
+
+    return PrincipalSnapshot(
+        id=user.id,
+        username=user.username,
+        role_names=tuple(sorted({role.name for role in user.roles if role.name})),
+        default_printer_id=user.default_printer_id,
+        version=user.updated_at,
+    )
+
+
+class PrincipalCache:
+    """Thread-safe, TTL-bounded mapping of user id to :class:`PrincipalSnapshot`."""
+
+    def __init__(
+        self,
+        *,
+        ttl_seconds: float = DEFAULT_CACHE_TTL_SECONDS,
+        max_entries: int = DEFAULT_CACHE_MAX_ENTRIES,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, int(max_entries))
+        self._entries: OrderedDict[int, tuple[float, PrincipalSnapshot]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> PrincipalSnapshot | None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, snapshot = entry
+            if expires_at <= now:
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return snapshot
+
+    def put(self, snapshot: PrincipalSnapshot) -> None:
+        if snapshot.id is None:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._entries[snapshot.id] = (expires_at, snapshot)
+            self._entries.move_to_end(snapshot.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int | None = None) -> None:
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+def _touch_modified_users(session, _flush_context, _instances) -> None:
+    # Role changes only write ``user_roles``; stamp the user row as well so
+    # other workers see a new ``updated_at`` and drop their cached snapshot.
+    now = datetime.utcnow()
+    for instance in session.dirty:
+        if isinstance(instance, User) and session.is_modified(instance):
+            instance.updated_at = now
+        elif isinstance(instance, Role) and session.is_modified(instance):
+            for user in instance.users:
+                user.updated_at = now
+    for instance in session.deleted:
+        if isinstance(instance, Role):
+            for user in instance.users:
+                user.updated_at = now
+
+
+def _invalidate_flushed_users(session, _flush_context) -> None:
+    cache = get_principal_cache()
+    if cache is None:
+        return
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, User) and instance.id is not None:
+            cache.invalidate(instance.id)
+
+
+def init_principal_cache(app) -> PrincipalCache:
+    """Attach a fresh principal cache to ``app``."""
+
+    if not event.contains(db.session, "before_flush", _touch_modified_users):
+        event.listen(db.session, "before_flush", _touch_modified_users)
+    if not event.contains(db.session, "after_flush", _invalidate_flushed_users):
+        event.listen(db.session, "after_flush", _invalidate_flushed_users)
+
+    cache = PrincipalCache(
+        ttl_seconds=float(
+            app.config.get("PRINCIPAL_CACHE_TTL_SECONDS", DEFAULT_CACHE_TTL_SECONDS)
+        ),
+        max_entries=int(
+            app.config.get("PRINCIPAL_CACHE_MAX_ENTRIES", DEFAULT_CACHE_MAX_ENTRIES)
+        ),
+    )
+    app.extensions["principal_cache"] = cache
+    return cache
+
+
+def get_principal_cache() -> PrincipalCache | None:
+    try:
+        return current_app.extensions.get("principal_cache")
+    except RuntimeError:  # pragma: no cover - outside an application context
+        return None
+
+
+def invalidate_principal(user_id: int | None = None) -> None:
+    """Drop the cached snapshot for ``user_id`` (or every user when ``None``)."""
+
+    cache = get_principal_cache()
+    if cache is not None:
+        cache.invalidate(user_id)
+
+
+def load_principal(user_id: int, *, verify: bool = True) -> PrincipalSnapshot | None:
+    """Return the snapshot for ``user_id``, querying the database on a miss.
+
+    With ``verify`` a cache hit is checked against ``User.updated_at`` so edits
+    made by other workers are picked up; the request loader verifies once and
+    later lookups in the same request skip the check.
+    """
+
+    cache = get_principal_cache()
+    if cache is not None:
+        snapshot = cache.get(user_id)
+        if snapshot is not None:
+            if not verify:
+                return snapshot
+            version = db.session.execute(
+                select(User.updated_at).where(User.id == user_id)
+            ).scalar_one_or_none()
+            if version is not None and version == snapshot.version:
+                return snapshot
+            cache.invalidate(user_id)
+            if version is None:
+                return None
+
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+
+    snapshot = build_snapshot(user)
+    if cache is not None:
+        cache.put(snapshot)
+    return snapshot
+
+
+class _CachedRole:
+    """Minimal role object mirroring the ``Role.name`` attribute."""
+
+    __slots__ = ("name",)
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __repr__(self) -> str:  # pragma: no cover - debug helper
+        return f"<Role {self.name}>"
+
+
+class PrincipalUser(UserMixin):
+    """``current_user`` implementation backed by a :class:`PrincipalSnapshot`.
+
+    Identity and role checks are answered from the snapshot.  Any other
+    attribute (``user_settings``, ``check_password``...) loads the ORM row on
+    first use and delegates to it, so existing callers keep working.
+    """
+
+    _OWN_ATTRIBUTES = frozenset({"_snapshot", "_user"})
+    is_emergency_user = False
+
+    def __init__(self, snapshot: PrincipalSnapshot) -> None:
+        object.__setattr__(self, "_snapshot", snapshot)
+        object.__setattr__(self, "_user", None)
+
+    @property
+    def snapshot(self) -> PrincipalSnapshot:
+        """Return the current snapshot, reloading it after an invalidation."""
+
+        try:
+            snapshot = load_principal(self._snapshot.id, verify=False)
+        except SQLAlchemyError:
+            db.session.rollback()
+            snapshot = None
+        if snapshot is not None and snapshot is not self._snapshot:
+            object.__setattr__(self, "_snapshot", snapshot)
+        return self._snapshot
+
+    @property
+    def id(self) -> int | None:
+        return self._snapshot.id
+
+    @property
+    def username(self) -> str | None:
+        return self.snapshot.username
+
+    @property
+    def default_printer_id(self) -> int | None:
+        if self._user is not None:
+            return self._user.default_printer_id
+        return self.snapshot.default_printer_id
+
+    @property
+    def roles(self) -> tuple[_CachedRole, ...]:
+        return tuple(_CachedRole(name) for name in self.snapshot.role_names)
+
+    def has_role(self, role_name: str) -> bool:
+        return self.has_any_role((role_name,))
+
+    def has_any_role(self, role_names) -> bool:
+        if not role_names:
+            return False
+        return self.snapshot.has_any_role(role_names)
+
+    def resolve(self) -> User | None:
+        """Return the ORM ``User`` row for this principal, loading it once."""
+
+        if self._user is None:
+            object.__setattr__(self, "_user", db.session.get(User, self._snapshot.id))
+        return self._user
+
+    def __getattr__(self, name: str):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        user = self.resolve()
+        if user is None:
+            raise AttributeError(name)
+        return getattr(user, name)
+
+    def __setattr__(self, name: str, value) -> None:
+        if name in self._OWN_ATTRIBUTES:
+            object.__setattr__(self, name, value)
+            return
+        user = self.resolve()
+        if user is None:
+            raise AttributeError(name)
+        setattr(user, name, value)
+
+    def __repr__(self) -> str:  # pragma: no cover - debug helper
+        return f"<PrincipalUser {self._snapshot.username}>"
+
+
+def load_principal_user(user_id: str | None) -> PrincipalUser | None:
+    """``login_manager.user_loader`` callback returning a cached principal."""
+
+    if not user_id or is_emergency_mode_active():
+        return None
+    try:
+        snapshot = load_principal(int(user_id))
+    except (TypeError, ValueError):
+        return None
+    except OperationalError:
+        current_app.logger.warning(
+            "Skipped user lookup during login_manager load because the database is unavailable."
+        )
+        return None
+    if snapshot is None:
+        return None
+    return PrincipalUser(snapshot)
+
+
+def current_principal() -> PrincipalSnapshot | None:
+    """Return the snapshot describing ``current_user`` or ``None`` if anonymous."""
+
+    if getattr(current_user, "is_emergency_user", False):
+        return EMERGENCY_PRINCIPAL
+    if not current_user.is_authenticated:
+        return None
+
+    snapshot = getattr(current_user, "snapshot", None)
+    if isinstance(snapshot, PrincipalSnapshot):
+        return snapshot
+
+    # ``login_user`` stores the ORM row for the remainder of the login request.
+    try:
+        user_id = current_user.id
+    except DetachedInstanceError:
+        identity = inspect(current_user._get_current_object()).identity
+        user_id = identity[0] if identity else None
+    if user_id is None:
+        return None
+    try:
+        return load_principal(user_id)
+    except SQLAlchemyError:
+        db.session.rollback()
+        return None
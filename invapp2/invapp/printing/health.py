@@ -0,0 +1,387 @@
+"""Printer reachability tracking with a per-printer circuit breaker.
+
+Every ``host:port`` the application prints to gets a :class:`PrinterHealth`
+record.  Send attempts and background probes report into the registry; after
+``PRINTER_HEALTH_FAILURE_THRESHOLD`` consecutive failures the circuit opens and
+:func:`~invapp.printing.zebra.send_zpl` skips the printer immediately instead of
+waiting on a connect timeout.  Once ``PRINTER_HEALTH_RESET_SECONDS`` have passed
+a single trial send is let through (half-open); its outcome closes or re-opens
+the circuit.  A daemon thread probes every enabled ``Printer`` (plus the system
+default) each ``PRINTER_HEALTH_PROBE_INTERVAL_SECONDS`` so a printer that comes
+back online is picked up without waiting for a user to retry.
+
+The registry lives in each worker's memory, so whenever a printer goes offline
+or comes back the transition is also published on the status bus (source
+``printer_health``); the ops monitor reads the latest one per printer.
+"""
+
+from __future__ import annotations
+
+import os
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Iterable
+
+from flask import current_app
+
+from invapp.services import status_bus
+
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+STATE_LABELS = {
+    STATE_CLOSED: "Online",
+    STATE_OPEN: "Offline",
+    STATE_HALF_OPEN: "Recovering",
+}
+
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_RESET_SECONDS = 60.0
+DEFAULT_PROBE_INTERVAL_SECONDS = 30.0
+DEFAULT_PROBE_TIMEOUT_SECONDS = 2.0
+DEFAULT_PORT = 9100
+
+
+@dataclass
+class PrinterHealth:
+    host: str
+    port: int
+    name: str | None = None
+    state: str = STATE_CLOSED
+    consecutive_failures: int = 0
+    total_failures: int = 0
+    skipped: int = 0
+    last_success_at: datetime | None = None
+    last_failure_at: datetime | None = None
+    last_checked_at: datetime | None = None
+    last_error: str | None = None
+    last_latency_ms: float | None = None
+    opened_at: float | None = None
+    trial_in_flight: bool = False
+
+    @property
+    def key(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "key": self.key,
+            "name": self.name,
+            "host": self.host,
+            "port": self.port,
+            "state": self.state,
+            "label": STATE_LABELS.get(self.state, self.state),
+            "consecutive_failures": self.consecutive_failures,
+            "total_failures": self.total_failures,
+            "skipped": self.skipped,
+            "last_success_at": _isoformat(self.last_success_at),
+            "last_failure_at": _isoformat(self.last_failure_at),
+            "last_checked_at": _isoformat(self.last_checked_at),
+            "last_error": self.last_error,
+            "last_latency_ms": self.last_latency_ms,
+        }
+
+
+def _isoformat(value: datetime | None) -> str | None:
+    return value.isoformat() if value is not None else None
+
+
+def _default_connect(host: str, port: int, timeout: float) -> None:
+    with socket.create_connection((host, port), timeout=timeout):
+        pass
+
+
+class PrinterHealthRegistry:
+    """Thread-safe health records and circuit state keyed by ``host:port``."""
+
+    def __init__(
+        self,
+        *,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        reset_seconds: float = DEFAULT_RESET_SECONDS,
+        probe_timeout: float = DEFAULT_PROBE_TIMEOUT_SECONDS,
+        probe_interval: float = DEFAULT_PROBE_INTERVAL_SECONDS,
+        default_port: int = DEFAULT_PORT,
+        clock: Callable[[], float] = time.monotonic,
+        connect: Callable[[str, int, float], None] = _default_connect,
+        on_transition: Callable[[dict[str, Any]], None] | None = None,
+    ) -> None:
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_seconds = max(0.0, float(reset_seconds))
+        self.probe_timeout = float(probe_timeout)
+        self.probe_interval = float(probe_interval)
+        self.default_port = int(default_port)
+        self._clock = clock
+        self._connect = connect
+        self.on_transition = on_transition
+        self._records: dict[tuple[str, int], PrinterHealth] = {}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._thread_pid: int | None = None
+        self._target_loader: Callable[[], Iterable[tuple[str, int | None, str | None]]] | None = None
+
+    def _key(self, host: str, port: int | None) -> tuple[str, int]:
+        return (host.strip().lower(), int(port or self.default_port))
+
+    def _record(self, host: str, port: int | None) -> PrinterHealth:
+        key = self._key(host, port)
+        record = self._records.get(key)
+        if record is None:
+            record = PrinterHealth(host=key[0], port=key[1])
+            self._records[key] = record
+        return record
+
+    def allow(self, host: str, port: int | None) -> bool:
+        """Return ``False`` when sends to ``host:port`` should be skipped."""
+
+        with self._lock:
+            record = self._record(host, port)
+            if record.state == STATE_CLOSED:
+                return True
+            if record.state == STATE_OPEN:
+                opened_at = record.opened_at or 0.0
+                if self._clock() - opened_at < self.reset_seconds:
+                    record.skipped += 1
+                    return False
+                record.state = STATE_HALF_OPEN
+                record.trial_in_flight = False
+            if record.trial_in_flight:
+                record.skipped += 1
+                return False
+            record.trial_in_flight = True
+            return True
+
+    def _notify(self, transition: dict[str, Any] | None) -> None:
+        if transition is None or self.on_transition is None:
+            return
+        try:
+            self.on_transition(transition)
+        except Exception:  # pragma: no cover - reporting must not break printing
+            pass
+
+    def record_success(
+        self, host: str, port: int | None, *, latency_ms: float | None = None
+    ) -> None:
+        now = datetime.utcnow()
+        transition = None
+        with self._lock:
+            record = self._record(host, port)
+            recovered = record.state != STATE_CLOSED
+            record.state = STATE_CLOSED
+            record.consecutive_failures = 0
+            record.opened_at = None
+            record.trial_in_flight = False
+            record.last_error = None
+            record.last_success_at = now
+            record.last_checked_at = now
+            if latency_ms is not None:
+                record.last_latency_ms = round(latency_ms, 1)
+            if recovered:
+                transition = record.to_dict()
+        self._notify(transition)
+
+    def record_failure(self, host: str, port: int | None, error: str | None = None) -> None:
+        now = datetime.utcnow()
+        transition = None
+        with self._lock:
+            record = self._record(host, port)
+            record.consecutive_failures += 1
+            record.total_failures += 1
+            record.last_error = error
+            record.last_failure_at = now
+            record.last_checked_at = now
+            record.trial_in_flight = False
+            if (
+                record.state == STATE_HALF_OPEN
+                or record.consecutive_failures >= self.failure_threshold
+            ):
+                went_offline = record.state == STATE_CLOSED
+                record.state = STATE_OPEN
+                record.opened_at = self._clock()
+                if went_offline:
+                    transition = record.to_dict()
+        self._notify(transition)
+
+    def probe(self, host: str, port: int | None, *, name: str | None = None) -> bool:
+        """Open a TCP connection to the printer and record the outcome."""
+
+        resolved_port = int(port or self.default_port)
+        if name:
+            with self._lock:
+                self._record(host, resolved_port).name = name
+        started = time.perf_counter()
+        try:
+            self._connect(host, resolved_port, self.probe_timeout)
+        except OSError as exc:
+            self.record_failure(host, resolved_port, str(exc))
+            return False
+        self.record_success(
+            host, resolved_port, latency_ms=(time.perf_counter() - started) * 1000
+        )
+        return True
+
+    def probe_all(
+        self, targets: Iterable[tuple[str, int | None, str | None]] | None = None
+    ) -> int:
+        """Probe each ``(host, port, name)`` target and return how many are up."""
+
+        if targets is None:
+            targets = self._target_loader() if self._target_loader else ()
+        seen: set[tuple[str, int]] = set()
+        online = 0
+        for host, port, name in targets:
+            if not host:
+                continue
+            key = self._key(host, port)
+            if key in seen:
+                continue
+            seen.add(key)
+            if self.probe(host, port, name=name):
+                online += 1
+        return online
+
+    def status(self, host: str | None, port: int | None) -> dict[str, Any] | None:
+        if not host:
+            return None
+        with self._lock:
+            record = self._records.get(self._key(host, port))
+            return record.to_dict() if record is not None else None
+
+    def snapshot(self) -> list[dict[str, Any]]:
+        with self._lock:
+            records = sorted(self._records.values(), key=lambda r: (r.name or r.host, r.port))
+            return [record.to_dict() for record in records]
+
+    def start(
+        self, target_loader: Callable[[], Iterable[tuple[str, int | None, str | None]]]
+    ) -> None:
+        """Start the background prober for this process if it is not running."""
+
+        if self.probe_interval <= 0:
+            return
+        pid = os.getpid()
+        if self._thread is not None and self._thread.is_alive() and self._thread_pid == pid:
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._thread_pid == pid:
+                return
+            self._target_loader = target_loader
+            self._thread = threading.Thread(
+                target=self._run, name="printer-health-probe", daemon=True
+            )
+            self._thread_pid = pid
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.probe_all()
+            except Exception:  # pragma: no cover - keep the prober alive
+                pass
+            time.sleep(self.probe_interval)
+
+
+def _configured_targets(app) -> list[tuple[str, int | None, str | None]]:
+    from invapp.models import Printer
+
+    targets: list[tuple[str, int | None, str | None]] = []
+    with app.app_context():
+        if not app.config.get("DATABASE_AVAILABLE", True):
+            printers = []
+        else:
+            try:
+                printers = Printer.query.filter_by(enabled=True).all()
+            except Exception:
+                printers = []
+        for printer in printers:
+            targets.append((printer.host, printer.port, printer.name))
+        default_host = app.config.get("ZEBRA_PRINTER_HOST")
+        if default_host:
+            targets.append((default_host, app.config.get("ZEBRA_PRINTER_PORT"), None))
+    return targets
+
+
+def _publish_transition(app, record: dict[str, Any]) -> None:
+    name = record["name"] or record["key"]
+    if record["state"] == STATE_OPEN:
+        level = "WARNING"
+        message = f"Printer {name} is offline: {record['last_error'] or 'unreachable'}"
+    else:
+        level = "INFO"
+        message = f"Printer {name} is back online"
+    with app.app_context():
+        status_bus.log_event(
+            level,
+            message,
+            context=record | {"pid": os.getpid()},
+            source="printer_health",
+        )
+
+
+def init_printer_health(app) -> PrinterHealthRegistry:
+    """Attach a printer health registry to ``app``."""
+
+    registry = PrinterHealthRegistry(
+        failure_threshold=int(
+            app.config.get("PRINTER_HEALTH_FAILURE_THRESHOLD", DEFAULT_FAILURE_THRESHOLD)
+        ),
+        reset_seconds=float(
+            app.config.get("PRINTER_HEALTH_RESET_SECONDS", DEFAULT_RESET_SECONDS)
+        ),
+        probe_timeout=float(
+            app.config.get("PRINTER_HEALTH_PROBE_TIMEOUT_SECONDS", DEFAULT_PROBE_TIMEOUT_SECONDS)
+        ),
+        probe_interval=float(
+            app.config.get(
+                "PRINTER_HEALTH_PROBE_INTERVAL_SECONDS", DEFAULT_PROBE_INTERVAL_SECONDS
+            )
+        ),
+        default_port=int(app.config.get("ZEBRA_PRINTER_PORT") or DEFAULT_PORT),
+        on_transition=lambda record: _publish_transition(app, record),
+    )
+    app.extensions["printer_health"] = registry
+    return registry
+
+
+def get_printer_health() -> PrinterHealthRegistry | None:
+    """Return the current app's registry, starting the prober on first use."""
+
+    try:
+        app = current_app._get_current_object()
+    except (AttributeError, RuntimeError):
+        return None
+    extensions = getattr(app, "extensions", None) or {}
+    registry = extensions.get("printer_health")
+    if registry is None:
+        return None
+    if not app.config.get("TESTING", False):
+        registry.start(lambda: _configured_targets(app))
+    return registry
+
+
+def printer_status_rows(printers: Iterable[Any]) -> list[dict[str, Any]]:
+    """Pair each ``Printer`` with its health record for display."""
+
+    registry = get_printer_health()
+    rows = []
+    for printer in printers:
+        status = registry.status(printer.host, printer.port) if registry else None
+        rows.append(
+            {
+                "id": printer.id,
+                "name": printer.name,
+                "connection": printer.connection_label(),
+                "enabled": printer.enabled,
+                "state": status["state"] if status else "unknown",
+                "label": status["label"] if status else "Not checked",
+                "last_error": status["last_error"] if status else None,
+                "last_checked_at": status["last_checked_at"] if status else None,
+                "consecutive_failures": status["consecutive_failures"] if status else 0,
+            }
+        )
+    return rows
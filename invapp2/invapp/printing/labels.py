@@ -1413,7 +1413,7 @@ def render_label_for_process(process: str, context: Mapping[str, Any]) -> str:
     return template.render(context)
 
 
-def build_receiving_label(
+def build_receiving_label_context(
     batch_or_sku: Any,
     description: str | None = None,
     qty: int | None = None,
@@ -1422,8 +1422,8 @@ def build_receiving_label(
     location: Any | None = None,
     po_number: str | None = None,
     lot_number: str | None = None,
-) -> str:
-    """Generate ZPL for a receiving label using the registered batch template."""
+) -> dict[str, Any]:
+    """Build the ``BatchCreated`` label context for a batch or a bare SKU."""
 
     if hasattr(batch_or_sku, "lot_number") or isinstance(batch_or_sku, Mapping):
         context = build_batch_label_context(
@@ -1457,7 +1457,30 @@ def build_receiving_label(
                 "Code": getattr(location, "code", "") if location is not None else "",
             },
         }
+    return context
+
+
+def build_receiving_label(
+    batch_or_sku: Any,
+    description: str | None = None,
+    qty: int | None = None,
+    *,
+    item: Any | None = None,
+    location: Any | None = None,
+    po_number: str | None = None,
+    lot_number: str | None = None,
+) -> str:
+    """Generate ZPL for a receiving label using the registered batch template."""
 
+    context = build_receiving_label_context(
+        batch_or_sku,
+        description,
+        qty,
+        item=item,
+        location=location,
+        po_number=po_number,
+        lot_number=lot_number,
+    )
     return render_label_for_process("BatchCreated", context)
 
 
@@ -0,0 +1,123 @@
+"""Cached PNG previews of label templates.
+
+Previews are rasterized locally by :mod:`invapp.printing.zpl_raster` and kept in
+a per-application LRU keyed by ``(template version, context hash, dpi)``.  The
+template version is a digest of the definition's layout and field bindings, so
+saving a template in the designer naturally produces new cache entries while
+unchanged labels are served without re-rendering.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Mapping
+
+from flask import current_app
+
+from .labels import LabelDefinition, get_template_for_process
+from .zpl_raster import DEFAULT_DPI, render_zpl_png
+
+
+DEFAULT_CACHE_SIZE = 256
+
+
+class LabelPreviewCache:
+    """Bounded LRU of rendered label PNGs."""
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_SIZE) -> None:
+        self.max_entries = max(1, int(max_entries))
+        self._entries: OrderedDict[tuple, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> bytes | None:
+        with self._lock:
+            image = self._entries.get(key)
+            if image is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return image
+
+    def put(self, key: tuple, image: bytes) -> None:
+        with self._lock:
+            self._entries[key] = image
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+def init_label_preview_cache(app) -> LabelPreviewCache:
+    cache = LabelPreviewCache(
+        int(app.config.get("LABEL_PREVIEW_CACHE_SIZE", DEFAULT_CACHE_SIZE))
+    )
+    app.extensions["label_preview_cache"] = cache
+    return cache
+
+
+def get_label_preview_cache() -> LabelPreviewCache | None:
+    try:
+        extensions = getattr(current_app, "extensions", None) or {}
+    except RuntimeError:
+        return None
+    return extensions.get("label_preview_cache")
+
+
+def _digest(payload: Any) -> str:
+    encoded = json.dumps(payload, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+
+def template_version(template: LabelDefinition) -> str:
+    """Content digest identifying one revision of ``template``."""
+
+    return _digest({"layout": template.layout, "fields": template.fields})
+
+
+def context_hash(context: Mapping[str, Any]) -> str:
+    return _digest(context)
+
+
+def render_template_preview(
+    template: LabelDefinition,
+    context: Mapping[str, Any],
+    *,
+    dpi: int = DEFAULT_DPI,
+) -> bytes:
+    """Return a PNG of ``template`` filled with ``context``, using the cache."""
+
+    key = (template_version(template), context_hash(context), int(dpi))
+    cache = get_label_preview_cache()
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    image = render_zpl_png(template.render(context), dpi=int(dpi))
+    if cache is not None:
+        cache.put(key, image)
+    return image
+
+
+def render_process_preview(
+    process: str,
+    context: Mapping[str, Any],
+    *,
+    dpi: int = DEFAULT_DPI,
+) -> bytes:
+    template = get_template_for_process(process)
+    if template is None:
+        raise KeyError(f"No label template assigned to process '{process}'.")
+    return render_template_preview(template, context, dpi=dpi)
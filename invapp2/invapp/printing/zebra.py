@@ -2,11 +2,17 @@
 
 from collections.abc import Mapping
 import socket
-from urllib.request import Request, urlopen
+import time
 
 from flask import current_app
 
-from .labels import build_receiving_label, render_label_for_process
+from .health import get_printer_health
+from .labels import (
+    build_receiving_label,
+    build_receiving_label_context,
+    render_label_for_process,
+)
+from .previews import render_process_preview
 from .printers import (
     PrintResult,
     fallback_to_system_default,
@@ -16,6 +22,9 @@ from .printers import (
 from invapp.services import status_bus
 
 
+DEFAULT_SEND_TIMEOUT_SECONDS = 5.0
+
+
 def send_zpl(
     zpl: str,
     host: str | None = None,
@@ -36,18 +45,40 @@ def send_zpl(
     -------
     bool
         ``True`` if the data was sent successfully, ``False`` otherwise.
+        Printers whose health circuit is open are skipped without connecting,
+        and connects or sends that exceed ``ZEBRA_PRINTER_TIMEOUT_SECONDS``
+        count as failures.
     """
 
     resolved_host = host or current_app.config["ZEBRA_PRINTER_HOST"]
     resolved_port = port or current_app.config["ZEBRA_PRINTER_PORT"]
 
+    health = get_printer_health()
+    if health is not None and not health.allow(resolved_host, resolved_port):
+        current_app.logger.warning(
+            "Skipping printer %s:%s; it is marked offline.", resolved_host, resolved_port
+        )
+        return False
+
+    timeout = float(
+        current_app.config.get("ZEBRA_PRINTER_TIMEOUT_SECONDS", DEFAULT_SEND_TIMEOUT_SECONDS)
+    )
+    started = time.perf_counter()
     try:
-        with socket.create_connection((resolved_host, resolved_port)) as sock:
+        with socket.create_connection((resolved_host, resolved_port), timeout=timeout) as sock:
             sock.sendall(zpl.encode("utf-8"))
-        return True
     except OSError as exc:
         current_app.logger.error("Failed to send ZPL to printer: %s", exc)
+        if health is not None:
+            health.record_failure(resolved_host, resolved_port, str(exc))
         return False
+    if health is not None:
+        health.record_success(
+            resolved_host,
+            resolved_port,
+            latency_ms=(time.perf_counter() - started) * 1000,
+        )
+    return True
 
 
 def print_receiving_label(
@@ -202,12 +233,12 @@ def render_receiving_label_png(
     batch_or_sku,
     description: str | None = None,
     qty: int | None = None,
+    *,
+    dpi: int | None = None,
     **kwargs,
 ) -> bytes:
-    """Render a receiving label as a PNG using the Labelary API."""
+    """Render a receiving label as a PNG without contacting an external service."""
 
-    zpl = build_receiving_label(batch_or_sku, description, qty, **kwargs)
-    url = "http://api.labelary.com/v1/printers/8dpmm/labels/4x6/0/"
-    request = Request(url, data=zpl.encode("utf-8"), headers={"Accept": "image/png"})
-    with urlopen(request) as response:
-        return response.read()
+    context = build_receiving_label_context(batch_or_sku, description, qty, **kwargs)
+    resolved_dpi = dpi or int(current_app.config.get("LABEL_PREVIEW_DPI", 203))
+    return render_process_preview("BatchCreated", context, dpi=resolved_dpi)
@@ -0,0 +1,514 @@
+"""Offline rasterizer for the ZPL subset emitted by :mod:`invapp.printing.labels`.
+
+Label previews used to be rendered by posting ZPL to the public Labelary API,
+which is unreachable from isolated plant networks.  This module draws the
+commands produced by ``labels._render_element`` locally:
+
+``^XA``/``^XZ``
+    label start / end
+``^PW``/``^LL``
+    print width and label length in dots
+``^FO``
+    field origin
+``^A``
+    scalable font (face ignored, orientation and size honoured)
+``^FB``
+    field block word wrapping and justification
+``^FD``/``^FS``
+    field data / field separator
+``^BY``/``^BC``
+    module width and Code 128 (subset B) barcodes
+``^GB``
+    graphic boxes and lines
+
+Text is drawn with a built-in 5x7 bitmap font scaled to the requested cell, so
+previews are faithful in layout rather than typeface.  Output is a 1-bit PNG
+produced with :mod:`zlib` only; no imaging library is required.
+"""
+
+from __future__ import annotations
+
+import re
+import struct
+import zlib
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+DEFAULT_DPI = 203
+SUPPORTED_DPI = (203, 300)
+DEFAULT_LABEL_INCHES = (4, 6)
+DEFAULT_MODULE_WIDTH = 2
+DEFAULT_BARCODE_HEIGHT = 10
+DEFAULT_FONT_HEIGHT = 9
+# Advance-to-height ratio approximating Zebra's scalable font 0.
+FONT_ASPECT = 0.6
+
+WHITE = 0xFF
+BLACK = 0x00
+
+# Column-major 5x7 glyphs for ASCII 0x20-0x7E; bit 0 is the top row.
+_FONT_5X7 = bytes.fromhex(
+    "0000000000" "00005f0000" "0007000700" "147f147f14" "242a7f2a12"
+    "2313086462" "3649552250" "0005030000" "001c224100" "0041221c00"
+    "082a1c2a08" "08083e0808" "0050300000" "0808080808" "0060600000"
+    "2010080402" "3e5149453e" "00427f4000" "4261514946" "2141454b31"
+    "1814127f10" "2745454539" "3c4a494930" "0171090503" "3649494936"
+    "064949291e" "0036360000" "0056360000" "0008142241" "1414141414"
+    "4122140800" "0201510906" "324979413e" "7e1111117e" "7f49494936"
+    "3e41414122" "7f4141221c" "7f49494941" "7f09090101" "3e41415132"
+    "7f0808087f" "00417f4100" "2040413f01" "7f08142241" "7f40404040"
+    "7f0204027f" "7f0408107f" "3e4141413e" "7f09090906" "3e4151215e"
+    "7f09192946" "4649494931" "01017f0101" "3f4040403f" "1f2040201f"
+    "7f2018207f" "6314081463" "0304780403" "6151494543" "00007f4141"
+    "0204081020" "41417f0000" "0402010204" "4040404040" "0001020400"
+    "2054545478" "7f48444438" "3844444420" "384444487f" "3854545418"
+    "087e090102" "081454543c" "7f08040478" "00447d4000" "2040443d00"
+    "007f102844" "00417f4000" "7c04180478" "7c08040478" "3844444438"
+    "7c14141408" "081414187c" "7c08040408" "4854545420" "043f444020"
+    "3c4040207c" "1c2040201c" "3c4030403c" "4428102844" "0c5050503c"
+    "4464544c44" "0008364100" "00007f0000" "0041360800" "08082a1c08"
+)
+
+CODE128_PATTERNS = (
+    "212222", "222122", "222221", "121223", "121322", "131222", "122213", "122312",
+    "132212", "221213", "221312", "231212", "112232", "122132", "122231", "113222",
+    "123122", "123221", "223211", "221132", "221231", "213212", "223112", "312131",
+    "311222", "321122", "321221", "312212", "322112", "322211", "212123", "212321",
+    "232121", "111323", "131123", "131321", "112313", "132113", "132311", "211313",
+    "231113", "231311", "112133", "112331", "132131", "113123", "113321", "133121",
+    "313121", "211331", "231131", "213113", "213311", "213131", "311123", "311321",
+    "331121", "312113", "312311", "332111", "314111", "221411", "431111", "111224",
+    "111422", "121124", "121421", "141122", "141221", "112214", "112412", "122114",
+    "122411", "142112", "142211", "241211", "221114", "413111", "241112", "134111",
+    "111242", "121142", "121241", "114212", "124112", "124211", "411212", "421112",
+    "421211", "212141", "214121", "412121", "111143", "111341", "131141", "114113",
+    "114311", "411113", "411311", "113141", "114131", "311141", "411131", "211412",
+    "211214", "211232", "2331112",
+)
+CODE128_START_B = 104
+CODE128_STOP = 106
+
+_COMMAND_PATTERN = re.compile(r"(?<!\\)[\^~]")
+
+
+class ZPLRenderError(ValueError):
+    """Raised when ZPL cannot be rasterized."""
+
+
+class Bitmap:
+    """8-bit grayscale canvas restricted to black and white pixels."""
+
+    __slots__ = ("width", "height", "pixels")
+
+    def __init__(self, width: int, height: int) -> None:
+        if width <= 0 or height <= 0:
+            raise ZPLRenderError("Label dimensions must be positive.")
+        self.width = int(width)
+        self.height = int(height)
+        self.pixels = bytearray(b"\xff" * (self.width * self.height))
+
+    def fill_rect(self, x: int, y: int, width: int, height: int) -> None:
+        x0 = max(0, int(x))
+        y0 = max(0, int(y))
+        x1 = min(self.width, int(x) + int(width))
+        y1 = min(self.height, int(y) + int(height))
+        if x1 <= x0 or y1 <= y0:
+            return
+        run = bytes(x1 - x0)
+        pixels = self.pixels
+        stride = self.width
+        for row in range(y0, y1):
+            offset = row * stride
+            pixels[offset + x0 : offset + x1] = run
+
+    def to_png(self, *, dpi: int = DEFAULT_DPI) -> bytes:
+        return encode_png(self, dpi=dpi)
+
+
+def _chunk(tag: bytes, data: bytes) -> bytes:
+    return (
+        struct.pack(">I", len(data))
+        + tag
+        + data
+        + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+    )
+
+
+_BIT_TABLE = bytes.maketrans(b"\xff\x00", b"10")
+
+
+def encode_png(bitmap: Bitmap, *, dpi: int = DEFAULT_DPI) -> bytes:
+    """Encode ``bitmap`` as a 1-bit grayscale PNG tagged with ``dpi``."""
+
+    width, height = bitmap.width, bitmap.height
+    row_bytes = (width + 7) // 8
+    padding = b"1" * (row_bytes * 8 - width)
+    pixels = bytes(bitmap.pixels)
+    raw = bytearray()
+    for row in range(height):
+        start = row * width
+        bits = pixels[start : start + width].translate(_BIT_TABLE) + padding
+        raw.append(0)
+        raw += int(bits, 2).to_bytes(row_bytes, "big")
+    pixels_per_metre = int(round(dpi / 0.0254))
+    return b"".join(
+        (
+            b"\x89PNG\r\n\x1a\n",
+            _chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 1, 0, 0, 0, 0)),
+            _chunk(b"pHYs", struct.pack(">IIB", pixels_per_metre, pixels_per_metre, 1)),
+            _chunk(b"IDAT", zlib.compress(bytes(raw), 6)),
+            _chunk(b"IEND", b""),
+        )
+    )
+
+
+@lru_cache(maxsize=2048)
+def _glyph_runs(char: str, width: int, height: int) -> tuple[tuple[int, int, int, int], ...]:
+    """Return the rectangles that draw ``char`` in a ``width`` x ``height`` cell."""
+
+    code = ord(char)
+    if code < 0x20 or code > 0x7E:
+        code = ord("?")
+    offset = (code - 0x20) * 5
+    columns = _FONT_5X7[offset : offset + 5]
+    # 5x7 glyph inside a 6x8 cell leaves one column and one row of spacing.
+    scale_x = width / 6.0
+    scale_y = height / 8.0
+    runs: list[tuple[int, int, int, int]] = []
+    for col, bits in enumerate(columns):
+        x0 = int(round(col * scale_x))
+        x1 = max(x0 + 1, int(round((col + 1) * scale_x)))
+        row = 0
+        while row < 7:
+            if not bits & (1 << row):
+                row += 1
+                continue
+            start = row
+            while row < 7 and bits & (1 << row):
+                row += 1
+            y0 = int(round(start * scale_y))
+            y1 = max(y0 + 1, int(round(row * scale_y)))
+            runs.append((x0, y0, x1 - x0, y1 - y0))
+    return tuple(runs)
+
+
+def text_rects(x: int, y: int, text: str, width: int, height: int) -> list[tuple[int, int, int, int]]:
+    """Rectangles drawing ``text`` with ``width`` x ``height`` character cells."""
+
+    rects = []
+    for index, char in enumerate(text):
+        if char == " ":
+            continue
+        origin_x = x + index * width
+        for dx, dy, run_width, run_height in _glyph_runs(char, width, height):
+            rects.append((origin_x + dx, y + dy, run_width, run_height))
+    return rects
+
+
+def _place(
+    target: Bitmap,
+    rects: list[tuple[int, int, int, int]],
+    x: int,
+    y: int,
+    box: tuple[int, int],
+    orientation: str,
+) -> None:
+    """Draw ``rects`` laid out in a ``box`` rotated clockwise by ``orientation``."""
+
+    box_width, box_height = box
+    fill = target.fill_rect
+    for lx, ly, w, h in rects:
+        if orientation == "R":
+            fill(x + box_height - ly - h, y + lx, h, w)
+        elif orientation == "I":
+            fill(x + box_width - lx - w, y + box_height - ly - h, w, h)
+        elif orientation == "B":
+            fill(x + ly, y + box_width - lx - w, h, w)
+        else:
+            fill(x + lx, y + ly, w, h)
+
+
+def code128_modules(data: str) -> list[int]:
+    """Return bar/space widths (in modules) encoding ``data`` in Code 128 B."""
+
+    values = [CODE128_START_B]
+    for char in data:
+        code = ord(char)
+        if code < 32 or code > 126:
+            raise ZPLRenderError(f"Character {char!r} cannot be encoded in Code 128 B.")
+        values.append(code - 32)
+    checksum = values[0]
+    for position, value in enumerate(values[1:], start=1):
+        checksum += position * value
+    values.append(checksum % 103)
+    values.append(CODE128_STOP)
+    widths: list[int] = []
+    for value in values:
+        widths.extend(int(digit) for digit in CODE128_PATTERNS[value])
+    return widths
+
+
+@dataclass
+class _FieldState:
+    x: int = 0
+    y: int = 0
+    font_orientation: str = "N"
+    font_height: int = DEFAULT_FONT_HEIGHT * 3
+    font_width: int | None = None
+    block: tuple[int, int, int, str] | None = None
+    barcode: dict | None = None
+    box: tuple[int, int, int] | None = None
+    data: str | None = None
+
+
+@dataclass
+class LabelCanvas:
+    """Interpreter state for one ``^XA`` ... ``^XZ`` label."""
+
+    dpi: int = DEFAULT_DPI
+    scale: float = 1.0
+    width: int | None = None
+    height: int | None = None
+    module_width: int = DEFAULT_MODULE_WIDTH
+    barcode_height: int = DEFAULT_BARCODE_HEIGHT
+    default_font: tuple[int, int | None] = (DEFAULT_FONT_HEIGHT * 3, None)
+    operations: list = field(default_factory=list)
+
+
+def _int(value: str | None, default: int = 0) -> int:
+    try:
+        return int(float(value)) if value not in (None, "") else default
+    except ValueError:
+        return default
+
+
+def _params(text: str) -> list[str]:
+    return [part.strip() for part in text.split(",")]
+
+
+def _unescape(text: str) -> str:
+    return text.replace("\\^", "^").replace("\\~", "~")
+
+
+def _tokenize(zpl: str) -> list[tuple[str, str]]:
+    tokens: list[tuple[str, str]] = []
+    positions = [match.start() for match in _COMMAND_PATTERN.finditer(zpl)]
+    for index, start in enumerate(positions):
+        end = positions[index + 1] if index + 1 < len(positions) else len(zpl)
+        body = zpl[start + 1 : end]
+        command = body[:2].upper()
+        argument = body[2:]
+        if command != "FD":
+            argument = argument.strip()
+        else:
+            argument = argument.rstrip("\r\n")
+        tokens.append((command, argument))
+    return tokens
+
+
+def parse_zpl(zpl: str, *, dpi: int = DEFAULT_DPI, source_dpi: int = DEFAULT_DPI) -> LabelCanvas:
+    """Interpret ``zpl`` into drawing operations scaled from ``source_dpi`` to ``dpi``."""
+
+    if dpi not in SUPPORTED_DPI:
+        raise ZPLRenderError(f"Unsupported DPI {dpi}; expected one of {SUPPORTED_DPI}.")
+    scale = dpi / float(source_dpi)
+
+    def s(value: int) -> int:
+        return max(0, int(round(value * scale)))
+
+    canvas = LabelCanvas(dpi=dpi, scale=scale)
+    state = _FieldState(font_height=s(canvas.default_font[0]))
+    started = False
+
+    for command, argument in _tokenize(zpl):
+        if command == "XA":
+            started = True
+            state = _FieldState(font_height=s(canvas.default_font[0]))
+        elif command == "XZ":
+            break
+        elif not started:
+            continue
+        elif command == "PW":
+            canvas.width = s(_int(argument))
+        elif command == "LL":
+            canvas.height = s(_int(argument))
+        elif command == "FO":
+            params = _params(argument)
+            state.x = s(_int(params[0] if params else None))
+            state.y = s(_int(params[1] if len(params) > 1 else None))
+        elif command == "CF":
+            params = _params(argument)
+            height = _int(params[1] if len(params) > 1 else None, DEFAULT_FONT_HEIGHT * 3)
+            width = _int(params[2] if len(params) > 2 else None) or None
+            canvas.default_font = (height, width)
+            state.font_height = s(height)
+            state.font_width = s(width) if width else None
+        elif command.startswith("A") and len(command) == 2 and command != "A@":
+            # ``^A0N,30,30`` (ZPL) and ``^A0,N,30`` (labels.py) both name the font first.
+            params = _params(argument[1:] if argument.startswith(",") else argument)
+            orientation = (params[0][:1] if params and params[0] else "N").upper()
+            height = _int(params[1] if len(params) > 1 else None, canvas.default_font[0])
+            width = _int(params[2] if len(params) > 2 else None) or None
+            state.font_orientation = orientation if orientation in "NRIB" else "N"
+            state.font_height = s(height)
+            state.font_width = s(width) if width else None
+        elif command == "FB":
+            params = _params(argument)
+            state.block = (
+                s(_int(params[0] if params else None)),
+                max(1, _int(params[1] if len(params) > 1 else None, 1)),
+                s(_int(params[2] if len(params) > 2 else None)),
+                (params[3][:1] if len(params) > 3 and params[3] else "L").upper(),
+            )
+        elif command == "BY":
+            params = _params(argument)
+            canvas.module_width = max(1, _int(params[0] if params else None, DEFAULT_MODULE_WIDTH))
+            if len(params) > 2 and params[2]:
+                canvas.barcode_height = _int(params[2], DEFAULT_BARCODE_HEIGHT)
+        elif command == "BC":
+            params = _params(argument)
+            orientation = (params[0][:1] if params and params[0] else "N").upper()
+            state.barcode = {
+                "orientation": orientation if orientation in "NRIB" else "N",
+                "height": s(_int(params[1] if len(params) > 1 else None, canvas.barcode_height)),
+                "print_text": (params[2] if len(params) > 2 and params[2] else "Y").upper() == "Y",
+                "text_above": (params[3] if len(params) > 3 and params[3] else "N").upper() == "Y",
+                "module": max(1, s(canvas.module_width)),
+            }
+        elif command == "GB":
+            params = _params(argument)
+            thickness = max(1, _int(params[2] if len(params) > 2 else None, 1))
+            width = max(_int(params[0] if params else None, thickness), thickness)
+            height = max(_int(params[1] if len(params) > 1 else None, thickness), thickness)
+            state.box = (s(width), s(height), max(1, s(thickness)))
+        elif command == "FD":
+            state.data = _unescape(argument)
+        elif command == "FS":
+            _emit_field(canvas, state)
+            state = _FieldState(
+                font_orientation=state.font_orientation,
+                font_height=state.font_height,
+                font_width=state.font_width,
+            )
+
+    if canvas.width is None:
+        canvas.width = DEFAULT_LABEL_INCHES[0] * dpi
+    if canvas.height is None:
+        canvas.height = DEFAULT_LABEL_INCHES[1] * dpi
+    return canvas
+
+
+def _emit_field(canvas: LabelCanvas, state: _FieldState) -> None:
+    if state.box is not None:
+        canvas.operations.append(("box", state.x, state.y, *state.box))
+        return
+    if state.data is None:
+        return
+    if state.barcode is not None:
+        canvas.operations.append(("barcode", state.x, state.y, state.data, dict(state.barcode)))
+        return
+    height = max(1, state.font_height)
+    width = max(1, state.font_width or int(round(height * FONT_ASPECT)))
+    canvas.operations.append(
+        ("text", state.x, state.y, state.data, width, height, state.font_orientation, state.block)
+    )
+
+
+def _layout_lines(text: str, advance: int, block: tuple[int, int, int, str] | None) -> list[tuple[int, str]]:
+    if block is None:
+        return [(0, text)]
+    block_width, max_lines, _spacing, justify = block
+    capacity = max(1, block_width // advance) if block_width else len(text) or 1
+    lines: list[str] = []
+    for paragraph in text.replace("\\&", "\n").split("\n"):
+        current = ""
+        for word in paragraph.split(" "):
+            candidate = f"{current} {word}" if current else word
+            if len(candidate) <= capacity:
+                current = candidate
+                continue
+            if current:
+                lines.append(current)
+            while len(word) > capacity:
+                lines.append(word[:capacity])
+                word = word[capacity:]
+            current = word
+        lines.append(current)
+    lines = lines[:max_lines]
+    placed = []
+    for line in lines:
+        slack = max(0, block_width - len(line) * advance)
+        if justify == "R":
+            offset = slack
+        elif justify == "C":
+            offset = slack // 2
+        else:
+            offset = 0
+        placed.append((offset, line))
+    return placed
+
+
+def _render_text(op, target: Bitmap) -> None:
+    _, x, y, text, width, height, orientation, block = op
+    lines = _layout_lines(text, width, block)
+    spacing = block[2] if block else 0
+    line_pitch = height + spacing
+    rects: list[tuple[int, int, int, int]] = []
+    for index, (offset, line) in enumerate(lines):
+        rects.extend(text_rects(offset, index * line_pitch, line, width, height))
+    box_width = block[0] if block and block[0] else max(len(line) for _, line in lines) * width
+    box_height = max(1, len(lines) * line_pitch - spacing)
+    _place(target, rects, x, y, (box_width, box_height), orientation)
+
+
+def _render_barcode(op, target: Bitmap) -> None:
+    _, x, y, data, options = op
+    module = options["module"]
+    bar_height = max(1, options["height"])
+    widths = code128_modules(data)
+    total = sum(widths) * module
+    text_height = max(8, module * 9) if options["print_text"] else 0
+    text_gap = max(2, module * 2) if text_height else 0
+    bar_top = text_height + text_gap if options["text_above"] else 0
+    rects: list[tuple[int, int, int, int]] = []
+    cursor = 0
+    for index, modules in enumerate(widths):
+        run = modules * module
+        if index % 2 == 0:
+            rects.append((cursor, bar_top, run, bar_height))
+        cursor += run
+    if text_height:
+        char_width = max(1, int(round(text_height * FONT_ASPECT)))
+        text_x = max(0, (total - len(data) * char_width) // 2)
+        text_y = 0 if options["text_above"] else bar_height + text_gap
+        rects.extend(text_rects(text_x, text_y, data, char_width, text_height))
+    box = (total, bar_height + text_height + text_gap)
+    _place(target, rects, x, y, box, options["orientation"])
+
+
+def _render_box(op, target: Bitmap) -> None:
+    _, x, y, width, height, thickness = op
+    if thickness * 2 >= min(width, height):
+        target.fill_rect(x, y, width, height)
+        return
+    target.fill_rect(x, y, width, thickness)
+    target.fill_rect(x, y + height - thickness, width, thickness)
+    target.fill_rect(x, y, thickness, height)
+    target.fill_rect(x + width - thickness, y, thickness, height)
+
+
+_RENDERERS = {"text": _render_text, "barcode": _render_barcode, "box": _render_box}
+
+
+def rasterize(zpl: str, *, dpi: int = DEFAULT_DPI, source_dpi: int = DEFAULT_DPI) -> Bitmap:
+    canvas = parse_zpl(zpl, dpi=dpi, source_dpi=source_dpi)
+    bitmap = Bitmap(canvas.width, canvas.height)
+    for op in canvas.operations:
+        _RENDERERS[op[0]](op, bitmap)
+    return bitmap
+
+
+def render_zpl_png(zpl: str, *, dpi: int = DEFAULT_DPI, source_dpi: int = DEFAULT_DPI) -> bytes:
+    """Rasterize ``zpl`` (authored for ``source_dpi``) into a PNG at ``dpi``."""
+
+    return encode_png(rasterize(zpl, dpi=dpi, source_dpi=source_dpi), dpi=dpi)
@@ -0,0 +1,496 @@
+"""In-process request metrics with Prometheus and JSON scrape endpoints.
+
+Every request records, under its endpoint name, the wall time (as a
+histogram), the response status and size, the SQL statements it executed
+(count and time, from engine cursor events) and the time spent rendering
+Jinja templates.  Each template additionally records how often it rendered
+and its inclusive and self time (excluding templates it extends or includes,
+but including its own blocks wherever they are rendered), so the costliest
+templates can be found.  Counters live in memory per worker process; ``/metrics``
+serves them in the Prometheus text format and ``/metrics.json`` as a summary
+with estimated percentiles for the operations monitor.  Each series carries a
+``worker`` label (the pid), because gunicorn routes a scrape to any one
+worker.
+
+Recording is a few ``perf_counter`` calls and one short lock per request, so
+the collector stays on in production (``REQUEST_METRICS_ENABLED``).  The
+endpoints answer loopback clients that did not come through a proxy, or any
+client presenting ``Authorization: Bearer <METRICS_TOKEN>``.
+"""
+
+from __future__ import annotations
+
+import hmac
+import ipaddress
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Any
+
+from flask import (
+    Flask,
+    Response,
+    abort,
+    current_app,
+    g,
+    has_app_context,
+    has_request_context,
+    jsonify,
+    request,
+)
+from jinja2 import Template
+from sqlalchemy import event
+
+from invapp.extensions import db
+
+
+# Upper bounds in seconds; the implicit last bucket is +Inf.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BACKGROUND_ENDPOINT = "(background)"
+UNMATCHED_ENDPOINT = "(unmatched)"
+METRICS_ENDPOINTS = frozenset({"request_metrics", "request_metrics_json"})
+
+
+class EndpointStats:
+    __slots__ = (
+        "buckets",
+        "count",
+        "duration_sum",
+        "statuses",
+        "response_bytes",
+        "sql_count",
+        "sql_seconds",
+        "render_seconds",
+    )
+
+    def __init__(self) -> None:
+        self.buckets = [0] * (len(DURATION_BUCKETS) + 1)
+        self.count = 0
+        self.duration_sum = 0.0
+        self.statuses: dict[int, int] = {}
+        self.response_bytes = 0
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.render_seconds = 0.0
+
+    def quantile(self, fraction: float) -> float | None:
+        """Bucket upper bound containing the ``fraction`` quantile."""
+
+        if not self.count:
+            return None
+        target = fraction * self.count
+        cumulative = 0
+        for index, bound in enumerate(DURATION_BUCKETS):
+            cumulative += self.buckets[index]
+            if cumulative >= target:
+                return bound
+        return float("inf")
+
+
+class TemplateStats:
+    __slots__ = ("renders", "inclusive_seconds", "self_seconds")
+
+    def __init__(self) -> None:
+        self.renders = 0
+        self.inclusive_seconds = 0.0
+        self.self_seconds = 0.0
+
+
+class RequestMetrics:
+    """Per-worker aggregate keyed by ``(endpoint, method)``."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.endpoints: dict[tuple[str, str], EndpointStats] = {}
+        self.templates: dict[str, TemplateStats] = {}
+        self.background_sql_count = 0
+        self.background_sql_seconds = 0.0
+
+    def observe(
+        self,
+        endpoint: str,
+        method: str,
+        status: int,
+        duration: float,
+        *,
+        response_bytes: int = 0,
+        sql_count: int = 0,
+        sql_seconds: float = 0.0,
+        render_seconds: float = 0.0,
+    ) -> None:
+        bucket = bisect_left(DURATION_BUCKETS, duration)
+        with self._lock:
+            stats = self.endpoints.get((endpoint, method))
+            if stats is None:
+                stats = self.endpoints[(endpoint, method)] = EndpointStats()
+            stats.buckets[bucket] += 1
+            stats.count += 1
+            stats.duration_sum += duration
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            stats.response_bytes += response_bytes
+            stats.sql_count += sql_count
+            stats.sql_seconds += sql_seconds
+            stats.render_seconds += render_seconds
+
+    def observe_template(
+        self, name: str, inclusive: float, self_time: float, *, rendered: bool
+    ) -> None:
+        with self._lock:
+            stats = self.templates.get(name)
+            if stats is None:
+                stats = self.templates[name] = TemplateStats()
+            if rendered:
+                stats.renders += 1
+                stats.inclusive_seconds += inclusive
+            stats.self_seconds += self_time
+
+    def _copy_templates(self) -> list[tuple[str, int, float, float]]:
+        with self._lock:
+            return [
+                (name, stats.renders, stats.inclusive_seconds, stats.self_seconds)
+                for name, stats in sorted(self.templates.items())
+            ]
+
+    def observe_background_sql(self, seconds: float) -> None:
+        with self._lock:
+            self.background_sql_count += 1
+            self.background_sql_seconds += seconds
+
+    def _copy(self) -> list[tuple[str, str, EndpointStats]]:
+        with self._lock:
+            copied = []
+            for (endpoint, method), stats in sorted(self.endpoints.items()):
+                clone = EndpointStats()
+                clone.buckets = list(stats.buckets)
+                clone.statuses = dict(stats.statuses)
+                for name in (
+                    "count",
+                    "duration_sum",
+                    "response_bytes",
+                    "sql_count",
+                    "sql_seconds",
+                    "render_seconds",
+                ):
+                    setattr(clone, name, getattr(stats, name))
+                copied.append((endpoint, method, clone))
+            return copied
+
+    def summary(self) -> dict[str, Any]:
+        endpoints = []
+        for endpoint, method, stats in self._copy():
+            count = stats.count
+            p50, p95 = stats.quantile(0.5), stats.quantile(0.95)
+            endpoints.append(
+                {
+                    "endpoint": endpoint,
+                    "method": method,
+                    "count": count,
+                    "errors": sum(n for status, n in stats.statuses.items() if status >= 500),
+                    "statuses": {str(status): n for status, n in sorted(stats.statuses.items())},
+                    "avg_ms": round(stats.duration_sum / count * 1000, 2),
+                    "p50_ms": None if p50 is None or p50 == float("inf") else p50 * 1000,
+                    "p95_ms": None if p95 is None or p95 == float("inf") else p95 * 1000,
+                    "avg_sql_statements": round(stats.sql_count / count, 2),
+                    "avg_sql_ms": round(stats.sql_seconds / count * 1000, 2),
+                    "avg_render_ms": round(stats.render_seconds / count * 1000, 2),
+                    "avg_response_bytes": round(stats.response_bytes / count),
+                }
+            )
+        with self._lock:
+            background = {
+                "sql_statements": self.background_sql_count,
+                "sql_ms": round(self.background_sql_seconds * 1000, 2),
+            }
+        templates = [
+            {
+                "template": name,
+                "renders": renders,
+                "avg_ms": round(inclusive / renders * 1000, 2) if renders else None,
+                "self_ms": round(self_time * 1000, 2),
+                "total_ms": round(inclusive * 1000, 2),
+            }
+            for name, renders, inclusive, self_time in self._copy_templates()
+        ]
+        templates.sort(key=lambda entry: entry["self_ms"], reverse=True)
+        return {
+            "worker": os.getpid(),
+            "started_at": self.started_at,
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "endpoints": endpoints,
+            "templates": templates,
+            "background": background,
+        }
+
+    def render_prometheus(self) -> str:
+        worker = str(os.getpid())
+        lines = [
+            "# HELP invapp_http_request_duration_seconds Request wall time by endpoint.",
+            "# TYPE invapp_http_request_duration_seconds histogram",
+        ]
+        snapshot = self._copy()
+        for endpoint, method, stats in snapshot:
+            labels = _labels(worker=worker, endpoint=endpoint, method=method)
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS, stats.buckets):
+                cumulative += count
+                lines.append(
+                    f"invapp_http_request_duration_seconds_bucket"
+                    f"{_labels(worker=worker, endpoint=endpoint, method=method, le=repr(bound))} "
+                    f"{cumulative}"
+                )
+            lines.append(
+                f"invapp_http_request_duration_seconds_bucket"
+                f"{_labels(worker=worker, endpoint=endpoint, method=method, le='+Inf')} "
+                f"{stats.count}"
+            )
+            lines.append(f"invapp_http_request_duration_seconds_sum{labels} {stats.duration_sum:.6f}")
+            lines.append(f"invapp_http_request_duration_seconds_count{labels} {stats.count}")
+
+        lines += [
+            "# HELP invapp_http_requests_total Responses by endpoint and status code.",
+            "# TYPE invapp_http_requests_total counter",
+        ]
+        for endpoint, method, stats in snapshot:
+            for status, count in sorted(stats.statuses.items()):
+                lines.append(
+                    f"invapp_http_requests_total"
+                    f"{_labels(worker=worker, endpoint=endpoint, method=method, status=str(status))} "
+                    f"{count}"
+                )
+
+        counters = (
+            ("invapp_http_response_bytes_total", "Response body bytes.", "response_bytes", "{}"),
+            ("invapp_db_statements_total", "SQL statements executed.", "sql_count", "{}"),
+            ("invapp_db_statement_seconds_total", "Time spent in SQL statements.", "sql_seconds", "{:.6f}"),
+            ("invapp_template_render_seconds_total", "Time spent rendering templates.", "render_seconds", "{:.6f}"),
+        )
+        for name, help_text, attribute, value_format in counters:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for endpoint, method, stats in snapshot:
+                labels = _labels(worker=worker, endpoint=endpoint, method=method)
+                lines.append(f"{name}{labels} {value_format.format(getattr(stats, attribute))}")
+
+        template_counters = (
+            ("invapp_template_renders_total", "Top-level renders per template.", 1, "{}"),
+            (
+                "invapp_template_inclusive_seconds_total",
+                "Render time per template including templates it extends or includes.",
+                2,
+                "{:.6f}",
+            ),
+            (
+                "invapp_template_self_seconds_total",
+                "Render time spent in each template's own code and blocks.",
+                3,
+                "{:.6f}",
+            ),
+        )
+        template_snapshot = self._copy_templates()
+        for name, help_text, index, value_format in template_counters:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for row in template_snapshot:
+                labels = _labels(worker=worker, template=row[0])
+                lines.append(f"{name}{labels} {value_format.format(row[index])}")
+
+        with self._lock:
+            background_count = self.background_sql_count
+            background_seconds = self.background_sql_seconds
+        labels = _labels(worker=worker, endpoint=BACKGROUND_ENDPOINT, method="")
+        lines.append(f"invapp_db_statements_total{labels} {background_count}")
+        lines.append(f"invapp_db_statement_seconds_total{labels} {background_seconds:.6f}")
+        lines += [
+            "# HELP invapp_process_start_time_seconds Worker start time (unix epoch).",
+            "# TYPE invapp_process_start_time_seconds gauge",
+            f"invapp_process_start_time_seconds{_labels(worker=worker)} {self.started_at:.3f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels: str) -> str:
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+_template_frames = threading.local()
+
+
+def _record_template(name: str, inclusive: float, self_time: float, rendered: bool) -> None:
+    if not has_app_context():
+        return
+    metrics = current_app.extensions.get("request_metrics")
+    if metrics is not None:
+        metrics.observe_template(name, inclusive, self_time, rendered=rendered)
+
+
+class _TimedRenderFunc:
+    """Wrap a template's root or block generator to time each ``next()``.
+
+    Nested timed generators (the parent of ``{% extends %}``, includes and
+    blocks of other templates) report their time to the enclosing frame, so
+    it is subtracted from this template's self time.  Compares equal to the
+    wrapped function because ``super()`` looks blocks up by identity.
+    """
+
+    __slots__ = ("name", "func", "rendered")
+
+    def __init__(self, name: str, func, *, rendered: bool) -> None:
+        self.name = name
+        self.func = func
+        self.rendered = rendered
+
+    def __eq__(self, other) -> bool:
+        return other is self or other is self.func
+
+    def __hash__(self) -> int:
+        return hash(self.func)
+
+    def __call__(self, context, *args, **kwargs):
+        frames = _template_frames.__dict__.setdefault("stack", [])
+        iterator = self.func(context, *args, **kwargs)
+        inclusive = 0.0
+        nested = 0.0
+        try:
+            while True:
+                frame = [0.0]
+                frames.append(frame)
+                started = time.perf_counter()
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    elapsed = time.perf_counter() - started
+                    frames.pop()
+                    inclusive += elapsed
+                    nested += frame[0]
+                    if frames:
+                        frames[-1][0] += elapsed
+                yield chunk
+        finally:
+            _record_template(self.name, inclusive, inclusive - nested, self.rendered)
+
+
+class TimedTemplate(Template):
+    """Template that adds its top-level render time to the current request.
+
+    ``{% include %}``/``{% extends %}`` go through the root render functions,
+    not :meth:`render`, so nested templates are not double counted.  The root
+    and block functions are wrapped as well to collect per-template timings.
+    """
+
+    @classmethod
+    def _from_namespace(cls, environment, namespace, globals):
+        template = super()._from_namespace(environment, namespace, globals)
+        name = template.name or "(string)"
+        template.root_render_func = _TimedRenderFunc(
+            name, template.root_render_func, rendered=True
+        )
+        template.blocks = {
+            block: _TimedRenderFunc(name, func, rendered=False)
+            for block, func in template.blocks.items()
+        }
+        return template
+
+    def render(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            if has_request_context():
+                g._metrics_render_seconds = g.get("_metrics_render_seconds", 0.0) + (
+                    time.perf_counter() - started
+                )
+
+
+def _instrument_engine(engine, metrics: RequestMetrics) -> None:
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("_metrics_query_start")
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        if has_request_context():
+            g._metrics_sql_count = g.get("_metrics_sql_count", 0) + 1
+            g._metrics_sql_seconds = g.get("_metrics_sql_seconds", 0.0) + elapsed
+        else:
+            metrics.observe_background_sql(elapsed)
+
+
+def _scrape_allowed() -> bool:
+    token = current_app.config.get("METRICS_TOKEN")
+    header = request.headers.get("Authorization", "")
+    if token and header.startswith("Bearer "):
+        return hmac.compare_digest(header[7:].strip(), str(token))
+    if request.headers.get("X-Forwarded-For") or request.headers.get("X-Real-IP"):
+        return False
+    try:
+        return ipaddress.ip_address(request.remote_addr or "").is_loopback
+    except ValueError:
+        return False
+
+
+def get_request_metrics(app=None) -> RequestMetrics | None:
+    target = app or current_app
+    return target.extensions.get("request_metrics")
+
+
+def init_request_metrics(app: Flask) -> RequestMetrics | None:
+    if not app.config.get("REQUEST_METRICS_ENABLED", True):
+        return None
+
+    metrics = RequestMetrics()
+    app.extensions["request_metrics"] = metrics
+    app.jinja_env.template_class = TimedTemplate
+    with app.app_context():
+        _instrument_engine(db.get_engine(app), metrics)
+
+    @app.before_request
+    def _start_request_timer() -> None:
+        g._metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request_metrics(response):
+        started = g.pop("_metrics_started", None)
+        if started is None:
+            return response
+        endpoint = request.endpoint or UNMATCHED_ENDPOINT
+        if endpoint.startswith("static") or endpoint in METRICS_ENDPOINTS:
+            return response
+        size = 0 if response.is_streamed else (response.content_length or 0)
+        metrics.observe(
+            endpoint,
+            request.method,
+            response.status_code,
+            time.perf_counter() - started,
+            response_bytes=size,
+            sql_count=g.get("_metrics_sql_count", 0),
+            sql_seconds=g.get("_metrics_sql_seconds", 0.0),
+            render_seconds=g.get("_metrics_render_seconds", 0.0),
+        )
+        return response
+
+    def request_metrics():
+        if not _scrape_allowed():
+            abort(404)
+        return Response(
+            metrics.render_prometheus(),
+            mimetype="text/plain; version=0.0.4; charset=utf-8",
+        )
+
+    def request_metrics_json():
+        if not _scrape_allowed():
+            abort(404)
+        return jsonify(metrics.summary())
+
+    app.add_url_rule("/metrics", "request_metrics", request_metrics)
+    app.add_url_rule("/metrics.json", "request_metrics_json", request_metrics_json)
+    return metrics
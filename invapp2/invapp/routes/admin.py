@@ -38,9 +38,11 @@ from invapp.extensions import db
 from invapp.db_maintenance import repair_primary_key_sequences
 from invapp.login import current_user, login_required, logout_user
 from invapp.offline import is_emergency_mode_active
+from invapp.printing.health import STATE_CLOSED, STATE_OPEN, get_printer_health
 from invapp.security import require_roles, require_admin_or_superuser
 from invapp.superuser import is_superuser, superuser_required
-from invapp.services import backup_exporter, backup_service, status_bus
+from invapp.services import backup_exporter, backup_service, db_pool, log_storage, status_bus
+from invapp.services.scheduler import get_leader_scheduler
 
 
 bp = Blueprint("admin", __name__, url_prefix="/admin")
@@ -557,6 +559,12 @@ def tools():
         }
         system_health.append(memory_card)
 
+    system_health.extend(_printer_health_cards(database_online))
+    scheduler_card = _scheduler_card()
+    if scheduler_card:
+        system_health.append(scheduler_card)
+    system_health.append(_db_pool_card())
+
     quick_links = [
         {
             "label": "Emergency command console",
@@ -616,6 +624,97 @@ def tools():
     )
 
 
+def _scheduler_card() -> dict[str, object] | None:
+    leader = get_leader_scheduler()
+    if leader is None:
+        return None
+    status = leader.status()
+    failing = [job["id"] for job in status["jobs"] if job["last_error"]]
+    if status["is_leader"]:
+        meta = f"This worker (pid {status['pid']}) runs {len(status['jobs'])} jobs"
+    else:
+        meta = f"Standby worker (pid {status['pid']}); another process holds the lock"
+    if failing:
+        meta = f"{meta} • failing: {', '.join(failing)}"
+    return {
+        "title": "Job Scheduler",
+        "metric": "Leader" if status["is_leader"] else "Standby",
+        "meta": meta,
+        "level": "warn" if failing or status["last_error"] else "ok",
+    }
+
+
+def _db_pool_card() -> dict[str, object]:
+    status = db_pool.pool_status()
+    if status["pgbouncer"]:
+        metric = "PgBouncer"
+        meta = f"NullPool (pooling delegated) • {status.get('connects', 0)} connects"
+    elif status["size"] is None:
+        metric = status["pool_class"]
+        meta = f"{status.get('checkouts', 0)} checkouts"
+    else:
+        capacity = status["size"] + (status["max_overflow"] or 0)
+        metric = f"{status['checked_out']}/{capacity} in use"
+        meta = (
+            f"pid {status['pid']} • peak {status.get('peak_checked_out', 0)} • "
+            f"overflow peak {status.get('peak_overflow', 0)} • "
+            f"max wait {status.get('wait_ms_max', 0):.0f} ms "
+            f"({status.get('slow_checkouts', 0)} slow, {status.get('timeouts', 0)} timeouts) • "
+            f"{status.get('invalidations', 0)} invalidations • "
+            f"{status['workers']} workers × {capacity} = {status['max_connections']} max"
+        )
+    level = "ok"
+    if status.get("timeouts") or status.get("invalidations"):
+        level = "alert" if status.get("timeouts") else "warn"
+    elif status.get("slow_checkouts"):
+        level = "warn"
+    return {"title": "Database Pool", "metric": metric, "meta": meta, "level": level}
+
+
+def _printer_health_cards(database_online: bool) -> list[dict[str, object]]:
+    registry = get_printer_health()
+    if registry is None:
+        return []
+    printers = (
+        models.Printer.query.filter_by(enabled=True).order_by(models.Printer.name.asc()).all()
+        if database_online
+        else []
+    )
+    cards: list[dict[str, object]] = []
+    for printer in printers:
+        status = registry.status(printer.host, printer.port)
+        if status is None:
+            cards.append(
+                {
+                    "title": f"Printer: {printer.name}",
+                    "metric": "Not checked",
+                    "meta": printer.connection_label(),
+                    "level": "ok",
+                }
+            )
+            continue
+        if status["state"] == STATE_CLOSED:
+            level = "ok"
+            meta = printer.connection_label()
+            if status["last_latency_ms"] is not None:
+                meta = f"{meta} • {status['last_latency_ms']:.0f} ms"
+        else:
+            level = "alert" if status["state"] == STATE_OPEN else "warn"
+            failures = status["consecutive_failures"]
+            meta = f"{failures} consecutive failure{'s' if failures != 1 else ''}"
+            if status["last_error"]:
+                meta = f"{meta} • {status['last_error']}"
+        cards.append(
+            {
+                "title": f"Printer: {printer.name}",
+                "metric": status["label"],
+                "meta": meta,
+                "level": level,
+            }
+        )
+    return cards
+
+
 def _clear_inventory_csrf_token() -> str:
     token = session.get("clear_inventory_csrf")
     if not token:
@@ -784,25 +883,8 @@ def access_log():
         .all()
     )
 
-    ip_summary = (
-        db.session.query(
-            models.AccessLog.ip_address,
-            func.count(models.AccessLog.id).label("total"),
-        )
-        .group_by(models.AccessLog.ip_address)
-        .order_by(func.count(models.AccessLog.id).desc())
-        .limit(20)
-        .all()
-    )
-
-    event_summary = (
-        db.session.query(
-            models.AccessLog.event_type,
-            func.count(models.AccessLog.id).label("total"),
-        )
-        .group_by(models.AccessLog.event_type)
-        .all()
-    )
+    summary_days = int(current_app.config.get("ACCESS_LOG_SUMMARY_DAYS", 30))
+    ip_summary, event_summary = log_storage.access_log_summary(days=summary_days)
 
     event_options = [
         (key, label)
@@ -816,6 +898,7 @@ def access_log():
         ip_summary=ip_summary,
         event_summary=event_summary,
         event_options=event_options,
+        summary_days=summary_days,
         models=models,
     )
 
@@ -948,6 +1031,13 @@ def download_auto_backup(filename: str):
     if backup_path is None:
         current_app.logger.warning("Auto backup download blocked: %s", filename)
         abort(404)
+    if backup_path.is_dir():
+        archive_name = f"{backup_path.name}.tar"
+        return current_app.response_class(
+            backup_service.iter_directory_tar(backup_path),
+            mimetype="application/x-tar",
+            headers={"Content-Disposition": f'attachment; filename="{archive_name}"'},
+        )
     return send_from_directory(
         backup_path.parent,
         backup_path.name,
@@ -971,7 +1061,7 @@ def delete_auto_backup(filename: str):
         return redirect(url_for("admin.auto_backups"))
 
     try:
-        backup_path.unlink()
+        backup_service.delete_auto_backup(backup_path)
         flash(f"Deleted backup {backup_path.name}.", "success")
     except OSError as exc:
         current_app.logger.exception("Failed to delete auto backup %s: %s", filename, exc)
@@ -1048,11 +1138,13 @@ def _log_backup_restore_attempt(
 def backups_home():
     backup_dir = None
     backups = []
+    attachment_snapshots = []
     message = None
 
     try:
         backup_dir = backup_service.get_backup_dir(current_app)
         backups = backup_service.list_backup_files(backup_dir)
+        attachment_snapshots = backup_service.list_attachment_snapshots(backup_dir)
     except Exception as exc:
         current_app.logger.exception("Failed to list backups: %s", exc)
         message = "Backup storage is unavailable. Check BACKUP_DIR permissions."
@@ -1060,6 +1152,7 @@ def backups_home():
     return render_template(
         "admin/backups.html",
         backups=backups,
+        attachment_snapshots=attachment_snapshots,
         backup_dir=str(backup_dir) if backup_dir else None,
         csrf_token=_backup_restore_csrf_token(),
         message=message,
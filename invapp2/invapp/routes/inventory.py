@@ -31,7 +31,7 @@ from flask import (
     session,
     url_for,
 )
-from sqlalchemy import asc, case, desc, func, inspect, or_, select
+from sqlalchemy import asc, desc, func, inspect, or_, select
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.orm import aliased, joinedload, lazyload, load_only
 from sqlalchemy.orm.exc import DetachedInstanceError
@@ -61,12 +61,16 @@ from invapp.models import (
     RoutingStepConsumption,
     User,
     db,
+    record_dictionary_deletions,
+    stamp_dictionary_rows,
 )
 from invapp.services.physical_inventory import (
     NormalizationOptions,
     aggregate_matched_rows,
+    discard_parsed_upload,
     get_item_field_samples,
     get_item_text_fields,
+    get_parsed_upload,
     match_upload_rows,
     items_assigned_to_location,
 )
@@ -78,6 +82,7 @@ from invapp.services.stock_transfer import (
     pending_receipt_case,
 )
 from invapp.services.item_locations import apply_smart_item_locations
+from invapp.services import attachment_store, item_dictionary, search_index
 from invapp.services.floorplan import floorplan_exists, floorplan_path
 from invapp.utils.csv_export import export_rows_to_csv
 from invapp.utils.csv_schema import (
@@ -88,7 +93,13 @@ from invapp.utils.csv_schema import (
     expected_headers,
     resolve_import_mappings,
 )
-from invapp.utils.tabular_import import TabularImportError, parse_tabular_upload, preview_csv_text
+from invapp.utils.tabular_import import (
+    TabularImportError,
+    copy_to_csv,
+    open_tabular_file,
+    open_tabular_upload,
+    preview_rows,
+)
 from invapp.utils.location_parser import parse_location_code
 from invapp.utils.physical_inventory_aisle import (
     UNKNOWN_AISLE,
@@ -155,10 +166,14 @@ def _ensure_placeholder_location(loc_map: dict[str, "Location"]) -> "Location":
 
 
 def _format_location_label(location: Location) -> str:
-    description = (location.description or "").strip()
+    return _location_label(location.code, location.description)
+
+
+def _location_label(code: str, description: str | None) -> str:
+    description = (description or "").strip()
     if description:
-        return f"{location.code} — {description}"
-    return location.code
+        return f"{code} — {description}"
+    return code
 
 
 def _normalize_location_code(code: str) -> str:
@@ -374,19 +389,15 @@ def _save_item_attachment(item: Item, file_storage):
     if not safe_name:
         safe_name = f"attachment_{uuid.uuid4().hex}"
 
-    upload_folder = current_app.config.get("ITEM_ATTACHMENT_UPLOAD_FOLDER")
-    if not upload_folder:
-        return False, "Attachment upload folder is not configured."
-
-    os.makedirs(upload_folder, exist_ok=True)
-    unique_name = f"{uuid.uuid4().hex}_{safe_name}"
-    file_path = os.path.join(upload_folder, unique_name)
-    file_storage.save(file_path)
+    try:
+        stored = attachment_store.store_upload("item", file_storage)
+    except attachment_store.AttachmentStoreError as exc:
+        return False, str(exc)
 
     db.session.add(
         ItemAttachment(
             item=item,
-            filename=unique_name,
+            filename=stored.filename,
             original_name=safe_name,
         )
     )
@@ -421,45 +432,62 @@ def _cleanup_import_storage(namespace, now=None):
 
 
 
-def _store_import_csv(namespace, csv_text, token=None):
-    """Persist CSV text for an import namespace and return its token."""
+def _import_csv_path(namespace, token):
+    if not token or any(ch in token for ch in ("/", "\\")):
+        return None
+    return os.path.join(_get_import_storage_dir(namespace), f"{token}.csv")
 
-    _cleanup_import_storage(namespace)
-    if token and any(ch in token for ch in ("/", "\\")):
-        token = None
-    if not token:
-        token = secrets.token_urlsafe(16)
 
-    path = os.path.join(_get_import_storage_dir(namespace), f"{token}.csv")
+def _store_import_upload(namespace, file_storage):
+    """Stream an uploaded CSV/TSV/XLSX file into import storage as CSV.
 
-    try:
-        with open(path, "w", encoding="utf-8") as handle:
-            handle.write(csv_text)
-    except OSError:
-        if token:
-            return token
-        return None
-    return token
+    Returns ``(token, reader)``.  The token is ``None`` when the file could not
+    be written; ``reader`` carries the normalized headers and any rows that
+    were skipped as malformed.  Raises :class:`TabularImportError` for
+    unreadable uploads.
+    """
 
+    _cleanup_import_storage(namespace)
+    token = secrets.token_urlsafe(16)
+    path = _import_csv_path(namespace, token)
 
+    with open_tabular_upload(file_storage) as reader:
+        try:
+            with open(path, "w", encoding="utf-8", newline="") as handle:
+                copy_to_csv(reader, handle)
+        except OSError:
+            _remove_import_csv(namespace, token)
+            return None, reader
+        except TabularImportError:
+            _remove_import_csv(namespace, token)
+            raise
+    return token, reader
 
-def _load_import_csv(namespace, token):
-    if not token or any(ch in token for ch in ("/", "\\")):
-        return None
-    path = os.path.join(_get_import_storage_dir(namespace), f"{token}.csv")
 
+def _open_import_csv(namespace, token):
+    """Return a streaming reader over a stored import, or ``None`` if it is gone."""
+
+    path = _import_csv_path(namespace, token)
+    if path is None:
+        return None
     try:
-        with open(path, "r", encoding="utf-8") as handle:
-            return handle.read()
+        return open_tabular_file(path)
     except OSError:
         return None
 
 
+def _flash_skipped_rows(reader):
+    if reader.error_count:
+        flash(
+            f"Skipped {reader.error_count} malformed rows: {reader.format_errors()}",
+            "warning",
+        )
+
 
 def _remove_import_csv(namespace, token):
-    if not token or any(ch in token for ch in ("/", "\\")):
+    path = _import_csv_path(namespace, token)
+    if path is None:
         return
-    path = os.path.join(_get_import_storage_dir(namespace), f"{token}.csv")
 
     try:
         os.remove(path)
@@ -467,6 +495,31 @@ def _remove_import_csv(namespace, token):
         pass
 
 
+def _load_physical_inventory_upload(token):
+    """Return the parsed physical inventory upload for ``token``.
+
+    Parsed rows are cached per token so repeated "test matching" requests only
+    normalize columns that have not been used yet.
+    """
+
+    path = _import_csv_path("physical_inventory", token)
+    if path is None:
+        return None
+    try:
+        fingerprint = os.path.getmtime(path)
+    except OSError:
+        discard_parsed_upload(token)
+        return None
+    return get_parsed_upload(
+        token, fingerprint, lambda: _open_import_csv("physical_inventory", token)
+    )
+
+
+def _remove_physical_inventory_upload(token):
+    discard_parsed_upload(token)
+    _remove_import_csv("physical_inventory", token)
+
+
 def _parse_decimal(value):
     if value is None:
         return None
@@ -562,64 +615,41 @@ def _log_unmapped_headers(namespace: str, headers: list[str], mapped: dict[str,
             ", ".join(unmapped),
         )
 
-def _prepare_import_mapping_context(
-    csv_text, fields, namespace, selected_mappings=None, token=None
-):
-
-    stream = io.StringIO(csv_text)
-    reader = csv.reader(stream)
-    try:
-        headers = next(reader)
-    except StopIteration:
-        headers = []
-
-    sample_rows = []
-    if headers:
-        for _ in range(5):
-            try:
-                sample_rows.append(next(reader))
-            except StopIteration:
-                break
-
-
-    import_token = _store_import_csv(namespace, csv_text, token=token)
+def _preview_import_csv(namespace, token, max_rows):
+    reader = _open_import_csv(namespace, token)
+    if reader is None:
+        return [], []
+    with reader:
+        return preview_rows(reader, max_rows=max_rows)
 
 
+def _prepare_import_mapping_context(namespace, token, fields, selected_mappings=None):
+    headers, sample_rows = _preview_import_csv(namespace, token, max_rows=5)
     return {
         "headers": headers,
         "sample_rows": sample_rows,
-        "import_token": import_token,
+        "import_token": token,
 
         "fields": fields,
         "selected_mappings": selected_mappings or {},
     }
 
 
-def _prepare_item_import_mapping_context(csv_text, selected_mappings=None, token=None):
+def _prepare_item_import_mapping_context(token, selected_mappings=None):
     return _prepare_import_mapping_context(
-        csv_text, ITEM_IMPORT_FIELDS, "items", selected_mappings=selected_mappings, token=token
+        "items", token, ITEM_IMPORT_FIELDS, selected_mappings=selected_mappings
     )
 
 
-def _prepare_location_import_mapping_context(
-    csv_text, selected_mappings=None, token=None
-):
+def _prepare_location_import_mapping_context(token, selected_mappings=None):
     return _prepare_import_mapping_context(
-        csv_text,
-        LOCATION_IMPORT_FIELDS,
-        "locations",
-        selected_mappings=selected_mappings,
-        token=token,
+        "locations", token, LOCATION_IMPORT_FIELDS, selected_mappings=selected_mappings
     )
 
 
-def _prepare_stock_import_mapping_context(csv_text, selected_mappings=None, token=None):
+def _prepare_stock_import_mapping_context(token, selected_mappings=None):
     return _prepare_import_mapping_context(
-        csv_text,
-        STOCK_IMPORT_FIELDS,
-        "stock",
-        selected_mappings=selected_mappings,
-        token=token,
+        "stock", token, STOCK_IMPORT_FIELDS, selected_mappings=selected_mappings
     )
 
 
@@ -649,16 +679,14 @@ def _auto_map_physical_inventory_headers(headers: list[str]) -> dict[str, str]:
 
 
 def _prepare_physical_inventory_mapping_context(
-    csv_text: str,
+    token: str,
     selected_mappings: dict[str, str] | None = None,
-    token: str | None = None,
 ):
-    headers, sample_rows = preview_csv_text(csv_text)
-    import_token = _store_import_csv("physical_inventory", csv_text, token=token)
+    headers, sample_rows = _preview_import_csv("physical_inventory", token, max_rows=50)
     return {
         "headers": headers,
         "sample_rows": sample_rows,
-        "import_token": import_token,
+        "import_token": token,
         "selected_mappings": selected_mappings or {},
         "item_fields": get_item_text_fields(),
         "duplicate_strategies": PHYSICAL_INVENTORY_DUPLICATE_STRATEGIES,
@@ -923,22 +951,20 @@ def physical_inventory_import():
                 flash("No import data found. Please upload the file again.", "danger")
                 return redirect(url_for("inventory.physical_inventory_import"))
 
-            csv_text = _load_import_csv("physical_inventory", import_token)
-            if csv_text is None:
+            upload = _load_physical_inventory_upload(import_token)
+            if upload is None:
                 flash(
                     "Could not read the uploaded file data. Please upload the file again.",
                     "danger",
                 )
                 return redirect(url_for("inventory.physical_inventory_import"))
 
-            reader = csv.DictReader(io.StringIO(csv_text))
-            if not reader.fieldnames:
+            if not upload.fieldnames:
                 flash("Uploaded file does not contain a header row.", "danger")
-                _remove_import_csv("physical_inventory", import_token)
+                _remove_physical_inventory_upload(import_token)
                 return redirect(url_for("inventory.physical_inventory_import"))
 
-            rows = list(reader)
-            headers = reader.fieldnames
+            headers = upload.fieldnames
 
             primary_upload_column = request.form.get("primary_upload_column", "")
             primary_item_field = request.form.get("primary_item_field", "")
@@ -979,9 +1005,7 @@ def physical_inventory_import():
                     "quantity": quantity_column,
                 }
                 context = _prepare_physical_inventory_mapping_context(
-                    csv_text,
-                    selected_mappings=selected_mappings,
-                    token=import_token,
+                    import_token, selected_mappings=selected_mappings
                 )
                 context.update(
                     {
@@ -1035,13 +1059,14 @@ def physical_inventory_import():
             )
 
             match_results = match_upload_rows(
-                rows,
+                upload,
                 primary_upload_column=primary_upload_column,
                 primary_item_field=primary_item_field,
                 quantity_column=quantity_column,
                 secondary_upload_column=secondary_upload_column,
                 secondary_item_field=secondary_item_field,
                 options=options,
+                refresh_keys=True,
             )
 
             if duplicate_strategy not in PHYSICAL_INVENTORY_DUPLICATE_STRATEGIES:
@@ -1080,7 +1105,7 @@ def physical_inventory_import():
                 db.session.add(line)
 
             db.session.commit()
-            _remove_import_csv("physical_inventory", import_token)
+            _remove_physical_inventory_upload(import_token)
 
             flash(
                 "Physical inventory snapshot created. "
@@ -1097,19 +1122,26 @@ def physical_inventory_import():
             return redirect(request.url)
 
         try:
-            csv_text = parse_tabular_upload(file)
+            import_token, upload = _store_import_upload("physical_inventory", file)
         except TabularImportError as exc:
             flash(str(exc), "danger")
             return redirect(request.url)
 
-        headers, _ = preview_csv_text(csv_text)
-        if not headers:
+        if not import_token:
+            flash(
+                "Could not prepare the uploaded data. Please try again.",
+                "danger",
+            )
+            return redirect(request.url)
+        if not upload.fieldnames:
+            _remove_import_csv("physical_inventory", import_token)
             flash("Uploaded file does not contain a header row.", "danger")
             return redirect(request.url)
 
-        auto_mappings = _auto_map_physical_inventory_headers(headers)
+        _flash_skipped_rows(upload)
+        auto_mappings = _auto_map_physical_inventory_headers(upload.fieldnames)
         context = _prepare_physical_inventory_mapping_context(
-            csv_text, selected_mappings=auto_mappings
+            import_token, selected_mappings=auto_mappings
         )
         context.update(
             {
@@ -1125,13 +1157,6 @@ def physical_inventory_import():
                 "duplicate_strategy": "sum",
             }
         )
-        if not context.get("import_token"):
-            flash(
-                "Could not prepare the uploaded data. Please try again.",
-                "danger",
-            )
-            return redirect(request.url)
-
         return render_template("inventory/physical_inventory_mapping.html", **context)
 
     return render_template("inventory/physical_inventory_upload.html")
@@ -1142,16 +1167,13 @@ def physical_inventory_import():
 def physical_inventory_test_matching():
     payload = request.get_json(silent=True) or {}
     import_token = payload.get("import_token") or ""
-    csv_text = _load_import_csv("physical_inventory", import_token)
-    if csv_text is None:
+    upload = _load_physical_inventory_upload(import_token)
+    if upload is None:
         return jsonify({"error": "No import data found."}), 400
 
-    reader = csv.DictReader(io.StringIO(csv_text))
-    if not reader.fieldnames:
+    if not upload.fieldnames:
         return jsonify({"error": "Uploaded file does not contain a header row."}), 400
 
-    rows = list(reader)
-
     primary_upload_column = payload.get("primary_upload_column") or ""
     primary_item_field = payload.get("primary_item_field") or ""
     quantity_column = payload.get("quantity_column") or ""
@@ -1170,7 +1192,7 @@ def physical_inventory_test_matching():
 
     try:
         match_results = match_upload_rows(
-            rows,
+            upload,
             primary_upload_column=primary_upload_column,
             primary_item_field=primary_item_field,
             quantity_column=quantity_column,
@@ -1835,21 +1857,14 @@ def search_items_api():
     if not query:
         return jsonify({"error": "Query is required"}), 400
 
-    like_pattern = f"%{query}%"
-    matches = (
-        Item.query.options(load_only(Item.sku, Item.name))
-        .filter(or_(Item.sku.ilike(like_pattern), Item.name.ilike(like_pattern)))
-        .order_by(Item.sku)
-        .limit(20)
-        .all()
-    )
+    matches = search_index.search_items(query, limit=20, include_description=False)
 
     return jsonify(
         {
             "results": [
                 {
-                    "sku": item.sku,
-                    "name": item.name,
+                    "sku": item["sku"],
+                    "name": item["name"],
                 }
                 for item in matches
             ]
@@ -1892,39 +1907,35 @@ def search_locations_api():
             ]
         )
 
-    lowered = query.lower()
-    contains_pattern = f"%{lowered}%"
-    prefix_pattern = f"{lowered}%"
-    ranking = case(
-        (func.lower(Location.code).like(prefix_pattern), 0),
-        else_=1,
-    )
-
-    matches = (
-        base_query.filter(
-            or_(
-                func.lower(Location.code).like(contains_pattern),
-                func.lower(Location.description).like(contains_pattern),
-            )
-        )
-        .order_by(ranking, func.lower(Location.code))
-        .limit(LOCATION_SEARCH_LIMIT)
-        .all()
-    )
+    matches = search_index.search_locations(query, limit=LOCATION_SEARCH_LIMIT)
 
     return jsonify(
         [
             {
-                "id": location.id,
-                "code": location.code,
-                "description": location.description or "",
-                "label": _format_location_label(location),
+                "id": location["id"],
+                "code": location["code"],
+                "description": location["description"] or "",
+                "label": _location_label(location["code"], location["description"]),
             }
             for location in matches
         ]
     )
 
 
+@bp.get("/api/dictionary")
+def item_dictionary_api():
+    """Item/location dictionary for offline scanner lookups.
+
+    ``?since=<version>`` returns only the rows changed or deleted after that
+    version; without it (or with an unusable token) a full snapshot is sent.
+    """
+
+    since = request.args.get("since", type=int)
+    response = jsonify(item_dictionary.build_dictionary(since))
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
 @bp.route("/api/items/<sku>")
 def lookup_item_api(sku):
     sku = sku.strip()
@@ -2490,16 +2501,15 @@ def download_item_attachment(item_id, attachment_id):
         ItemAttachment.query.filter_by(id=attachment_id, item_id=item_id)
         .first_or_404()
     )
-    upload_folder = current_app.config.get("ITEM_ATTACHMENT_UPLOAD_FOLDER")
-    if not upload_folder:
-        abort(404)
-
-    return send_from_directory(
-        upload_folder,
+    response = attachment_store.send_attachment(
+        "item",
         attachment.filename,
-        as_attachment=True,
-        download_name=attachment.original_name,
+        attachment.original_name,
+        thumbnail=request.args.get("thumbnail") == "1",
     )
+    if response is None:
+        abort(404)
+    return response
 
 
 @bp.route(
@@ -2514,14 +2524,7 @@ def delete_item_attachment(item_id, attachment_id):
         .first_or_404()
     )
 
-    upload_folder = current_app.config.get("ITEM_ATTACHMENT_UPLOAD_FOLDER")
-    if upload_folder:
-        file_path = os.path.join(upload_folder, attachment.filename)
-        try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-        except OSError:
-            pass
+    attachment_store.release("item", ItemAttachment, attachment.filename)
 
     db.session.delete(attachment)
     db.session.commit()
@@ -2645,7 +2648,9 @@ def delete_all_items():
         )
         return redirect(url_for("inventory.list_items"))
 
+    item_ids = [item_id for (item_id,) in db.session.query(Item.id)]
     deleted_count = Item.query.delete(synchronize_session=False)
+    record_dictionary_deletions(Item, item_ids)
     db.session.commit()
 
     if deleted_count:
@@ -2677,7 +2682,9 @@ def delete_available_items():
         )
         return redirect(url_for("inventory.list_items"))
 
+    item_ids = [item_id for (item_id,) in deletable_query.with_entities(Item.id)]
     deleted = deletable_query.delete(synchronize_session=False)
+    record_dictionary_deletions(Item, item_ids)
     db.session.commit()
     flash(
         f"Deleted {deleted} item{'s' if deleted != 1 else ''} that had no related records.",
@@ -2711,9 +2718,9 @@ def import_items():
                 return redirect(url_for("inventory.import_items"))
 
 
-            csv_text = _load_import_csv("items", import_token)
+            reader = _open_import_csv("items", import_token)
 
-            if csv_text is None:
+            if reader is None:
                 flash(
                     "Could not read the uploaded CSV data. Please upload the file again.",
                     "danger",
@@ -2723,7 +2730,6 @@ def import_items():
 
                 return redirect(url_for("inventory.import_items"))
 
-            reader = csv.DictReader(io.StringIO(csv_text))
             if not reader.fieldnames:
                 flash("Uploaded CSV does not contain a header row.", "danger")
 
@@ -2756,9 +2762,7 @@ def import_items():
                     "danger",
                 )
                 context = _prepare_item_import_mapping_context(
-                    csv_text,
-                    selected_mappings=selected_mappings,
-                    token=import_token,
+                    import_token, selected_mappings=selected_mappings
                 )
 
                 context.update(
@@ -2780,9 +2784,7 @@ def import_items():
                     "danger",
                 )
                 context = _prepare_item_import_mapping_context(
-                    csv_text,
-                    selected_mappings=selected_mappings,
-                    token=import_token,
+                    import_token, selected_mappings=selected_mappings
                 )
 
                 context.update(
@@ -2998,18 +3000,28 @@ def import_items():
             return redirect(request.url)
 
         try:
-            csv_text = file.stream.read().decode("utf-8-sig")
-        except UnicodeDecodeError:
-            flash("CSV import files must be UTF-8 encoded.", "danger")
+            import_token, upload = _store_import_upload("items", file)
+        except TabularImportError as exc:
+            flash(str(exc), "danger")
             return redirect(request.url)
 
+        if not import_token:
+            flash(
+                "Could not prepare the uploaded CSV. Please try again.",
+                "danger",
+            )
+            return redirect(request.url)
+        if not upload.fieldnames:
+            _remove_import_csv("items", import_token)
+            flash("Uploaded CSV does not contain a header row.", "danger")
+            return redirect(request.url)
 
-        headers = next(csv.reader(io.StringIO(csv_text)), [])
+        _flash_skipped_rows(upload)
         auto_mappings = resolve_import_mappings(
-            headers, ITEM_IMPORT_FIELDS, ITEMS_HEADER_ALIASES
+            upload.fieldnames, ITEM_IMPORT_FIELDS, ITEMS_HEADER_ALIASES
         )
         context = _prepare_item_import_mapping_context(
-            csv_text, selected_mappings=auto_mappings
+            import_token, selected_mappings=auto_mappings
         )
         context.update(
             {
@@ -3017,17 +3029,6 @@ def import_items():
                 "start_over_url": url_for("inventory.import_items"),
             }
         )
-        import_token = context.get("import_token")
-        if not import_token:
-            flash(
-                "Could not prepare the uploaded CSV. Please try again.",
-                "danger",
-            )
-            return redirect(request.url)
-        if not context["headers"]:
-            _remove_import_csv("items", import_token)
-            flash("Uploaded CSV does not contain a header row.", "danger")
-            return redirect(request.url)
 
         return render_template("inventory/import_mapping.html", **context)
 
@@ -3327,6 +3328,15 @@ def delete_all_locations():
     items_cleared = 0
     deleted = 0
     try:
+        # Bulk writes skip the mapper events that version the scanner
+        # dictionary, so stamp and tombstone the affected rows explicitly.
+        relocated_item_ids = [
+            item_id
+            for (item_id,) in db.session.query(Item.id).filter(
+                Item.default_location_id.isnot(None)
+            )
+        ]
+        location_ids = [location_id for (location_id,) in db.session.query(Location.id)]
         items_cleared = (
             db.session.query(Item)
             .filter(
@@ -3346,6 +3356,8 @@ def delete_all_locations():
             )
         )
         deleted = Location.query.delete(synchronize_session=False)
+        stamp_dictionary_rows(Item, relocated_item_ids)
+        record_dictionary_deletions(Location, location_ids)
         db.session.commit()
     except SQLAlchemyError:
         db.session.rollback()
@@ -3678,8 +3690,8 @@ def import_locations():
                     flash("No CSV data found. Please upload the file again.", "danger")
                     return redirect(url_for("inventory.import_locations"))
 
-                csv_text = _load_import_csv("locations", import_token)
-                if csv_text is None:
+                reader = _open_import_csv("locations", import_token)
+                if reader is None:
                     flash(
                         "Could not read the uploaded CSV data. Please upload the file again.",
                         "danger",
@@ -3709,9 +3721,7 @@ def import_locations():
                         "danger",
                     )
                     context = _prepare_location_import_mapping_context(
-                        csv_text,
-                        selected_mappings=selected_mappings,
-                        token=import_token,
+                        import_token, selected_mappings=selected_mappings
                     )
                     context.update(
                         {
@@ -3723,7 +3733,6 @@ def import_locations():
                     )
                     return render_template("inventory/import_mapping.html", **context)
 
-                reader = csv.DictReader(io.StringIO(csv_text))
                 if not reader.fieldnames:
                     flash("Uploaded CSV does not contain a header row.", "danger")
                     _remove_import_csv("locations", import_token)
@@ -3740,9 +3749,7 @@ def import_locations():
                         "danger",
                     )
                     context = _prepare_location_import_mapping_context(
-                        csv_text,
-                        selected_mappings=selected_mappings,
-                        token=import_token,
+                        import_token, selected_mappings=selected_mappings
                     )
                     context.update(
                         {
@@ -3826,32 +3833,33 @@ def import_locations():
                 return redirect(request.url)
 
             try:
-                csv_text = file.stream.read().decode("utf-8-sig")
-            except UnicodeDecodeError:
-                flash("CSV import files must be UTF-8 encoded.", "danger")
+                import_token, upload = _store_import_upload("locations", file)
+            except TabularImportError as exc:
+                flash(str(exc), "danger")
                 return redirect(request.url)
 
-            context = _prepare_location_import_mapping_context(csv_text)
-            context.update(
-                {
-                    "mapping_title": "Map Location Columns",
-                    "submit_label": "Import Locations",
-                    "start_over_url": url_for("inventory.import_locations"),
-                    "delete_missing": delete_missing,
-                }
-            )
-            import_token = context.get("import_token")
             if not import_token:
                 flash(
                     "Could not prepare the uploaded CSV. Please try again.",
                     "danger",
                 )
                 return redirect(request.url)
-            if not context["headers"]:
+            if not upload.fieldnames:
                 _remove_import_csv("locations", import_token)
                 flash("Uploaded CSV does not contain a header row.", "danger")
                 return redirect(request.url)
 
+            _flash_skipped_rows(upload)
+            context = _prepare_location_import_mapping_context(import_token)
+            context.update(
+                {
+                    "mapping_title": "Map Location Columns",
+                    "submit_label": "Import Locations",
+                    "start_over_url": url_for("inventory.import_locations"),
+                    "delete_missing": delete_missing,
+                }
+            )
+
             return render_template("inventory/import_mapping.html", **context)
 
         return render_template("inventory/import_locations.html")
@@ -4790,8 +4798,8 @@ def import_stock():
                 flash("No CSV data found. Please upload the file again.", "danger")
                 return redirect(url_for("inventory.import_stock"))
 
-            csv_text = _load_import_csv("stock", import_token)
-            if csv_text is None:
+            reader = _open_import_csv("stock", import_token)
+            if reader is None:
                 flash(
                     "Could not read the uploaded CSV data. Please upload the file again.",
                     "danger",
@@ -4799,7 +4807,6 @@ def import_stock():
                 _remove_import_csv("stock", import_token)
                 return redirect(url_for("inventory.import_stock"))
 
-            reader = csv.DictReader(io.StringIO(csv_text))
             if not reader.fieldnames:
                 flash("Uploaded CSV does not contain a header row.", "danger")
                 _remove_import_csv("stock", import_token)
@@ -4830,9 +4837,7 @@ def import_stock():
                     "danger",
                 )
                 context = _prepare_stock_import_mapping_context(
-                    csv_text,
-                    selected_mappings=selected_mappings,
-                    token=import_token,
+                    import_token, selected_mappings=selected_mappings
                 )
                 context.update(
                     {
@@ -4854,9 +4859,7 @@ def import_stock():
                     "danger",
                 )
                 context = _prepare_stock_import_mapping_context(
-                    csv_text,
-                    selected_mappings=selected_mappings,
-                    token=import_token,
+                    import_token, selected_mappings=selected_mappings
                 )
                 context.update(
                     {
@@ -4878,9 +4881,7 @@ def import_stock():
                     "danger",
                 )
                 context = _prepare_stock_import_mapping_context(
-                    csv_text,
-                    selected_mappings=selected_mappings,
-                    token=import_token,
+                    import_token, selected_mappings=selected_mappings
                 )
                 context.update(
                     {
@@ -5002,17 +5003,28 @@ def import_stock():
             return redirect(request.url)
 
         try:
-            csv_text = file.stream.read().decode("utf-8-sig")
-        except UnicodeDecodeError:
-            flash("CSV import files must be UTF-8 encoded.", "danger")
+            import_token, upload = _store_import_upload("stock", file)
+        except TabularImportError as exc:
+            flash(str(exc), "danger")
+            return redirect(request.url)
+
+        if not import_token:
+            flash(
+                "Could not prepare the uploaded CSV. Please try again.",
+                "danger",
+            )
+            return redirect(request.url)
+        if not upload.fieldnames:
+            _remove_import_csv("stock", import_token)
+            flash("Uploaded CSV does not contain a header row.", "danger")
             return redirect(request.url)
 
-        headers = next(csv.reader(io.StringIO(csv_text)), [])
+        _flash_skipped_rows(upload)
         auto_mappings = resolve_import_mappings(
-            headers, STOCK_IMPORT_FIELDS, STOCK_HEADER_ALIASES
+            upload.fieldnames, STOCK_IMPORT_FIELDS, STOCK_HEADER_ALIASES
         )
         context = _prepare_stock_import_mapping_context(
-            csv_text, selected_mappings=auto_mappings
+            import_token, selected_mappings=auto_mappings
         )
         context.update(
             {
@@ -5021,17 +5033,6 @@ def import_stock():
                 "start_over_url": url_for("inventory.import_stock"),
             }
         )
-        import_token = context.get("import_token")
-        if not import_token:
-            flash(
-                "Could not prepare the uploaded CSV. Please try again.",
-                "danger",
-            )
-            return redirect(request.url)
-        if not context["headers"]:
-            _remove_import_csv("stock", import_token)
-            flash("Uploaded CSV does not contain a header row.", "danger")
-            return redirect(request.url)
 
         return render_template("inventory/import_mapping.html", **context)
 
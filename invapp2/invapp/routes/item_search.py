@@ -1,11 +1,11 @@
 from __future__ import annotations
 
 from flask import Blueprint, jsonify, request
-from sqlalchemy import case, func, or_
-from sqlalchemy.orm import load_only
+from sqlalchemy import func
 
 from invapp.auth import blueprint_page_guard
 from invapp.models import Item, Location, Movement, db
+from invapp.services import search_index
 
 
 bp = Blueprint("item_search", __name__, url_prefix="/api")
@@ -17,8 +17,8 @@ bp.before_request(blueprint_page_guard("purchasing"))
 def search_items():
     """Search items for quick purchasing lookup.
 
-    To extend search criteria, add fields to ``match_filter`` and update
-    ``ranking`` so new columns are ordered deterministically.
+    Matching and ranking live in :mod:`invapp.services.search_index`; add new
+    searchable columns to its item documents.
     """
 
     query = (request.args.get("q") or "").strip()
@@ -27,43 +27,9 @@ def search_items():
     if len(query) > 80:
         return jsonify({"error": "Query must be 80 characters or fewer."}), 400
 
-    lowered = query.lower()
-    contains_pattern = f"%{lowered}%"
-    prefix_pattern = f"{lowered}%"
+    matches = search_index.search_items(query, limit=10)
 
-    match_filter = or_(
-        func.lower(Item.sku).like(contains_pattern),
-        func.lower(Item.name).like(contains_pattern),
-        func.lower(Item.description).like(contains_pattern),
-    )
-
-    ranking = case(
-        (func.lower(Item.sku) == lowered, 0),
-        (func.lower(Item.sku).like(prefix_pattern), 1),
-        (func.lower(Item.sku).like(contains_pattern), 2),
-        else_=3,
-    )
-
-    matches = (
-        Item.query.options(
-            load_only(
-                Item.id,
-                Item.sku,
-                Item.name,
-                Item.description,
-                Item.unit,
-                Item.min_stock,
-                Item.item_class,
-                Item.type,
-            )
-        )
-        .filter(match_filter)
-        .order_by(ranking, Item.sku)
-        .limit(10)
-        .all()
-    )
-
-    item_ids = [item.id for item in matches]
+    item_ids = [item["id"] for item in matches]
     totals_map: dict[int, float] = {}
     locations_map: dict[int, list[dict[str, str | float]]] = {}
     if item_ids:
@@ -105,17 +71,17 @@ def search_items():
     for item in matches:
         results.append(
             {
-                "id": item.id,
-                "item_number": item.sku,
-                "name": item.name,
-                "description": item.description or item.name,
-                "uom": item.unit or "",
-                "default_reorder_qty": item.min_stock,
+                "id": item["id"],
+                "item_number": item["sku"],
+                "name": item["name"],
+                "description": item["description"] or item["name"],
+                "uom": item["unit"] or "",
+                "default_reorder_qty": item["min_stock"],
                 "preferred_supplier_id": None,
                 "preferred_supplier_name": None,
-                "category": item.item_class or item.type,
-                "on_hand_total": totals_map.get(item.id, 0),
-                "locations": locations_map.get(item.id, []),
+                "category": item["item_class"] or item["type"],
+                "on_hand_total": totals_map.get(item["id"], 0),
+                "locations": locations_map.get(item["id"], []),
             }
         )
 
@@ -1,5 +1,3 @@
-import csv
-import io
 import json
 import re
 from collections import defaultdict
@@ -25,10 +23,8 @@ from invapp.security import require_roles
 from invapp.models import (
     BillOfMaterial,
     BillOfMaterialComponent,
-    Batch,
     GateOrderDetail,
     Item,
-    Location,
     Movement,
     Order,
     OrderComponent,
@@ -40,8 +36,25 @@ from invapp.models import (
     RoutingStepConsumption,
 )
 from invapp.login import current_user
+from invapp.services import atp
+from invapp.services.component_availability import (
+    ComponentAvailability,
+    consumption_rows,
+    load_component_availability,
+    order_component_item_ids,
+    order_detail_load_options,
+)
 from invapp.superuser import is_superuser
-from invapp.gate_parser import GatePartNumberError, parse_gate_part_number
+from invapp.gate_parser import (
+    GatePartNumberError,
+    parse_gate_part_number,
+    parse_gate_part_numbers,
+)
+from invapp.utils.tabular_import import (
+    TabularImportError,
+    TabularReader,
+    open_tabular_upload,
+)
 
 bp = Blueprint("orders", __name__, url_prefix="/orders")
 
@@ -49,6 +62,7 @@ bp.before_request(blueprint_page_guard("orders"))
 
 ORDER_TYPE_CHOICES = ("Gates", "COP's", "Operators", "Controllers")
 GATE_ROUTING_STEPS = ("Framing", "Assembly", "Inspection", "Packaging")
+GATE_PART_NUMBER_BATCH_LIMIT = 1000
 
 
 def _ensure_order_management_access():
@@ -98,12 +112,7 @@ def _rebalance_priorities():
 
     reorderable_orders = (
         Order.query.filter(Order.status.in_(OrderStatus.RESERVABLE_STATES))
-        .order_by(
-            Order.priority,
-            Order.promised_date.is_(None),
-            Order.promised_date,
-            Order.order_number,
-        )
+        .order_by(*atp.priority_ordering())
         .all()
     )
 
@@ -115,30 +124,7 @@ def _rebalance_priorities():
 def _available_quantity(item_id: int) -> Decimal:
     """Return on-hand inventory minus active reservations for an item."""
 
-    total_on_hand = Decimal(
-        (
-            db.session.query(func.coalesce(func.sum(Movement.quantity), 0))
-            .filter(Movement.item_id == item_id)
-            .scalar()
-        )
-        or 0
-    )
-
-    reserved_total = Decimal(
-        (
-            db.session.query(func.coalesce(func.sum(Reservation.quantity), 0))
-            .join(OrderLine)
-            .join(Order)
-            .filter(
-                Reservation.item_id == item_id,
-                Order.status.in_(OrderStatus.RESERVABLE_STATES),
-            )
-            .scalar()
-        )
-        or 0
-    )
-
-    available = total_on_hand - reserved_total
+    available = atp.available_quantities([item_id]).get(item_id, Decimal("0"))
     return available if available > 0 else Decimal("0")
 
 
@@ -148,67 +134,20 @@ def _component_requirement(usage: RoutingStepComponent) -> Decimal:
     return Decimal(bom_component.quantity) * Decimal(order_line.quantity)
 
 
-def _position_balance(item_id: int, batch_id: int | None, location_id: int) -> int:
-    filters = [Movement.item_id == item_id, Movement.location_id == location_id]
-    if batch_id is None:
-        filters.append(Movement.batch_id.is_(None))
-    else:
-        filters.append(Movement.batch_id == batch_id)
-
-    balance = (
-        db.session.query(func.coalesce(func.sum(Movement.quantity), 0))
-        .filter(*filters)
-        .scalar()
-    ) or 0
-    return int(balance)
-
-
-def _inventory_options(item_id: int):
-    rows = (
-        db.session.query(
-            Movement.batch_id,
-            Movement.location_id,
-            func.coalesce(func.sum(Movement.quantity), 0).label("on_hand"),
-        )
-        .filter(Movement.item_id == item_id)
-        .group_by(Movement.batch_id, Movement.location_id)
-        .having(func.coalesce(func.sum(Movement.quantity), 0) > 0)
-        .all()
-    )
-
-    batch_ids = {row.batch_id for row in rows if row.batch_id is not None}
-    location_ids = {row.location_id for row in rows if row.location_id is not None}
-
-    batches = {
-        batch.id: batch
-        for batch in Batch.query.filter(Batch.id.in_(batch_ids)).all()
-    } if batch_ids else {}
-    locations = {
-        location.id: location
-        for location in Location.query.filter(Location.id.in_(location_ids)).all()
-    } if location_ids else {}
-
-    options = []
-    for batch_id, location_id, on_hand in rows:
-        batch_label = "Unbatched"
-        if batch_id is not None:
-            batch = batches.get(batch_id)
-            batch_label = batch.lot_number if batch else f"Batch {batch_id}"
-        location_label = "Unknown"
-        if location_id is not None:
-            location = locations.get(location_id)
-            location_label = location.code if location else f"Loc {location_id}"
-
-        options.append(
-            {
-                "value": f"{batch_id if batch_id is not None else 'none'}::{location_id}",
-                "batch_id": batch_id,
-                "location_id": location_id,
-                "label": f"{batch_label} @ {location_label} (avail {_format_quantity(on_hand)})",
-                "available": float(on_hand),
-            }
-        )
-
+def _inventory_options(availability: ComponentAvailability, item_id: int):
+    options = [
+        {
+            "value": f"{position.batch_id if position.batch_id is not None else 'none'}::{position.location_id}",
+            "batch_id": position.batch_id,
+            "location_id": position.location_id,
+            "label": (
+                f"{position.batch_label} @ {position.location_label} "
+                f"(avail {_format_quantity(position.on_hand)})"
+            ),
+            "available": float(position.on_hand),
+        }
+        for position in availability.positions(item_id)
+    ]
     return sorted(options, key=lambda entry: entry["label"])
 
 
@@ -226,6 +165,54 @@ def parse_gate_part_number_api():
     except GatePartNumberError as exc:
         return jsonify({"error": str(exc)}), 400
 
+    return jsonify(_serialize_parsed_gate_part(parsed))
+
+
+@bp.route("/api/parse_gate_part_numbers", methods=["POST"])
+def parse_gate_part_numbers_api():
+    guard_response = _ensure_order_management_access()
+    if guard_response is not None:
+        return guard_response
+
+    payload = request.get_json(silent=True) or {}
+    raw_part_numbers = payload.get("part_numbers")
+    if not isinstance(raw_part_numbers, list):
+        return jsonify({"error": "part_numbers must be a list."}), 400
+    if len(raw_part_numbers) > GATE_PART_NUMBER_BATCH_LIMIT:
+        return (
+            jsonify(
+                {
+                    "error": (
+                        f"At most {GATE_PART_NUMBER_BATCH_LIMIT} part numbers "
+                        "can be parsed per request."
+                    )
+                }
+            ),
+            400,
+        )
+
+    part_numbers = [
+        (value if isinstance(value, str) else "").strip() for value in raw_part_numbers
+    ]
+    results = []
+    for part_number, parsed in zip(part_numbers, parse_gate_part_numbers(part_numbers)):
+        if isinstance(parsed, GatePartNumberError):
+            results.append({"part_number": part_number, "ok": False, "error": str(parsed)})
+            continue
+        entry = _serialize_parsed_gate_part(parsed)
+        entry.update({"part_number": part_number, "ok": True})
+        results.append(entry)
+
+    return jsonify(
+        {
+            "results": results,
+            "parsed_count": sum(1 for entry in results if entry["ok"]),
+            "error_count": sum(1 for entry in results if not entry["ok"]),
+        }
+    )
+
+
+def _serialize_parsed_gate_part(parsed) -> dict:
     response = {
         "material": parsed.material,
         "panel_material_color": parsed.panel_material_color,
@@ -299,7 +286,7 @@ def parse_gate_part_number_api():
         )
 
     response["autofill_fields"] = autofill_fields
-    return jsonify(response)
+    return response
 
 
 def _format_schedule_breakdown(buckets):
@@ -431,7 +418,7 @@ def _resolve_csv_field(normalized_fields, override_name, fallback_keys, *, label
     return None, None
 
 
-def _parse_bulk_bom_rows(reader: csv.DictReader, *, column_overrides=None):
+def _parse_bulk_bom_rows(reader: TabularReader, *, column_overrides=None):
     if column_overrides is None:
         column_overrides = {}
 
@@ -478,7 +465,8 @@ def _parse_bulk_bom_rows(reader: csv.DictReader, *, column_overrides=None):
     bom_rows = defaultdict(lambda: defaultdict(Decimal))
     current_assembly = None
 
-    for row_index, row in enumerate(reader, start=2):
+    for row in reader:
+        row_index = reader.line_num
         assembly_value = (row.get(assembly_field) or "").strip()
         if assembly_value:
             current_assembly = assembly_value
@@ -543,6 +531,7 @@ def _prepare_order_detail(
     pending_completed_ids=None,
     selected_batches=None,
     inspection_values=None,
+    availability: ComponentAvailability | None = None,
 ):
     if selected_batches is None:
         selected_batches = {}
@@ -581,26 +570,15 @@ def _prepare_order_detail(
     component_requirements = {}
     component_consumptions = {}
 
+    if availability is None:
+        availability = load_component_availability(order_component_item_ids(order))
     for step in order.routing_steps:
         for usage in step.component_usages:
-            component_item = usage.bom_component.component_item
-            component_options[usage.id] = _inventory_options(component_item.id)
+            component_options[usage.id] = _inventory_options(
+                availability, usage.bom_component.component_item_id
+            )
             component_requirements[usage.id] = _component_requirement(usage)
-            consumption_rows = []
-            for consumption in usage.consumptions:
-                movement = consumption.movement
-                batch = movement.batch
-                location = movement.location
-                batch_label = batch.lot_number if batch else "Unbatched"
-                location_label = location.code if location else "Unknown"
-                consumption_rows.append(
-                    {
-                        "batch_label": batch_label,
-                        "location_label": location_label,
-                        "quantity": consumption.quantity,
-                    }
-                )
-            component_consumptions[usage.id] = consumption_rows
+            component_consumptions[usage.id] = consumption_rows(usage)
 
     return {
         "order": order,
@@ -855,6 +833,104 @@ def view_waiting_orders():
     return render_template("orders/waiting.html", orders=orders, today=date.today())
 
 
+def _serialize_atp_allocation(allocation) -> dict:
+    return {
+        "order_id": allocation.order_id,
+        "order_number": allocation.order.order_number if allocation.order else None,
+        "item_id": allocation.item_id,
+        "sku": allocation.item.sku if allocation.item else None,
+        "rank": allocation.rank,
+        "required": float(allocation.required),
+        "consumed": float(allocation.consumed),
+        "reserved": float(allocation.reserved),
+        "allocated": float(allocation.allocated),
+        "shortage": float(allocation.shortage),
+    }
+
+
+def _atp_computed_at() -> str | None:
+    computed_at = atp.snapshot_time()
+    return computed_at.isoformat() if computed_at else None
+
+
+@bp.route("/shortages")
+def view_shortages():
+    atp.refresh_atp()
+    shortage_items = atp.shortage_items()
+    orders_by_id = {}
+    short_lines = defaultdict(list)
+    for allocation in atp.shortage_allocations():
+        orders_by_id[allocation.order_id] = allocation.order
+        short_lines[allocation.order_id].append(allocation)
+    short_orders = [
+        {"order": orders_by_id[order_id], "lines": lines}
+        for order_id, lines in short_lines.items()
+    ]
+    return render_template(
+        "orders/shortages.html",
+        shortage_items=shortage_items,
+        short_orders=short_orders,
+        computed_at=atp.snapshot_time(),
+        format_quantity=_format_quantity,
+    )
+
+
+@bp.get("/api/atp/shortages")
+def atp_shortages_api():
+    atp.refresh_atp()
+    return jsonify(
+        {
+            "computed_at": _atp_computed_at(),
+            "shortages": [
+                _serialize_atp_allocation(allocation)
+                for allocation in atp.shortage_allocations()
+            ],
+        }
+    )
+
+
+@bp.get("/api/atp/orders/<int:order_id>")
+def atp_order_api(order_id):
+    order = Order.query.get_or_404(order_id)
+    atp.refresh_atp()
+    allocations = atp.order_allocations(order.id)
+    return jsonify(
+        {
+            "computed_at": _atp_computed_at(),
+            "order_id": order.id,
+            "order_number": order.order_number,
+            "status": order.status,
+            "short": any(allocation.shortage > 0 for allocation in allocations),
+            "components": [
+                _serialize_atp_allocation(allocation) for allocation in allocations
+            ],
+        }
+    )
+
+
+@bp.get("/api/atp/items/<int:item_id>")
+def atp_item_api(item_id):
+    item = Item.query.get_or_404(item_id)
+    atp.refresh_atp()
+    summary = atp.item_summary(item.id)
+    return jsonify(
+        {
+            "computed_at": _atp_computed_at(),
+            "item_id": item.id,
+            "sku": item.sku,
+            "on_hand": float(summary.on_hand) if summary else 0.0,
+            "demand": float(summary.demand) if summary else 0.0,
+            "allocated": float(summary.allocated) if summary else 0.0,
+            "available": float(summary.available) if summary else 0.0,
+            "shortage": float(summary.shortage) if summary else 0.0,
+            "orders": [
+                _serialize_atp_allocation(allocation)
+                for allocation in atp.item_allocations(item.id)
+            ],
+        }
+    )
+
+
 @bp.route("/bom-template/<string:sku>")
 @require_roles("admin")
 def fetch_bom_template(sku: str):
@@ -976,41 +1052,40 @@ def bom_library():
                 errors.append("A CSV file is required to import a BOM.")
             else:
                 try:
-                    raw_content = upload.read().decode("utf-8-sig")
-                except UnicodeDecodeError:
-                    errors.append("CSV import files must be UTF-8 encoded.")
-                else:
-                    stream = io.StringIO(raw_content)
-                    reader = csv.DictReader(stream)
-                    if not reader.fieldnames:
-                        errors.append("CSV file is empty.")
-                    else:
-                        normalized = {
-                            (name or "").strip().lower(): name
-                            for name in reader.fieldnames
-                        }
-                        sku_field = normalized.get("component_sku") or normalized.get("sku")
-                        quantity_field = normalized.get("quantity")
-                        if not sku_field or not quantity_field:
-                            errors.append(
-                                "CSV must include 'component_sku' and 'quantity' columns."
-                            )
+                    with open_tabular_upload(upload) as reader:
+                        if not reader.fieldnames:
+                            errors.append("CSV file is empty.")
                         else:
-                            parsed_entries = []
-                            for row in reader:
-                                sku_value = (row.get(sku_field) or "").strip()
-                                quantity_value = (row.get(quantity_field) or "").strip()
-                                if not sku_value and not quantity_value:
-                                    continue
-                                parsed_entries.append(
-                                    {"sku": sku_value, "quantity": quantity_value}
-                                )
-                            if not parsed_entries:
+                            normalized = {
+                                name.lower(): name for name in reader.fieldnames
+                            }
+                            sku_field = normalized.get("component_sku") or normalized.get(
+                                "sku"
+                            )
+                            quantity_field = normalized.get("quantity")
+                            if not sku_field or not quantity_field:
                                 errors.append(
-                                    "CSV did not include any component rows to import."
+                                    "CSV must include 'component_sku' and 'quantity' columns."
                                 )
-                            bom_payload = parsed_entries
-                            form_data["bom"] = parsed_entries
+                            else:
+                                parsed_entries = []
+                                for row in reader:
+                                    sku_value = row[sku_field].strip()
+                                    quantity_value = row[quantity_field].strip()
+                                    if not sku_value and not quantity_value:
+                                        continue
+                                    parsed_entries.append(
+                                        {"sku": sku_value, "quantity": quantity_value}
+                                    )
+                                errors.extend(str(error) for error in reader.errors)
+                                if not parsed_entries:
+                                    errors.append(
+                                        "CSV did not include any component rows to import."
+                                    )
+                                bom_payload = parsed_entries
+                                form_data["bom"] = parsed_entries
+                except TabularImportError as exc:
+                    errors.append(str(exc))
         else:
             bom_raw = request.form.get("bom_data") or "[]"
             try:
@@ -1179,19 +1254,17 @@ def bom_bulk_import():
             errors.append("A CSV file is required to import BOM templates.")
         else:
             try:
-                raw_content = upload.read().decode("utf-8-sig")
-            except UnicodeDecodeError:
-                errors.append("CSV import files must be UTF-8 encoded.")
-            else:
-                stream = io.StringIO(raw_content)
-                reader = csv.DictReader(stream)
-                if not reader.fieldnames:
-                    errors.append("CSV file is empty.")
-                else:
-                    bom_rows, parse_errors = _parse_bulk_bom_rows(
-                        reader, column_overrides=column_overrides
-                    )
-                    errors.extend(parse_errors)
+                with open_tabular_upload(upload) as reader:
+                    if not reader.fieldnames:
+                        errors.append("CSV file is empty.")
+                    else:
+                        bom_rows, parse_errors = _parse_bulk_bom_rows(
+                            reader, column_overrides=column_overrides
+                        )
+                        errors.extend(parse_errors)
+                        errors.extend(str(error) for error in reader.errors)
+            except TabularImportError as exc:
+                errors.append(str(exc))
 
         if not errors and bom_rows:
             assembly_skus = set(bom_rows.keys())
@@ -1534,11 +1607,8 @@ def view_order(order_id):
             joinedload(Order.order_lines)
             .joinedload(OrderLine.reservations)
             .joinedload(Reservation.item),
-            joinedload(Order.routing_steps)
-            .joinedload(RoutingStep.component_links)
-            .joinedload(RoutingStepComponent.order_component)
-            .joinedload(OrderComponent.component_item),
             joinedload(Order.gate_details),
+            *order_detail_load_options(),
         )
         .filter_by(id=order_id)
         .first_or_404()
@@ -1594,21 +1664,8 @@ def inspection_report(order_id):
 def update_routing(order_id):
     order = (
         Order.query.options(
-            joinedload(Order.routing_steps)
-            .joinedload(RoutingStep.component_usages)
-            .joinedload(RoutingStepComponent.bom_component)
-            .joinedload(OrderComponent.order_line)
-            .joinedload(OrderLine.reservations),
-            joinedload(Order.routing_steps)
-            .joinedload(RoutingStep.component_usages)
-            .joinedload(RoutingStepComponent.consumptions)
-            .joinedload(RoutingStepConsumption.movement)
-            .joinedload(Movement.batch),
-            joinedload(Order.routing_steps)
-            .joinedload(RoutingStep.component_usages)
-            .joinedload(RoutingStepComponent.consumptions)
-            .joinedload(RoutingStepConsumption.movement)
-            .joinedload(Movement.location),
+            joinedload(Order.gate_details),
+            *order_detail_load_options(),
         )
         .filter_by(id=order_id)
         .first_or_404()
@@ -1643,6 +1700,7 @@ def update_routing(order_id):
 
     errors = []
     planned_consumptions = defaultdict(list)
+    availability = load_component_availability(order_component_item_ids(order))
 
     for step in order.routing_steps:
         desired_state = step.id in selected_ids
@@ -1735,7 +1793,7 @@ def update_routing(order_id):
                     continue
 
                 required_qty = _component_requirement(usage)
-                available_qty = _position_balance(
+                available_qty = availability.balance(
                     usage.bom_component.component_item_id, batch_id, location_id
                 )
                 if required_qty > available_qty:
@@ -1763,6 +1821,7 @@ def update_routing(order_id):
             pending_completed_ids=selected_ids,
             selected_batches=selected_batches,
             inspection_values=inspection_values,
+            availability=availability,
         )
         return render_template("orders/view.html", **context), 400
 
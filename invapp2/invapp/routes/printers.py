@@ -1,5 +1,6 @@
 from flask import (
     Blueprint,
+    Response,
     current_app,
     flash,
     jsonify,
@@ -16,14 +17,18 @@ from invapp.extensions import db
 from invapp.login import current_user, login_required
 from invapp.models import LabelProcessAssignment, LabelTemplate, Printer
 from invapp.security import require_roles
+from invapp.printing.health import get_printer_health, printer_status_rows
 from invapp.printing.labels import (
+    LabelDefinition,
     build_designer_state,
     get_designer_label_config,
     get_designer_sample_context,
     iter_designer_labels,
     serialize_designer_layout,
 )
+from invapp.printing.previews import render_template_preview
 from invapp.printing.zebra import print_label_for_process
+from invapp.printing.zpl_raster import SUPPORTED_DPI, ZPLRenderError
 
 bp = Blueprint("printers", __name__, url_prefix="/settings/printers")
 
@@ -153,6 +158,25 @@ def printer_settings():
         zebra_host=current_app.config.get("ZEBRA_PRINTER_HOST", ""),
         zebra_port=current_app.config.get("ZEBRA_PRINTER_PORT", ""),
         is_admin=current_user.has_role("admin"),
+        printer_status=printer_status_rows(printers),
+    )
+
+
+@bp.route("/health", methods=["GET", "POST"])
+@login_required
+@require_roles("admin")
+def printer_health():
+    printers = Printer.query.order_by(Printer.name.asc()).all()
+    registry = get_printer_health()
+    if request.method == "POST" and registry is not None:
+        registry.probe_all(
+            [(printer.host, printer.port, printer.name) for printer in printers if printer.enabled]
+        )
+    return jsonify(
+        {
+            "printers": printer_status_rows(printers),
+            "targets": registry.snapshot() if registry is not None else [],
+        }
     )
 
 
@@ -261,6 +285,43 @@ def label_designer_print_trial():
         }
     )
 
+
+@bp.post("/designer/preview")
+@login_required
+@require_roles("admin")
+def label_designer_preview():
+    payload = request.get_json(silent=True) or {}
+    layout = payload.get("layout")
+    if not isinstance(layout, dict):
+        return jsonify({"message": "Layout payload is required for a preview."}), 400
+
+    label_id = payload.get("label_id") or layout.get("id")
+    config = get_designer_label_config(label_id) if label_id else None
+    if config is None:
+        return jsonify({"message": f"Unknown label '{label_id}'."}), 404
+
+    try:
+        dpi = int(payload.get("dpi") or current_app.config.get("LABEL_PREVIEW_DPI", 203))
+    except (TypeError, ValueError):
+        dpi = 0
+    if dpi not in SUPPORTED_DPI:
+        return jsonify({"message": "Preview resolution must be 203 or 300 dpi."}), 400
+
+    serialized = serialize_designer_layout(label_id, layout)
+    template = LabelDefinition(
+        name=config.template_name,
+        layout=serialized["layout"],
+        fields=serialized["fields"],
+    )
+    try:
+        image = render_template_preview(
+            template, get_designer_sample_context(label_id), dpi=dpi
+        )
+    except ZPLRenderError as exc:
+        return jsonify({"message": f"Unable to render preview: {exc}"}), 400
+    return Response(image, mimetype="image/png")
+
+
 @bp.post("/designer/save")
 @login_required
 @require_roles("admin")
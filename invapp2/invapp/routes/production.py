@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import ast
 import csv
 import io
 from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
@@ -33,6 +32,15 @@ from invapp.models import (
     ProductionDailyRecord,
     ProductionOutputFormula,
 )
+from invapp.services import production_metrics
+from invapp.services.production_metrics import (
+    ADDITIONAL_METRICS,
+    DECIMAL_QUANT,
+    DECIMAL_ZERO,
+    FormulaEvaluationError,
+    compute_output_values,
+    format_decimal,
+)
 
 bp = Blueprint("production", __name__, url_prefix="/production")
 
@@ -69,15 +77,6 @@ def _parse_optional_decimal(value: str | None) -> Decimal | None:
     except (InvalidOperation, TypeError):
         return None
 
-ADDITIONAL_METRICS: List[Dict[str, str]] = [
-    {"key": "controllers_4_stop", "label": "Controllers (4 Stop)"},
-    {"key": "controllers_6_stop", "label": "Controllers (6 Stop)"},
-    {"key": "door_locks_lh", "label": "Door Locks (LH)"},
-    {"key": "door_locks_rh", "label": "Door Locks (RH)"},
-    {"key": "operators_produced", "label": "Operators Produced"},
-    {"key": "cops_produced", "label": "COPs Produced"},
-]
-
 DEFAULT_OUTPUT_FORMULA = "combined_output / total_hours"
 DEFAULT_OUTPUT_VARIABLES = [
     {
@@ -150,10 +149,6 @@ FORMULA_METRIC_HINTS: List[Dict[str, str]] = [
     },
 ]
 
-DECIMAL_ZERO = Decimal("0")
-DECIMAL_QUANT = Decimal("0.01")
-
-
 def _ensure_default_customers() -> None:
     existing_customers = ProductionCustomer.query.all()
     if not existing_customers:
@@ -207,10 +202,6 @@ def _ensure_default_customers() -> None:
 
 
 
-class FormulaEvaluationError(Exception):
-    """Raised when a user-defined production formula cannot be evaluated."""
-
-
 def _ensure_output_formula() -> ProductionOutputFormula:
     setting = ProductionOutputFormula.query.first()
     if setting is None:
@@ -223,12 +214,17 @@ def _ensure_output_formula() -> ProductionOutputFormula:
     return setting
 
 
-def _to_decimal(value: Any) -> Decimal:
-    if isinstance(value, Decimal):
-        return value
-    if value in (None, ""):
-        return DECIMAL_ZERO
-    return Decimal(str(value))
+def _refresh_history_metrics(*entry_dates: date) -> None:
+    """Recompute derived history rows after a save; misses heal on next view."""
+
+    try:
+        if entry_dates:
+            production_metrics.refresh_daily_metrics(*entry_dates)
+        else:
+            production_metrics.rebuild_daily_metrics()
+    except SQLAlchemyError:
+        db.session.rollback()
+        current_app.logger.exception("Failed to refresh production history metrics.")
 
 
 def _default_formula_context() -> Dict[str, Decimal]:
@@ -250,115 +246,8 @@ def _default_formula_context() -> Dict[str, Decimal]:
     return context
 
 
-def _build_formula_context(
-    record: ProductionDailyRecord,
-    produced_sum: int,
-    packaged_sum: int,
-    controllers_total: int,
-    door_locks_total: int,
-    operators_total: int,
-    cops_total: int,
-) -> Dict[str, Decimal]:
-    combined_total = produced_sum + packaged_sum
-    context: Dict[str, Decimal] = {
-        "produced": Decimal(produced_sum),
-        "packaged": Decimal(packaged_sum),
-        "combined": Decimal(combined_total),
-        "employees": Decimal(record.gates_employees or 0),
-        "shift_hours": ProductionDailyRecord.LABOR_SHIFT_HOURS,
-        "overtime": _to_decimal(record.gates_hours_ot),
-        "total_hours": _to_decimal(record.gates_total_labor_hours),
-        "controllers": Decimal(controllers_total),
-        "door_locks": Decimal(door_locks_total),
-        "operators": Decimal(operators_total),
-        "cops": Decimal(cops_total),
-    }
-    for metric in ADDITIONAL_METRICS:
-        context[metric["key"]] = Decimal(getattr(record, metric["key"]) or 0)
-    return context
-
-
-def _evaluate_decimal_expression(
-    expression: str, context: Dict[str, Decimal]
-) -> Decimal:
-    if not expression:
-        raise FormulaEvaluationError("Expression cannot be blank.")
-    try:
-        parsed = ast.parse(expression, mode="eval")
-    except SyntaxError as exc:  # pragma: no cover - defensive
-        raise FormulaEvaluationError("Invalid expression syntax.") from exc
-
-    def _eval(node: ast.AST) -> Decimal:
-        if isinstance(node, ast.Expression):
-            return _eval(node.body)
-        if isinstance(node, ast.BinOp):
-            left = _eval(node.left)
-            right = _eval(node.right)
-            if isinstance(node.op, ast.Add):
-                return left + right
-            if isinstance(node.op, ast.Sub):
-                return left - right
-            if isinstance(node.op, ast.Mult):
-                return left * right
-            if isinstance(node.op, ast.Div):
-                if right == DECIMAL_ZERO:
-                    raise FormulaEvaluationError("Division by zero.")
-                return left / right
-            raise FormulaEvaluationError("Unsupported operator.")
-        if isinstance(node, ast.UnaryOp):
-            operand = _eval(node.operand)
-            if isinstance(node.op, ast.UAdd):
-                return operand
-            if isinstance(node.op, ast.USub):
-                return -operand
-            raise FormulaEvaluationError("Unsupported unary operator.")
-        if isinstance(node, ast.Name):
-            if node.id not in context:
-                raise FormulaEvaluationError(f"Unknown variable '{node.id}'.")
-            return _to_decimal(context[node.id])
-        if isinstance(node, ast.Constant):
-            if isinstance(node.value, (int, float, str)):
-                return Decimal(str(node.value))
-            raise FormulaEvaluationError("Unsupported constant type.")
-        if isinstance(node, ast.Num):  # pragma: no cover - legacy Python
-            return Decimal(str(node.n))
-        paren_expr = getattr(ast, "ParenExpr", None)
-        if paren_expr is not None and isinstance(node, paren_expr):  # pragma: no cover - Python 3.12+
-            return _eval(node.expression)
-        raise FormulaEvaluationError("Unsupported expression component.")
-
-    result = _eval(parsed.body if isinstance(parsed, ast.Expression) else parsed)
-    return result
-
-
-def _compute_output_values(
-    formula_config: Dict[str, Any], context: Dict[str, Decimal]
-) -> tuple[Decimal, List[Dict[str, Any]]]:
-    working_context = dict(context)
-    variables: List[Dict[str, Any]] = []
-    for variable in formula_config.get("variables") or []:
-        name = (variable.get("name") or "").strip()
-        expression = (variable.get("expression") or "").strip()
-        if not name or not expression:
-            continue
-        label = (variable.get("label") or name).strip() or name
-        value = _evaluate_decimal_expression(expression, working_context)
-        working_context[name] = value
-        variables.append({"name": name, "label": label, "value": value})
-
-    formula_text = (formula_config.get("formula") or "").strip()
-    if not formula_text:
-        raise FormulaEvaluationError("Formula is required.")
-    result = _evaluate_decimal_expression(formula_text, working_context)
-    return result, variables
-
-
 def _active_customers() -> List[ProductionCustomer]:
-    return (
-        ProductionCustomer.query.filter_by(is_active=True)
-        .order_by(ProductionCustomer.is_other_bucket.asc(), ProductionCustomer.name.asc())
-        .all()
-    )
+    return production_metrics.active_customers()
 
 
 
@@ -371,17 +260,6 @@ def _parse_date(value: str | None) -> date | None:
         return None
 
 
-def _format_decimal(value: Decimal | int | float | str | None) -> str:
-    if value is None:
-        decimal_value = DECIMAL_ZERO
-    else:
-        if isinstance(value, Decimal):
-            decimal_value = value
-        else:
-            decimal_value = Decimal(str(value))
-    return format(decimal_value.quantize(DECIMAL_QUANT, rounding=ROUND_HALF_UP), "f")
-
-
 def _format_optional_decimal(value: Decimal | None) -> str:
     if value is None:
         return ""
@@ -430,7 +308,7 @@ def _form_values_from_record(
 
 
     values["gates_employees"] = record.gates_employees or 0
-    values["gates_hours_ot"] = _format_decimal(record.gates_hours_ot)
+    values["gates_hours_ot"] = format_decimal(record.gates_hours_ot)
     values["controllers_4_stop"] = record.controllers_4_stop or 0
     values["controllers_6_stop"] = record.controllers_6_stop or 0
     values["door_locks_lh"] = record.door_locks_lh or 0
@@ -438,7 +316,7 @@ def _form_values_from_record(
     values["operators_produced"] = record.operators_produced or 0
     values["cops_produced"] = record.cops_produced or 0
     values["additional_employees"] = record.additional_employees or 0
-    values["additional_hours_ot"] = _format_decimal(record.additional_hours_ot)
+    values["additional_hours_ot"] = format_decimal(record.additional_hours_ot)
     values["gates_notes"] = record.gates_notes or ""
     values["gates_summary"] = record.gates_summary or ""
     values["additional_notes"] = record.additional_notes or ""
@@ -694,7 +572,7 @@ def _process_output_formula_form(
         return False, {"formula": formula_text, "variables": variables}
 
     try:
-        _compute_output_values(
+        compute_output_values(
             {"formula": formula_text, "variables": variables},
             _default_formula_context(),
         )
@@ -705,6 +583,7 @@ def _process_output_formula_form(
     setting.formula = formula_text
     setting.variables = variables
     db.session.commit()
+    _refresh_history_metrics()
     return True, {"formula": setting.formula, "variables": variables}
 
 
@@ -789,6 +668,7 @@ def final_process_entry():
                 )
             )
             db.session.commit()
+            _refresh_history_metrics(selected_date)
             flash(
                 f"Recorded completion for order {order_number} on {selected_date.strftime('%B %d, %Y')}.",
                 "success",
@@ -1044,6 +924,7 @@ def gates_entry():
                 extra_completion_rows=3,
             )
 
+        _refresh_history_metrics(selected_date)
         flash(
             f"Gates packaged totals saved for {selected_date.strftime('%B %d, %Y')}.",
             "success",
@@ -1118,6 +999,7 @@ def additional_entry():
                 record_exists=record_exists,
             )
 
+        _refresh_history_metrics(selected_date)
         flash(
             f"Additional production totals saved for {selected_date.strftime('%B %d, %Y')}.",
             "success",
@@ -1137,45 +1019,16 @@ def additional_entry():
 
 
 def _build_history_context(start_date: date, end_date: date) -> Dict[str, Any]:
-    customers = _active_customers()
+    grouping = production_metrics.customer_grouping(_active_customers())
+    table_customers = grouping.table_customers
+    stack_customers = grouping.stack_customers
+    grouped_customers = grouping.grouped_customers
 
     chart_settings = ProductionChartSettings.get_or_create()
+    _ensure_output_formula()
 
-    records = (
-        ProductionDailyRecord.query.options(
-            joinedload(ProductionDailyRecord.customer_totals)
-        )
-        .filter(
-
-            ProductionDailyRecord.entry_date >= start_date,
-            ProductionDailyRecord.entry_date <= end_date,
-        )
-        .order_by(ProductionDailyRecord.entry_date.asc())
-        .all()
-    )
-
-    other_customer = next((c for c in customers if c.is_other_bucket), None)
-    grouped_customers = [
-        customer
-        for customer in customers
-        if customer.lump_into_other and not customer.is_other_bucket
-    ]
-    primary_customers = [
-        customer
-        for customer in customers
-        if not customer.is_other_bucket and not customer.lump_into_other
-    ]
-
-    stack_customers = primary_customers[:]
-    if other_customer:
-        stack_customers.append(other_customer)
-
-    table_customers = [
-        customer for customer in customers if not customer.is_other_bucket
-    ]
-    if other_customer:
-        table_customers.append(other_customer)
-
+    metric_rows = production_metrics.load_daily_metrics(start_date, end_date)
+    records = [record for record, _metric in metric_rows]
 
     table_rows = []
     chart_labels: List[str] = []
@@ -1197,156 +1050,67 @@ def _build_history_context(start_date: date, end_date: date) -> Dict[str, Any]:
             }
         )
 
-    running_totals = {series["key"]: 0 for series in LINE_SERIES}
-    current_month: tuple[int, int] | None = None
-    formula_setting = _ensure_output_formula()
-    formula_config = {
-        "formula": formula_setting.formula,
-        "variables": formula_setting.variables or [],
-    }
-
+    # Stored cumulatives run from the first of the month; the chart restarts
+    # them at ``start_date`` when the range begins mid-month.
+    offset = production_metrics.cumulative_offset(start_date)
+    first_month = (start_date.year, start_date.month)
 
-    for record in records:
+    for record, metric in metric_rows:
         chart_labels.append(record.entry_date.strftime("%Y-%m-%d"))
         chart_entry_dates.append(record.entry_date)
-        month_key = (record.entry_date.year, record.entry_date.month)
-        if month_key != current_month:
-            current_month = month_key
-            running_totals = {series["key"]: 0 for series in LINE_SERIES}
 
-        totals_by_customer = {
-            total.customer_id: total for total in record.customer_totals
+        per_customer_packaged = {
+            int(customer_id): value
+            for customer_id, value in (metric.packaged_by_customer or {}).items()
         }
-
-        produced_sum = 0
-        packaged_sum = 0
-        per_customer_packaged: Dict[int, int] = {}
-
-        for customer in table_customers:
-            totals = totals_by_customer.get(customer.id)
-            produced_value = totals.gates_produced if totals else 0
-            packaged_value = totals.gates_packaged if totals else 0
-            per_customer_packaged[customer.id] = packaged_value
-            produced_sum += produced_value
-            packaged_sum += packaged_value
-
+        stack_packaged = metric.stack_packaged or {}
         for dataset, customer in zip(packaged_stack_datasets, stack_customers):
-            packaged_value = per_customer_packaged.get(customer.id, 0)
-            if customer.is_other_bucket:
-                packaged_value += sum(
-                    per_customer_packaged.get(grouped.id, 0)
-                    for grouped in grouped_customers
-                )
-            dataset["data"].append(packaged_value)
+            dataset["data"].append(stack_packaged.get(str(customer.id), 0))
 
-
-        controllers_total = (record.controllers_4_stop or 0) + (
-            record.controllers_6_stop or 0
-        )
-        door_locks_total = (record.door_locks_lh or 0) + (record.door_locks_rh or 0)
-        operators_total = record.operators_produced or 0
-        cops_total = record.cops_produced or 0
-
-        gates_total_hours_value = record.gates_total_labor_hours
-        gates_total_hours_display = _format_decimal(gates_total_hours_value)
-        gates_hours_ot_display = _format_decimal(record.gates_hours_ot)
-        gates_combined_total = produced_sum + packaged_sum
-        gates_output_per_hour_display: str | None = None
-        output_variables_display: List[Dict[str, str]] = []
-        try:
-            output_value, variable_values = _compute_output_values(
-                formula_config,
-                _build_formula_context(
-                    record,
-                    produced_sum,
-                    packaged_sum,
-                    controllers_total,
-                    door_locks_total,
-                    operators_total,
-                    cops_total,
-                ),
-            )
-        except FormulaEvaluationError:
-            output_value = None
-            variable_values = []
-        else:
-            gates_output_per_hour_display = _format_decimal(output_value)
-            output_variables_display = [
-                {
-                    "name": variable["name"],
-                    "label": variable["label"],
-                    "value": _format_decimal(variable["value"]),
-                }
-                for variable in variable_values
-            ]
-
-        overlay_values.append(float(output_value) if output_value is not None else None)
-        total_packaged_values.append(packaged_sum)
-
-
-        additional_total_hours_value = record.additional_total_labor_hours
-        additional_total_hours_display = _format_decimal(
-            additional_total_hours_value
+        month_offset = (
+            offset
+            if (record.entry_date.year, record.entry_date.month) == first_month
+            else None
         )
-        additional_hours_ot_display = _format_decimal(record.additional_hours_ot)
-        additional_per_hour: List[Dict[str, str]] = []
-        additional_output_total_value = DECIMAL_ZERO
-        if additional_total_hours_value and additional_total_hours_value > DECIMAL_ZERO:
-            for metric in ADDITIONAL_METRICS:
-                total_value = getattr(record, metric["key"]) or 0
-                per_hour_value = (
-                    Decimal(total_value) / additional_total_hours_value
-                ).quantize(DECIMAL_QUANT, rounding=ROUND_HALF_UP)
-                additional_output_total_value += per_hour_value
-                additional_per_hour.append(
-                    {
-                        "key": metric["key"],
-                        "label": metric["label"],
-                        "per_hour": _format_decimal(per_hour_value),
-                    }
-                )
-
-        running_totals["packaged"] += packaged_sum
-        running_totals["controllers"] += controllers_total
-        running_totals["door_locks"] += door_locks_total
-        running_totals["operators"] += operators_total
-        running_totals["cops"] += cops_total
-
         for series in LINE_SERIES:
-            cumulative_series[series["key"]].append(running_totals[series["key"]])
+            key = series["key"]
+            value = getattr(metric, f"cumulative_{key}")
+            if month_offset:
+                value -= month_offset[key]
+            cumulative_series[key].append(value)
 
+        overlay_values.append(metric.output_value)
+        total_packaged_values.append(metric.packaged_total)
 
+        gates_total_hours_value = record.gates_total_labor_hours
+        additional_total_hours_value = record.additional_total_labor_hours
         table_rows.append(
             {
                 "record": record,
-                "packaged_sum": packaged_sum,
-                "gates_combined_total": gates_combined_total,
+                "packaged_sum": metric.packaged_total,
+                "gates_combined_total": metric.produced_total + metric.packaged_total,
                 "per_customer_packaged": per_customer_packaged,
-                "controllers_total": controllers_total,
-                "door_locks_total": door_locks_total,
-                "operators_total": operators_total,
-                "cops_total": cops_total,
+                "controllers_total": metric.controllers_total,
+                "door_locks_total": metric.door_locks_total,
+                "operators_total": metric.operators_total,
+                "cops_total": metric.cops_total,
                 "gates_employees": record.gates_employees or 0,
-                "gates_hours_ot": gates_hours_ot_display,
-                "gates_total_hours": gates_total_hours_display,
+                "gates_hours_ot": format_decimal(record.gates_hours_ot),
+                "gates_total_hours": format_decimal(gates_total_hours_value),
                 "gates_total_hours_value": float(gates_total_hours_value)
                 if gates_total_hours_value is not None
                 else 0.0,
-                "gates_output_per_hour": gates_output_per_hour_display,
-                "output_per_hour_value": float(output_value)
-                if output_value is not None
-                else None,
-                "output_variables": output_variables_display,
+                "gates_output_per_hour": metric.output_display,
+                "output_per_hour_value": metric.output_value,
+                "output_variables": metric.output_variables or [],
                 "additional_employees": record.additional_employees or 0,
-                "additional_hours_ot": additional_hours_ot_display,
-                "additional_total_hours": additional_total_hours_display,
+                "additional_hours_ot": format_decimal(record.additional_hours_ot),
+                "additional_total_hours": format_decimal(additional_total_hours_value),
                 "additional_total_hours_value": float(additional_total_hours_value)
                 if additional_total_hours_value is not None
                 else 0.0,
-                "additional_output_total_value": float(additional_output_total_value)
-                if additional_per_hour
-                else 0.0,
-                "additional_per_hour": additional_per_hour,
+                "additional_output_total_value": metric.additional_output_total or 0.0,
+                "additional_per_hour": metric.additional_per_hour or [],
             }
         )
 
@@ -1722,7 +1486,7 @@ def history_export():
             for metric in row["additional_per_hour"]
         )
         additional_total = (
-            _format_decimal(row["additional_output_total_value"])
+            format_decimal(row["additional_output_total_value"])
             if row["additional_per_hour"]
             else ""
         )
@@ -1819,6 +1583,7 @@ def production_settings():
             )
             db.session.add(new_customer)
             db.session.commit()
+            _refresh_history_metrics()
             flash(f"Added customer {name}.", "success")
             return redirect(url_for("production.production_settings"))
 
@@ -1873,6 +1638,7 @@ def production_settings():
 
             if changes_made:
                 db.session.commit()
+                _refresh_history_metrics()
                 flash("Production customer settings updated.", "success")
             else:
                 flash("No changes detected.", "info")
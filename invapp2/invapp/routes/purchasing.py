@@ -5,7 +5,6 @@ from __future__ import annotations
 from datetime import date, datetime
 import os
 import secrets
-import uuid
 from decimal import Decimal, InvalidOperation
 from functools import wraps
 from typing import Iterable
@@ -20,10 +19,10 @@ from flask import (
     redirect,
     render_template,
     request,
-    send_from_directory,
     session,
     url_for,
 )
+from werkzeug.local import LocalProxy
 from werkzeug.routing import BuildError
 from werkzeug.utils import secure_filename
 from sqlalchemy import Boolean, Date, DateTime, func, inspect
@@ -42,7 +41,9 @@ from invapp.models import (
     db,
 )
 from invapp.permissions import resolve_edit_roles
+from invapp.principals import PrincipalUser
 from invapp.security import require_any_role
+from invapp.services import attachment_store
 from invapp.superuser import is_superuser
 
 
@@ -116,6 +117,10 @@ def _coerce_user_settings(user: User | None) -> dict:
 
 
 def _refresh_user_for_settings(user: User) -> User:
+    if isinstance(user, LocalProxy):
+        user = user._get_current_object()
+    if isinstance(user, PrincipalUser):
+        return user.resolve() or user
     try:
         state = inspect(user)
     except (TypeError, ValueError):
@@ -470,22 +475,20 @@ def _save_purchase_attachment(purchase_request: PurchaseRequest, file_storage):
     if not safe_name:
         safe_name = f"attachment_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
 
-    upload_folder = current_app.config.get("PURCHASING_ATTACHMENT_UPLOAD_FOLDER")
-    if not upload_folder:
-        return False, "Attachment upload folder is not configured.", None
-
-    os.makedirs(upload_folder, exist_ok=True)
-    extension = os.path.splitext(safe_name)[1].lower()
-    unique_name = f"{uuid.uuid4().hex}{extension}"
-    file_path = os.path.join(upload_folder, unique_name)
-    file_storage.stream.seek(0)
-    file_storage.save(file_path)
+    try:
+        stored = attachment_store.store_upload(
+            "purchasing", file_storage, max_bytes=max_size_bytes
+        )
+    except attachment_store.AttachmentTooLarge:
+        return False, f"Attachment exceeds the {max_size_mb} MB upload limit.", None
+    except attachment_store.AttachmentStoreError as exc:
+        return False, str(exc), None
 
     attachment = PurchaseRequestAttachment(
         request=purchase_request,
-        filename=unique_name,
+        filename=stored.filename,
         original_name=safe_name,
-        file_size=file_size or 0,
+        file_size=stored.size,
         uploaded_by=_current_actor(),
     )
     db.session.add(attachment)
@@ -671,6 +674,7 @@ def view_request(request_id: int):
         status_labels=dict(PurchaseRequest.STATUS_CHOICES),
         receive_url=receive_url,
         allowed_extensions=allowed_extensions,
+        attachment_thumbnails=attachment_store.has_thumbnail,
     )
 
 
@@ -713,17 +717,10 @@ def delete_request(request_id: int):
         deleted_by_username=_current_username(),
         delete_reason=delete_reason,
     )
-    upload_folder = current_app.config.get("PURCHASING_ATTACHMENT_UPLOAD_FOLDER")
-    failed_files: list[str] = []
-    if upload_folder:
-        for attachment in purchase_request.attachments:
-            file_path = os.path.join(upload_folder, attachment.filename)
-            try:
-                os.remove(file_path)
-            except FileNotFoundError:
-                continue
-            except OSError:
-                failed_files.append(attachment.original_name or attachment.filename)
+    for attachment in purchase_request.attachments:
+        attachment_store.release(
+            "purchasing", PurchaseRequestAttachment, attachment.filename
+        )
 
     db.session.add(audit_entry)
     db.session.delete(purchase_request)
@@ -737,7 +734,7 @@ def delete_request(request_id: int):
         flash("Unable to delete the item shortage. Please try again.", "danger")
         return redirect(url_for("purchasing.view_request", request_id=request_id))
 
-    if failed_files:
+    if attachment_store.release_failures():
         flash(
             "Item shortage deleted, but some attachment files could not be removed.",
             "warning",
@@ -843,16 +840,15 @@ def download_attachment(request_id: int, attachment_id: int):
     if attachment is None:
         abort(404)
 
-    upload_folder = current_app.config.get("PURCHASING_ATTACHMENT_UPLOAD_FOLDER")
-    if not upload_folder:
-        abort(404)
-
-    return send_from_directory(
-        upload_folder,
+    response = attachment_store.send_attachment(
+        "purchasing",
         attachment.filename,
-        as_attachment=True,
-        download_name=attachment.original_name,
+        attachment.original_name,
+        thumbnail=request.args.get("thumbnail") == "1",
     )
+    if response is None:
+        abort(404)
+    return response
 
 
 @bp.route(
@@ -867,20 +863,15 @@ def delete_attachment(request_id: int, attachment_id: int):
     if attachment is None:
         abort(404)
 
-    upload_folder = current_app.config.get("PURCHASING_ATTACHMENT_UPLOAD_FOLDER")
-    if upload_folder:
-        file_path = os.path.join(upload_folder, attachment.filename)
-        try:
-            os.remove(file_path)
-        except FileNotFoundError:
-            pass
-        except OSError:
-            flash(
-                "Attachment removed from record, but the file could not be deleted.",
-                "warning",
-            )
-
+    attachment_store.release(
+        "purchasing", PurchaseRequestAttachment, attachment.filename
+    )
     db.session.delete(attachment)
     db.session.commit()
+    if attachment_store.release_failures():
+        flash(
+            "Attachment removed from record, but the file could not be deleted.",
+            "warning",
+        )
     flash("Attachment removed.", "success")
     return redirect(url_for("purchasing.view_request", request_id=request_id))
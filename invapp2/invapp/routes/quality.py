@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import os
 from datetime import date, datetime
 from functools import wraps
 from typing import Iterable
@@ -13,7 +12,6 @@ from flask import (
     redirect,
     render_template,
     request,
-    send_from_directory,
     session,
     url_for,
 )
@@ -27,6 +25,7 @@ from invapp.login import current_user
 from invapp.models import RMAAttachment, RMARequest, RMAStatusEvent, User, db
 from invapp.permissions import resolve_edit_roles
 from invapp.security import require_any_role
+from invapp.services import attachment_store
 
 
 bp = Blueprint("quality", __name__, url_prefix="/quality")
@@ -113,18 +112,14 @@ def _save_rma_attachment(request_record: RMARequest, file_storage):
     if not safe_name:
         safe_name = f"attachment_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
 
-    upload_folder = current_app.config.get("QUALITY_ATTACHMENT_UPLOAD_FOLDER")
-    if not upload_folder:
-        return False, "Attachment upload folder is not configured.", None
-
-    os.makedirs(upload_folder, exist_ok=True)
-    unique_name = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}_{os.urandom(6).hex()}_{safe_name}"
-    file_path = os.path.join(upload_folder, unique_name)
-    file_storage.save(file_path)
+    try:
+        stored = attachment_store.store_upload("quality", file_storage)
+    except attachment_store.AttachmentStoreError as exc:
+        return False, str(exc), None
 
     attachment = RMAAttachment(
         request=request_record,
-        filename=unique_name,
+        filename=stored.filename,
         original_name=safe_name,
     )
     db.session.add(attachment)
@@ -290,6 +285,7 @@ def view_request(request_id: int):
         status_labels=dict(RMARequest.STATUS_CHOICES),
         priority_labels=dict(RMARequest.PRIORITY_CHOICES),
         allowed_extensions=allowed_extensions,
+        attachment_thumbnails=attachment_store.has_thumbnail,
     )
 
 
@@ -507,16 +503,15 @@ def download_attachment(request_id: int, attachment_id: int):
     if attachment is None:
         abort(404)
 
-    upload_folder = current_app.config.get("QUALITY_ATTACHMENT_UPLOAD_FOLDER")
-    if not upload_folder:
-        abort(404)
-
-    return send_from_directory(
-        upload_folder,
+    response = attachment_store.send_attachment(
+        "quality",
         attachment.filename,
-        as_attachment=True,
-        download_name=attachment.original_name,
+        attachment.original_name,
+        thumbnail=request.args.get("thumbnail") == "1",
     )
+    if response is None:
+        abort(404)
+    return response
 
 
 @bp.route(
@@ -531,15 +526,7 @@ def delete_attachment(request_id: int, attachment_id: int):
     if attachment is None:
         abort(404)
 
-    upload_folder = current_app.config.get("QUALITY_ATTACHMENT_UPLOAD_FOLDER")
-    if upload_folder:
-        file_path = os.path.join(upload_folder, attachment.filename)
-        try:
-            os.remove(file_path)
-        except FileNotFoundError:
-            pass
-        except OSError:
-            flash("Attachment removed from record, but the file could not be deleted.", "warning")
+    attachment_store.release("quality", RMAAttachment, attachment.filename)
 
     changed_by = _current_actor()
     attachment.request.status_events.append(
@@ -553,5 +540,7 @@ def delete_attachment(request_id: int, attachment_id: int):
 
     db.session.delete(attachment)
     db.session.commit()
+    if attachment_store.release_failures():
+        flash("Attachment removed from record, but the file could not be deleted.", "warning")
     flash("Attachment removed.", "success")
     return redirect(url_for("quality.view_request", request_id=request_id))
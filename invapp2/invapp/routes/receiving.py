@@ -7,12 +7,14 @@ from flask import (
     flash,
     jsonify,
     Response,
+    abort,
 )
 from invapp.extensions import db
 from invapp.models import Receiving, Item, Stock, Location
 from invapp.services.item_locations import apply_smart_item_locations
 from invapp.login import current_user
 from invapp.printing.zebra import print_receiving_label, render_receiving_label_png
+from invapp.printing.zpl_raster import SUPPORTED_DPI, ZPLRenderError
 
 bp = Blueprint("receiving", __name__, url_prefix="/receiving")
 
@@ -102,7 +104,13 @@ def label_preview():
     sku = request.args["sku"]
     description = request.args["description"]
     qty = int(request.args["qty"])
-    image = render_receiving_label_png(sku, description, qty)
+    dpi = request.args.get("dpi", type=int)
+    if dpi is not None and dpi not in SUPPORTED_DPI:
+        abort(400)
+    try:
+        image = render_receiving_label_png(sku, description, qty, dpi=dpi)
+    except ZPLRenderError as exc:
+        return jsonify({"message": f"Unable to render preview: {exc}"}), 400
     return Response(image, mimetype="image/png")
 
 
@@ -1,6 +1,4 @@
-import os
 import re
-import uuid
 from collections import defaultdict
 from dataclasses import dataclass
 from datetime import date
@@ -10,6 +8,7 @@ from flask import (
     Blueprint,
     abort,
     current_app,
+    flash,
     redirect,
     render_template,
     request,
@@ -30,6 +29,7 @@ from invapp.models import (
     db,
 )
 from invapp.security import require_roles
+from invapp.services import attachment_store
 
 bp = Blueprint("work", __name__, url_prefix="/work")
 
@@ -336,28 +336,35 @@ def upload_instruction():
         return redirect(url_for("work.list_instructions"))
 
     filename = secure_filename(file.filename)
-    unique_name = f"{uuid.uuid4().hex}_{filename}"
-    upload_folder = current_app.config["WORK_INSTRUCTION_UPLOAD_FOLDER"]
-    os.makedirs(upload_folder, exist_ok=True)
-    file_path = os.path.join(upload_folder, unique_name)
-    file.save(file_path)
+    try:
+        stored = attachment_store.store_upload("work_instruction", file)
+    except attachment_store.AttachmentStoreError as exc:
+        flash(str(exc) or "Work instruction not uploaded.", "error")
+        return redirect(url_for("work.list_instructions"))
 
-    wi = WorkInstruction(filename=unique_name, original_name=filename)
+    wi = WorkInstruction(filename=stored.filename, original_name=filename)
     db.session.add(wi)
     db.session.commit()
 
     return redirect(url_for("work.list_instructions"))
 
 
+@bp.route("/instructions/<int:instruction_id>/download")
+def download_instruction(instruction_id):
+    wi = WorkInstruction.query.get_or_404(instruction_id)
+    response = attachment_store.send_attachment(
+        "work_instruction", wi.filename, wi.original_name, as_attachment=False
+    )
+    if response is None:
+        abort(404)
+    return response
+
+
 @bp.route("/instructions/<int:instruction_id>/delete", methods=["POST"])
 @require_roles("admin")
 def delete_instruction(instruction_id):
     wi = WorkInstruction.query.get_or_404(instruction_id)
-    file_path = os.path.join(
-        current_app.config["WORK_INSTRUCTION_UPLOAD_FOLDER"], wi.filename
-    )
-    if os.path.exists(file_path):
-        os.remove(file_path)
+    attachment_store.release("work_instruction", WorkInstruction, wi.filename)
     db.session.delete(wi)
     db.session.commit()
     return redirect(url_for("work.list_instructions"))
@@ -0,0 +1,464 @@
+"""Plant-wide available-to-promise (ATP) allocation for active orders.
+
+Every active order needs ``component quantity x line quantity`` of each BOM
+component, less what routing steps have already consumed.  On-hand stock of
+an item is allocated to those requirements in two passes: first up to each
+reservable order's :class:`~invapp.models.Reservation` total, then by order
+priority using the same ordering as ``orders._rebalance_priorities``
+(:func:`priority_ordering`).  Whatever a requirement does not receive is its
+shortage.
+
+Items are independent of each other, so the result is stored per
+``(order, item)`` in ``atp_allocation`` with per-item totals in ``atp_item``,
+and a refresh only recomputes the items that changed.  Flushes touching
+``Movement``, ``Reservation``, ``OrderComponent``, ``OrderLine`` or an order's
+status/priority write :class:`~invapp.models.AtpDirtyMark` rows in the same
+transaction; :func:`refresh_atp` consumes them.  Pages and the API refresh
+before reading, the scheduler refreshes every ``ATP_REFRESH_MINUTES`` and
+rebuilds the whole snapshot daily to pick up bulk SQL writes.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Iterable
+
+from flask import current_app
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import joinedload
+
+from invapp.extensions import db
+from invapp.models import (
+    AtpAllocation,
+    AtpDirtyMark,
+    AtpItem,
+    AtpSnapshot,
+    Movement,
+    Order,
+    OrderComponent,
+    OrderLine,
+    OrderStatus,
+    Reservation,
+    RoutingStepComponent,
+    RoutingStepConsumption,
+)
+from invapp.services.scheduler import register_job
+
+
+DEFAULT_REFRESH_MINUTES = 5
+ZERO = Decimal(0)
+
+#: Order columns that change an order's demand or its place in the queue.
+ORDER_FIELDS = ("status", "priority", "promised_date", "order_number")
+
+
+def priority_ordering() -> tuple:
+    """Order by which stock is promised; shared with priority rebalancing."""
+
+    return (
+        Order.priority,
+        Order.promised_date.is_(None),
+        Order.promised_date,
+        Order.order_number,
+    )
+
+
+def _decimal(value) -> Decimal:
+    return Decimal(value or 0)
+
+
+def _item_filter(query, column, item_ids: set[int] | None):
+    if item_ids is None:
+        return query
+    return query.filter(column.in_(sorted(item_ids)))
+
+
+def available_quantities(item_ids: Iterable[int]) -> dict[int, Decimal]:
+    """On-hand minus active reservations for ``item_ids`` in two queries."""
+
+    ids = {item_id for item_id in item_ids if item_id is not None}
+    if not ids:
+        return {}
+    on_hand = dict(
+        db.session.query(Movement.item_id, func.coalesce(func.sum(Movement.quantity), 0))
+        .filter(Movement.item_id.in_(sorted(ids)))
+        .group_by(Movement.item_id)
+    )
+    reserved = dict(
+        db.session.query(Reservation.item_id, func.coalesce(func.sum(Reservation.quantity), 0))
+        .join(OrderLine, Reservation.order_line_id == OrderLine.id)
+        .join(Order, OrderLine.order_id == Order.id)
+        .filter(
+            Reservation.item_id.in_(sorted(ids)),
+            Order.status.in_(OrderStatus.RESERVABLE_STATES),
+        )
+        .group_by(Reservation.item_id)
+    )
+    return {
+        item_id: _decimal(on_hand.get(item_id)) - _decimal(reserved.get(item_id))
+        for item_id in ids
+    }
+
+
+def _load_inputs(item_ids: set[int] | None) -> dict[str, Any]:
+    """Demand, consumption, reservations and stock for ``item_ids`` (all if None)."""
+
+    active_orders = (
+        db.session.query(Order.id, Order.status)
+        .filter(Order.status.in_(OrderStatus.ACTIVE_STATES))
+        .order_by(*priority_ordering())
+        .all()
+    )
+    ranks = {order_id: rank for rank, (order_id, _) in enumerate(active_orders, start=1)}
+    reservable = {
+        order_id
+        for order_id, status in active_orders
+        if status in OrderStatus.RESERVABLE_STATES
+    }
+
+    required_query = (
+        db.session.query(
+            OrderLine.order_id,
+            OrderComponent.component_item_id,
+            func.sum(OrderComponent.quantity * OrderLine.quantity),
+        )
+        .join(OrderLine, OrderComponent.order_line_id == OrderLine.id)
+        .join(Order, OrderLine.order_id == Order.id)
+        .filter(Order.status.in_(OrderStatus.ACTIVE_STATES))
+        .group_by(OrderLine.order_id, OrderComponent.component_item_id)
+    )
+    consumed_query = (
+        db.session.query(
+            OrderLine.order_id,
+            OrderComponent.component_item_id,
+            func.sum(RoutingStepConsumption.quantity),
+        )
+        .select_from(RoutingStepConsumption)
+        .join(
+            RoutingStepComponent,
+            RoutingStepConsumption.routing_step_component_id == RoutingStepComponent.id,
+        )
+        .join(OrderComponent, RoutingStepComponent.order_component_id == OrderComponent.id)
+        .join(OrderLine, OrderComponent.order_line_id == OrderLine.id)
+        .join(Order, OrderLine.order_id == Order.id)
+        .filter(Order.status.in_(OrderStatus.ACTIVE_STATES))
+        .group_by(OrderLine.order_id, OrderComponent.component_item_id)
+    )
+    reserved_query = (
+        db.session.query(
+            OrderLine.order_id,
+            Reservation.item_id,
+            func.sum(Reservation.quantity),
+        )
+        .join(OrderLine, Reservation.order_line_id == OrderLine.id)
+        .join(Order, OrderLine.order_id == Order.id)
+        .filter(Order.status.in_(OrderStatus.RESERVABLE_STATES))
+        .group_by(OrderLine.order_id, Reservation.item_id)
+    )
+
+    required = {
+        (order_id, item_id): _decimal(total)
+        for order_id, item_id, total in _item_filter(
+            required_query, OrderComponent.component_item_id, item_ids
+        )
+    }
+    consumed = {
+        (order_id, item_id): _decimal(total)
+        for order_id, item_id, total in _item_filter(
+            consumed_query, OrderComponent.component_item_id, item_ids
+        )
+    }
+    reserved = {
+        (order_id, item_id): _decimal(total)
+        for order_id, item_id, total in _item_filter(
+            reserved_query, Reservation.item_id, item_ids
+        )
+        if order_id in reservable
+    }
+
+    demand_items = {item_id for _, item_id in required}
+    on_hand = {}
+    if demand_items:
+        on_hand = {
+            item_id: _decimal(total)
+            for item_id, total in db.session.query(
+                Movement.item_id, func.coalesce(func.sum(Movement.quantity), 0)
+            )
+            .filter(Movement.item_id.in_(sorted(demand_items)))
+            .group_by(Movement.item_id)
+        }
+    return {
+        "ranks": ranks,
+        "required": required,
+        "consumed": consumed,
+        "reserved": reserved,
+        "on_hand": on_hand,
+    }
+
+
+def allocate(inputs: dict[str, Any]) -> tuple[list[dict], list[dict]]:
+    """Allocate stock per item: reservations first, then by order priority."""
+
+    ranks = inputs["ranks"]
+    demands_by_item: dict[int, list[dict]] = defaultdict(list)
+    for (order_id, item_id), required in inputs["required"].items():
+        consumed = min(inputs["consumed"].get((order_id, item_id), ZERO), required)
+        demands_by_item[item_id].append(
+            {
+                "order_id": order_id,
+                "item_id": item_id,
+                "rank": ranks[order_id],
+                "required": required,
+                "consumed": consumed,
+                "reserved": inputs["reserved"].get((order_id, item_id), ZERO),
+                "allocated": ZERO,
+            }
+        )
+
+    allocations: list[dict] = []
+    items: list[dict] = []
+    for item_id, demands in demands_by_item.items():
+        demands.sort(key=lambda entry: entry["rank"])
+        on_hand = inputs["on_hand"].get(item_id, ZERO)
+        supply = max(on_hand, ZERO)
+
+        for entry in demands:
+            outstanding = entry["required"] - entry["consumed"]
+            take = min(entry["reserved"], outstanding, supply)
+            if take > 0:
+                entry["allocated"] = take
+                supply -= take
+        for entry in demands:
+            outstanding = entry["required"] - entry["consumed"]
+            take = min(outstanding - entry["allocated"], supply)
+            if take > 0:
+                entry["allocated"] += take
+                supply -= take
+
+        demand_total = allocated_total = shortage_total = ZERO
+        short_orders = 0
+        for entry in demands:
+            outstanding = entry["required"] - entry["consumed"]
+            entry["shortage"] = outstanding - entry["allocated"]
+            demand_total += outstanding
+            allocated_total += entry["allocated"]
+            shortage_total += entry["shortage"]
+            short_orders += 1 if entry["shortage"] > 0 else 0
+            allocations.append(entry)
+        items.append(
+            {
+                "item_id": item_id,
+                "on_hand": on_hand,
+                "demand": demand_total,
+                "allocated": allocated_total,
+                "available": supply,
+                "shortage": shortage_total,
+                "short_orders": short_orders,
+            }
+        )
+    return allocations, items
+
+
+def _store(item_ids: set[int] | None, allocations: list[dict], items: list[dict]) -> None:
+    now = datetime.utcnow()
+    allocation_delete = AtpAllocation.__table__.delete()
+    item_delete = AtpItem.__table__.delete()
+    if item_ids is not None:
+        allocation_delete = allocation_delete.where(
+            AtpAllocation.__table__.c.item_id.in_(sorted(item_ids))
+        )
+        item_delete = item_delete.where(AtpItem.__table__.c.item_id.in_(sorted(item_ids)))
+    db.session.execute(allocation_delete)
+    db.session.execute(item_delete)
+    if allocations:
+        db.session.execute(
+            AtpAllocation.__table__.insert(),
+            [{**entry, "computed_at": now} for entry in allocations],
+        )
+    if items:
+        db.session.execute(
+            AtpItem.__table__.insert(), [{**entry, "computed_at": now} for entry in items]
+        )
+
+
+def _locked_snapshot() -> AtpSnapshot:
+    snapshot = AtpSnapshot.query.filter_by(id=1).with_for_update().first()
+    if snapshot is None:
+        snapshot = AtpSnapshot(id=1)
+        db.session.add(snapshot)
+    return snapshot
+
+
+def rebuild_atp() -> dict[str, int]:
+    """Recompute the whole snapshot."""
+
+    snapshot = _locked_snapshot()
+    max_mark = db.session.query(func.max(AtpDirtyMark.id)).scalar()
+    allocations, items = allocate(_load_inputs(None))
+    _store(None, allocations, items)
+    if max_mark is not None:
+        AtpDirtyMark.query.filter(AtpDirtyMark.id <= max_mark).delete(
+            synchronize_session=False
+        )
+    snapshot.built_at = snapshot.refreshed_at = datetime.utcnow()
+    db.session.commit()
+    return {"items": len(items), "allocations": len(allocations)}
+
+
+def refresh_atp() -> dict[str, int]:
+    """Recompute only the items marked dirty since the last refresh."""
+
+    snapshot = _locked_snapshot()
+    if snapshot.built_at is None:
+        return rebuild_atp()
+
+    marks = db.session.query(AtpDirtyMark.id, AtpDirtyMark.item_id, AtpDirtyMark.order_id).all()
+    if not marks:
+        db.session.commit()
+        return {"items": 0, "allocations": 0}
+
+    item_ids = {item_id for _, item_id, _ in marks if item_id is not None}
+    order_ids = {order_id for _, _, order_id in marks if order_id is not None}
+    if order_ids:
+        ordered = sorted(order_ids)
+        item_ids.update(
+            item_id
+            for (item_id,) in db.session.query(OrderComponent.component_item_id)
+            .join(OrderLine, OrderComponent.order_line_id == OrderLine.id)
+            .filter(OrderLine.order_id.in_(ordered))
+            .distinct()
+        )
+        item_ids.update(
+            item_id
+            for (item_id,) in db.session.query(AtpAllocation.item_id)
+            .filter(AtpAllocation.order_id.in_(ordered))
+            .distinct()
+        )
+
+    allocations, items = allocate(_load_inputs(item_ids)) if item_ids else ([], [])
+    _store(item_ids, allocations, items)
+    AtpDirtyMark.query.filter(AtpDirtyMark.id <= max(mark_id for mark_id, _, _ in marks)).delete(
+        synchronize_session=False
+    )
+    snapshot.refreshed_at = datetime.utcnow()
+    db.session.commit()
+    return {"items": len(item_ids), "allocations": len(allocations)}
+
+
+def _order_changed(instance: Order) -> bool:
+    state = inspect(instance)
+    return any(state.attrs[name].history.has_changes() for name in ORDER_FIELDS)
+
+
+def _mark_flushed_rows(session, _flush_context) -> None:
+    try:
+        if not current_app.config.get("ATP_ENABLED", True):
+            return
+    except RuntimeError:
+        return
+
+    item_ids: set[int] = set()
+    order_ids: set[int] = set()
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, (Movement, Reservation)):
+            item_ids.add(instance.item_id)
+        elif isinstance(instance, OrderComponent):
+            item_ids.add(instance.component_item_id)
+        elif isinstance(instance, OrderLine):
+            order_ids.add(instance.order_id)
+        elif isinstance(instance, Order):
+            if instance in session.dirty and not _order_changed(instance):
+                continue
+            order_ids.add(instance.id)
+
+    now = datetime.utcnow()
+    rows = [
+        {"item_id": item_id, "order_id": None, "created_at": now}
+        for item_id in item_ids
+        if item_id is not None
+    ] + [
+        {"item_id": None, "order_id": order_id, "created_at": now}
+        for order_id in order_ids
+        if order_id is not None
+    ]
+    if rows:
+        session.connection().execute(AtpDirtyMark.__table__.insert(), rows)
+
+
+def init_atp(app) -> None:
+    if not event.contains(db.session, "after_flush", _mark_flushed_rows):
+        event.listen(db.session, "after_flush", _mark_flushed_rows)
+
+
+def register_atp_jobs(app) -> None:
+    def refresh(app) -> None:
+        result = refresh_atp()
+        if result["items"]:
+            app.logger.info("ATP refresh recomputed %s", result)
+
+    def rebuild(app) -> None:
+        rebuild_atp()
+
+    register_job(
+        app,
+        "atp-refresh",
+        refresh,
+        minutes=int(app.config.get("ATP_REFRESH_MINUTES") or DEFAULT_REFRESH_MINUTES),
+        description="Recompute available-to-promise allocations for changed items.",
+    )
+    register_job(
+        app,
+        "atp-rebuild",
+        rebuild,
+        hours=24,
+        description="Rebuild the available-to-promise shortage snapshot.",
+    )
+
+
+def order_allocations(order_id: int) -> list[AtpAllocation]:
+    return (
+        AtpAllocation.query.options(joinedload(AtpAllocation.item))
+        .filter_by(order_id=order_id)
+        .order_by(AtpAllocation.shortage.desc(), AtpAllocation.item_id)
+        .all()
+    )
+
+
+def item_allocations(item_id: int) -> list[AtpAllocation]:
+    return (
+        AtpAllocation.query.options(joinedload(AtpAllocation.order))
+        .filter_by(item_id=item_id)
+        .order_by(AtpAllocation.rank)
+        .all()
+    )
+
+
+def item_summary(item_id: int) -> AtpItem | None:
+    return db.session.get(AtpItem, item_id)
+
+
+def shortage_items() -> list[AtpItem]:
+    return (
+        AtpItem.query.options(joinedload(AtpItem.item))
+        .filter(AtpItem.shortage > 0)
+        .order_by(AtpItem.shortage.desc(), AtpItem.item_id)
+        .all()
+    )
+
+
+def shortage_allocations() -> list[AtpAllocation]:
+    return (
+        AtpAllocation.query.options(
+            joinedload(AtpAllocation.order), joinedload(AtpAllocation.item)
+        )
+        .filter(AtpAllocation.shortage > 0)
+        .order_by(AtpAllocation.rank, AtpAllocation.item_id)
+        .all()
+    )
+
+
+def snapshot_time() -> datetime | None:
+    snapshot = db.session.get(AtpSnapshot, 1)
+    return snapshot.refreshed_at if snapshot else None
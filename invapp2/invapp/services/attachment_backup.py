@@ -0,0 +1,384 @@
+"""Incremental, content-addressed backups of the attachment upload folders.
+
+Every backup run writes a JSON manifest listing each attachment file (by upload
+folder config key and relative path) together with its SHA-256 digest.  File
+contents live once in ``objects/<aa>/<digest>`` regardless of how many runs or
+paths reference them, so an unchanged PDF costs nothing after its first backup.
+
+Files whose size and mtime match the previous manifest reuse the recorded
+digest without being read again; only new or changed files are hashed and
+copied.  Retention prunes old manifests and then drops objects that no
+surviving manifest references.  Any retained manifest can be restored to
+rebuild the folders as they were at that run.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterator, Mapping
+
+
+MANIFEST_VERSION = 1
+MANIFEST_SUFFIX = ".manifest.json"
+OBJECTS_DIRNAME = "objects"
+MANIFESTS_DIRNAME = "manifests"
+HASH_CHUNK_SIZE = 1024 * 1024
+DEFAULT_RETENTION_DAYS = 30
+DEFAULT_KEEP_MIN = 6
+
+
+@dataclass
+class SnapshotStats:
+    files: int = 0
+    bytes: int = 0
+    hashed: int = 0
+    new_objects: int = 0
+    new_bytes: int = 0
+
+    def to_dict(self) -> dict[str, int]:
+        return {
+            "files": self.files,
+            "bytes": self.bytes,
+            "hashed": self.hashed,
+            "new_objects": self.new_objects,
+            "new_bytes": self.new_bytes,
+        }
+
+
+@dataclass
+class SnapshotResult:
+    name: str
+    manifest_path: Path
+    stats: SnapshotStats = field(default_factory=SnapshotStats)
+
+
+class AttachmentStore:
+    """Content-addressed object store plus per-run manifests under ``root``."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root)
+        self.objects_dir = self.root / OBJECTS_DIRNAME
+        self.manifests_dir = self.root / MANIFESTS_DIRNAME
+
+    def ensure(self) -> None:
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.manifests_dir.mkdir(parents=True, exist_ok=True)
+
+    def object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / digest
+
+    def manifest_path(self, name: str) -> Path:
+        return self.manifests_dir / f"{name}{MANIFEST_SUFFIX}"
+
+    # -- manifests -------------------------------------------------------
+
+    def list_manifests(self) -> list[Path]:
+        """Manifest paths, oldest first."""
+
+        if not self.manifests_dir.exists():
+            return []
+        manifests = [
+            path
+            for path in self.manifests_dir.iterdir()
+            if path.is_file() and path.name.endswith(MANIFEST_SUFFIX)
+        ]
+        return sorted(manifests, key=lambda path: (_mtime(path), path.name))
+
+    def load_manifest(self, name: str) -> dict:
+        path = self.manifest_path(name)
+        if not path.exists():
+            raise FileNotFoundError(f"Attachment snapshot '{name}' not found.")
+        return _read_manifest(path)
+
+    def latest_manifest(self) -> dict | None:
+        manifests = self.list_manifests()
+        if not manifests:
+            return None
+        try:
+            return _read_manifest(manifests[-1])
+        except (OSError, ValueError):
+            return None
+
+    # -- snapshot --------------------------------------------------------
+
+    def snapshot(
+        self,
+        name: str,
+        roots: Mapping[str, Path],
+        *,
+        now: datetime | None = None,
+    ) -> SnapshotResult:
+        """Record the current contents of ``roots`` as manifest ``name``."""
+
+        self.ensure()
+        previous = _index_entries(self.latest_manifest())
+        stats = SnapshotStats()
+        entries: list[dict] = []
+
+        for root_key, root_path in sorted(roots.items()):
+            for file_path in _iter_files(Path(root_path)):
+                try:
+                    stat = file_path.stat()
+                except OSError:
+                    continue
+                relative = file_path.relative_to(root_path).as_posix()
+                prior = previous.get((root_key, relative))
+                digest = None
+                if (
+                    prior is not None
+                    and prior.get("size") == stat.st_size
+                    and prior.get("mtime_ns") == stat.st_mtime_ns
+                    and self.object_path(prior["sha256"]).exists()
+                ):
+                    digest = prior["sha256"]
+                if digest is None:
+                    try:
+                        digest, created = self._store_file(file_path)
+                    except OSError:
+                        continue
+                    stats.hashed += 1
+                    if created:
+                        stats.new_objects += 1
+                        stats.new_bytes += stat.st_size
+                entries.append(
+                    {
+                        "root": root_key,
+                        "path": relative,
+                        "sha256": digest,
+                        "size": stat.st_size,
+                        "mtime_ns": stat.st_mtime_ns,
+                    }
+                )
+                stats.files += 1
+                stats.bytes += stat.st_size
+
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "name": name,
+            "created_at": (now or datetime.utcnow()).isoformat(),
+            "roots": {key: str(path) for key, path in sorted(roots.items())},
+            "files": entries,
+            "stats": stats.to_dict(),
+        }
+        manifest_path = self.manifest_path(name)
+        _atomic_write(manifest_path, json.dumps(manifest, indent=1).encode("utf-8"))
+        return SnapshotResult(name=name, manifest_path=manifest_path, stats=stats)
+
+    def _store_file(self, source: Path) -> tuple[str, bool]:
+        """Hash ``source`` while copying it; return ``(digest, newly_stored)``."""
+
+        hasher = hashlib.sha256()
+        fd, temp_name = tempfile.mkstemp(prefix=".incoming_", dir=self.objects_dir)
+        try:
+            with open(source, "rb") as reader, os.fdopen(fd, "wb") as writer:
+                for chunk in iter(lambda: reader.read(HASH_CHUNK_SIZE), b""):
+                    hasher.update(chunk)
+                    writer.write(chunk)
+            digest = hasher.hexdigest()
+            target = self.object_path(digest)
+            if target.exists():
+                return digest, False
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(temp_name, target)
+            return digest, True
+        finally:
+            if os.path.exists(temp_name):
+                os.unlink(temp_name)
+
+    # -- retention -------------------------------------------------------
+
+    def prune(
+        self,
+        *,
+        retention_days: int = DEFAULT_RETENTION_DAYS,
+        keep_min: int = DEFAULT_KEEP_MIN,
+        now: datetime | None = None,
+    ) -> dict[str, int]:
+        """Delete expired manifests, then objects no manifest references."""
+
+        manifests = self.list_manifests()
+        cutoff = (now or datetime.utcnow()) - timedelta(days=max(0, retention_days))
+        removable = manifests[: max(0, len(manifests) - max(1, keep_min))]
+        removed_manifests = 0
+        for path in removable:
+            if _manifest_created_at(path) < cutoff:
+                path.unlink(missing_ok=True)
+                removed_manifests += 1
+
+        referenced: set[str] = set()
+        for path in self.list_manifests():
+            try:
+                manifest = _read_manifest(path)
+            except (OSError, ValueError):
+                # An unreadable manifest must not cause its objects to be
+                # collected; skip garbage collection entirely.
+                return {"manifests": removed_manifests, "objects": 0, "bytes": 0}
+            referenced.update(entry["sha256"] for entry in manifest.get("files", []))
+
+        removed_objects = 0
+        removed_bytes = 0
+        if self.objects_dir.exists():
+            for shard in self.objects_dir.iterdir():
+                if not shard.is_dir():
+                    continue
+                for obj in shard.iterdir():
+                    if obj.name in referenced:
+                        continue
+                    try:
+                        removed_bytes += obj.stat().st_size
+                        obj.unlink()
+                        removed_objects += 1
+                    except OSError:
+                        continue
+                try:
+                    shard.rmdir()
+                except OSError:
+                    pass
+        return {
+            "manifests": removed_manifests,
+            "objects": removed_objects,
+            "bytes": removed_bytes,
+        }
+
+    # -- restore ---------------------------------------------------------
+
+    def restore(
+        self,
+        name: str,
+        targets: Mapping[str, Path],
+        *,
+        logger: logging.Logger | None = None,
+    ) -> int:
+        """Rebuild snapshot ``name`` into ``targets`` (config key -> folder).
+
+        Every file is verified against its digest before it replaces the
+        target, and files absent from the snapshot are left untouched.
+        """
+
+        logger = logger or logging.getLogger("invapp.backup")
+        manifest = self.load_manifest(name)
+        restored = 0
+        for entry in manifest.get("files", []):
+            target_root = targets.get(entry["root"])
+            if target_root is None:
+                logger.warning(
+                    "Skipping %s: no restore target for %s.", entry["path"], entry["root"]
+                )
+                continue
+            destination = _safe_join(Path(target_root), entry["path"])
+            source = self.object_path(entry["sha256"])
+            if not source.exists():
+                raise FileNotFoundError(
+                    f"Object {entry['sha256']} for {entry['root']}/{entry['path']} is missing."
+                )
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            hasher = hashlib.sha256()
+            fd, temp_name = tempfile.mkstemp(prefix=".restore_", dir=destination.parent)
+            try:
+                with open(source, "rb") as reader, os.fdopen(fd, "wb") as writer:
+                    for chunk in iter(lambda: reader.read(HASH_CHUNK_SIZE), b""):
+                        hasher.update(chunk)
+                        writer.write(chunk)
+                if hasher.hexdigest() != entry["sha256"]:
+                    raise ValueError(f"Object {entry['sha256']} failed verification.")
+                os.replace(temp_name, destination)
+            finally:
+                if os.path.exists(temp_name):
+                    os.unlink(temp_name)
+            mtime_ns = entry.get("mtime_ns")
+            if mtime_ns:
+                os.utime(destination, ns=(mtime_ns, mtime_ns))
+            restored += 1
+        return restored
+
+
+def summarize_manifest(path: Path) -> dict[str, object] | None:
+    try:
+        manifest = _read_manifest(path)
+    except (OSError, ValueError):
+        return None
+    return {
+        "name": manifest.get("name") or path.name[: -len(MANIFEST_SUFFIX)],
+        "created_at": _parse_timestamp(manifest.get("created_at")),
+        "stats": manifest.get("stats") or {},
+    }
+
+
+def _iter_files(root: Path) -> Iterator[Path]:
+    if not root.is_dir():
+        return
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            path = Path(dirpath) / filename
+            if path.is_file() and not path.is_symlink():
+                yield path
+
+
+def _index_entries(manifest: dict | None) -> dict[tuple[str, str], dict]:
+    if not manifest:
+        return {}
+    return {(entry["root"], entry["path"]): entry for entry in manifest.get("files", [])}
+
+
+def _read_manifest(path: Path) -> dict:
+    with open(path, "r", encoding="utf-8") as handle:
+        manifest = json.load(handle)
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"Unsupported attachment manifest: {path.name}")
+    return manifest
+
+
+def _parse_timestamp(value) -> datetime | None:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def _mtime(path: Path) -> float:
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return 0.0
+
+
+def _manifest_created_at(path: Path) -> datetime:
+    try:
+        created = _parse_timestamp(_read_manifest(path).get("created_at"))
+    except (OSError, ValueError):
+        created = None
+    if created is None:
+        try:
+            created = datetime.utcfromtimestamp(path.stat().st_mtime)
+        except OSError:
+            created = datetime.min
+    return created
+
+
+def _safe_join(root: Path, relative: str) -> Path:
+    candidate = (root / relative).resolve()
+    if not candidate.is_relative_to(root.resolve()):
+        raise ValueError(f"Refusing to restore outside {root}: {relative}")
+    return candidate
+
+
+def _atomic_write(path: Path, payload: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_name = tempfile.mkstemp(prefix=".manifest_", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(payload)
+        os.replace(temp_name, path)
+    finally:
+        if os.path.exists(temp_name):
+            os.unlink(temp_name)
@@ -0,0 +1,362 @@
+"""Shared storage for uploaded attachments.
+
+Purchasing, quality (RMA), item attachments and work instructions keep their
+own upload folders (the attachment backups are keyed by those folders), but
+all of them store files through this module:
+
+* Uploads are streamed to a temporary file in the target folder in
+  ``CHUNK_SIZE`` pieces while being hashed, so a large PDF is never held in
+  memory and size limits are enforced while reading.
+* Files are named after their SHA-256 digest.  Uploading the same content
+  again reuses the existing file, and :func:`release` only removes a file once
+  no other row references it.
+* Both sides wait for the caller's commit.  :func:`release` deletes the file
+  from an ``after_commit`` hook once a fresh query finds no referencing row,
+  and a deduplicated upload keeps its temporary copy until its row commits,
+  putting it back in place if a concurrent release removed the file.  Both
+  steps hold an ``flock`` on the folder, so a rolled back delete never loses
+  a file and an upload never ends up pointing at a removed one.
+* Images get a JPEG thumbnail in ``<folder>/.thumbnails`` when Pillow is
+  installed.
+
+:func:`send_attachment` hands downloads to the front-end web server when
+``ATTACHMENT_ACCEL_REDIRECT_PREFIX`` (nginx ``X-Accel-Redirect``) or
+``ATTACHMENT_X_SENDFILE`` (Apache/lighttpd ``X-Sendfile``) is configured, so a
+multi-megabyte download does not occupy a gunicorn worker.  Otherwise the file
+is streamed by the app with conditional and ``Range`` request support.  The
+nginx prefix must map ``<prefix><namespace>/`` to each upload folder with an
+``internal`` location, e.g.::
+
+    location /protected-attachments/purchasing/ {
+        internal;
+        alias /srv/invapp/purchase_request_attachments/;
+    }
+"""
+
+from __future__ import annotations
+
+import hashlib
+import mimetypes
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import quote
+
+from flask import current_app, send_file
+from sqlalchemy import event, select
+from werkzeug.utils import secure_filename
+
+from invapp.extensions import db
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - thumbnails are optional
+    Image = None
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+
+CHUNK_SIZE = 1024 * 1024
+THUMBNAIL_DIRNAME = ".thumbnails"
+THUMBNAIL_SIZE = (320, 320)
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".bmp"}
+LOCK_FILENAME = ".store.lock"
+_PENDING_KEY = "attachment_store_pending"
+_FAILED_KEY = "attachment_store_failed"
+_thread_lock = threading.Lock()
+
+#: Attachment namespace -> config key of its upload folder.
+NAMESPACES = {
+    "purchasing": "PURCHASING_ATTACHMENT_UPLOAD_FOLDER",
+    "quality": "QUALITY_ATTACHMENT_UPLOAD_FOLDER",
+    "item": "ITEM_ATTACHMENT_UPLOAD_FOLDER",
+    "work_instruction": "WORK_INSTRUCTION_UPLOAD_FOLDER",
+}
+
+
+class AttachmentStoreError(Exception):
+    """Raised when an upload cannot be stored."""
+
+
+class AttachmentTooLarge(AttachmentStoreError):
+    pass
+
+
+@dataclass(frozen=True)
+class StoredFile:
+    filename: str
+    original_name: str
+    digest: str
+    size: int
+    deduplicated: bool
+    thumbnail: str | None = None
+
+
+def upload_folder(namespace: str) -> Path | None:
+    folder = current_app.config.get(NAMESPACES[namespace])
+    return Path(folder) if folder else None
+
+
+def thumbnails_supported() -> bool:
+    return Image is not None
+
+
+def _is_image(filename: str) -> bool:
+    return os.path.splitext(filename)[1].lower() in IMAGE_EXTENSIONS
+
+
+def has_thumbnail(filename: str | None) -> bool:
+    """Whether a thumbnail can be served for ``filename``."""
+
+    return thumbnails_supported() and bool(filename) and _is_image(filename)
+
+
+def _thumbnail_path(folder: Path, filename: str) -> Path:
+    return folder / THUMBNAIL_DIRNAME / f"{os.path.splitext(filename)[0]}.jpg"
+
+
+def _write_thumbnail(folder: Path, filename: str) -> str | None:
+    if Image is None or not _is_image(filename):
+        return None
+    target = _thumbnail_path(folder, filename)
+    if target.exists():
+        return target.name
+    target.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        with Image.open(folder / filename) as image:
+            image.thumbnail(THUMBNAIL_SIZE)
+            if image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            tmp_path = target.with_name(target.name + ".tmp")
+            image.save(tmp_path, "JPEG", quality=80, optimize=True)
+        os.replace(tmp_path, target)
+    except (OSError, ValueError) as exc:
+        current_app.logger.warning("Thumbnail for %s failed: %s", filename, exc)
+        return None
+    return target.name
+
+
+@contextmanager
+def _folder_lock(folder: Path):
+    """Serialize dedupe checks and deletions in ``folder`` across workers."""
+
+    if fcntl is None:  # pragma: no cover - non-POSIX platforms
+        with _thread_lock:
+            yield
+        return
+    with open(folder / LOCK_FILENAME, "a") as handle:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+def _defer(action: tuple) -> None:
+    """Queue ``action`` to run after the current transaction commits."""
+
+    if not event.contains(db.session, "after_commit", _run_pending):
+        event.listen(db.session, "after_commit", _run_pending)
+        event.listen(db.session, "after_transaction_end", _discard_pending)
+    session = db.session()
+    if not session.in_transaction():
+        session.begin()
+    session.info.setdefault(_PENDING_KEY, []).append(action)
+
+
+def _run_pending(session) -> None:
+    failed = session.info.setdefault(_FAILED_KEY, [])
+    for action in session.info.pop(_PENDING_KEY, []):
+        kind, folder, *args = action
+        if kind == "promote":
+            _promote(folder, *args)
+        elif not _delete_unreferenced(folder, *args):
+            failed.append(args[1])
+
+
+def _discard_pending(session, transaction) -> None:
+    if transaction.parent is not None:
+        return
+    # Anything still queued here belongs to a transaction that did not commit.
+    for action in session.info.pop(_PENDING_KEY, []):
+        if action[0] == "promote":
+            _remove_quietly(Path(action[2]))
+
+
+def _remove_quietly(path: Path) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _promote(folder: Path, temp_path: str, filename: str) -> None:
+    with _folder_lock(folder):
+        target = folder / filename
+        if target.exists():
+            _remove_quietly(Path(temp_path))
+            return
+        try:
+            os.replace(temp_path, target)
+        except OSError as exc:
+            current_app.logger.error("Restoring attachment %s failed: %s", filename, exc)
+
+
+def _delete_unreferenced(folder: Path, table, filename: str) -> bool:
+    with _folder_lock(folder):
+        with db.engine.connect() as connection:
+            referenced = connection.execute(
+                select(table.c.id).where(table.c.filename == filename).limit(1)
+            ).first()
+        if referenced is not None:
+            return True
+        ok = True
+        for path in (folder / filename, _thumbnail_path(folder, filename)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            except OSError as exc:
+                current_app.logger.warning("Removing attachment %s failed: %s", path, exc)
+                ok = False
+        return ok
+
+
+def store_upload(namespace: str, file_storage, *, max_bytes: int | None = None) -> StoredFile:
+    """Stream ``file_storage`` into the namespace folder under its content hash."""
+
+    folder = upload_folder(namespace)
+    if folder is None:
+        raise AttachmentStoreError("Attachment upload folder is not configured.")
+    folder.mkdir(parents=True, exist_ok=True)
+
+    original_name = secure_filename(file_storage.filename or "")
+    extension = os.path.splitext(original_name)[1].lower()
+    digest = hashlib.sha256()
+    size = 0
+    handle = tempfile.NamedTemporaryFile(dir=folder, prefix=".upload-", delete=False)
+    try:
+        with handle:
+            stream = file_storage.stream
+            if hasattr(stream, "seek"):
+                stream.seek(0)
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise AttachmentTooLarge(f"Upload exceeds {max_bytes} bytes.")
+                digest.update(chunk)
+                handle.write(chunk)
+
+        filename = f"{digest.hexdigest()}{extension}"
+        target = folder / filename
+        os.chmod(handle.name, 0o644)
+        with _folder_lock(folder):
+            deduplicated = target.exists()
+            if not deduplicated:
+                os.replace(handle.name, target)
+        if deduplicated:
+            # Keep the copy until the referencing row commits in case a
+            # concurrent release deletes the shared file first.
+            _defer(("promote", folder, handle.name, filename))
+    except BaseException:
+        try:
+            os.remove(handle.name)
+        except OSError:
+            pass
+        raise
+
+    return StoredFile(
+        filename=filename,
+        original_name=original_name,
+        digest=digest.hexdigest(),
+        size=size,
+        deduplicated=deduplicated,
+        thumbnail=_write_thumbnail(folder, filename),
+    )
+
+
+def release(namespace: str, model, filename: str) -> None:
+    """Delete ``filename`` after the current transaction commits.
+
+    The file is kept if a ``model`` row still references it at that point.
+    Files that could not be removed are reported by :func:`release_failures`.
+    """
+
+    folder = upload_folder(namespace)
+    if folder is None or not filename:
+        return
+    _defer(("release", folder, model.__table__, filename))
+
+
+def release_failures() -> list[str]:
+    """Return and clear the released files that could not be removed."""
+
+    return db.session.info.pop(_FAILED_KEY, [])
+
+
+def send_attachment(
+    namespace: str,
+    filename: str,
+    download_name: str | None = None,
+    *,
+    as_attachment: bool = True,
+    thumbnail: bool = False,
+):
+    """Response for a stored file, offloaded to the web server when configured."""
+
+    folder = upload_folder(namespace)
+    if folder is None or not filename or os.path.basename(filename) != filename:
+        return None
+    if thumbnail:
+        if _write_thumbnail(folder, filename) is None:
+            return None
+        path = _thumbnail_path(folder, filename)
+        relative = f"{THUMBNAIL_DIRNAME}/{path.name}"
+        download_name = path.name
+        as_attachment = False
+    else:
+        path = folder / filename
+        relative = filename
+    if not path.is_file():
+        return None
+
+    config = current_app.config
+    accel_prefix = config.get("ATTACHMENT_ACCEL_REDIRECT_PREFIX")
+    if accel_prefix or config.get("ATTACHMENT_X_SENDFILE"):
+        response = current_app.response_class(
+            mimetype=mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        )
+        response.headers.set(
+            "Content-Disposition",
+            "attachment" if as_attachment else "inline",
+            filename=download_name or filename,
+        )
+        response.cache_control.no_cache = True
+        response.cache_control.private = True
+        if accel_prefix:
+            response.headers["X-Accel-Redirect"] = (
+                f"{accel_prefix.rstrip('/')}/{namespace}/{quote(relative)}"
+            )
+        else:
+            response.headers["X-Sendfile"] = os.fspath(path.resolve())
+        return response
+
+    response = send_file(
+        os.fspath(path),
+        as_attachment=as_attachment,
+        download_name=download_name or filename,
+        conditional=True,
+        max_age=None,
+    )
+    # Attachments sit behind a login; keep shared caches from storing them.
+    response.cache_control.private = True
+    return response
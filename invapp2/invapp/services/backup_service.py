@@ -9,10 +9,11 @@ import shutil
 import subprocess
 import tarfile
 import tempfile
+import time
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, Iterator
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
@@ -25,7 +26,16 @@ from flask import current_app
 from invapp.extensions import db
 from invapp.models import AppSetting, BackupRun
 from invapp.services import status_bus
+from invapp.services.attachment_backup import (
+    DEFAULT_KEEP_MIN as DEFAULT_ATTACHMENT_KEEP_MIN,
+    DEFAULT_RETENTION_DAYS as DEFAULT_ATTACHMENT_RETENTION_DAYS,
+    MANIFEST_SUFFIX,
+    AttachmentStore,
+    SnapshotStats,
+    summarize_manifest,
+)
 from invapp.services.db_schema import ensure_app_setting_schema
+from invapp.services.scheduler import register_leader_hook
 
 
 BACKUP_SETTING_KEY = "backup_frequency_hours"
@@ -33,8 +43,14 @@ DEFAULT_BACKUP_FREQUENCY_HOURS = 4
 BACKUP_JOB_ID = "automated-backup"
 BACKUP_REFRESH_JOB_ID = "automated-backup-refresh"
 BACKUP_REFRESH_MINUTES = 5
-BACKUP_SUBDIRS = ("db", "files", "tmp")
-AUTO_BACKUP_ALLOWED_EXTENSIONS = (".zip", ".tar.gz", ".sql", ".dump")
+BACKUP_SUBDIRS = ("db", "files", "attachments", "tmp")
+AUTO_BACKUP_ALLOWED_EXTENSIONS = (".zip", ".tar.gz", ".sql", ".dump", ".dumpdir")
+# pg_dump --format value -> artifact suffix written to the db/ backup folder.
+# Directory-format dumps are folders; everything else is a single file.
+DB_DUMP_FORMATS = {"plain": ".sql", "custom": ".dump", "directory": ".dumpdir"}
+DEFAULT_DB_DUMP_FORMAT = "custom"
+DEFAULT_DB_DUMP_JOBS = 4
+DEFAULT_DB_DUMP_COMPRESSION = 6
 RESTORE_TIMEOUT_SECONDS = 900
 _WARNED_KEYS: set[str] = set()
 _APP_SETTING_REPAIR_ATTEMPTED = False
@@ -186,24 +202,39 @@ def _next_copy_number(backup_dirs: Iterable[Path], timestamp: str) -> int:
     return max_copy + 1
 
 
-def _data_directories(app) -> list[Path]:
-    config_keys = (
-        "WORK_INSTRUCTION_UPLOAD_FOLDER",
-        "ITEM_ATTACHMENT_UPLOAD_FOLDER",
-        "QUALITY_ATTACHMENT_UPLOAD_FOLDER",
-        "PURCHASING_ATTACHMENT_UPLOAD_FOLDER",
-    )
-    dirs: list[Path] = []
-    for key in config_keys:
+DATA_DIRECTORY_CONFIG_KEYS = (
+    "WORK_INSTRUCTION_UPLOAD_FOLDER",
+    "ITEM_ATTACHMENT_UPLOAD_FOLDER",
+    "QUALITY_ATTACHMENT_UPLOAD_FOLDER",
+    "PURCHASING_ATTACHMENT_UPLOAD_FOLDER",
+)
+
+
+def _data_directory_map(app) -> dict[str, Path]:
+    dirs: dict[str, Path] = {}
+    for key in DATA_DIRECTORY_CONFIG_KEYS:
         path_value = app.config.get(key)
         if not path_value:
             continue
         path = Path(path_value)
         if path.exists() and path.is_dir():
-            dirs.append(path)
+            dirs[key] = path
     return dirs
 
 
+def _data_directories(app) -> list[Path]:
+    return list(_data_directory_map(app).values())
+
+
+def get_attachment_store(backup_dir: Path) -> AttachmentStore:
+    return AttachmentStore(backup_dir / "attachments")
+
+
+def _attachment_backup_mode(app) -> str:
+    mode = str(app.config.get("BACKUP_ATTACHMENT_MODE") or "incremental").strip().lower()
+    return mode if mode in {"incremental", "archive"} else "incremental"
+
+
 def _build_pg_dump_env(app, logger: logging.Logger) -> dict[str, str] | None:
     env = os.environ.copy()
     if all(env.get(key) for key in ("PGHOST", "PGUSER", "PGDATABASE")):
@@ -238,19 +269,82 @@ def _build_pg_dump_env(app, logger: logging.Logger) -> dict[str, str] | None:
     return env
 
 
-def _run_pg_dump(app, output_path: Path, logger: logging.Logger) -> None:
+def _db_dump_format(app, logger: logging.Logger | None = None) -> str:
+    value = str(app.config.get("BACKUP_DB_FORMAT") or DEFAULT_DB_DUMP_FORMAT).strip().lower()
+    if value not in DB_DUMP_FORMATS:
+        if logger is not None:
+            _warn_once(
+                logger,
+                f"Unknown BACKUP_DB_FORMAT '{value}'; using {DEFAULT_DB_DUMP_FORMAT}.",
+                key=f"backup_db_format:{value}",
+            )
+        return DEFAULT_DB_DUMP_FORMAT
+    return value
+
+
+def _config_int(app, key: str, default: int, minimum: int, maximum: int) -> int:
+    try:
+        value = int(app.config.get(key, default))
+    except (TypeError, ValueError):
+        value = default
+    return max(minimum, min(maximum, value))
+
+
+def _db_dump_jobs(app) -> int:
+    return _config_int(app, "BACKUP_DB_JOBS", DEFAULT_DB_DUMP_JOBS, 1, 32)
+
+
+def _db_dump_compression(app) -> int:
+    return _config_int(app, "BACKUP_DB_COMPRESSION", DEFAULT_DB_DUMP_COMPRESSION, 0, 9)
+
+
+def _dump_format_for_path(path: Path) -> str | None:
+    for dump_format, suffix in DB_DUMP_FORMATS.items():
+        if path.name.endswith(suffix):
+            return dump_format
+    return None
+
+
+def _path_size(path: Path) -> int:
+    """Size of a dump artifact; directory-format dumps are summed file by file."""
+
+    if path.is_dir():
+        total = 0
+        for child in path.rglob("*"):
+            try:
+                if child.is_file():
+                    total += child.stat().st_size
+            except OSError:
+                continue
+        return total
+    return path.stat().st_size
+
+
+def _run_pg_dump(
+    app,
+    output_path: Path,
+    logger: logging.Logger,
+    *,
+    dump_format: str = "plain",
+    jobs: int = 1,
+    compression: int | None = None,
+) -> None:
     env = _build_pg_dump_env(app, logger)
     if env is None:
         raise RuntimeError("Database connection info not available for pg_dump.")
 
     command = [
         "pg_dump",
-        "--format=plain",
+        f"--format={dump_format}",
         "--no-owner",
         "--no-privileges",
-        "--file",
-        str(output_path),
     ]
+    if dump_format != "plain" and compression is not None:
+        command.append(f"--compress={compression}")
+    # Parallel dumps are only supported by the directory format.
+    if dump_format == "directory" and jobs > 1:
+        command.append(f"--jobs={jobs}")
+    command.extend(["--file", str(output_path)])
 
     subprocess.run(command, check=True, env=env)
 
@@ -357,32 +451,67 @@ def run_backup_job(app) -> None:
 
         db_dir = backup_dir / "db"
         files_dir = backup_dir / "files"
+        attachment_store = get_attachment_store(backup_dir)
+        attachment_store.ensure()
         timestamp = _timestamp_label()
-        copy_number = _next_copy_number((db_dir, files_dir), timestamp)
-        db_dump_path = db_dir / f"backup_{timestamp}_copy{copy_number}.sql"
+        copy_number = _next_copy_number(
+            (db_dir, files_dir, attachment_store.manifests_dir), timestamp
+        )
+        dump_format = _db_dump_format(app, logger)
+        db_dump_path = (
+            db_dir / f"backup_{timestamp}_copy{copy_number}{DB_DUMP_FORMATS[dump_format]}"
+        )
         data_archive_path = files_dir / f"backup_{timestamp}_copy{copy_number}.tar.gz"
 
         _log_info(logger, f"Starting automated backup (copy {copy_number})")
         backup_record = _create_backup_run(status="started")
 
         try:
-            _run_pg_dump(app, db_dump_path, logger)
-            _log_info(logger, f"Database backup created: {db_dump_path}")
+            dump_started = time.monotonic()
+            _run_pg_dump(
+                app,
+                db_dump_path,
+                logger,
+                dump_format=dump_format,
+                jobs=_db_dump_jobs(app),
+                compression=_db_dump_compression(app),
+            )
+            dump_seconds = time.monotonic() - dump_started
+            dump_bytes = _path_size(db_dump_path) if db_dump_path.exists() else None
+            _log_info(
+                logger,
+                f"Database backup created: {db_dump_path} ({dump_format}, "
+                f"{_format_bytes(float(dump_bytes or 0))} in {dump_seconds:.1f}s)",
+            )
 
-            data_dirs = _data_directories(app)
-            if _archive_directories(data_dirs, data_archive_path):
-                _log_info(logger, f"Data archive created: {data_archive_path}")
+            archive_bytes = None
+            archive_new_bytes = None
+            if _attachment_backup_mode(app) == "archive":
+                data_dirs = _data_directories(app)
+                if _archive_directories(data_dirs, data_archive_path):
+                    _log_info(logger, f"Data archive created: {data_archive_path}")
+                    archive_bytes = data_archive_path.stat().st_size
+                else:
+                    _log_info(logger, "No data directories found for archival.")
             else:
-                _log_info(logger, "No data directories found for archival.")
-
+                snapshot_stats = _snapshot_attachments(
+                    app, attachment_store, f"backup_{timestamp}_copy{copy_number}", logger
+                )
+                if snapshot_stats is not None:
+                    archive_bytes = snapshot_stats.bytes
+                    archive_new_bytes = snapshot_stats.new_bytes
             _log_info(logger, "Automated backup completed successfully.")
             _finalize_backup_run(
                 backup_record,
                 status="succeeded",
                 filename=db_dump_path.name,
                 filepath=str(db_dump_path),
-                bytes=db_dump_path.stat().st_size if db_dump_path.exists() else None,
+                bytes=dump_bytes,
                 message="Backup completed successfully.",
+                dump_format=dump_format,
+                duration_seconds=dump_seconds,
+                archive_bytes=archive_bytes,
+                archive_new_bytes=archive_new_bytes,
             )
         except Exception as exc:
             _log_exception(logger, "Automated backup failed.", exc)
@@ -399,6 +528,89 @@ def run_backup_job(app) -> None:
             )
 
 
+def _snapshot_attachments(
+    app, store: AttachmentStore, name: str, logger: logging.Logger
+) -> SnapshotStats | None:
+    """Record an incremental attachment snapshot and return its stats.
+
+    ``stats.bytes`` is the size of every file in the snapshot; ``stats.new_bytes``
+    is the part that was not already in the object store.
+    """
+
+    roots = _data_directory_map(app)
+    if not roots:
+        _log_info(logger, "No data directories found for archival.")
+        return None
+
+    result = store.snapshot(name, roots)
+    stats = result.stats
+    _log_info(
+        logger,
+        f"Attachment snapshot {name}: {stats.files} files, {stats.hashed} hashed, "
+        f"{stats.new_objects} new objects ({_format_bytes(float(stats.new_bytes))}).",
+    )
+    pruned = store.prune(
+        retention_days=int(
+            app.config.get(
+                "BACKUP_ATTACHMENT_RETENTION_DAYS", DEFAULT_ATTACHMENT_RETENTION_DAYS
+            )
+        ),
+        keep_min=int(
+            app.config.get("BACKUP_ATTACHMENT_KEEP_MIN", DEFAULT_ATTACHMENT_KEEP_MIN)
+        ),
+    )
+    if pruned["manifests"] or pruned["objects"]:
+        _log_info(
+            logger,
+            f"Pruned {pruned['manifests']} attachment snapshots and {pruned['objects']} "
+            f"objects ({_format_bytes(float(pruned['bytes']))}).",
+        )
+    return stats
+
+
+def list_attachment_snapshots(backup_dir: Path) -> list[dict[str, object]]:
+    snapshots = []
+    for path in reversed(get_attachment_store(backup_dir).list_manifests()):
+        summary = summarize_manifest(path)
+        if summary is not None:
+            snapshots.append(summary)
+    return snapshots
+
+
+def restore_attachment_snapshot(
+    app,
+    name: str,
+    logger: logging.Logger,
+    *,
+    target_dir: Path | None = None,
+) -> int:
+    """Rebuild attachment snapshot ``name``.
+
+    Files are written back to the configured upload folders, or beneath
+    ``target_dir/<config key>/`` when a target directory is given.
+    """
+
+    if not name or Path(name).name != name or name.endswith(MANIFEST_SUFFIX):
+        raise ValueError("Invalid attachment snapshot name.")
+    store = get_attachment_store(get_backup_dir(app, logger=logger))
+    if target_dir is not None:
+        targets = {key: Path(target_dir) / key for key in DATA_DIRECTORY_CONFIG_KEYS}
+    else:
+        targets = {
+            key: Path(app.config[key])
+            for key in DATA_DIRECTORY_CONFIG_KEYS
+            if app.config.get(key)
+        }
+    restored = store.restore(name, targets, logger=logger)
+    status_bus.log_event(
+        "info",
+        f"Restored {restored} attachment files from snapshot {name}.",
+        context={"snapshot": name, "target": str(target_dir) if target_dir else "in_place"},
+        source="backup_restore",
+    )
+    return restored
+
+
 def refresh_backup_schedule(app, *, force: bool = False) -> None:
     scheduler: BackgroundScheduler | None = app.extensions.get("backup_scheduler")
     if scheduler is None:
@@ -449,11 +661,19 @@ def refresh_backup_schedule(app, *, force: bool = False) -> None:
         _log_info(logger, f"Backup schedule set to every {frequency_hours} hours.")
 
 
-def initialize_backup_scheduler(app) -> None:
+def initialize_backup_scheduler(app, scheduler: BackgroundScheduler | None = None) -> None:
+    """Add the backup jobs to ``scheduler``.
+
+    Without a scheduler a private one is created and started; the leader
+    scheduler passes its own (not yet started) instance instead.
+    """
+
     if app.extensions.get("backup_scheduler") is not None:
         return
 
-    scheduler = BackgroundScheduler(timezone="UTC")
+    owns_scheduler = scheduler is None
+    if owns_scheduler:
+        scheduler = BackgroundScheduler(timezone="UTC")
     app.extensions["backup_scheduler"] = scheduler
 
     try:
@@ -487,7 +707,23 @@ def initialize_backup_scheduler(app) -> None:
         args=[app],
     )
 
-    scheduler.start()
+    if owns_scheduler:
+        scheduler.start()
+
+
+def _release_backup_scheduler(app) -> None:
+    app.extensions.pop("backup_scheduler", None)
+    app.config.pop("BACKUP_FREQUENCY_HOURS", None)
+
+
+def register_backup_jobs(app) -> None:
+    """Run the backup jobs only in the process that holds scheduler leadership."""
+
+    register_leader_hook(
+        app,
+        lambda app, scheduler: initialize_backup_scheduler(app, scheduler=scheduler),
+        _release_backup_scheduler,
+    )
 
 
 def list_backup_files(backup_dir: Path) -> list[dict[str, object]]:
@@ -497,10 +733,15 @@ def list_backup_files(backup_dir: Path) -> list[dict[str, object]]:
         if not folder.exists():
             continue
         for item in folder.iterdir():
-            if not item.is_file():
+            dump_format = _dump_format_for_path(item) if kind == "db" else None
+            if item.is_dir():
+                if dump_format != "directory":
+                    continue
+            elif not item.is_file():
                 continue
             try:
                 stat = item.stat()
+                size = _path_size(item)
             except OSError:
                 continue
             results.append(
@@ -508,7 +749,8 @@ def list_backup_files(backup_dir: Path) -> list[dict[str, object]]:
                     "filename": item.name,
                     "path": item,
                     "kind": kind,
-                    "size": stat.st_size,
+                    "format": dump_format,
+                    "size": size,
                     "created_at": datetime.utcfromtimestamp(stat.st_mtime),
                 }
             )
@@ -523,7 +765,7 @@ def is_valid_backup_filename(filename: str) -> bool:
         return False
     if ".." in filename or "/" in filename or "\\" in filename:
         return False
-    return filename.endswith((".sql", ".dump"))
+    return filename.endswith(tuple(DB_DUMP_FORMATS.values()))
 
 
 def list_auto_backup_files(app, logger: logging.Logger | None = None) -> list[dict[str, object]]:
@@ -538,20 +780,20 @@ def list_auto_backup_files(app, logger: logging.Logger | None = None) -> list[di
             logger.exception("Unable to read auto backup directory: %s", folder)
             continue
         for item in entries:
-            if not item.is_file():
-                continue
-            if not _is_allowed_auto_backup_filename(item.name):
+            if not _is_auto_backup_artifact(item):
                 continue
             try:
                 stat = item.stat()
+                size = _path_size(item)
             except OSError:
                 continue
             results.append(
                 {
                     "filename": item.name,
                     "path": item,
-                    "size_bytes": stat.st_size,
-                    "size_hr": _format_bytes(float(stat.st_size)),
+                    "is_directory": item.is_dir(),
+                    "size_bytes": size,
+                    "size_hr": _format_bytes(float(size)),
                     "created_at": datetime.utcfromtimestamp(stat.st_mtime),
                 }
             )
@@ -574,11 +816,56 @@ def resolve_auto_backup_path(app, filename: str, logger: logging.Logger | None =
         return None
     for folder in _auto_backup_dirs(app, logger=logger):
         candidate = folder / filename
-        if candidate.exists() and candidate.is_file():
+        if candidate.exists() and _is_auto_backup_artifact(candidate):
             return candidate
     return None
 
 
+def iter_directory_tar(path: Path, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+    """Stream ``path`` as an uncompressed tar archive rooted at its name.
+
+    Used to download directory-format dumps; members are read in chunks so a
+    large dump is never held in memory.  Extracting the archive yields the
+    dump folder that ``pg_restore --format=directory`` expects.
+    """
+
+    members = [path, *sorted(path.rglob("*"))]
+    for member in members:
+        if not (member.is_dir() or member.is_file()) or member.is_symlink():
+            continue
+        info = tarfile.TarInfo(str(Path(path.name) / member.relative_to(path)))
+        stat = member.stat()
+        info.mtime = int(stat.st_mtime)
+        info.mode = stat.st_mode & 0o777
+        if member.is_dir():
+            info.type = tarfile.DIRTYPE
+            yield info.tobuf(format=tarfile.PAX_FORMAT)
+            continue
+        info.size = stat.st_size
+        yield info.tobuf(format=tarfile.PAX_FORMAT)
+        remaining = info.size
+        with member.open("rb") as handle:
+            while remaining > 0:
+                chunk = handle.read(min(chunk_size, remaining))
+                if not chunk:
+                    raise OSError(f"{member} shrank while it was being archived.")
+                remaining -= len(chunk)
+                yield chunk
+        padding = -info.size % tarfile.BLOCKSIZE
+        if padding:
+            yield tarfile.NUL * padding
+    yield tarfile.NUL * (tarfile.BLOCKSIZE * 2)
+
+
+def delete_auto_backup(path: Path) -> None:
+    """Remove an auto backup artifact; directory-format dumps are removed whole."""
+
+    if path.is_dir():
+        shutil.rmtree(path)
+    else:
+        path.unlink()
+
+
 def _auto_backup_dirs(app, logger: logging.Logger) -> list[Path]:
     config_dir = app.config.get("BACKUP_DIR_AUTO")
     if config_dir:
@@ -592,6 +879,14 @@ def _is_allowed_auto_backup_filename(filename: str) -> bool:
     return any(lowered.endswith(ext) for ext in AUTO_BACKUP_ALLOWED_EXTENSIONS)
 
 
+def _is_auto_backup_artifact(path: Path) -> bool:
+    if not _is_allowed_auto_backup_filename(path.name) or path.is_symlink():
+        return False
+    if path.is_dir():
+        return path.name.lower().endswith(DB_DUMP_FORMATS["directory"])
+    return path.is_file()
+
+
 def _format_bytes(value: float) -> str:
     step = 1024.0
     units = ["B", "KB", "MB", "GB", "TB", "PB"]
@@ -675,6 +970,29 @@ def _run_psql_restore(env: dict[str, str], staged_backup: Path, timeout: int) ->
     )
 
 
+def _run_pg_restore(
+    env: dict[str, str], staged_backup: Path, timeout: int, jobs: int
+) -> subprocess.CompletedProcess:
+    command = [
+        "pg_restore",
+        "--no-owner",
+        "--no-privileges",
+        "--exit-on-error",
+        f"--jobs={max(1, jobs)}",
+        "--dbname",
+        _database_identifier_from_env(env),
+        str(staged_backup),
+    ]
+    return subprocess.run(
+        command,
+        check=True,
+        env=env,
+        timeout=timeout,
+        capture_output=True,
+        text=True,
+    )
+
+
 def restore_database_backup(app, filename: str, logger: logging.Logger) -> RestoreOutcome:
     if not is_valid_backup_filename(filename):
         raise ValueError("Invalid backup filename.")
@@ -686,11 +1004,18 @@ def restore_database_backup(app, filename: str, logger: logging.Logger) -> Resto
     if not backup_path.exists():
         raise FileNotFoundError("Backup file not found.")
 
+    dump_format = _dump_format_for_path(backup_path)
+    if dump_format is None or backup_path.is_dir() != (dump_format == "directory"):
+        raise ValueError("Unsupported backup format for restore.")
+
     timestamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
     staging_dir = backup_dir / "tmp" / f"restore_{timestamp}"
     _ensure_directory(staging_dir)
     staged_backup = staging_dir / backup_path.name
-    shutil.copy2(backup_path, staged_backup)
+    if dump_format == "directory":
+        shutil.copytree(backup_path, staged_backup)
+    else:
+        shutil.copy2(backup_path, staged_backup)
 
     env = _build_pg_dump_env(app, logger)
     if env is None:
@@ -701,9 +1026,6 @@ def restore_database_backup(app, filename: str, logger: logging.Logger) -> Resto
     stdout = ""
     stderr = ""
 
-    if staged_backup.suffix != ".sql":
-        raise ValueError("Only .sql backups are supported for restore.")
-
     try:
         status_bus.log_event(
             "info",
@@ -721,13 +1043,23 @@ def restore_database_backup(app, filename: str, logger: logging.Logger) -> Resto
         )
         _reset_public_schema(env, logger)
 
-        status_bus.log_event(
-            "info",
-            "Applying backup via psql.",
-            context={"filename": filename, "stage": "restore"},
-            source="backup_restore",
-        )
-        result = _run_psql_restore(env, staged_backup, timeout)
+        if dump_format == "plain":
+            status_bus.log_event(
+                "info",
+                "Applying backup via psql.",
+                context={"filename": filename, "stage": "restore"},
+                source="backup_restore",
+            )
+            result = _run_psql_restore(env, staged_backup, timeout)
+        else:
+            jobs = _db_dump_jobs(app)
+            status_bus.log_event(
+                "info",
+                f"Applying backup via pg_restore ({jobs} jobs).",
+                context={"filename": filename, "stage": "restore", "format": dump_format},
+                source="backup_restore",
+            )
+            result = _run_pg_restore(env, staged_backup, timeout, jobs)
         stdout = result.stdout or ""
         stderr = result.stderr or ""
 
@@ -809,6 +1141,10 @@ def _finalize_backup_run(
     filepath: str | None = None,
     bytes: int | None = None,
     message: str | None = None,
+    dump_format: str | None = None,
+    duration_seconds: float | None = None,
+    archive_bytes: int | None = None,
+    archive_new_bytes: int | None = None,
 ) -> None:
     if record is None:
         return
@@ -818,6 +1154,10 @@ def _finalize_backup_run(
         record.filepath = filepath
         record.bytes = bytes
         record.message = message
+        record.dump_format = dump_format
+        record.duration_seconds = duration_seconds
+        record.archive_bytes = archive_bytes
+        record.archive_new_bytes = archive_new_bytes
         record.finished_at = datetime.utcnow()
         db.session.add(record)
         db.session.commit()
@@ -0,0 +1,317 @@
+"""Connection pool sizing and instrumentation.
+
+Each gunicorn worker is a separate process with its own pool, so the pool only
+needs to cover the worker's request threads (``GUNICORN_THREADS``) plus a few
+background connections (status bus writer, scheduled jobs, backups).  Unless
+``DB_POOL_SIZE``/``DB_MAX_OVERFLOW`` are set explicitly they are derived from
+those numbers, and the whole deployment needs at most
+``GUNICORN_WORKERS * (pool_size + max_overflow)`` server connections.
+
+``DB_PGBOUNCER`` switches to ``NullPool``: PgBouncer (transaction pooling) owns
+connection reuse and the application must not hold server sessions across
+requests.  Session-level advisory locks do not survive transaction pooling, so
+the scheduler falls back to its file lock in that mode.
+
+Pre-ping is off by default; a disconnect invalidates the whole pool on first
+use instead, and ``DB_POOL_RECYCLE`` retires connections before server or
+firewall idle timeouts close them.
+
+:class:`PoolMetrics` counts checkouts, slow checkouts (waits), timeouts,
+overflow use and invalidations for the admin tools page.  Pool exhaustion and
+invalidations are also published on the status bus so the operations monitor
+sees them.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import NullPool, QueuePool
+
+from invapp.extensions import db
+from invapp.services import status_bus
+
+
+DEFAULT_POOL_TIMEOUT = 10.0
+DEFAULT_POOL_RECYCLE = 1800
+DEFAULT_BACKGROUND_CONNECTIONS = 2
+DEFAULT_SLOW_CHECKOUT_MS = 100.0
+
+
+class PoolMetrics:
+    """Thread-safe counters fed by pool events and :class:`InstrumentedQueuePool`."""
+
+    def __init__(self, slow_checkout_ms: float = DEFAULT_SLOW_CHECKOUT_MS) -> None:
+        self.slow_checkout_ms = slow_checkout_ms
+        self._lock = threading.Lock()
+        self.started_at = datetime.utcnow()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.soft_invalidations = 0
+        self.slow_checkouts = 0
+        self.timeouts = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+        self.peak_checked_out = 0
+        self.peak_overflow = 0
+        self.last_timeout_at: datetime | None = None
+        self.last_invalidation_at: datetime | None = None
+
+    def record_wait(self, elapsed_ms: float, *, timed_out: bool = False) -> None:
+        with self._lock:
+            self.wait_ms_total += elapsed_ms
+            self.wait_ms_max = max(self.wait_ms_max, elapsed_ms)
+            if elapsed_ms >= self.slow_checkout_ms:
+                self.slow_checkouts += 1
+            if timed_out:
+                self.timeouts += 1
+                self.last_timeout_at = datetime.utcnow()
+
+    def record_checkout(self, pool) -> None:
+        checked_out = _call(pool, "checkedout")
+        overflow = _call(pool, "overflow")
+        with self._lock:
+            self.checkouts += 1
+            if checked_out is not None:
+                self.peak_checked_out = max(self.peak_checked_out, checked_out)
+            if overflow is not None:
+                self.peak_overflow = max(self.peak_overflow, overflow)
+
+    def increment(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+            if name in {"invalidations", "soft_invalidations"}:
+                self.last_invalidation_at = datetime.utcnow()
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "since": self.started_at,
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "soft_invalidations": self.soft_invalidations,
+                "slow_checkouts": self.slow_checkouts,
+                "timeouts": self.timeouts,
+                "wait_ms_avg": round(self.wait_ms_total / self.checkouts, 2)
+                if self.checkouts
+                else 0.0,
+                "wait_ms_max": round(self.wait_ms_max, 2),
+                "peak_checked_out": self.peak_checked_out,
+                "peak_overflow": self.peak_overflow,
+                "last_timeout_at": self.last_timeout_at,
+                "last_invalidation_at": self.last_invalidation_at,
+            }
+
+
+def _call(pool, name: str):
+    method = getattr(pool, name, None)
+    if method is None:
+        return None
+    try:
+        return method()
+    except Exception:  # pragma: no cover - pool implementations without counters
+        return None
+
+
+class InstrumentedQueuePool(QueuePool):
+    """``QueuePool`` that times how long callers wait for a connection."""
+
+    metrics: PoolMetrics | None = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self._record((time.perf_counter() - started) * 1000, timed_out=True)
+            raise
+        self._record((time.perf_counter() - started) * 1000)
+        return connection
+
+    def _record(self, elapsed_ms: float, *, timed_out: bool = False) -> None:
+        if self.metrics is not None:
+            self.metrics.record_wait(elapsed_ms, timed_out=timed_out)
+            if timed_out:
+                _publish("Database connection pool exhausted", self, "timeout")
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def _config_bool(config, key: str, default: bool = False) -> bool:
+    value = config.get(key, default)
+    if isinstance(value, str):
+        return value.strip().lower() in {"1", "true", "yes", "on"}
+    return bool(value)
+
+
+def _config_int(config, key: str, default: int | None) -> int | None:
+    value = config.get(key)
+    if value in (None, ""):
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def pool_sizing(config) -> dict[str, int]:
+    """Per-worker pool size and overflow derived from the worker/thread count."""
+
+    threads = max(1, _config_int(config, "GUNICORN_THREADS", 1))
+    background = max(
+        0, _config_int(config, "DB_POOL_BACKGROUND_CONNECTIONS", DEFAULT_BACKGROUND_CONNECTIONS)
+    )
+    pool_size = _config_int(config, "DB_POOL_SIZE", None)
+    max_overflow = _config_int(config, "DB_MAX_OVERFLOW", None)
+    if pool_size is None:
+        pool_size = threads + background
+    if max_overflow is None:
+        max_overflow = threads
+    workers = max(1, _config_int(config, "GUNICORN_WORKERS", 1))
+    return {
+        "workers": workers,
+        "threads": threads,
+        "pool_size": max(1, pool_size),
+        "max_overflow": max(0, max_overflow),
+        "max_connections": workers * (max(1, pool_size) + max(0, max_overflow)),
+    }
+
+
+def configure_engine_options(config) -> dict[str, Any]:
+    """Fill ``SQLALCHEMY_ENGINE_OPTIONS`` with pool settings (explicit options win)."""
+
+    options = config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", {})
+    options.setdefault("pool_pre_ping", _config_bool(config, "DB_POOL_PRE_PING"))
+
+    uri = config.get("SQLALCHEMY_DATABASE_URI") or ""
+    try:
+        backend = make_url(uri).get_backend_name()
+    except Exception:
+        backend = ""
+    if backend == "sqlite" or not backend:
+        # SQLite keeps SQLAlchemy's per-dialect pool choice.
+        return options
+
+    if _config_bool(config, "DB_PGBOUNCER"):
+        options.setdefault("poolclass", NullPool)
+        # Transaction pooling cannot keep server-side prepared statements.
+        connect_args = options.setdefault("connect_args", {})
+        if backend == "postgresql" and make_url(uri).get_driver_name() == "psycopg":
+            connect_args.setdefault("prepare_threshold", None)
+        return options
+
+    sizing = pool_sizing(config)
+    options.setdefault("poolclass", InstrumentedQueuePool)
+    options.setdefault("pool_size", sizing["pool_size"])
+    options.setdefault("max_overflow", sizing["max_overflow"])
+    options.setdefault(
+        "pool_timeout", float(config.get("DB_POOL_TIMEOUT") or DEFAULT_POOL_TIMEOUT)
+    )
+    options.setdefault(
+        "pool_recycle", _config_int(config, "DB_POOL_RECYCLE", DEFAULT_POOL_RECYCLE)
+    )
+    options.setdefault("pool_use_lifo", True)
+    return options
+
+
+def _publish(message: str, pool, reason: str) -> None:
+    try:
+        app = current_app._get_current_object()
+    except RuntimeError:
+        return
+    context = {
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in pool_status(app).items()
+    }
+    context["reason"] = reason
+    status_bus.log_event(
+        "WARNING",
+        message,
+        context=context,
+        source="db_pool",
+        dedupe_key=f"db-pool:{os.getpid()}:{reason}",
+    )
+
+
+def instrument_engine(engine, metrics: PoolMetrics) -> None:
+    """Attach ``metrics`` to ``engine``'s pool events."""
+
+    pool = engine.pool
+    if isinstance(pool, InstrumentedQueuePool):
+        pool.metrics = metrics
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        metrics.increment("connects")
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.record_checkout(engine.pool)
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        metrics.increment("checkins")
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.increment("invalidations")
+        _publish("Database connection invalidated", engine.pool, "invalidate")
+
+    @event.listens_for(engine, "soft_invalidate")
+    def _on_soft_invalidate(dbapi_connection, connection_record, exception):
+        metrics.increment("soft_invalidations")
+
+
+def init_pool_metrics(app) -> PoolMetrics:
+    metrics = PoolMetrics(
+        slow_checkout_ms=float(
+            app.config.get("DB_POOL_SLOW_CHECKOUT_MS") or DEFAULT_SLOW_CHECKOUT_MS
+        )
+    )
+    app.extensions["db_pool_metrics"] = metrics
+    with app.app_context():
+        instrument_engine(db.get_engine(app), metrics)
+    return metrics
+
+
+def pool_status(app=None) -> dict[str, Any]:
+    """Live pool state plus the counters collected since startup."""
+
+    target = app or current_app
+    engine = db.get_engine(target)
+    pool = engine.pool
+    metrics = target.extensions.get("db_pool_metrics")
+    sizing = pool_sizing(target.config)
+    status: dict[str, Any] = {
+        "pid": os.getpid(),
+        "pool_class": type(pool).__name__,
+        "pgbouncer": _config_bool(target.config, "DB_PGBOUNCER"),
+        "pre_ping": bool(getattr(pool, "_pre_ping", False)),
+        "size": _call(pool, "size"),
+        "max_overflow": getattr(pool, "_max_overflow", None),
+        "timeout": _call(pool, "timeout"),
+        "recycle": getattr(pool, "_recycle", None),
+        "checked_in": _call(pool, "checkedin"),
+        "checked_out": _call(pool, "checkedout"),
+        "overflow": max(0, _call(pool, "overflow") or 0),
+        "workers": sizing["workers"],
+        "max_connections": sizing["max_connections"],
+    }
+    if metrics is not None:
+        status.update(metrics.snapshot())
+    return status
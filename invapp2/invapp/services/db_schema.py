@@ -55,3 +55,132 @@ def ensure_app_setting_schema(engine: Engine, logger: logging.Logger) -> list[st
     if added:
         logger.info("Added missing columns to app_setting: %s", ", ".join(added))
     return added
+
+
+BACKUP_RUN_METRIC_COLUMNS = (
+    ("dump_format", "VARCHAR(16)"),
+    ("duration_seconds", "FLOAT"),
+    ("archive_bytes", "BIGINT"),
+    ("archive_new_bytes", "BIGINT"),
+)
+
+
+def ensure_backup_run_schema(engine: Engine, logger: logging.Logger) -> list[str]:
+    """Ensure backup_run has the dump format and duration/size metric columns."""
+
+    added: list[str] = []
+    try:
+        inspector = inspect(engine)
+        if not inspector.has_table("backup_run"):
+            return added
+        columns = {column["name"] for column in inspector.get_columns("backup_run")}
+    except SQLAlchemyError as exc:
+        logger.warning("Unable to inspect backup_run schema: %s", exc)
+        return added
+
+    statements = []
+    for name, column_type in BACKUP_RUN_METRIC_COLUMNS:
+        if name not in columns:
+            statements.append(f"ALTER TABLE backup_run ADD COLUMN {name} {column_type}")
+            added.append(name)
+
+    if not statements:
+        return added
+
+    try:
+        with engine.begin() as conn:
+            for statement in statements:
+                conn.execute(text(statement))
+    except SQLAlchemyError as exc:
+        logger.warning("Unable to repair backup_run schema: %s", exc)
+        return []
+
+    logger.info("Added missing columns to backup_run: %s", ", ".join(added))
+    return added
+
+
+SEARCH_TRIGRAM_INDEXES = (
+    ("ix_item_sku_trgm", "item", "sku"),
+    ("ix_item_name_trgm", "item", "name"),
+    ("ix_item_description_trgm", "item", "description"),
+    ("ix_location_code_trgm", "location", "code"),
+    ("ix_location_description_trgm", "location", "description"),
+)
+
+
+def ensure_search_trigram_indexes(engine: Engine, logger: logging.Logger) -> list[str]:
+    """Create ``pg_trgm`` GIN indexes backing case-insensitive substring search.
+
+    Only PostgreSQL is supported; the extension may require elevated privileges,
+    in which case a warning is logged and search falls back to sequential scans.
+    """
+
+    if engine.dialect.name != "postgresql":
+        return []
+
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    except SQLAlchemyError as exc:
+        logger.warning("pg_trgm extension unavailable; search indexes skipped: %s", exc)
+        return []
+
+    created: list[str] = []
+    for index_name, table, column in SEARCH_TRIGRAM_INDEXES:
+        try:
+            with engine.begin() as conn:
+                conn.execute(
+                    text(
+                        f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} "
+                        f"USING gin (lower({column}) gin_trgm_ops)"
+                    )
+                )
+        except SQLAlchemyError as exc:
+            logger.warning("Unable to create search index %s: %s", index_name, exc)
+            continue
+        created.append(index_name)
+    return created
+
+
+DICTIONARY_VERSION_TABLES = ("item", "location")
+
+
+def ensure_item_dictionary_schema(engine: Engine, logger: logging.Logger) -> list[str]:
+    """Add change_version columns/indexes and the lower(sku) lookup index."""
+
+    added: list[str] = []
+    try:
+        inspector = inspect(engine)
+        existing = {
+            table: {column["name"] for column in inspector.get_columns(table)}
+            for table in DICTIONARY_VERSION_TABLES
+            if inspector.has_table(table)
+        }
+    except SQLAlchemyError as exc:
+        logger.warning("Unable to inspect item dictionary schema: %s", exc)
+        return added
+
+    statements = []
+    for table, columns in existing.items():
+        if "change_version" not in columns:
+            statements.append(
+                f"ALTER TABLE {table} ADD COLUMN change_version BIGINT NOT NULL DEFAULT 0"
+            )
+            added.append(f"{table}.change_version")
+        statements.append(
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_change_version ON {table} (change_version)"
+        )
+    if "item" in existing:
+        statements.append("CREATE INDEX IF NOT EXISTS ix_item_sku_lower ON item (lower(sku))")
+
+    try:
+        with engine.begin() as conn:
+            for statement in statements:
+                conn.execute(text(statement))
+    except SQLAlchemyError as exc:
+        logger.warning("Unable to repair item dictionary schema: %s", exc)
+        return []
+
+    if added:
+        logger.info("Added item dictionary columns: %s", ", ".join(added))
+    return added
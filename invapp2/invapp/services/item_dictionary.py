@@ -0,0 +1,97 @@
+"""Versioned item/location dictionary for offline barcode lookups.
+
+Scanner pages keep a copy of every item and location in IndexedDB (see
+``static/js/item-dictionary.js``) and resolve scans locally instead of calling
+``/inventory/api/items/<sku>`` per scan.  Each ``Item``/``Location`` row carries
+a ``change_version`` stamped from the :class:`~invapp.models.DictionaryVersion`
+counter whenever a dictionary field changes, and deletions leave a
+:class:`~invapp.models.DictionaryTombstone`.  A client sends the version it
+last synced and receives only the rows and tombstones stamped after it.
+
+Rows are returned as positional arrays described by ``fields`` to keep the
+first full download small.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from sqlalchemy import text
+
+from invapp.extensions import db
+from invapp.models import DictionaryTombstone, Item, Location
+
+
+ITEM_FIELDS = ("id", "sku", "name", "description", "unit", "type", "default_location_id")
+LOCATION_FIELDS = ("id", "code", "description")
+
+
+def current_version() -> int:
+    value = db.session.execute(
+        text("SELECT value FROM dictionary_version WHERE id = 1")
+    ).scalar()
+    return int(value or 0)
+
+
+def _rows(model, fields, since: int | None, version: int) -> list[list[Any]]:
+    query = db.session.query(*(getattr(model, name) for name in fields)).filter(
+        model.change_version <= version
+    )
+    if since is not None:
+        query = query.filter(model.change_version > since)
+    return [list(row) for row in query.order_by(model.id)]
+
+
+def build_dictionary(since: int | None = None) -> dict[str, Any]:
+    """Full snapshot, or the changes after ``since`` when that token is usable.
+
+    Only rows stamped at or below the counter value read up front are
+    returned; anything committed later is picked up by the next delta.
+    """
+
+    version = current_version()
+    full = since is None or since < 0 or since > version
+    if full:
+        since = None
+
+    deleted: dict[str, list[int]] = {"items": [], "locations": []}
+    if not full:
+        tombstones = (
+            db.session.query(DictionaryTombstone.entity, DictionaryTombstone.entity_id)
+            .filter(
+                DictionaryTombstone.version > since,
+                DictionaryTombstone.version <= version,
+            )
+            .order_by(DictionaryTombstone.version)
+        )
+        for entity, entity_id in tombstones:
+            deleted["items" if entity == Item.__tablename__ else "locations"].append(entity_id)
+
+    return {
+        "version": version,
+        "full": full,
+        "fields": {"items": list(ITEM_FIELDS), "locations": list(LOCATION_FIELDS)},
+        "items": _rows(Item, ITEM_FIELDS, since, version),
+        "locations": _rows(Location, LOCATION_FIELDS, since, version),
+        "deleted": deleted,
+    }
+
+
+def changed_ids(model, since: int, version: int) -> set[int]:
+    """Ids of ``model`` rows stamped or tombstoned after ``since`` up to ``version``."""
+
+    ids = {
+        row_id
+        for (row_id,) in db.session.query(model.id).filter(
+            model.change_version > since, model.change_version <= version
+        )
+    }
+    ids.update(
+        entity_id
+        for (entity_id,) in db.session.query(DictionaryTombstone.entity_id).filter(
+            DictionaryTombstone.entity == model.__tablename__,
+            DictionaryTombstone.version > since,
+            DictionaryTombstone.version <= version,
+        )
+    )
+    return ids
@@ -0,0 +1,481 @@
+"""Partitioned storage, retention and hourly rollups for the audit/ops logs.
+
+On PostgreSQL ``access_log`` and ``ops_event_log`` are converted in place to
+tables range-partitioned by month.  The existing table becomes the
+``<table>_legacy`` partition (covering everything up to the start of the next
+month), and ``<table>_pYYYYMM`` partitions are created
+``LOG_PARTITION_MONTHS_AHEAD`` months in advance.  Retention drops whole
+partitions once their upper bound falls behind the cutoff and then deletes any
+remaining expired rows in batches.  SQLite has no partitioning, so it only
+gets the batched deletes.  ``access_log`` and ``error_report`` are kept
+forever unless ``ACCESS_LOG_RETENTION_DAYS`` / ``ERROR_REPORT_RETENTION_DAYS``
+are set; ``ops_event_log`` defaults to 30 days.
+
+``access_log_hourly`` holds per-hour counts by event type and IP address.
+:func:`access_log_summary` answers the access log page's summary widgets from
+the rollups plus the raw rows newer than the last rolled-up hour, so the page
+no longer has to group the whole table.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Iterable
+
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+from invapp.extensions import db
+from invapp.models import AccessLog, AccessLogHourly, ErrorReport, OpsEventLog
+from invapp.services.scheduler import register_job
+
+
+LOGGER = logging.getLogger("invapp.log_storage")
+
+DEFAULT_MONTHS_AHEAD = 2
+DEFAULT_ROLLUP_MAX_HOURS = 24 * 7
+DEFAULT_SUMMARY_DAYS = 30
+DELETE_BATCH_SIZE = 5000
+# pg_advisory_xact_lock key serialising partition maintenance across workers.
+PARTITION_LOCK_KEY = 0x6C6F6770  # "logp"
+
+
+@dataclass(frozen=True)
+class LogTable:
+    name: str
+    model: Any
+    column: str
+    retention_key: str
+    default_retention_days: int
+    partitioned: bool = False
+    indexes: tuple[tuple[str, str], ...] = ()
+    foreign_keys: tuple[str, ...] = ()
+
+
+LOG_TABLES = (
+    LogTable(
+        name="access_log",
+        model=AccessLog,
+        column="occurred_at",
+        retention_key="ACCESS_LOG_RETENTION_DAYS",
+        default_retention_days=0,
+        partitioned=True,
+        indexes=(
+            ("ix_access_log_occurred_at", "occurred_at"),
+            ("ix_access_log_event_type", "event_type"),
+        ),
+        foreign_keys=('(user_id) REFERENCES "user" (id) ON DELETE SET NULL',),
+    ),
+    LogTable(
+        name="ops_event_log",
+        model=OpsEventLog,
+        column="created_at",
+        retention_key="OPS_EVENT_LOG_RETENTION_DAYS",
+        default_retention_days=30,
+        partitioned=True,
+        indexes=(("ix_ops_event_log_created_at", "created_at"),),
+    ),
+    LogTable(
+        name="error_report",
+        model=ErrorReport,
+        column="occurred_at",
+        retention_key="ERROR_REPORT_RETENTION_DAYS",
+        default_retention_days=0,
+    ),
+)
+
+
+def month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    index = value.year * 12 + (value.month - 1) + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, start: datetime) -> str:
+    return f"{table}_p{start:%Y%m}"
+
+
+def plan_partitions(
+    table: str, upper_bound: datetime, *, now: datetime, months_ahead: int
+) -> list[tuple[str, datetime, datetime]]:
+    """Monthly partitions needed so ``table`` accepts rows through ``months_ahead``."""
+
+    target = add_months(month_start(now), max(0, months_ahead) + 1)
+    start = month_start(upper_bound)
+    if start < upper_bound:
+        start = add_months(start, 1)
+    planned = []
+    while start < target:
+        end = add_months(start, 1)
+        planned.append((partition_name(table, start), start, end))
+        start = end
+    return planned
+
+
+_UPPER_BOUND_RE = re.compile(r"TO \('([^']+)'\)")
+
+
+def parse_upper_bound(expression: str | None) -> datetime | None:
+    """Upper bound of a ``pg_get_expr(relpartbound)`` range expression."""
+
+    match = _UPPER_BOUND_RE.search(expression or "")
+    if not match:
+        return None
+    try:
+        return datetime.fromisoformat(match.group(1).split("+")[0].strip())
+    except ValueError:
+        return None
+
+
+def _is_partitioned(conn, table: str) -> bool:
+    return bool(
+        conn.execute(
+            text(
+                "SELECT 1 FROM pg_partitioned_table p "
+                "JOIN pg_class c ON c.oid = p.partrelid "
+                "WHERE c.relname = :table AND c.relnamespace = 'public'::regnamespace"
+            ),
+            {"table": table},
+        ).scalar()
+    )
+
+
+def _partitions(conn, table: str) -> list[tuple[str, datetime | None]]:
+    rows = conn.execute(
+        text(
+            "SELECT child.relname, pg_get_expr(child.relpartbound, child.oid) "
+            "FROM pg_inherits i "
+            "JOIN pg_class parent ON parent.oid = i.inhparent "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "WHERE parent.relname = :table "
+            "AND parent.relnamespace = 'public'::regnamespace"
+        ),
+        {"table": table},
+    )
+    return [(name, parse_upper_bound(bound)) for name, bound in rows]
+
+
+def _convert_to_partitioned(conn, spec: LogTable, now: datetime) -> None:
+    """Turn ``spec.name`` into a partitioned table with the old one attached."""
+
+    legacy = f"{spec.name}_legacy"
+    newest = conn.execute(text(f"SELECT MAX({spec.column}) FROM {spec.name}")).scalar()
+    boundary = add_months(month_start(max(now, newest or now)), 1)
+    sequence = conn.execute(
+        text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": spec.name}
+    ).scalar()
+    primary_key = conn.execute(
+        text(
+            "SELECT conname FROM pg_constraint "
+            "WHERE conrelid = CAST(:table AS regclass) AND contype = 'p'"
+        ),
+        {"table": spec.name},
+    ).scalar()
+
+    conn.execute(text(f"ALTER TABLE {spec.name} RENAME TO {legacy}"))
+    if primary_key:
+        conn.execute(
+            text(f"ALTER TABLE {legacy} RENAME CONSTRAINT {primary_key} TO {legacy}_pkey")
+        )
+    for index_name, _column in spec.indexes:
+        conn.execute(
+            text(
+                f"ALTER INDEX IF EXISTS {index_name} "
+                f"RENAME TO {index_name.replace(spec.name, legacy, 1)}"
+            )
+        )
+    conn.execute(
+        text(
+            f"CREATE TABLE {spec.name} (LIKE {legacy} INCLUDING DEFAULTS "
+            f"INCLUDING CONSTRAINTS INCLUDING STORAGE) PARTITION BY RANGE ({spec.column})"
+        )
+    )
+    conn.execute(
+        text(
+            f"ALTER TABLE {spec.name} ADD CONSTRAINT {spec.name}_pkey "
+            f"PRIMARY KEY (id, {spec.column})"
+        )
+    )
+    for foreign_key in spec.foreign_keys:
+        conn.execute(text(f"ALTER TABLE {spec.name} ADD FOREIGN KEY {foreign_key}"))
+    for index_name, column in spec.indexes:
+        conn.execute(text(f"CREATE INDEX {index_name} ON {spec.name} ({column})"))
+    if sequence:
+        # The sequence must outlive the legacy partition once retention drops it.
+        conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {spec.name}.id"))
+    conn.execute(
+        text(
+            f"ALTER TABLE {spec.name} ATTACH PARTITION {legacy} "
+            f"FOR VALUES FROM (MINVALUE) TO ('{boundary.isoformat(sep=' ')}')"
+        )
+    )
+
+
+def ensure_log_partitions(
+    engine: Engine,
+    logger: logging.Logger | None = None,
+    *,
+    months_ahead: int = DEFAULT_MONTHS_AHEAD,
+    now: datetime | None = None,
+) -> list[str]:
+    """Partition the log tables (PostgreSQL only) and pre-create future months."""
+
+    logger = logger or LOGGER
+    if engine.dialect.name != "postgresql":
+        return []
+    now = now or datetime.utcnow()
+    created: list[str] = []
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY})
+            for spec in LOG_TABLES:
+                if not spec.partitioned:
+                    continue
+                if not conn.execute(
+                    text("SELECT to_regclass(:table)"), {"table": f"public.{spec.name}"}
+                ).scalar():
+                    continue
+                if not _is_partitioned(conn, spec.name):
+                    _convert_to_partitioned(conn, spec, now)
+                    logger.info("Converted %s to a monthly partitioned table.", spec.name)
+                bounds = [bound for _, bound in _partitions(conn, spec.name) if bound]
+                upper = max(bounds) if bounds else month_start(now)
+                for name, start, end in plan_partitions(
+                    spec.name, upper, now=now, months_ahead=months_ahead
+                ):
+                    conn.execute(
+                        text(
+                            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {spec.name} "
+                            f"FOR VALUES FROM ('{start.isoformat(sep=' ')}') "
+                            f"TO ('{end.isoformat(sep=' ')}')"
+                        )
+                    )
+                    created.append(name)
+    except SQLAlchemyError as exc:
+        logger.warning("Unable to maintain log partitions: %s", exc)
+        return []
+    if created:
+        logger.info("Created log partitions: %s", ", ".join(created))
+    return created
+
+
+def _retention_days(config, spec: LogTable) -> int:
+    try:
+        return int(config.get(spec.retention_key, spec.default_retention_days))
+    except (TypeError, ValueError):
+        return spec.default_retention_days
+
+
+def _delete_batches(engine: Engine, table, column, cutoff: datetime) -> int:
+    removed = 0
+    while True:
+        with engine.begin() as conn:
+            ids = select(table.c.id).where(column < cutoff).limit(DELETE_BATCH_SIZE)
+            result = conn.execute(delete(table).where(table.c.id.in_(ids)))
+        removed += result.rowcount or 0
+        if not result.rowcount or result.rowcount < DELETE_BATCH_SIZE:
+            return removed
+
+
+def apply_retention(
+    engine: Engine, config, *, now: datetime | None = None
+) -> dict[str, int]:
+    """Drop expired partitions and delete expired rows; return rows/partitions removed."""
+
+    now = now or datetime.utcnow()
+    removed: dict[str, int] = {}
+    for spec in LOG_TABLES:
+        days = _retention_days(config, spec)
+        if days <= 0:
+            continue
+        cutoff = now - timedelta(days=days)
+        if spec.partitioned and engine.dialect.name == "postgresql":
+            with engine.begin() as conn:
+                if _is_partitioned(conn, spec.name):
+                    for name, upper in _partitions(conn, spec.name):
+                        if upper is not None and upper <= cutoff:
+                            conn.execute(text(f"DROP TABLE {name}"))
+                            removed[f"{spec.name}:partitions"] = (
+                                removed.get(f"{spec.name}:partitions", 0) + 1
+                            )
+        table = spec.model.__table__
+        removed[spec.name] = _delete_batches(engine, table, table.c[spec.column], cutoff)
+
+    rollup_days = int(config.get("ACCESS_LOG_ROLLUP_RETENTION_DAYS", 730))
+    if rollup_days > 0:
+        table = AccessLogHourly.__table__
+        with engine.begin() as conn:
+            result = conn.execute(
+                delete(table).where(table.c.hour < now - timedelta(days=rollup_days))
+            )
+        removed["access_log_hourly"] = result.rowcount or 0
+    return removed
+
+
+def _hour_bucket(engine: Engine, column):
+    if engine.dialect.name == "postgresql":
+        return func.date_trunc("hour", column)
+    return func.strftime("%Y-%m-%d %H:00:00", column)
+
+
+def _as_datetime(value) -> datetime:
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    return datetime.fromisoformat(str(value))
+
+
+def floor_hour(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def rollup_access_log(
+    engine: Engine,
+    *,
+    now: datetime | None = None,
+    max_hours: int = DEFAULT_ROLLUP_MAX_HOURS,
+) -> int:
+    """Aggregate completed hours of ``access_log`` into ``access_log_hourly``.
+
+    The most recent rolled-up hour is recomputed each run so rows committed
+    late are picked up.  Each call then covers at most ``max_hours`` starting
+    from the next hour that has rows, so a gap in ``access_log`` longer than
+    the window (a plant shutdown) is skipped instead of stalling the rollup.
+    """
+
+    current_hour = floor_hour(now or datetime.utcnow())
+    source = AccessLog.__table__
+    rollup = AccessLogHourly.__table__
+    with engine.begin() as conn:
+        watermark = conn.execute(select(func.max(rollup.c.hour))).scalar()
+        if watermark is not None:
+            start = _as_datetime(watermark)
+        else:
+            oldest = conn.execute(select(func.min(source.c.occurred_at))).scalar()
+            if oldest is None:
+                return 0
+            start = floor_hour(_as_datetime(oldest))
+        following = conn.execute(
+            select(func.min(source.c.occurred_at)).where(
+                source.c.occurred_at >= start + timedelta(hours=1)
+            )
+        ).scalar()
+        resume = start
+        if following is not None:
+            resume = max(start, floor_hour(_as_datetime(following)))
+        end = min(current_hour, resume + timedelta(hours=max(1, max_hours)))
+        if start >= end:
+            return 0
+
+        bucket = _hour_bucket(engine, source.c.occurred_at).label("bucket")
+        rows = conn.execute(
+            select(bucket, source.c.event_type, source.c.ip_address, func.count())
+            .where(source.c.occurred_at >= start, source.c.occurred_at < end)
+            .group_by(bucket, source.c.event_type, source.c.ip_address)
+        ).all()
+        conn.execute(delete(rollup).where(rollup.c.hour >= start, rollup.c.hour < end))
+        payload = [
+            {
+                "hour": _as_datetime(hour),
+                "event_type": event_type,
+                "ip_address": ip_address,
+                "total": total,
+            }
+            for hour, event_type, ip_address, total in rows
+        ]
+        if payload:
+            conn.execute(insert(rollup), payload)
+    return len(payload)
+
+
+def _merge_counts(*groups: Iterable[tuple[Any, int]]) -> dict[Any, int]:
+    merged: dict[Any, int] = {}
+    for group in groups:
+        for key, total in group:
+            merged[key] = merged.get(key, 0) + int(total or 0)
+    return merged
+
+
+def access_log_summary(
+    *,
+    days: int = DEFAULT_SUMMARY_DAYS,
+    ip_limit: int = 20,
+    now: datetime | None = None,
+) -> tuple[list[tuple[str | None, int]], list[tuple[str, int]]]:
+    """``(ip_summary, event_summary)`` for the last ``days`` days of access."""
+
+    now = now or datetime.utcnow()
+    since = floor_hour(now - timedelta(days=days))
+    watermark = db.session.query(func.max(AccessLogHourly.hour)).scalar()
+    rolled_until = since
+    if watermark is not None:
+        rolled_until = max(since, _as_datetime(watermark) + timedelta(hours=1))
+
+    def rolled(column):
+        return (
+            db.session.query(column, func.sum(AccessLogHourly.total))
+            .filter(AccessLogHourly.hour >= since, AccessLogHourly.hour < rolled_until)
+            .group_by(column)
+            .all()
+        )
+
+    def raw(column):
+        return (
+            db.session.query(column, func.count(AccessLog.id))
+            .filter(AccessLog.occurred_at >= rolled_until)
+            .group_by(column)
+            .all()
+        )
+
+    ip_counts = _merge_counts(rolled(AccessLogHourly.ip_address), raw(AccessLog.ip_address))
+    event_counts = _merge_counts(
+        rolled(AccessLogHourly.event_type), raw(AccessLog.event_type)
+    )
+    ip_summary = sorted(ip_counts.items(), key=lambda item: (-item[1], item[0] or ""))
+    event_summary = sorted(event_counts.items(), key=lambda item: item[0] or "")
+    return ip_summary[:ip_limit], event_summary
+
+
+def register_log_jobs(app) -> None:
+    def maintain_partitions(app) -> None:
+        ensure_log_partitions(
+            db.get_engine(app),
+            app.logger,
+            months_ahead=int(app.config.get("LOG_PARTITION_MONTHS_AHEAD", DEFAULT_MONTHS_AHEAD)),
+        )
+
+    def retention(app) -> None:
+        removed = apply_retention(db.get_engine(app), app.config)
+        if any(removed.values()):
+            app.logger.info("Log retention removed %s", removed)
+
+    def rollup(app) -> None:
+        rollup_access_log(db.get_engine(app))
+
+    register_job(
+        app,
+        "log-partitions",
+        maintain_partitions,
+        hours=24,
+        description="Create upcoming monthly access/ops log partitions.",
+    )
+    register_job(
+        app,
+        "log-retention",
+        retention,
+        hours=1,
+        description="Apply access_log, ops_event_log and error_report retention.",
+    )
+    register_job(
+        app,
+        "access-log-rollup",
+        rollup,
+        minutes=15,
+        description="Roll completed hours of access_log into access_log_hourly.",
+    )
@@ -2,19 +2,31 @@
 
 from __future__ import annotations
 
-from dataclasses import asdict, dataclass
+import csv
+import io
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
 from decimal import Decimal, InvalidOperation
 from typing import Iterable
 
-from sqlalchemy import String, Text, func
-from sqlalchemy.orm import load_only
+from flask import current_app
+from sqlalchemy import String, Text, event, func
 
 from invapp.extensions import db
 from invapp.models import Item
+from invapp.utils.tabular_import import TabularReader
 
 
 SKU_EXCLUSION_TOKENS = {"sku", "item_number", "part_number"}
 
+#: Seconds a cached item key table stays valid.  Writes made by this worker
+#: invalidate tables immediately; the TTL bounds staleness from other workers.
+MATCH_KEY_TABLE_TTL_SECONDS = 300
+#: Number of parsed uploads kept per worker for repeated "test matching" calls.
+PARSED_UPLOAD_CACHE_SIZE = 4
+
 
 @dataclass(frozen=True)
 class NormalizationOptions:
@@ -92,9 +104,164 @@ def _parse_quantity(value: object | None) -> Decimal:
         return Decimal(0)
 
 
-def _load_items_for_matching(fields: Iterable[str]) -> list[Item]:
-    load_fields = [Item.id] + [getattr(Item, field) for field in fields]
-    return Item.query.options(load_only(*load_fields)).all()
+@dataclass
+class MatchKeyTable:
+    """Normalized values of one Item field, indexed both ways.
+
+    ``by_key`` maps a normalized value to the ``(item_id, item_name)`` pairs
+    that share it and ``key_by_item`` maps an item id to its normalized value,
+    so secondary disambiguation is a dictionary lookup per candidate.
+    """
+
+    field_name: str
+    options: NormalizationOptions
+    version: int
+    built_at: float
+    by_key: dict[str, list[tuple[int, str]]] = field(default_factory=dict)
+    key_by_item: dict[int, str] = field(default_factory=dict)
+
+
+_ITEM_DATA_VERSION = 0
+_ITEM_DATA_VERSION_LOCK = threading.Lock()
+
+
+def _bump_item_data_version(*_args) -> None:
+    global _ITEM_DATA_VERSION
+    with _ITEM_DATA_VERSION_LOCK:
+        _ITEM_DATA_VERSION += 1
+
+
+for _event_name in ("after_insert", "after_update", "after_delete"):
+    event.listen(Item, _event_name, _bump_item_data_version)
+
+
+def _key_table_cache() -> dict[tuple[str, NormalizationOptions], MatchKeyTable]:
+    return current_app.extensions.setdefault("physical_inventory_key_tables", {})
+
+
+def build_match_key_table(field_name: str, options: NormalizationOptions) -> MatchKeyTable:
+    """Load ``field_name`` for every item and index its normalized values."""
+
+    version = _ITEM_DATA_VERSION
+    column = getattr(Item, field_name)
+    table = MatchKeyTable(
+        field_name=field_name,
+        options=options,
+        version=version,
+        built_at=time.monotonic(),
+    )
+    for item_id, item_name, value in db.session.query(Item.id, Item.name, column):
+        key = normalize_match_value(value, options)
+        if not key:
+            continue
+        table.key_by_item[item_id] = key
+        table.by_key.setdefault(key, []).append((item_id, item_name))
+    return table
+
+
+def get_match_key_table(
+    field_name: str,
+    options: NormalizationOptions,
+    *,
+    refresh: bool = False,
+) -> MatchKeyTable:
+    """Return the cached key table for ``field_name``/``options``.
+
+    Tables are rebuilt when an Item was written in this process since they were
+    built, when they are older than :data:`MATCH_KEY_TABLE_TTL_SECONDS`, or
+    when ``refresh`` is requested.
+    """
+
+    cache = _key_table_cache()
+    cache_key = (field_name, options)
+    table = cache.get(cache_key)
+    if (
+        refresh
+        or table is None
+        or table.version != _ITEM_DATA_VERSION
+        or time.monotonic() - table.built_at > MATCH_KEY_TABLE_TTL_SECONDS
+    ):
+        table = build_match_key_table(field_name, options)
+        cache[cache_key] = table
+    return table
+
+
+def clear_match_key_tables() -> None:
+    _key_table_cache().clear()
+
+
+class ParsedUpload:
+    """Rows of an uploaded ERP file with memoized normalized columns."""
+
+    def __init__(self, fieldnames: list[str] | None, rows: list[dict[str, object]]):
+        self.fieldnames = list(fieldnames or [])
+        self.rows = rows
+        self._normalized: dict[tuple[str, NormalizationOptions], list[str]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_csv_text(cls, csv_text: str) -> "ParsedUpload":
+        reader = csv.DictReader(io.StringIO(csv_text))
+        rows = list(reader)
+        return cls(reader.fieldnames, rows)
+
+    @classmethod
+    def from_reader(cls, reader: TabularReader) -> "ParsedUpload":
+        with reader:
+            fieldnames = reader.fieldnames
+            rows = list(reader)
+        return cls(fieldnames, rows)
+
+    def normalized_column(self, column: str, options: NormalizationOptions) -> list[str]:
+        cache_key = (column, options)
+        with self._lock:
+            values = self._normalized.get(cache_key)
+        if values is None:
+            values = [normalize_match_value(row.get(column), options) for row in self.rows]
+            with self._lock:
+                self._normalized[cache_key] = values
+        return values
+
+
+_PARSED_UPLOADS: OrderedDict[str, tuple[object, ParsedUpload]] = OrderedDict()
+_PARSED_UPLOADS_LOCK = threading.Lock()
+
+
+def get_parsed_upload(token: str, fingerprint: object, loader) -> ParsedUpload | None:
+    """Return the parsed upload for ``token``, parsing it with ``loader`` once.
+
+    ``fingerprint`` identifies the stored file version (for example its mtime)
+    so a re-uploaded file under the same token is parsed again.  ``loader``
+    returns a :class:`TabularReader` over the stored rows (or CSV text), or
+    ``None`` when the upload is gone.
+    """
+
+    with _PARSED_UPLOADS_LOCK:
+        cached = _PARSED_UPLOADS.get(token)
+        if cached is not None and cached[0] == fingerprint:
+            _PARSED_UPLOADS.move_to_end(token)
+            return cached[1]
+
+    source = loader()
+    if source is None:
+        discard_parsed_upload(token)
+        return None
+    if isinstance(source, str):
+        parsed = ParsedUpload.from_csv_text(source)
+    else:
+        parsed = ParsedUpload.from_reader(source)
+
+    with _PARSED_UPLOADS_LOCK:
+        _PARSED_UPLOADS[token] = (fingerprint, parsed)
+        _PARSED_UPLOADS.move_to_end(token)
+        while len(_PARSED_UPLOADS) > PARSED_UPLOAD_CACHE_SIZE:
+            _PARSED_UPLOADS.popitem(last=False)
+    return parsed
+
+
+def discard_parsed_upload(token: str) -> None:
+    with _PARSED_UPLOADS_LOCK:
+        _PARSED_UPLOADS.pop(token, None)
 
 
 def items_assigned_to_location(location_id: int) -> list[Item]:
@@ -112,42 +279,39 @@ def items_assigned_to_location(location_id: int) -> list[Item]:
 
 
 def match_upload_rows(
-    rows: Iterable[dict[str, object]],
+    rows: Iterable[dict[str, object]] | ParsedUpload,
     primary_upload_column: str,
     primary_item_field: str,
     quantity_column: str,
     options: NormalizationOptions,
     secondary_upload_column: str | None = None,
     secondary_item_field: str | None = None,
+    *,
+    refresh_keys: bool = False,
 ) -> dict[str, object]:
-    rows_list = list(rows)
+    upload = rows if isinstance(rows, ParsedUpload) else ParsedUpload(None, list(rows))
+    rows_list = upload.rows
     allowed_fields = {field["name"] for field in get_item_text_fields()}
     if primary_item_field not in allowed_fields:
         raise ValueError("Invalid primary item field selected.")
     if secondary_item_field and secondary_item_field not in allowed_fields:
         raise ValueError("Invalid secondary item field selected.")
 
-    fields = {primary_item_field}
-    if secondary_item_field:
-        fields.add(secondary_item_field)
-
-    items = _load_items_for_matching(fields)
-
-    lookup: dict[str, list[Item]] = {}
-    for item in items:
-        value = getattr(item, primary_item_field, None)
-        key = normalize_match_value(value, options)
-        if not key:
-            continue
-        lookup.setdefault(key, []).append(item)
+    lookup = get_match_key_table(primary_item_field, options, refresh=refresh_keys).by_key
+    use_secondary = bool(secondary_upload_column and secondary_item_field)
+    if use_secondary:
+        secondary_keys_by_item = get_match_key_table(
+            secondary_item_field, options, refresh=refresh_keys
+        ).key_by_item
+        secondary_values = upload.normalized_column(secondary_upload_column, options)
 
     matched_rows: list[dict[str, object]] = []
     unmatched_rows: list[dict[str, object]] = []
     ambiguous_rows: list[dict[str, object]] = []
 
-    for index, row in enumerate(rows_list, start=1):
+    primary_values = upload.normalized_column(primary_upload_column, options)
+    for index, (row, normalized) in enumerate(zip(rows_list, primary_values), start=1):
         raw_value = row.get(primary_upload_column)
-        normalized = normalize_match_value(raw_value, options)
         if not normalized:
             unmatched_rows.append(
                 {
@@ -161,12 +325,12 @@ def match_upload_rows(
 
         matches = lookup.get(normalized, [])
         if len(matches) == 1:
-            item = matches[0]
+            item_id, item_name = matches[0]
             matched_rows.append(
                 {
                     "row_index": index,
-                    "item_id": item.id,
-                    "item_name": item.name,
+                    "item_id": item_id,
+                    "item_name": item_name,
                     "quantity": _parse_quantity(row.get(quantity_column)),
                     "matched_on_secondary": False,
                     "row": row,
@@ -185,28 +349,24 @@ def match_upload_rows(
             )
             continue
 
-        if secondary_upload_column and secondary_item_field:
-            secondary_raw = row.get(secondary_upload_column)
-            secondary_key = normalize_match_value(secondary_raw, options)
+        if use_secondary:
+            secondary_key = secondary_values[index - 1]
             if secondary_key:
                 secondary_matches = [
-                    item
-                    for item in matches
-                    if normalize_match_value(
-                        getattr(item, secondary_item_field, None), options
-                    )
-                    == secondary_key
+                    candidate
+                    for candidate in matches
+                    if secondary_keys_by_item.get(candidate[0]) == secondary_key
                 ]
             else:
                 secondary_matches = []
 
             if len(secondary_matches) == 1:
-                item = secondary_matches[0]
+                item_id, item_name = secondary_matches[0]
                 matched_rows.append(
                     {
                         "row_index": index,
-                        "item_id": item.id,
-                        "item_name": item.name,
+                        "item_id": item_id,
+                        "item_name": item_name,
                         "quantity": _parse_quantity(row.get(quantity_column)),
                         "matched_on_secondary": True,
                         "row": row,
@@ -220,7 +380,7 @@ def match_upload_rows(
                     "reason": "Ambiguous match after secondary check",
                     "value": raw_value,
                     "row": row,
-                    "candidates": [item.id for item in matches],
+                    "candidates": [item_id for item_id, _ in matches],
                 }
             )
             continue
@@ -231,7 +391,7 @@ def match_upload_rows(
                 "reason": "Ambiguous match",
                 "value": raw_value,
                 "row": row,
-                "candidates": [item.id for item in matches],
+                "candidates": [item_id for item_id, _ in matches],
             }
         )
 
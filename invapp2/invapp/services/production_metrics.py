@@ -0,0 +1,543 @@
+"""Derived per-day production metrics for the history views.
+
+The production history page and its CSV export need, for every day in the
+range, the packaged/produced totals of the active customers, the stacked
+"Other" bucket values, the configured output-per-labor-hour formula, the
+additional-labor per-hour figures and month-to-date cumulative series.
+Computing those from ``ProductionDailyRecord`` and its customer totals on every
+view grew linearly with the range, so they are stored one row per day in
+``production_daily_metric``.
+
+Rows are maintained a calendar month at a time (the cumulative columns are
+month-to-date running totals):
+
+* an ``after_flush`` listener deletes the rows from the changed day to the
+  end of its month whenever a daily record or customer total is written, and
+  every row when the output formula or the customer grouping changes;
+* the daily entry screens call :func:`refresh_daily_metrics` after saving,
+  and the settings page calls :func:`rebuild_daily_metrics`;
+* :func:`load_daily_metrics` recomputes any month in the requested range that
+  is still missing rows, so history views never read stale values.
+"""
+
+from __future__ import annotations
+
+import ast
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Dict, Iterable, List
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import lazyload
+
+from invapp.extensions import db
+from invapp.models import (
+    ProductionCustomer,
+    ProductionDailyCustomerTotal,
+    ProductionDailyMetric,
+    ProductionDailyRecord,
+    ProductionOutputFormula,
+)
+
+
+ADDITIONAL_METRICS: List[Dict[str, str]] = [
+    {"key": "controllers_4_stop", "label": "Controllers (4 Stop)"},
+    {"key": "controllers_6_stop", "label": "Controllers (6 Stop)"},
+    {"key": "door_locks_lh", "label": "Door Locks (LH)"},
+    {"key": "door_locks_rh", "label": "Door Locks (RH)"},
+    {"key": "operators_produced", "label": "Operators Produced"},
+    {"key": "cops_produced", "label": "COPs Produced"},
+]
+
+#: Metric column suffixes of the month-to-date cumulative series.
+CUMULATIVE_KEYS = ("packaged", "controllers", "door_locks", "operators", "cops")
+
+#: Customer attributes that change how daily totals are grouped.
+GROUPING_ATTRIBUTES = ("is_active", "is_other_bucket", "lump_into_other")
+
+DECIMAL_ZERO = Decimal("0")
+DECIMAL_QUANT = Decimal("0.01")
+
+
+class FormulaEvaluationError(Exception):
+    """Raised when a user-defined production formula cannot be evaluated."""
+
+
+def to_decimal(value: Any) -> Decimal:
+    if isinstance(value, Decimal):
+        return value
+    if value in (None, ""):
+        return DECIMAL_ZERO
+    return Decimal(str(value))
+
+
+def format_decimal(value: Decimal | int | float | str | None) -> str:
+    if value is None:
+        decimal_value = DECIMAL_ZERO
+    else:
+        if isinstance(value, Decimal):
+            decimal_value = value
+        else:
+            decimal_value = Decimal(str(value))
+    return format(decimal_value.quantize(DECIMAL_QUANT, rounding=ROUND_HALF_UP), "f")
+
+
+def build_formula_context(
+    record: ProductionDailyRecord,
+    produced_sum: int,
+    packaged_sum: int,
+    controllers_total: int,
+    door_locks_total: int,
+    operators_total: int,
+    cops_total: int,
+) -> Dict[str, Decimal]:
+    combined_total = produced_sum + packaged_sum
+    context: Dict[str, Decimal] = {
+        "produced": Decimal(produced_sum),
+        "packaged": Decimal(packaged_sum),
+        "combined": Decimal(combined_total),
+        "employees": Decimal(record.gates_employees or 0),
+        "shift_hours": ProductionDailyRecord.LABOR_SHIFT_HOURS,
+        "overtime": to_decimal(record.gates_hours_ot),
+        "total_hours": to_decimal(record.gates_total_labor_hours),
+        "controllers": Decimal(controllers_total),
+        "door_locks": Decimal(door_locks_total),
+        "operators": Decimal(operators_total),
+        "cops": Decimal(cops_total),
+    }
+    for metric in ADDITIONAL_METRICS:
+        context[metric["key"]] = Decimal(getattr(record, metric["key"]) or 0)
+    return context
+
+
+def evaluate_decimal_expression(
+    expression: str, context: Dict[str, Decimal]
+) -> Decimal:
+    if not expression:
+        raise FormulaEvaluationError("Expression cannot be blank.")
+    try:
+        parsed = ast.parse(expression, mode="eval")
+    except SyntaxError as exc:  # pragma: no cover - defensive
+        raise FormulaEvaluationError("Invalid expression syntax.") from exc
+
+    def _eval(node: ast.AST) -> Decimal:
+        if isinstance(node, ast.Expression):
+            return _eval(node.body)
+        if isinstance(node, ast.BinOp):
+            left = _eval(node.left)
+            right = _eval(node.right)
+            if isinstance(node.op, ast.Add):
+                return left + right
+            if isinstance(node.op, ast.Sub):
+                return left - right
+            if isinstance(node.op, ast.Mult):
+                return left * right
+            if isinstance(node.op, ast.Div):
+                if right == DECIMAL_ZERO:
+                    raise FormulaEvaluationError("Division by zero.")
+                return left / right
+            raise FormulaEvaluationError("Unsupported operator.")
+        if isinstance(node, ast.UnaryOp):
+            operand = _eval(node.operand)
+            if isinstance(node.op, ast.UAdd):
+                return operand
+            if isinstance(node.op, ast.USub):
+                return -operand
+            raise FormulaEvaluationError("Unsupported unary operator.")
+        if isinstance(node, ast.Name):
+            if node.id not in context:
+                raise FormulaEvaluationError(f"Unknown variable '{node.id}'.")
+            return to_decimal(context[node.id])
+        if isinstance(node, ast.Constant):
+            if isinstance(node.value, (int, float, str)):
+                return Decimal(str(node.value))
+            raise FormulaEvaluationError("Unsupported constant type.")
+        if isinstance(node, ast.Num):  # pragma: no cover - legacy Python
+            return Decimal(str(node.n))
+        paren_expr = getattr(ast, "ParenExpr", None)
+        if paren_expr is not None and isinstance(node, paren_expr):  # pragma: no cover - Python 3.12+
+            return _eval(node.expression)
+        raise FormulaEvaluationError("Unsupported expression component.")
+
+    result = _eval(parsed.body if isinstance(parsed, ast.Expression) else parsed)
+    return result
+
+
+def compute_output_values(
+    formula_config: Dict[str, Any], context: Dict[str, Decimal]
+) -> tuple[Decimal, List[Dict[str, Any]]]:
+    working_context = dict(context)
+    variables: List[Dict[str, Any]] = []
+    for variable in formula_config.get("variables") or []:
+        name = (variable.get("name") or "").strip()
+        expression = (variable.get("expression") or "").strip()
+        if not name or not expression:
+            continue
+        label = (variable.get("label") or name).strip() or name
+        value = evaluate_decimal_expression(expression, working_context)
+        working_context[name] = value
+        variables.append({"name": name, "label": label, "value": value})
+
+    formula_text = (formula_config.get("formula") or "").strip()
+    if not formula_text:
+        raise FormulaEvaluationError("Formula is required.")
+    result = evaluate_decimal_expression(formula_text, working_context)
+    return result, variables
+
+
+@dataclass(frozen=True)
+class CustomerGrouping:
+    """How active customers are laid out in the history table and chart."""
+
+    table_customers: List[ProductionCustomer]
+    stack_customers: List[ProductionCustomer]
+    grouped_customers: List[ProductionCustomer]
+
+
+def active_customers() -> List[ProductionCustomer]:
+    return (
+        ProductionCustomer.query.filter_by(is_active=True)
+        .order_by(ProductionCustomer.is_other_bucket.asc(), ProductionCustomer.name.asc())
+        .all()
+    )
+
+
+def customer_grouping(customers: List[ProductionCustomer]) -> CustomerGrouping:
+    other_customer = next((c for c in customers if c.is_other_bucket), None)
+    grouped_customers = [
+        customer
+        for customer in customers
+        if customer.lump_into_other and not customer.is_other_bucket
+    ]
+    stack_customers = [
+        customer
+        for customer in customers
+        if not customer.is_other_bucket and not customer.lump_into_other
+    ]
+    table_customers = [
+        customer for customer in customers if not customer.is_other_bucket
+    ]
+    if other_customer:
+        stack_customers.append(other_customer)
+        table_customers.append(other_customer)
+    return CustomerGrouping(
+        table_customers=table_customers,
+        stack_customers=stack_customers,
+        grouped_customers=grouped_customers,
+    )
+
+
+def _formula_config() -> Dict[str, Any]:
+    setting = ProductionOutputFormula.query.first()
+    if setting is None:
+        return {}
+    return {"formula": setting.formula, "variables": setting.variables or []}
+
+
+def compute_day_metrics(
+    record: ProductionDailyRecord,
+    grouping: CustomerGrouping,
+    formula_config: Dict[str, Any],
+) -> Dict[str, Any]:
+    """Column values of the metric row for ``record`` (without cumulatives)."""
+
+    totals_by_customer = {total.customer_id: total for total in record.customer_totals}
+
+    produced_sum = 0
+    packaged_sum = 0
+    per_customer_packaged: Dict[int, int] = {}
+    for customer in grouping.table_customers:
+        totals = totals_by_customer.get(customer.id)
+        produced_value = totals.gates_produced if totals else 0
+        packaged_value = totals.gates_packaged if totals else 0
+        per_customer_packaged[customer.id] = packaged_value
+        produced_sum += produced_value
+        packaged_sum += packaged_value
+
+    stack_packaged: Dict[int, int] = {}
+    for customer in grouping.stack_customers:
+        packaged_value = per_customer_packaged.get(customer.id, 0)
+        if customer.is_other_bucket:
+            packaged_value += sum(
+                per_customer_packaged.get(grouped.id, 0)
+                for grouped in grouping.grouped_customers
+            )
+        stack_packaged[customer.id] = packaged_value
+
+    controllers_total = record.total_controllers
+    door_locks_total = record.total_door_locks
+    operators_total = record.operators_produced or 0
+    cops_total = record.cops_produced or 0
+
+    output_value: Decimal | None
+    try:
+        output_value, variable_values = compute_output_values(
+            formula_config,
+            build_formula_context(
+                record,
+                produced_sum,
+                packaged_sum,
+                controllers_total,
+                door_locks_total,
+                operators_total,
+                cops_total,
+            ),
+        )
+    except FormulaEvaluationError:
+        output_value = None
+        variable_values = []
+
+    additional_total_hours = record.additional_total_labor_hours
+    additional_per_hour: List[Dict[str, str]] = []
+    additional_output_total = DECIMAL_ZERO
+    if additional_total_hours and additional_total_hours > DECIMAL_ZERO:
+        for metric in ADDITIONAL_METRICS:
+            total_value = getattr(record, metric["key"]) or 0
+            per_hour_value = (
+                Decimal(total_value) / additional_total_hours
+            ).quantize(DECIMAL_QUANT, rounding=ROUND_HALF_UP)
+            additional_output_total += per_hour_value
+            additional_per_hour.append(
+                {
+                    "key": metric["key"],
+                    "label": metric["label"],
+                    "per_hour": format_decimal(per_hour_value),
+                }
+            )
+
+    return {
+        "record_id": record.id,
+        "entry_date": record.entry_date,
+        "produced_total": produced_sum,
+        "packaged_total": packaged_sum,
+        "controllers_total": controllers_total,
+        "door_locks_total": door_locks_total,
+        "operators_total": operators_total,
+        "cops_total": cops_total,
+        "packaged_by_customer": {
+            str(customer_id): value for customer_id, value in per_customer_packaged.items()
+        },
+        "stack_packaged": {
+            str(customer_id): value for customer_id, value in stack_packaged.items()
+        },
+        "output_value": float(output_value) if output_value is not None else None,
+        "output_display": format_decimal(output_value) if output_value is not None else None,
+        "output_variables": [
+            {
+                "name": variable["name"],
+                "label": variable["label"],
+                "value": format_decimal(variable["value"]),
+            }
+            for variable in variable_values
+        ],
+        "additional_output_total": float(additional_output_total)
+        if additional_per_hour
+        else None,
+        "additional_per_hour": additional_per_hour,
+    }
+
+
+def _month_start(value: date) -> date:
+    return value.replace(day=1)
+
+
+def _next_month_start(value: date) -> date:
+    if value.month == 12:
+        return date(value.year + 1, 1, 1)
+    return date(value.year, value.month + 1, 1)
+
+
+def _recompute_months(months: Iterable[date]) -> int:
+    """Replace the metric rows of each month (given by its first day)."""
+
+    months = sorted(set(months))
+    if not months:
+        return 0
+    grouping = customer_grouping(active_customers())
+    formula_config = _formula_config()
+    metric_table = ProductionDailyMetric.__table__
+    now = datetime.utcnow()
+    written = 0
+
+    for month in months:
+        month_end = _next_month_start(month)
+        records = (
+            ProductionDailyRecord.query.options(
+                lazyload(ProductionDailyRecord.gate_completions)
+            )
+            .filter(
+                ProductionDailyRecord.entry_date >= month,
+                ProductionDailyRecord.entry_date < month_end,
+            )
+            .order_by(ProductionDailyRecord.entry_date.asc())
+            .all()
+        )
+        running = {key: 0 for key in CUMULATIVE_KEYS}
+        rows = []
+        for record in records:
+            values = compute_day_metrics(record, grouping, formula_config)
+            running["packaged"] += values["packaged_total"]
+            running["controllers"] += values["controllers_total"]
+            running["door_locks"] += values["door_locks_total"]
+            running["operators"] += values["operators_total"]
+            running["cops"] += values["cops_total"]
+            for key in CUMULATIVE_KEYS:
+                values[f"cumulative_{key}"] = running[key]
+            values["computed_at"] = now
+            rows.append(values)
+
+        db.session.execute(
+            metric_table.delete().where(
+                metric_table.c.entry_date >= month,
+                metric_table.c.entry_date < month_end,
+            )
+        )
+        if rows:
+            db.session.execute(metric_table.insert(), rows)
+        written += len(rows)
+    return written
+
+
+def _commit_recompute(months: Iterable[date]) -> int:
+    try:
+        written = _recompute_months(months)
+        db.session.commit()
+    except IntegrityError:
+        # Another worker filled the same month concurrently; its rows stand.
+        db.session.rollback()
+        return 0
+    return written
+
+
+def refresh_daily_metrics(*entry_dates: date) -> int:
+    """Recompute the months containing ``entry_dates`` and commit."""
+
+    return _commit_recompute(_month_start(value) for value in entry_dates if value)
+
+
+def rebuild_daily_metrics() -> int:
+    """Recompute every stored day, e.g. after a formula or grouping change."""
+
+    dates = db.session.query(ProductionDailyRecord.entry_date).all()
+    db.session.execute(ProductionDailyMetric.__table__.delete())
+    return _commit_recompute(_month_start(entry_date) for (entry_date,) in dates)
+
+
+def load_daily_metrics(
+    start_date: date, end_date: date
+) -> List[tuple[ProductionDailyRecord, ProductionDailyMetric]]:
+    """``(record, metric)`` pairs in the range, recomputing missing months."""
+
+    def _query():
+        return (
+            db.session.query(ProductionDailyRecord, ProductionDailyMetric)
+            .options(
+                lazyload(ProductionDailyRecord.customer_totals),
+                lazyload(ProductionDailyRecord.gate_completions),
+            )
+            .outerjoin(
+                ProductionDailyMetric,
+                ProductionDailyMetric.record_id == ProductionDailyRecord.id,
+            )
+            .filter(
+                ProductionDailyRecord.entry_date >= _month_start(start_date),
+                ProductionDailyRecord.entry_date <= end_date,
+            )
+            .order_by(ProductionDailyRecord.entry_date.asc())
+            .all()
+        )
+
+    rows = _query()
+    stale = {_month_start(record.entry_date) for record, metric in rows if metric is None}
+    if stale:
+        _commit_recompute(stale)
+        rows = _query()
+    return [(record, metric) for record, metric in rows if record.entry_date >= start_date]
+
+
+def cumulative_offset(start_date: date) -> Dict[str, int]:
+    """Month-to-date totals of the days before ``start_date`` in its month."""
+
+    previous = (
+        ProductionDailyMetric.query.filter(
+            ProductionDailyMetric.entry_date >= _month_start(start_date),
+            ProductionDailyMetric.entry_date < start_date,
+        )
+        .order_by(ProductionDailyMetric.entry_date.desc())
+        .first()
+    )
+    if previous is None:
+        return {key: 0 for key in CUMULATIVE_KEYS}
+    return {key: getattr(previous, f"cumulative_{key}") for key in CUMULATIVE_KEYS}
+
+
+def _changed_dates(session, instances) -> set[date]:
+    dates: set[date] = set()
+    record_ids: set[int] = set()
+    for instance in instances:
+        if isinstance(instance, ProductionDailyRecord):
+            history = inspect(instance).attrs.entry_date.history
+            known = [
+                value
+                for value in (*history.added, *history.unchanged, *history.deleted)
+                if value
+            ]
+            if known:
+                dates.update(known)
+            elif instance.id is not None:
+                record_ids.add(instance.id)
+        elif instance.record_id is not None:
+            record_ids.add(instance.record_id)
+    if record_ids:
+        record_table = ProductionDailyRecord.__table__
+        dates.update(
+            session.connection().execute(
+                select(record_table.c.entry_date).where(record_table.c.id.in_(record_ids))
+            ).scalars()
+        )
+    return dates
+
+
+def _grouping_changed(session) -> bool:
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, ProductionOutputFormula):
+            return True
+        if isinstance(instance, ProductionCustomer):
+            if instance in session.dirty:
+                state = inspect(instance)
+                if not any(
+                    state.attrs[name].history.has_changes()
+                    for name in GROUPING_ATTRIBUTES
+                ):
+                    continue
+            return True
+    return False
+
+
+def _invalidate_flushed_rows(session, _flush_context) -> None:
+    metric_table = ProductionDailyMetric.__table__
+    if _grouping_changed(session):
+        session.connection().execute(metric_table.delete())
+        return
+
+    written = [
+        instance
+        for instance in (*session.new, *session.dirty, *session.deleted)
+        if isinstance(instance, (ProductionDailyRecord, ProductionDailyCustomerTotal))
+    ]
+    if not written:
+        return
+    for changed in _changed_dates(session, written):
+        session.connection().execute(
+            metric_table.delete().where(
+                metric_table.c.entry_date >= changed,
+                metric_table.c.entry_date < _next_month_start(changed),
+            )
+        )
+
+
+def init_production_metrics(app) -> None:
+    if not event.contains(db.session, "after_flush", _invalidate_flushed_rows):
+        event.listen(db.session, "after_flush", _invalidate_flushed_rows)
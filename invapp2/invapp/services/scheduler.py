@@ -0,0 +1,429 @@
+"""Single-leader execution of periodic background jobs.
+
+Every gunicorn worker builds the same :class:`JobRegistry`, but only the worker
+holding the scheduler lock runs an APScheduler ``BackgroundScheduler`` for it.
+On PostgreSQL the lock is a session-level advisory lock held on a dedicated
+connection; SQLite/dev deployments use an ``flock`` on a file in the instance
+folder.  Both are released by the operating system or database when the
+leader process dies, and the remaining workers retry every
+``SCHEDULER_LEADER_CHECK_SECONDS`` so one of them takes over automatically.
+
+Modules register work with :func:`register_job` (a fixed interval) or
+:func:`register_leader_hook` (a callback that receives the scheduler when this
+process becomes leader and can add dynamically scheduled jobs, like backups).
+"""
+
+from __future__ import annotations
+
+import atexit
+import hashlib
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable
+
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+from flask import current_app
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+try:  # pragma: no cover - platform dependent
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+
+DEFAULT_LOCK_NAME = "invapp-scheduler"
+DEFAULT_LEADER_CHECK_SECONDS = 30.0
+
+LOGGER = logging.getLogger("invapp.scheduler")
+
+
+@dataclass
+class PeriodicJob:
+    id: str
+    func: Callable[[Any], Any]
+    trigger: Any
+    description: str = ""
+    last_started_at: datetime | None = None
+    last_finished_at: datetime | None = None
+    last_error: str | None = None
+    runs: int = 0
+
+
+@dataclass
+class LeaderHook:
+    start: Callable[[Any, BackgroundScheduler], None]
+    stop: Callable[[Any], None] | None = None
+
+
+@dataclass
+class JobRegistry:
+    jobs: dict[str, PeriodicJob] = field(default_factory=dict)
+    hooks: list[LeaderHook] = field(default_factory=list)
+
+    def register(
+        self,
+        job_id: str,
+        func: Callable[[Any], Any],
+        *,
+        trigger: Any | None = None,
+        seconds: float = 0,
+        minutes: float = 0,
+        hours: float = 0,
+        description: str = "",
+    ) -> PeriodicJob:
+        if trigger is None:
+            if not (seconds or minutes or hours):
+                raise ValueError("A trigger or an interval is required.")
+            trigger = IntervalTrigger(seconds=seconds, minutes=minutes, hours=hours)
+        job = PeriodicJob(id=job_id, func=func, trigger=trigger, description=description)
+        self.jobs[job_id] = job
+        return job
+
+    def add_hook(
+        self,
+        start: Callable[[Any, BackgroundScheduler], None],
+        stop: Callable[[Any], None] | None = None,
+    ) -> None:
+        self.hooks.append(LeaderHook(start=start, stop=stop))
+
+
+def lock_key(name: str) -> int:
+    """Stable signed 64-bit advisory lock key for ``name``."""
+
+    digest = hashlib.sha1(name.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
+
+
+class AdvisoryLock:
+    """PostgreSQL session advisory lock held on a connection outside the pool."""
+
+    def __init__(self, engine, key: int) -> None:
+        self.engine = engine
+        self.key = key
+        self._connection = None
+
+    def acquire(self) -> bool:
+        if self._connection is not None:
+            return self.verify()
+        connection = self.engine.connect()
+        # Detached so closing the connection really ends the session (and the
+        # lock) instead of returning a lock-holding connection to the pool.
+        connection.detach()
+        connection = connection.execution_options(isolation_level="AUTOCOMMIT")
+        try:
+            acquired = connection.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key}
+            ).scalar()
+        except SQLAlchemyError:
+            connection.close()
+            raise
+        if not acquired:
+            connection.close()
+            return False
+        self._connection = connection
+        return True
+
+    def verify(self) -> bool:
+        if self._connection is None:
+            return False
+        try:
+            self._connection.execute(text("SELECT 1"))
+        except SQLAlchemyError:
+            self._discard()
+            return False
+        return True
+
+    def release(self) -> None:
+        if self._connection is None:
+            return
+        try:
+            self._connection.execute(
+                text("SELECT pg_advisory_unlock(:key)"), {"key": self.key}
+            )
+        except SQLAlchemyError:
+            pass
+        self._discard()
+
+    def _discard(self) -> None:
+        connection, self._connection = self._connection, None
+        try:
+            connection.close()
+        except Exception:  # pragma: no cover - connection already gone
+            pass
+
+
+class FileLock:
+    """Exclusive ``flock`` on ``path``; released when the process exits."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._handle = None
+
+    def acquire(self) -> bool:
+        if self._handle is not None:
+            return True
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        handle = open(self.path, "a+")
+        if fcntl is not None:
+            try:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                handle.close()
+                return False
+        handle.seek(0)
+        handle.truncate()
+        handle.write(str(os.getpid()))
+        handle.flush()
+        self._handle = handle
+        return True
+
+    def verify(self) -> bool:
+        return self._handle is not None
+
+    def release(self) -> None:
+        handle, self._handle = self._handle, None
+        if handle is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+        finally:
+            handle.close()
+
+
+class LeaderScheduler:
+    """Runs a :class:`JobRegistry` in this process while it holds ``lock``."""
+
+    def __init__(
+        self,
+        app,
+        registry: JobRegistry,
+        lock,
+        *,
+        check_interval: float = DEFAULT_LEADER_CHECK_SECONDS,
+        scheduler_factory: Callable[[], BackgroundScheduler] | None = None,
+    ) -> None:
+        self.app = app
+        self.registry = registry
+        self.lock = lock
+        self.check_interval = check_interval
+        self._scheduler_factory = scheduler_factory or (
+            lambda: BackgroundScheduler(timezone="UTC")
+        )
+        self._scheduler: BackgroundScheduler | None = None
+        self._lock = threading.RLock()
+        self._thread: threading.Thread | None = None
+        self._thread_pid: int | None = None
+        self._stop = threading.Event()
+        self.leader_since: datetime | None = None
+        self.last_error: str | None = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._scheduler is not None
+
+    def start(self) -> None:
+        pid = os.getpid()
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._thread_pid == pid:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="scheduler-leader", daemon=True
+            )
+            self._thread_pid = pid
+            self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._lock:
+            self._step_down("process stopping")
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.tick()
+            self._stop.wait(self.check_interval)
+
+    def tick(self) -> bool:
+        """Confirm or contend for leadership; return whether this process leads."""
+
+        with self._lock:
+            if self._scheduler is not None:
+                if self.lock.verify():
+                    return True
+                self._step_down("scheduler lock lost")
+            try:
+                acquired = self.lock.acquire()
+            except Exception as exc:
+                self.last_error = str(exc)
+                LOGGER.warning("Unable to contend for scheduler leadership: %s", exc)
+                return False
+            if acquired:
+                self._become_leader()
+            return self._scheduler is not None
+
+    def _become_leader(self) -> None:
+        scheduler = self._scheduler_factory()
+        for job in self.registry.jobs.values():
+            scheduler.add_job(
+                self._run_job,
+                trigger=job.trigger,
+                id=job.id,
+                args=[job],
+                replace_existing=True,
+                max_instances=1,
+                coalesce=True,
+            )
+        for hook in self.registry.hooks:
+            try:
+                hook.start(self.app, scheduler)
+            except Exception as exc:
+                self.last_error = str(exc)
+                LOGGER.exception("Scheduler leader hook failed: %s", exc)
+        scheduler.start()
+        self._scheduler = scheduler
+        self.leader_since = datetime.utcnow()
+        LOGGER.info("Process %s is now the scheduler leader.", os.getpid())
+
+    def _step_down(self, reason: str) -> None:
+        scheduler, self._scheduler = self._scheduler, None
+        if scheduler is not None:
+            try:
+                scheduler.shutdown(wait=False)
+            except Exception:  # pragma: no cover - scheduler already stopped
+                pass
+            for hook in self.registry.hooks:
+                if hook.stop is None:
+                    continue
+                try:
+                    hook.stop(self.app)
+                except Exception as exc:
+                    LOGGER.exception("Scheduler leader stop hook failed: %s", exc)
+            LOGGER.warning("Process %s gave up scheduler leadership: %s", os.getpid(), reason)
+        self.leader_since = None
+        try:
+            self.lock.release()
+        except Exception:  # pragma: no cover - best-effort cleanup
+            pass
+
+    def _run_job(self, job: PeriodicJob) -> None:
+        job.last_started_at = datetime.utcnow()
+        started = time.monotonic()
+        try:
+            with self.app.app_context():
+                job.func(self.app)
+            job.last_error = None
+        except Exception as exc:
+            job.last_error = str(exc)
+            LOGGER.exception("Scheduled job %s failed: %s", job.id, exc)
+        finally:
+            job.runs += 1
+            job.last_finished_at = datetime.utcnow()
+            LOGGER.debug("Scheduled job %s took %.2fs", job.id, time.monotonic() - started)
+
+    def status(self) -> dict[str, Any]:
+        scheduler = self._scheduler
+        jobs = []
+        for job in self.registry.jobs.values():
+            next_run = None
+            if scheduler is not None:
+                scheduled = scheduler.get_job(job.id)
+                next_run = getattr(scheduled, "next_run_time", None)
+            jobs.append(
+                {
+                    "id": job.id,
+                    "description": job.description,
+                    "runs": job.runs,
+                    "last_started_at": job.last_started_at,
+                    "last_finished_at": job.last_finished_at,
+                    "last_error": job.last_error,
+                    "next_run_at": next_run,
+                }
+            )
+        return {
+            "pid": os.getpid(),
+            "is_leader": self.is_leader,
+            "leader_since": self.leader_since,
+            "lock": type(self.lock).__name__,
+            "last_error": self.last_error,
+            "jobs": jobs,
+        }
+
+
+def build_scheduler_lock(app, engine):
+    """Advisory lock on PostgreSQL, a file lock everywhere else.
+
+    Behind PgBouncer transaction pooling a session-level advisory lock would
+    be released (or leaked to another client) between transactions, so the
+    file lock is used there as well.
+    """
+
+    name = app.config.get("SCHEDULER_LOCK_NAME") or DEFAULT_LOCK_NAME
+    pgbouncer = str(app.config.get("DB_PGBOUNCER", "")).strip().lower() in {
+        "1", "true", "yes", "on"
+    }
+    if engine is not None and engine.dialect.name == "postgresql" and not pgbouncer:
+        return AdvisoryLock(engine, lock_key(name))
+    lock_path = app.config.get("SCHEDULER_LOCK_FILE") or os.path.join(
+        app.instance_path, f"{name}.lock"
+    )
+    return FileLock(Path(lock_path))
+
+
+def init_scheduler(app) -> JobRegistry:
+    registry = JobRegistry()
+    app.extensions["job_registry"] = registry
+    return registry
+
+
+def get_job_registry(app=None) -> JobRegistry | None:
+    target = app or current_app
+    return target.extensions.get("job_registry")
+
+
+def register_job(app, job_id: str, func: Callable[[Any], Any], **kwargs) -> PeriodicJob:
+    """Register ``func(app)`` to run periodically under the scheduler leader."""
+
+    return app.extensions["job_registry"].register(job_id, func, **kwargs)
+
+
+def register_leader_hook(
+    app,
+    start: Callable[[Any, BackgroundScheduler], None],
+    stop: Callable[[Any], None] | None = None,
+) -> None:
+    app.extensions["job_registry"].add_hook(start, stop)
+
+
+def start_leader_scheduler(app, engine) -> LeaderScheduler:
+    """Start contending for leadership in a background thread."""
+
+    leader = app.extensions.get("leader_scheduler")
+    if leader is None:
+        leader = LeaderScheduler(
+            app,
+            app.extensions["job_registry"],
+            build_scheduler_lock(app, engine),
+            check_interval=float(
+                app.config.get("SCHEDULER_LEADER_CHECK_SECONDS", DEFAULT_LEADER_CHECK_SECONDS)
+            ),
+        )
+        app.extensions["leader_scheduler"] = leader
+    leader.start()
+    return leader
+
+
+def get_leader_scheduler(app=None) -> LeaderScheduler | None:
+    try:
+        target = app or current_app
+        return target.extensions.get("leader_scheduler")
+    except RuntimeError:
+        return None
@@ -0,0 +1,569 @@
+"""In-memory typeahead index for items and locations.
+
+Typeahead endpoints match ``%query%`` against SKU/name/description and
+location code/description.  A leading-wildcard ``LIKE`` cannot use a B-tree
+index, so each worker keeps an n-gram/prefix index of those columns instead
+(see :class:`SearchIndex`).  :func:`rank_match` defines the ordering for every
+endpoint, including the SQL fallback used when the index is disabled.
+
+Writes from every worker reach the index on the next search: ``Item`` and
+``Location`` rows carry the item dictionary's ``change_version`` stamp (see
+:mod:`invapp.services.item_dictionary`), so each search reads the single-row
+dictionary counter and, when it moved, reloads only the rows stamped or
+tombstoned since the index last synced.  Item hits are re-read by id so
+columns outside the dictionary (``min_stock``, ``item_class``) are current.
+A full rebuild runs on a background thread every ``SEARCH_INDEX_TTL_SECONDS``
+to compact postings and catch bulk SQL that bypasses the stamps; searches keep
+using the current index meanwhile, and use the SQL fallback until the first
+build finishes.  PostgreSQL deployments additionally get ``pg_trgm`` GIN
+indexes (see :func:`invapp.services.db_schema.ensure_search_trigram_indexes`)
+which serve the fallback path.
+"""
+
+from __future__ import annotations
+
+import bisect
+import heapq
+import threading
+import time
+from array import array
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Sequence
+
+from flask import current_app
+from sqlalchemy.exc import SQLAlchemyError
+
+from invapp.extensions import db
+from invapp.models import Item, Location
+from invapp.services import item_dictionary
+
+
+DEFAULT_INDEX_TTL_SECONDS = 300
+FIELD_SEPARATOR = "\x1f"
+BIGRAM_SIZE = 2
+TRIGRAM_SIZE = 3
+#: Posting lists at most this long are verified directly; longer ones mean the
+#: query is common, so scanning documents in rank order finds ``limit`` hits
+#: sooner.
+SELECTIVE_BUCKET_SIZE = 2000
+LOAD_CHUNK_SIZE = 500
+
+
+@dataclass(frozen=True)
+class SearchDocument:
+    """One indexed row.
+
+    ``fields`` holds the lowercased searchable values with the primary field
+    (SKU or location code) first.  ``payload`` carries the display columns the
+    endpoints return so a hit needs no further query.
+    """
+
+    id: int
+    primary: str
+    fields: tuple[str, ...]
+    payload: dict[str, Any]
+    haystack: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "haystack", FIELD_SEPARATOR.join(self.fields))
+
+
+def rank_match(query: str, fields: Sequence[str]) -> int | None:
+    """Return the rank of a match (lower is better) or ``None`` if no match.
+
+    ``query`` and ``fields`` must already be lowercased; ``fields[0]`` is the
+    primary field.  Exact primary matches rank first, then primary prefixes,
+    then primary substrings, then matches on any other field.
+    """
+
+    primary = fields[0] if fields else ""
+    if primary == query:
+        return 0
+    if primary.startswith(query):
+        return 1
+    if query in primary:
+        return 2
+    for value in fields[1:]:
+        if query in value:
+            return 3
+    return None
+
+
+def rank_candidates(
+    query: str,
+    candidates: Iterable[Any],
+    fields_of: Callable[[Any], Sequence[str]],
+    primary_of: Callable[[Any], str],
+    *,
+    limit: int,
+) -> list[Any]:
+    """Return the best ``limit`` candidates ordered by :func:`rank_match`.
+
+    Ties are broken by the case-insensitive primary value, then the raw value.
+    """
+
+    lowered = query.lower()
+    ranked = []
+    for candidate in candidates:
+        rank = rank_match(lowered, fields_of(candidate))
+        if rank is None:
+            continue
+        primary = primary_of(candidate) or ""
+        ranked.append(((rank, primary.lower(), primary), candidate))
+    return [candidate for _, candidate in heapq.nsmallest(limit, ranked, key=lambda entry: entry[0])]
+
+
+def _normalize(value: Any) -> str:
+    return str(value).lower() if value is not None else ""
+
+
+def _ngrams(text: str, size: int) -> set[str]:
+    return {text[index : index + size] for index in range(len(text) - size + 1)}
+
+
+def _sort_key(primary: str) -> tuple[str, str]:
+    return (primary.lower(), primary)
+
+
+class SearchIndex:
+    """Ranked substring index over documents produced by ``loader``.
+
+    ``loader(ids)`` returns documents for the given ids, or for every row when
+    ``ids`` is ``None``.  ``changes(since, version)`` returns the ids written
+    between two values of ``version_source()``; without them the index only
+    refreshes through :meth:`mark_dirty` and the periodic rebuild.  Documents are kept in :func:`rank_candidates` order so
+    each rank tier can stop as soon as ``limit`` hits are found:
+
+    * primary prefixes (ranks 0 and 1) are a contiguous range of the sorted
+      primaries, found with :mod:`bisect`;
+    * primary substrings (rank 2) come from bigram postings of the primary;
+    * other-field matches (rank 3) come from trigram postings of the haystack
+      when the rarest trigram is selective, otherwise from a scan of the sorted
+      documents that stops after ``limit`` matches.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        loader: Callable[[Iterable[int] | None], list[SearchDocument]],
+        *,
+        version_source: Callable[[], int] | None = None,
+        changes: Callable[[int, int], Iterable[int]] | None = None,
+        ttl_seconds: float = DEFAULT_INDEX_TTL_SECONDS,
+        run_in_background: bool = True,
+    ) -> None:
+        self.name = name
+        self.loader = loader
+        self.version_source = version_source
+        self.changes = changes
+        self.ttl_seconds = ttl_seconds
+        self.run_in_background = run_in_background
+        self._documents: dict[int, SearchDocument] = {}
+        self._order: list[tuple[tuple[str, str], int]] = []
+        self._postings: dict[str, array] = {}
+        self._primary_postings: dict[str, array] = {}
+        self._built_at: float | None = None
+        self._dirty: set[int] = set()
+        self._version: int | None = None
+        self._rebuilding = False
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    @property
+    def is_built(self) -> bool:
+        return self._built_at is not None
+
+    def mark_dirty(self, ids: Iterable[int]) -> None:
+        with self._lock:
+            self._dirty.update(ids)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._built_at = None
+
+    @staticmethod
+    def _post(postings: dict[str, array], grams: Iterable[str], doc_id: int) -> None:
+        for gram in grams:
+            bucket = postings.get(gram)
+            if bucket is None:
+                bucket = postings[gram] = array("l")
+            bucket.append(doc_id)
+
+    def rebuild(self) -> None:
+        # Read the version first: anything written while loading is re-synced.
+        version = self.version_source() if self.version_source else None
+        documents = self.loader(None)
+        postings: dict[str, array] = {}
+        primary_postings: dict[str, array] = {}
+        for document in documents:
+            self._post(postings, _ngrams(document.haystack, TRIGRAM_SIZE), document.id)
+            self._post(primary_postings, _ngrams(document.fields[0], BIGRAM_SIZE), document.id)
+        order = sorted((_sort_key(document.primary), document.id) for document in documents)
+        with self._lock:
+            self._documents = {document.id: document for document in documents}
+            self._order = order
+            self._postings = postings
+            self._primary_postings = primary_postings
+            self._dirty.clear()
+            self._version = version
+            self._built_at = time.monotonic()
+
+    def _start_rebuild(self) -> None:
+        if not self.run_in_background:
+            self.rebuild()
+            return
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(
+            target=self._rebuild_in_background,
+            args=(current_app._get_current_object(),),
+            name=f"search-index-{self.name}",
+            daemon=True,
+        ).start()
+
+    def _rebuild_in_background(self, app) -> None:
+        try:
+            with app.app_context():
+                try:
+                    self.rebuild()
+                except SQLAlchemyError:
+                    app.logger.exception("Rebuilding the %s search index failed.", self.name)
+                finally:
+                    db.session.remove()
+        finally:
+            with self._lock:
+                self._rebuilding = False
+
+    def _sync_changes(self) -> None:
+        if self.version_source is None or self.changes is None:
+            return
+        version = self.version_source()
+        with self._lock:
+            since = self._version
+        if since is None or version == since:
+            return
+        if version < since:
+            # The counter went backwards (a database restore): start over.
+            self._start_rebuild()
+            return
+        ids = set(self.changes(since, version))
+        with self._lock:
+            if self._version == since:
+                self._dirty.update(ids)
+                self._version = version
+
+    def _apply_dirty(self) -> None:
+        with self._lock:
+            dirty = set(self._dirty)
+            self._dirty.clear()
+        if not dirty:
+            return
+        documents = {document.id: document for document in self.loader(dirty)}
+        with self._lock:
+            for doc_id in dirty:
+                previous = self._documents.pop(doc_id, None)
+                if previous is not None:
+                    entry = (_sort_key(previous.primary), doc_id)
+                    position = bisect.bisect_left(self._order, entry)
+                    if position < len(self._order) and self._order[position] == entry:
+                        del self._order[position]
+                document = documents.get(doc_id)
+                if document is None:
+                    continue
+                # Stale postings are harmless: hits are verified against the
+                # current document and the periodic rebuild compacts them.
+                known = _ngrams(previous.haystack, TRIGRAM_SIZE) if previous else set()
+                known_primary = _ngrams(previous.fields[0], BIGRAM_SIZE) if previous else set()
+                self._post(
+                    self._postings,
+                    _ngrams(document.haystack, TRIGRAM_SIZE) - known,
+                    doc_id,
+                )
+                self._post(
+                    self._primary_postings,
+                    _ngrams(document.fields[0], BIGRAM_SIZE) - known_primary,
+                    doc_id,
+                )
+                bisect.insort(self._order, (_sort_key(document.primary), doc_id))
+                self._documents[doc_id] = document
+
+    def ensure_fresh(self) -> bool:
+        """Bring the index up to date; ``False`` while the first build runs."""
+
+        if self._built_at is None:
+            self._start_rebuild()
+            if self._built_at is None:
+                return False
+        elif time.monotonic() - self._built_at > self.ttl_seconds:
+            self._start_rebuild()
+        self._sync_changes()
+        if self._dirty:
+            self._apply_dirty()
+        return True
+
+    def _smallest_bucket(
+        self, postings: dict[str, array], query: str, size: int
+    ) -> array | None:
+        """Return the rarest posting list for ``query`` (empty if a gram is unknown)."""
+
+        smallest = None
+        for gram in _ngrams(query, size):
+            bucket = postings.get(gram)
+            if bucket is None:
+                return array("l")
+            if smallest is None or len(bucket) < len(smallest):
+                smallest = bucket
+        return smallest
+
+    def _ranked_from_ids(self, ids, query, field_count, rank, limit) -> list[SearchDocument]:
+        documents = self._documents
+        hits = []
+        for doc_id in set(ids):
+            document = documents.get(doc_id)
+            if document is None:
+                continue
+            if rank_match(query, document.fields[:field_count]) == rank:
+                hits.append(document)
+        return heapq.nsmallest(limit, hits, key=lambda document: _sort_key(document.primary))
+
+    def _search_locked(self, query: str, limit: int, field_count: int | None) -> list[SearchDocument]:
+        documents = self._documents
+        results: list[SearchDocument] = []
+
+        # Ranks 0-1: sorted primaries starting with the query.
+        position = bisect.bisect_left(self._order, ((query,),))
+        while position < len(self._order) and len(results) < limit:
+            (lowered, _raw), doc_id = self._order[position]
+            if not lowered.startswith(query):
+                break
+            results.append(documents[doc_id])
+            position += 1
+        if len(results) >= limit:
+            return results
+
+        # Rank 2: the primary contains the query past its first character.
+        if len(query) >= BIGRAM_SIZE:
+            primary_ids = self._smallest_bucket(self._primary_postings, query, BIGRAM_SIZE)
+        else:
+            primary_ids = documents.keys()
+        results.extend(
+            self._ranked_from_ids(primary_ids, query, field_count, 2, limit - len(results))
+        )
+        if len(results) >= limit:
+            return results
+
+        # Rank 3: another field contains the query.
+        needed = limit - len(results)
+        bucket = None
+        if len(query) >= TRIGRAM_SIZE:
+            bucket = self._smallest_bucket(self._postings, query, TRIGRAM_SIZE)
+        if bucket is not None and len(bucket) <= SELECTIVE_BUCKET_SIZE:
+            results.extend(self._ranked_from_ids(bucket, query, field_count, 3, needed))
+            return results
+
+        for _key, doc_id in self._order:
+            document = documents[doc_id]
+            if query not in document.haystack:
+                continue
+            fields = document.fields[:field_count] if field_count else document.fields
+            if rank_match(query, fields) != 3:
+                continue
+            results.append(document)
+            if len(results) >= limit:
+                break
+        return results
+
+    def search(
+        self,
+        query: str,
+        *,
+        limit: int,
+        field_count: int | None = None,
+    ) -> list[SearchDocument] | None:
+        """Return the top ``limit`` documents matching ``query``.
+
+        ``field_count`` restricts matching to the first N fields of each
+        document (for example SKU and name but not description).  Returns
+        ``None`` while the index is still being built.
+        """
+
+        lowered = query.strip().lower()
+        if not lowered or limit <= 0:
+            return []
+        if not self.ensure_fresh():
+            return None
+        with self._lock:
+            return self._search_locked(lowered, limit, field_count)
+
+
+def _chunks(ids: Iterable[int]) -> Iterable[list[int]]:
+    ids = list(ids)
+    for start in range(0, len(ids), LOAD_CHUNK_SIZE):
+        yield ids[start : start + LOAD_CHUNK_SIZE]
+
+
+def _load_item_documents(ids: Iterable[int] | None) -> list[SearchDocument]:
+    if ids is not None:
+        return [
+            document
+            for chunk in _chunks(ids)
+            for document in _query_item_documents(Item.id.in_(chunk))
+        ]
+    return _query_item_documents(None)
+
+
+def _query_item_documents(criterion) -> list[SearchDocument]:
+    query = db.session.query(
+        Item.id,
+        Item.sku,
+        Item.name,
+        Item.description,
+        Item.unit,
+        Item.min_stock,
+        Item.item_class,
+        Item.type,
+    )
+    if criterion is not None:
+        query = query.filter(criterion)
+    return [
+        SearchDocument(
+            id=row.id,
+            primary=row.sku or "",
+            fields=(_normalize(row.sku), _normalize(row.name), _normalize(row.description)),
+            payload={
+                "sku": row.sku,
+                "name": row.name,
+                "description": row.description,
+                "unit": row.unit,
+                "min_stock": row.min_stock,
+                "item_class": row.item_class,
+                "type": row.type,
+            },
+        )
+        for row in query
+    ]
+
+
+def _load_location_documents(ids: Iterable[int] | None) -> list[SearchDocument]:
+    if ids is not None:
+        return [
+            document
+            for chunk in _chunks(ids)
+            for document in _query_location_documents(Location.id.in_(chunk))
+        ]
+    return _query_location_documents(None)
+
+
+def _query_location_documents(criterion) -> list[SearchDocument]:
+    query = db.session.query(Location.id, Location.code, Location.description)
+    if criterion is not None:
+        query = query.filter(criterion)
+    return [
+        SearchDocument(
+            id=row.id,
+            primary=row.code or "",
+            fields=(_normalize(row.code), _normalize(row.description)),
+            payload={"code": row.code, "description": row.description},
+        )
+        for row in query
+    ]
+
+
+def init_search_index(app) -> dict[str, SearchIndex]:
+    """Attach item and location search indexes to ``app``."""
+
+    options = {
+        "version_source": item_dictionary.current_version,
+        "ttl_seconds": float(
+            app.config.get("SEARCH_INDEX_TTL_SECONDS", DEFAULT_INDEX_TTL_SECONDS)
+        ),
+        "run_in_background": not app.config.get("TESTING", False),
+    }
+    indexes = {
+        "item": SearchIndex(
+            "item",
+            _load_item_documents,
+            changes=lambda since, version: item_dictionary.changed_ids(Item, since, version),
+            **options,
+        ),
+        "location": SearchIndex(
+            "location",
+            _load_location_documents,
+            changes=lambda since, version: item_dictionary.changed_ids(
+                Location, since, version
+            ),
+            **options,
+        ),
+    }
+    app.extensions["search_index"] = indexes
+    return indexes
+
+
+def get_search_index(kind: str) -> SearchIndex | None:
+    """Return the ``kind`` index, or ``None`` when it is disabled."""
+
+    if not current_app.config.get("SEARCH_INDEX_ENABLED", True):
+        return None
+    return current_app.extensions.get("search_index", {}).get(kind)
+
+
+def _item_row(document: SearchDocument) -> dict[str, Any]:
+    return {"id": document.id, **document.payload}
+
+
+def search_items(query: str, *, limit: int, include_description: bool = True) -> list[dict[str, Any]]:
+    """Return ranked item rows matching ``query`` on SKU, name and description."""
+
+    field_count = 3 if include_description else 2
+    index = get_search_index("item")
+    hits = index.search(query, limit=limit, field_count=field_count) if index else None
+    if hits is not None:
+        # Re-read the hits: min_stock and item_class are not version-stamped.
+        current = {
+            document.id: document
+            for document in _load_item_documents([document.id for document in hits])
+        }
+        return [_item_row(current[document.id]) for document in hits if document.id in current]
+
+    pattern = f"%{query.strip().lower()}%"
+    columns = [Item.sku, Item.name, Item.description][:field_count]
+    documents = _query_item_documents(
+        db.or_(*(db.func.lower(column).like(pattern) for column in columns))
+    )
+    return [
+        _item_row(document)
+        for document in rank_candidates(
+            query,
+            documents,
+            lambda document: document.fields[:field_count],
+            lambda document: document.primary,
+            limit=limit,
+        )
+    ]
+
+
+def search_locations(query: str, *, limit: int) -> list[dict[str, Any]]:
+    """Return ranked location rows matching ``query`` on code and description."""
+
+    index = get_search_index("location")
+    documents = index.search(query, limit=limit) if index else None
+    if documents is None:
+        pattern = f"%{query.strip().lower()}%"
+        matching = _query_location_documents(
+            db.or_(
+                db.func.lower(Location.code).like(pattern),
+                db.func.lower(Location.description).like(pattern),
+            )
+        )
+        documents = rank_candidates(
+            query,
+            matching,
+            lambda document: document.fields,
+            lambda document: document.primary,
+            limit=limit,
+        )
+    return [{"id": document.id, **document.payload} for document in documents]
@@ -1,20 +1,185 @@
-"""Centralized status/event bus for the operations monitor."""
+"""Centralized status/event bus for the operations monitor.
+
+Events are kept in memory for the monitor and queued for persistence in a
+bounded ring per application.  A background writer drains the ring in batches
+into ``ops_event_log`` on its own engine connection, so callers never commit
+(or roll back) the request's ``db.session``.  When the ring is full the oldest
+unpersisted events are dropped and counted rather than blocking the caller.
+
+Repeated events sharing a ``dedupe_key`` are folded into one entry until the
+key expires after ``STATUS_BUS_DEDUPE_TTL_SECONDS``; the dedupe map is capped at
+``STATUS_BUS_DEDUPE_MAX_ENTRIES`` keys.  ``ops_event_log`` rows older than
+``OPS_EVENT_LOG_RETENTION_DAYS`` are pruned by the leader-only log retention
+job (see :mod:`invapp.services.log_storage`).
+"""
 
 from __future__ import annotations
 
+import atexit
 import logging
-from collections import deque
+import os
+import threading
+import time
+from collections import OrderedDict, deque
 from datetime import datetime
 from typing import Any, Deque
 
+from flask import current_app
+from sqlalchemy import insert
 from sqlalchemy.exc import SQLAlchemyError
 
 from invapp.extensions import db
 from invapp.models import OpsEventLog
 
 
+DEFAULT_BUFFER_SIZE = 1000
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_FLUSH_INTERVAL_SECONDS = 2.0
+DEFAULT_DEDUPE_TTL_SECONDS = 300
+DEFAULT_DEDUPE_MAX_ENTRIES = 1000
+
 _EVENTS: Deque[dict[str, Any]] = deque(maxlen=200)
-_DEDUPE: dict[str, dict[str, Any]] = {}
+_DEDUPE: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+_LOCK = threading.Lock()
+
+
+class StatusBusWriter:
+    """Bounded queue of events awaiting persistence for one application."""
+
+    def __init__(
+        self,
+        app,
+        *,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL_SECONDS,
+        run_in_background: bool = True,
+    ) -> None:
+        self.app = app
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = flush_interval
+        self.run_in_background = run_in_background
+        self._pending: Deque[dict[str, Any]] = deque(maxlen=max(1, int(buffer_size)))
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._thread_pid: int | None = None
+        self.dropped = 0
+        self.persisted = 0
+        self.failed = 0
+        self.last_error: str | None = None
+
+    def enqueue(self, row: dict[str, Any]) -> None:
+        with self._lock:
+            if len(self._pending) == self._pending.maxlen:
+                self.dropped += 1
+            self._pending.append(row)
+            pending = len(self._pending)
+        if not self.run_in_background:
+            return
+        self._ensure_thread()
+        if pending >= self.batch_size:
+            self._wakeup.set()
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def _take_batch(self) -> list[dict[str, Any]]:
+        with self._lock:
+            count = min(self.batch_size, len(self._pending))
+            return [self._pending.popleft() for _ in range(count)]
+
+    def flush(self) -> int:
+        """Persist every queued event and return how many rows were written."""
+
+        written = 0
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return written
+            if not self.app.config.get("DATABASE_AVAILABLE", True):
+                with self._lock:
+                    self.dropped += len(batch)
+                continue
+            try:
+                engine = db.get_engine(self.app)
+                with engine.begin() as connection:
+                    connection.execute(insert(OpsEventLog.__table__), batch)
+            except SQLAlchemyError as exc:
+                with self._lock:
+                    self.failed += len(batch)
+                    self.last_error = str(exc)
+                continue
+            written += len(batch)
+            with self._lock:
+                self.persisted += len(batch)
+
+    def _ensure_thread(self) -> None:
+        pid = os.getpid()
+        if self._thread is not None and self._thread.is_alive() and self._thread_pid == pid:
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._thread_pid == pid:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="status-bus-writer", daemon=True
+            )
+            self._thread_pid = pid
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "capacity": self._pending.maxlen,
+                "dropped": self.dropped,
+                "persisted": self.persisted,
+                "failed": self.failed,
+                "last_error": self.last_error,
+            }
+
+
+def init_status_bus(app) -> StatusBusWriter:
+    """Attach a status bus writer to ``app``."""
+
+    writer = StatusBusWriter(
+        app,
+        buffer_size=int(app.config.get("STATUS_BUS_BUFFER_SIZE", DEFAULT_BUFFER_SIZE)),
+        batch_size=int(app.config.get("STATUS_BUS_BATCH_SIZE", DEFAULT_BATCH_SIZE)),
+        flush_interval=float(
+            app.config.get("STATUS_BUS_FLUSH_INTERVAL_SECONDS", DEFAULT_FLUSH_INTERVAL_SECONDS)
+        ),
+        run_in_background=not app.config.get("TESTING", False),
+    )
+    app.extensions["status_bus"] = writer
+    if writer.run_in_background:
+        atexit.register(writer.flush)
+    return writer
+
+
+def get_writer() -> StatusBusWriter | None:
+    try:
+        return current_app.extensions.get("status_bus")
+    except RuntimeError:
+        return None
+
+
+def _dedupe_settings() -> tuple[float, int]:
+    try:
+        config = current_app.config
+    except RuntimeError:
+        return DEFAULT_DEDUPE_TTL_SECONDS, DEFAULT_DEDUPE_MAX_ENTRIES
+    return (
+        float(config.get("STATUS_BUS_DEDUPE_TTL_SECONDS", DEFAULT_DEDUPE_TTL_SECONDS)),
+        int(config.get("STATUS_BUS_DEDUPE_MAX_ENTRIES", DEFAULT_DEDUPE_MAX_ENTRIES)),
+    )
 
 
 def log_event(
@@ -27,43 +192,67 @@ def log_event(
 ) -> None:
     timestamp = datetime.utcnow()
     normalized_level = level.upper()
+    ttl_seconds, max_entries = _dedupe_settings()
+    now = time.monotonic()
 
-    if dedupe_key and dedupe_key in _DEDUPE:
-        event = _DEDUPE[dedupe_key]
-        event["count"] += 1
-        event["timestamp"] = timestamp
-        event["context"] = context or event.get("context")
-        return
-
-    event = {
-        "timestamp": timestamp,
-        "level": normalized_level,
-        "message": message,
-        "context": context,
-        "source": source,
-        "count": 1,
-    }
-    _EVENTS.append(event)
-    if dedupe_key:
-        _DEDUPE[dedupe_key] = event
+    with _LOCK:
+        if dedupe_key:
+            cached = _DEDUPE.get(dedupe_key)
+            if cached is not None and cached[0] > now:
+                event = cached[1]
+                event["count"] += 1
+                event["timestamp"] = timestamp
+                event["context"] = context or event.get("context")
+                return
+            _DEDUPE.pop(dedupe_key, None)
 
-    try:
-        record = OpsEventLog(
-            level=normalized_level,
-            source=source,
-            message=message,
-            context_json=context,
+        event = {
+            "timestamp": timestamp,
+            "level": normalized_level,
+            "message": message,
+            "context": context,
+            "source": source,
+            "count": 1,
+        }
+        _EVENTS.append(event)
+        if dedupe_key:
+            _DEDUPE[dedupe_key] = (now + ttl_seconds, event)
+            while len(_DEDUPE) > max(1, max_entries):
+                _DEDUPE.popitem(last=False)
+
+    writer = get_writer()
+    if writer is not None:
+        writer.enqueue(
+            {
+                "created_at": timestamp,
+                "level": normalized_level,
+                "source": source,
+                "message": message,
+                "context_json": context,
+            }
         )
-        db.session.add(record)
-        db.session.commit()
-    except (SQLAlchemyError, RuntimeError):
-        db.session.rollback()
+
+
+def flush_pending() -> int:
+    """Synchronously persist queued events for the current application."""
+
+    writer = get_writer()
+    return writer.flush() if writer is not None else 0
+
+
+def get_status_bus_stats() -> dict[str, Any]:
+    writer = get_writer()
+    stats = writer.stats() if writer is not None else {}
+    with _LOCK:
+        stats["dedupe_entries"] = len(_DEDUPE)
+    return stats
 
 
 def get_recent_events(limit: int = 200) -> list[dict[str, Any]]:
     if limit <= 0:
         return []
-    return list(_EVENTS)[-limit:]
+    with _LOCK:
+        return list(_EVENTS)[-limit:]
 
 
 class StatusBusHandler(logging.Handler):
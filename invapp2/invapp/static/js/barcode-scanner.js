@@ -1,6 +1,55 @@
 (function () {
   const widgetStates = new WeakMap();
   const trackedWidgets = new Set();
+  // The decoder is only fetched when a scan control is used; see base.html
+  // for the pinned, vendored build referenced by data-decoder-src.
+  const scriptElement = document.currentScript;
+  const decoderSrc = scriptElement ? scriptElement.dataset.decoderSrc || "" : "";
+  let decoderPromise = null;
+
+  function resolveDecoder() {
+    const ZX = window.ZXingBrowser || window.ZXing;
+    return ZX && ZX.BrowserMultiFormatReader ? ZX : null;
+  }
+
+  function loadDecoder() {
+    const loaded = resolveDecoder();
+    if (loaded) {
+      return Promise.resolve(loaded);
+    }
+    if (decoderPromise) {
+      return decoderPromise;
+    }
+    if (!decoderSrc) {
+      return Promise.reject(new Error("Barcode decoder is not configured."));
+    }
+    decoderPromise = new Promise((resolve, reject) => {
+      const script = document.createElement("script");
+      script.src = decoderSrc;
+      script.async = true;
+      script.onload = () => {
+        const ZX = resolveDecoder();
+        if (ZX) {
+          resolve(ZX);
+        } else {
+          reject(new Error("Barcode decoder failed to initialise."));
+        }
+      };
+      script.onerror = () => reject(new Error("Unable to load the barcode decoder."));
+      document.head.appendChild(script);
+    }).catch((error) => {
+      decoderPromise = null;
+      throw error;
+    });
+    return decoderPromise;
+  }
+
+  function isNotFound(ZX, err) {
+    if (ZX.NotFoundException) {
+      return err instanceof ZX.NotFoundException;
+    }
+    return Boolean(err && err.name === "NotFoundException");
+  }
 
   function getState(widget) {
     return widgetStates.get(widget);
@@ -80,12 +129,41 @@
     return null;
   }
 
+  function describeItem(data) {
+    const details = [data.name];
+    if (data.description) {
+      details.push(data.description);
+    }
+    if (data.unit) {
+      details.push(`Unit: ${data.unit}`);
+    }
+    return details.join(" · ");
+  }
+
+  async function lookupOffline(code) {
+    if (!window.ItemDictionary) {
+      return null;
+    }
+    try {
+      return await window.ItemDictionary.lookupItem(code);
+    } catch (error) {
+      console.warn("Local item lookup failed", error);
+      return null;
+    }
+  }
+
   async function handleLookup(widget, code) {
     const state = getState(widget);
     if (!state || !state.lookupTemplate) {
       return;
     }
 
+    const cached = await lookupOffline(code);
+    if (cached) {
+      updateResult(widget, describeItem(cached), "success");
+      return;
+    }
+
     const placeholder = "__SKU__";
     const encoded = encodeURIComponent(code);
     let url = state.lookupTemplate;
@@ -104,14 +182,7 @@
       }
       const data = await response.json();
       if (data && data.name) {
-        const details = [data.name];
-        if (data.description) {
-          details.push(data.description);
-        }
-        if (data.unit) {
-          details.push(`Unit: ${data.unit}`);
-        }
-        updateResult(widget, details.join(" · "), "success");
+        updateResult(widget, describeItem(data), "success");
       } else {
         updateResult(widget, "Item found.", "success");
       }
@@ -167,6 +238,19 @@
 
     state.lastResult = "";
     setButtonState(state, true);
+    updateResult(widget, "Loading scanner…", "status");
+
+    let ZX;
+    try {
+      ZX = await loadDecoder();
+    } catch (error) {
+      setButtonState(state, false);
+      updateResult(widget, error.message || "Unable to load the barcode decoder.", "error");
+      return;
+    }
+    if (!state.reader) {
+      state.reader = new ZX.BrowserMultiFormatReader();
+    }
     updateResult(widget, "Starting camera…", "status");
 
     try {
@@ -181,7 +265,7 @@
           if (result && (result.text || typeof result.getText === "function")) {
             const text = result.text || result.getText();
             handleDetection(widget, text);
-          } else if (err && !(err instanceof window.ZXing.NotFoundException)) {
+          } else if (err && !isNotFound(ZX, err)) {
             console.warn("Barcode scan error", err);
             updateResult(widget, "Scanning error. Adjust lighting or distance.", "status");
           }
@@ -196,17 +280,11 @@
   }
 
   function initScannerWidgets() {
-    const ZX = window.ZXing;
     const widgets = document.querySelectorAll("[data-scanner]");
     if (!widgets.length) {
       return;
     }
 
-    if (!ZX || !ZX.BrowserMultiFormatReader) {
-      console.warn("ZXing library was not loaded.");
-      return;
-    }
-
     widgets.forEach((widget) => {
       const video = widget.querySelector("video");
       const startBtn = widget.querySelector(".start-scan");
@@ -221,9 +299,8 @@
         return;
       }
 
-      const reader = new ZX.BrowserMultiFormatReader();
       const state = {
-        reader,
+        reader: null,
         video,
         startBtn,
         stopBtn,
@@ -252,9 +329,16 @@
 
       widgetStates.set(widget, state);
       trackedWidgets.add(widget);
+      if (lookupTemplate && window.ItemDictionary) {
+        window.ItemDictionary.start();
+      }
 
       if (startBtn) {
         startBtn.addEventListener("click", () => startScan(widget));
+        // Start fetching the decoder as soon as the user reaches for the button.
+        const warmDecoder = () => loadDecoder().catch(() => {});
+        startBtn.addEventListener("pointerenter", warmDecoder, { once: true });
+        startBtn.addEventListener("focus", warmDecoder, { once: true });
       }
       if (stopBtn) {
         stopBtn.addEventListener("click", () => {
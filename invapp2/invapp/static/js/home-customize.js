@@ -1,4 +1,29 @@
 (() => {
+  const loadCubeBody = async (placeholder) => {
+    const body = placeholder.closest("[data-cube-body]");
+    if (!body) {
+      return;
+    }
+    try {
+      const response = await fetch(placeholder.dataset.cubeSrc, {
+        headers: { Accept: "application/json" },
+        credentials: "same-origin",
+      });
+      if (!response.ok) {
+        throw new Error(`Unexpected status ${response.status}`);
+      }
+      const payload = await response.json();
+      body.innerHTML = payload.html || "";
+    } catch (error) {
+      placeholder.textContent = "Unable to load this summary. Refresh to try again.";
+      placeholder.classList.remove("home-summary-loading");
+    }
+  };
+
+  document.querySelectorAll("[data-cube-src]").forEach((placeholder) => {
+    loadCubeBody(placeholder);
+  });
+
   const layoutDataEl = document.getElementById("home-layout-data");
   if (!layoutDataEl) {
     return;
@@ -0,0 +1,247 @@
+(function () {
+  const DICTIONARY_URL = "/inventory/api/dictionary";
+  const DB_NAME = "invapp-item-dictionary";
+  const DB_VERSION = 1;
+  const SYNC_INTERVAL_MS = 5 * 60 * 1000;
+  const MIN_SYNC_GAP_MS = 30 * 1000;
+
+  // In-memory mirror used when IndexedDB is unavailable (private browsing,
+  // old WebViews). Lookups still avoid a request per scan within the page.
+  const memory = { items: new Map(), skus: new Map(), locations: new Map() };
+
+  let dbPromise = null;
+  let version = null;
+  let syncPromise = null;
+  let lastSyncAt = 0;
+  let started = false;
+
+  function requestToPromise(request) {
+    return new Promise((resolve, reject) => {
+      request.onsuccess = () => resolve(request.result);
+      request.onerror = () => reject(request.error);
+    });
+  }
+
+  function transactionDone(tx) {
+    return new Promise((resolve, reject) => {
+      tx.oncomplete = () => resolve();
+      tx.onerror = () => reject(tx.error);
+      tx.onabort = () => reject(tx.error);
+    });
+  }
+
+  function openDatabase() {
+    if (dbPromise) {
+      return dbPromise;
+    }
+    if (!window.indexedDB) {
+      dbPromise = Promise.resolve(null);
+      return dbPromise;
+    }
+    dbPromise = new Promise((resolve) => {
+      const request = window.indexedDB.open(DB_NAME, DB_VERSION);
+      request.onupgradeneeded = () => {
+        const db = request.result;
+        const items = db.createObjectStore("items", { keyPath: "id" });
+        items.createIndex("sku_lower", "sku_lower", { unique: false });
+        db.createObjectStore("locations", { keyPath: "id" });
+        db.createObjectStore("meta");
+      };
+      request.onsuccess = () => resolve(request.result);
+      request.onerror = () => {
+        console.warn("Item dictionary cache unavailable", request.error);
+        resolve(null);
+      };
+      request.onblocked = () => resolve(null);
+    });
+    return dbPromise;
+  }
+
+  async function loadStoredVersion() {
+    const db = await openDatabase();
+    if (!db) {
+      return null;
+    }
+    const tx = db.transaction("meta", "readonly");
+    const stored = await requestToPromise(tx.objectStore("meta").get("version"));
+    return typeof stored === "number" ? stored : null;
+  }
+
+  function toRecords(fields, rows) {
+    return rows.map((row) => {
+      const record = {};
+      fields.forEach((field, index) => {
+        record[field] = row[index];
+      });
+      if (record.sku !== undefined) {
+        record.sku_lower = String(record.sku || "").toLowerCase();
+      }
+      return record;
+    });
+  }
+
+  function applyToMemory(payload, items, locations) {
+    if (payload.full) {
+      memory.items.clear();
+      memory.skus.clear();
+      memory.locations.clear();
+    }
+    payload.deleted.items.forEach((id) => {
+      const previous = memory.items.get(id);
+      if (previous) {
+        memory.skus.delete(previous.sku_lower);
+      }
+      memory.items.delete(id);
+    });
+    payload.deleted.locations.forEach((id) => memory.locations.delete(id));
+    items.forEach((item) => {
+      const previous = memory.items.get(item.id);
+      if (previous) {
+        memory.skus.delete(previous.sku_lower);
+      }
+      memory.items.set(item.id, item);
+      memory.skus.set(item.sku_lower, item.id);
+    });
+    locations.forEach((location) => memory.locations.set(location.id, location));
+  }
+
+  async function applyToDatabase(db, payload, items, locations) {
+    const tx = db.transaction(["items", "locations", "meta"], "readwrite");
+    const itemStore = tx.objectStore("items");
+    const locationStore = tx.objectStore("locations");
+    if (payload.full) {
+      itemStore.clear();
+      locationStore.clear();
+    }
+    payload.deleted.items.forEach((id) => itemStore.delete(id));
+    payload.deleted.locations.forEach((id) => locationStore.delete(id));
+    items.forEach((item) => itemStore.put(item));
+    locations.forEach((location) => locationStore.put(location));
+    tx.objectStore("meta").put(payload.version, "version");
+    await transactionDone(tx);
+  }
+
+  async function runSync() {
+    const db = await openDatabase();
+    if (version === null && db) {
+      version = await loadStoredVersion();
+    }
+    const url = version === null ? DICTIONARY_URL : `${DICTIONARY_URL}?since=${version}`;
+    const response = await fetch(url, {
+      headers: { Accept: "application/json" },
+      credentials: "same-origin",
+    });
+    if (!response.ok) {
+      throw new Error(`Dictionary sync failed (${response.status})`);
+    }
+    const payload = await response.json();
+    const items = toRecords(payload.fields.items, payload.items);
+    const locations = toRecords(payload.fields.locations, payload.locations);
+    if (db) {
+      await applyToDatabase(db, payload, items, locations);
+    } else {
+      applyToMemory(payload, items, locations);
+    }
+    version = payload.version;
+    lastSyncAt = Date.now();
+    return payload;
+  }
+
+  function sync(force = false) {
+    if (syncPromise) {
+      return syncPromise;
+    }
+    if (!force && lastSyncAt && Date.now() - lastSyncAt < MIN_SYNC_GAP_MS) {
+      return Promise.resolve(null);
+    }
+    syncPromise = runSync()
+      .catch((error) => {
+        console.warn("Item dictionary sync failed", error);
+        return null;
+      })
+      .finally(() => {
+        syncPromise = null;
+      });
+    return syncPromise;
+  }
+
+  async function findItem(skuLower) {
+    const db = await openDatabase();
+    if (!db) {
+      const id = memory.skus.get(skuLower);
+      return id === undefined ? null : memory.items.get(id) || null;
+    }
+    const tx = db.transaction("items", "readonly");
+    const matches = await requestToPromise(tx.objectStore("items").index("sku_lower").getAll(skuLower));
+    return matches.length ? matches[0] : null;
+  }
+
+  async function findLocation(id) {
+    if (id === null || id === undefined) {
+      return null;
+    }
+    const db = await openDatabase();
+    if (!db) {
+      return memory.locations.get(id) || null;
+    }
+    const tx = db.transaction("locations", "readonly");
+    return (await requestToPromise(tx.objectStore("locations").get(id))) || null;
+  }
+
+  function start() {
+    if (started) {
+      return;
+    }
+    started = true;
+    sync(true);
+    window.setInterval(() => sync(), SYNC_INTERVAL_MS);
+    window.addEventListener("online", () => sync(true));
+    document.addEventListener("visibilitychange", () => {
+      if (document.visibilityState === "visible") {
+        sync();
+      }
+    });
+  }
+
+  /**
+   * Resolve a SKU from the local dictionary. The result matches the shape of
+   * ``/inventory/api/items/<sku>`` for the fields the dictionary carries, or
+   * is ``null`` when the SKU is not known locally (callers fall back to the
+   * network lookup, which also covers items created since the last sync).
+   */
+  async function lookupItem(sku) {
+    const key = (sku || "").toString().trim().toLowerCase();
+    if (!key) {
+      return null;
+    }
+    start();
+    if (version === null) {
+      version = await loadStoredVersion();
+      if (version === null) {
+        await sync(true);
+      }
+    }
+    let item = await findItem(key);
+    if (!item) {
+      // Possibly created since the last sync; a delta is cheap.
+      await sync();
+      item = await findItem(key);
+    }
+    if (!item) {
+      return null;
+    }
+    const location = await findLocation(item.default_location_id);
+    return {
+      sku: item.sku,
+      name: item.name,
+      description: item.description || "",
+      unit: item.unit || "",
+      type: item.type || "",
+      default_location: location
+        ? { id: location.id, code: location.code, description: location.description }
+        : null,
+    };
+  }
+
+  window.ItemDictionary = { lookupItem, start, sync };
+})();
@@ -311,6 +311,33 @@ async function postJson(url, payload) {
   return data;
 }
 
+async function postForImage(url, payload) {
+  const response = await fetch(url, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      Accept: 'image/png, application/json'
+    },
+    credentials: 'same-origin',
+    body: JSON.stringify(payload)
+  });
+
+  if (!response.ok) {
+    let message = 'Request failed.';
+    try {
+      const data = await response.json();
+      if (data && data.message) {
+        message = data.message;
+      }
+    } catch (error) {
+      // Non-JSON error bodies fall back to the generic message.
+    }
+    throw new Error(message);
+  }
+
+  return URL.createObjectURL(await response.blob());
+}
+
 function roundToGrid(value) {
   return Math.round(value / GRID_SIZE) * GRID_SIZE;
 }
@@ -368,11 +395,15 @@ const ActionPanel = ({
   label,
   saveUrl,
   trialPrintUrl,
+  previewUrl,
   printerName,
   onSave,
   onTrialPrint,
+  onPreview,
   saving,
   printing,
+  previewing,
+  previewImage,
   feedback
 }) => {
   const hasLabel = Boolean(label);
@@ -413,8 +444,28 @@ const ActionPanel = ({
             'inline-flex items-center justify-center rounded-md border border-slate-200 bg-white px-3 py-2 text-sm font-semibold text-slate-700 shadow-sm transition hover:border-indigo-300 hover:text-indigo-700 disabled:cursor-not-allowed disabled:border-slate-200 disabled:text-slate-400'
         },
         printing ? 'Printing…' : 'Trial Print'
-      )
+      ),
+      previewUrl
+        ? h(
+            'button',
+            {
+              type: 'button',
+              onClick: hasLabel ? onPreview : undefined,
+              disabled: !hasLabel || previewing,
+              className:
+                'inline-flex items-center justify-center rounded-md border border-slate-200 bg-white px-3 py-2 text-sm font-semibold text-slate-700 shadow-sm transition hover:border-indigo-300 hover:text-indigo-700 disabled:cursor-not-allowed disabled:border-slate-200 disabled:text-slate-400 sm:col-span-2'
+            },
+            previewing ? 'Rendering…' : 'Printer Preview'
+          )
+        : null
     ),
+    previewImage
+      ? h('img', {
+          src: previewImage,
+          alt: 'Rendered label preview',
+          className: 'w-full rounded-md border border-slate-200 bg-white'
+        })
+      : null,
     !saveUrl
       ? h(
           'p',
@@ -1167,9 +1218,12 @@ const LabelDesignerApp = ({ config }) => {
   const [actionFeedback, setActionFeedback] = useState(null);
   const [isSaving, setIsSaving] = useState(false);
   const [isPrinting, setIsPrinting] = useState(false);
+  const [isPreviewing, setIsPreviewing] = useState(false);
+  const [previewImage, setPreviewImage] = useState(null);
 
   const saveLayoutUrl = config?.saveLayoutUrl || null;
   const trialPrintUrl = config?.trialPrintUrl || null;
+  const previewUrl = config?.previewUrl || null;
   const selectedPrinterName = config?.selectedPrinterName || null;
 
   useEffect(() => {
@@ -1289,6 +1343,33 @@ const LabelDesignerApp = ({ config }) => {
     }
   }, [saveLayoutUrl, selectedLabel]);
 
+  useEffect(
+    () => () => {
+      if (previewImage) {
+        URL.revokeObjectURL(previewImage);
+      }
+    },
+    [previewImage]
+  );
+
+  const handlePreview = useCallback(async () => {
+    if (!selectedLabel || !previewUrl) {
+      return;
+    }
+    const layout = toSerializableLayout(selectedLabel);
+    setIsPreviewing(true);
+    try {
+      setPreviewImage(await postForImage(previewUrl, { label_id: layout.id, layout }));
+    } catch (error) {
+      setActionFeedback({
+        type: 'error',
+        message: error.message || 'Failed to render a printer preview.'
+      });
+    } finally {
+      setIsPreviewing(false);
+    }
+  }, [previewUrl, selectedLabel]);
+
   const handleTrialPrint = useCallback(async () => {
     if (!selectedLabel) {
       setActionFeedback({ type: 'error', message: 'Select a label before requesting a trial print.' });
@@ -1352,11 +1433,15 @@ const LabelDesignerApp = ({ config }) => {
         label: selectedLabel,
         saveUrl: saveLayoutUrl,
         trialPrintUrl,
+        previewUrl,
         printerName: selectedPrinterName,
         onSave: handleSaveLayout,
         onTrialPrint: handleTrialPrint,
+        onPreview: handlePreview,
         saving: isSaving,
         printing: isPrinting,
+        previewing: isPreviewing,
+        previewImage,
         feedback: actionFeedback
       }),
       PropertyInspector({
@@ -0,0 +1,265 @@
+"""Fingerprinted, precompressed static assets.
+
+``flask assets build`` copies every stylesheet, script, image and font from the
+static folder into ``STATIC_BUILD_DIR`` under a content-hashed name
+(``style.css`` -> ``style.3f9a1c2e4b5d.css``), writes ``.gz`` variants (and
+``.br`` when the optional ``brotli`` package is installed) next to text
+assets, and records the mapping in ``manifest.json``.
+
+While a manifest is loaded, ``url_for('static', ...)`` and the static
+endpoints of blueprints whose folder lives inside the app static folder (the
+MDI bundle) emit the hashed name.  Hashed URLs, including names left by earlier
+builds, are served from the build directory with a one-year ``immutable`` Cache-Control and the smallest
+precompressed variant the client accepts, so kiosks stop revalidating assets
+on every page load.  Unhashed URLs keep Flask's conditional caching; without
+a build the app behaves exactly as before.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from flask import request, send_from_directory
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+
+MANIFEST_NAME = "manifest.json"
+IMMUTABLE_MAX_AGE = 31536000
+HASH_LENGTH = 12
+HASHED_NAME_RE = re.compile(rf"\.[0-9a-f]{{{HASH_LENGTH}}}\.[^./]+$")
+
+ASSET_EXTENSIONS = {
+    ".css",
+    ".js",
+    ".map",
+    ".json",
+    ".svg",
+    ".png",
+    ".jpg",
+    ".jpeg",
+    ".gif",
+    ".webp",
+    ".ico",
+    ".woff",
+    ".woff2",
+}
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".map", ".json", ".svg"}
+
+# Preferred order when the client accepts several encodings.
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+@dataclass
+class StaticAssets:
+    build_dir: Path
+    manifest: dict[str, str] = field(default_factory=dict)
+    originals: dict[str, str] = field(default_factory=dict)
+    # Static endpoint -> its folder relative to the app static folder.
+    endpoints: dict[str, str] = field(default_factory=dict)
+
+    def load(self) -> None:
+        self.manifest = load_manifest(self.build_dir)
+        self.originals = {hashed: name for name, hashed in self.manifest.items()}
+
+
+def _fingerprint(relative: str, data: bytes) -> str:
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    stem, ext = os.path.splitext(relative)
+    return f"{stem}.{digest}{ext}"
+
+
+def _write_if_changed(path: Path, data: bytes) -> None:
+    if path.exists() and path.stat().st_size == len(data) and path.read_bytes() == data:
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+def _compressed_variants(data: bytes) -> dict[str, bytes]:
+    variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(data, quality=11)
+    return {suffix: blob for suffix, blob in variants.items() if len(blob) < len(data)}
+
+
+def iter_asset_paths(static_folder: Path, excluded: set[Path] | None = None):
+    """Relative POSIX paths of the fingerprintable files under ``static_folder``."""
+
+    excluded = {path.resolve() for path in excluded or ()}
+    for root, dirs, files in os.walk(static_folder):
+        root_path = Path(root)
+        dirs[:] = sorted(
+            name
+            for name in dirs
+            if not name.startswith(".") and (root_path / name).resolve() not in excluded
+        )
+        for name in sorted(files):
+            if Path(name).suffix.lower() in ASSET_EXTENSIONS:
+                yield (root_path / name).relative_to(static_folder).as_posix()
+
+
+def build_assets(
+    static_folder: str | os.PathLike,
+    build_dir: str | os.PathLike,
+    *,
+    excluded: set[Path] | None = None,
+) -> dict[str, str]:
+    """Write hashed and compressed copies of the static assets plus the manifest.
+
+    Hashed files from earlier builds are left in place so pages rendered
+    before a deploy keep loading their assets.
+    """
+
+    static_folder = Path(static_folder)
+    build_dir = Path(build_dir)
+    manifest: dict[str, str] = {}
+    for relative in iter_asset_paths(static_folder, excluded):
+        data = (static_folder / relative).read_bytes()
+        hashed = _fingerprint(relative, data)
+        target = build_dir / hashed
+        _write_if_changed(target, data)
+        if target.suffix.lower() in COMPRESSIBLE_EXTENSIONS:
+            for suffix, blob in _compressed_variants(data).items():
+                _write_if_changed(target.with_name(target.name + suffix), blob)
+        manifest[relative] = hashed
+
+    _write_if_changed(
+        build_dir / MANIFEST_NAME,
+        (json.dumps(manifest, indent=2, sort_keys=True) + "\n").encode("utf-8"),
+    )
+    return manifest
+
+
+def load_manifest(build_dir: str | os.PathLike) -> dict[str, str]:
+    path = Path(build_dir) / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def excluded_folders(app) -> set[Path]:
+    """Upload folders that live under the static folder are not assets."""
+
+    static_folder = Path(app.static_folder).resolve()
+    folders = set()
+    for key, value in app.config.items():
+        if key.endswith("_UPLOAD_FOLDER") and value:
+            path = Path(value).resolve()
+            if path == static_folder or static_folder in path.parents:
+                folders.add(path)
+    build_dir = Path(app.config["STATIC_BUILD_DIR"]).resolve()
+    if static_folder in build_dir.parents:
+        folders.add(build_dir)
+    return folders
+
+
+def _static_endpoints(app) -> dict[str, str]:
+    static_folder = Path(app.static_folder).resolve()
+    endpoints = {"static": ""}
+    for name, blueprint in app.blueprints.items():
+        if not blueprint.has_static_folder:
+            continue
+        folder = Path(blueprint.static_folder).resolve()
+        if static_folder in folder.parents:
+            endpoints[f"{name}.static"] = folder.relative_to(static_folder).as_posix() + "/"
+    return endpoints
+
+
+def _is_hashed_build_file(assets: StaticAssets, name: str) -> bool:
+    """Whether ``name`` is a fingerprinted file in the build directory.
+
+    Covers hashes from earlier builds that are no longer in the manifest.
+    """
+
+    if not HASHED_NAME_RE.search(name):
+        return False
+    path = safe_join(os.fspath(assets.build_dir), name)
+    return path is not None and os.path.isfile(path)
+
+
+def _serve_hashed(assets: StaticAssets, hashed: str):
+    mimetype = mimetypes.guess_type(hashed)[0] or "application/octet-stream"
+    response = None
+    accepted = request.accept_encodings
+    if Path(hashed).suffix.lower() in COMPRESSIBLE_EXTENSIONS:
+        for encoding, suffix in ENCODINGS:
+            variant = hashed + suffix
+            if accepted[encoding] and (assets.build_dir / variant).is_file():
+                response = send_from_directory(
+                    assets.build_dir, variant, mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE
+                )
+                response.headers["Content-Encoding"] = encoding
+                break
+        response = response or send_from_directory(
+            assets.build_dir, hashed, mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE
+        )
+        response.vary.add("Accept-Encoding")
+    else:
+        response = send_from_directory(
+            assets.build_dir, hashed, mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE
+        )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_static_assets(app) -> StaticAssets:
+    """Load the asset manifest and hook hashed URLs into ``url_for``.
+
+    Call after the blueprints are registered so their static endpoints are
+    known.
+    """
+
+    assets = StaticAssets(build_dir=Path(app.config["STATIC_BUILD_DIR"]))
+    assets.endpoints = _static_endpoints(app)
+    assets.load()
+    app.extensions["static_assets"] = assets
+
+    @app.url_defaults
+    def _hashed_static_url(endpoint, values):
+        prefix = assets.endpoints.get(endpoint)
+        if prefix is None or not assets.manifest:
+            return
+        filename = values.get("filename")
+        hashed = assets.manifest.get(f"{prefix}{filename}") if filename else None
+        if hashed:
+            values["filename"] = hashed[len(prefix):]
+
+    @app.before_request
+    def _serve_hashed_static():
+        prefix = assets.endpoints.get(request.endpoint)
+        if prefix is None:
+            return None
+        hashed = f"{prefix}{(request.view_args or {}).get('filename', '')}"
+        if hashed not in assets.originals and not _is_hashed_build_file(assets, hashed):
+            return None
+        return _serve_hashed(assets, hashed)
+
+    @app.after_request
+    def _cache_vendor_assets(response):
+        # Vendored files carry their version in the file name, so a browser
+        # never needs to revalidate them.
+        if request.path.startswith("/static/vendor/") and response.status_code == 200:
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        return response
+
+    return assets
@@ -7,7 +7,7 @@ from functools import wraps
 from flask import abort, current_app, session
 
 from invapp.login import current_user, login_required
-from invapp.models import User
+from invapp.principals import load_principal
 
 
 def is_superuser() -> bool:
@@ -24,12 +24,12 @@ def is_superuser() -> bool:
     except (TypeError, ValueError):
         return False
 
-    user = User.query.get(user_id)
-    if user is None:
+    principal = load_principal(user_id, verify=False)
+    if principal is None:
         return False
 
     admin_username = current_app.config.get("ADMIN_USER", "superuser")
-    return user.username == admin_username
+    return principal.username == admin_username
 
 
 def superuser_required(view_func):
@@ -0,0 +1,71 @@
+"""Persistent Jinja bytecode cache shared by the gunicorn workers.
+
+Jinja compiles each template to Python source and then to a code object the
+first time a worker renders it.  With ``JINJA_BYTECODE_CACHE_DIR`` set, the
+compiled code objects are written there and every other worker (and every
+restart) loads them instead of compiling again.  Entries are keyed by the
+template name and validated against a checksum of the template source, so an
+edited template is recompiled automatically.
+
+``flask templates compile`` compiles every template of the app and its
+blueprints into the cache at deploy time, so the first request of the day
+does not pay for compilation.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+
+from jinja2 import FileSystemBytecodeCache, TemplateError
+
+
+CACHE_PATTERN = "invapp-%s.cache"
+TEMPLATE_EXTENSIONS = (".html", ".txt", ".xml", ".jinja", ".j2")
+
+
+@dataclass
+class CompileResult:
+    compiled: list[str] = field(default_factory=list)
+    failed: dict[str, str] = field(default_factory=dict)
+
+
+def init_template_cache(app) -> FileSystemBytecodeCache | None:
+    directory = app.config.get("JINJA_BYTECODE_CACHE_DIR")
+    if not directory:
+        return None
+    try:
+        os.makedirs(directory, exist_ok=True)
+    except OSError as exc:
+        app.logger.warning("Template bytecode cache disabled (%s): %s", directory, exc)
+        return None
+    cache = FileSystemBytecodeCache(directory, pattern=CACHE_PATTERN)
+    app.jinja_env.bytecode_cache = cache
+    app.extensions["template_bytecode_cache"] = cache
+    return cache
+
+
+def compile_templates(app) -> CompileResult:
+    """Compile every template reachable through the app's Jinja loader."""
+
+    env = app.jinja_env
+    result = CompileResult()
+    with app.app_context():
+        for name in sorted(env.list_templates()):
+            if not name.endswith(TEMPLATE_EXTENSIONS):
+                continue
+            try:
+                env.get_template(name)
+            except TemplateError as exc:
+                result.failed[name] = str(exc)
+            else:
+                result.compiled.append(name)
+    return result
+
+
+def clear_template_cache(app) -> bool:
+    cache = app.extensions.get("template_bytecode_cache")
+    if cache is None:
+        return False
+    cache.clear()
+    return True
@@ -1,49 +1,209 @@
-"""Utilities for parsing tabular uploads (CSV/TSV/XLSX)."""
+"""Streaming readers for tabular uploads (CSV/TSV/XLSX).
+
+Uploads are read one row at a time straight from the uploaded stream, so an
+import only holds the row it is working on regardless of the file size.  CSV
+and TSV files are decoded incrementally; XLSX sheets are read with openpyxl's
+read-only mode, which streams the sheet XML out of the archive instead of
+building the whole workbook.
+"""
 
 from __future__ import annotations
 
 import csv
 import io
 import os
-from typing import Iterable
+import zipfile
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, Optional, TextIO
 
 from werkzeug.datastructures import FileStorage
 
 
+MAX_REPORTED_ROW_ERRORS = 20
+
+
 class TabularImportError(ValueError):
     """Raised when tabular uploads cannot be parsed."""
 
 
-def _rows_to_csv_text(rows: Iterable[Iterable[object]]) -> str:
-    output = io.StringIO()
-    writer = csv.writer(output)
-    for row in rows:
-        writer.writerow(["" if cell is None else cell for cell in row])
-    return output.getvalue()
+@dataclass(frozen=True)
+class TabularRowError:
+    line_number: int
+    message: str
 
+    def __str__(self) -> str:
+        return f"Row {self.line_number}: {self.message}"
 
-def parse_tabular_upload(file_storage: FileStorage) -> str:
-    """Return CSV text for a CSV, TSV, or XLSX upload."""
 
-    if not file_storage or not file_storage.filename:
-        raise TabularImportError("No file uploaded.")
+def _cell_text(value: object) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    return str(value)
+
+
+def normalize_headers(cells: Iterable[object]) -> list[str]:
+    """Return clean, unique header names for a header row.
+
+    Surrounding whitespace and stray byte-order marks are stripped, trailing
+    empty cells are dropped, blank headers become ``Column N`` and repeated
+    names get a ``(2)``, ``(3)``... suffix so every column stays addressable.
+    """
+
+    names = [_cell_text(cell).replace("\ufeff", "").strip() for cell in cells]
+    while names and not names[-1]:
+        names.pop()
+
+    headers: list[str] = []
+    seen: dict[str, int] = {}
+    for index, name in enumerate(names, start=1):
+        name = name or f"Column {index}"
+        count = seen.get(name, 0) + 1
+        seen[name] = count
+        headers.append(name if count == 1 else f"{name} ({count})")
+    return headers
+
+
+class TabularReader:
+    """Iterate an upload as dicts keyed by its normalized header names.
+
+    The reader mirrors :class:`csv.DictReader`: ``fieldnames`` holds the
+    headers and iterating yields one dict per data row, with missing trailing
+    cells filled with ``""``.  ``line_num`` is the 1-based row number of the
+    row last read, counting the header row.  Blank rows are skipped.  Rows
+    with more values than there are headers are skipped and reported in
+    ``errors`` (capped at ``max_errors``; ``error_count`` keeps the total).
+
+    The reader closes its source once it is exhausted; use it as a context
+    manager when it may be abandoned early.
+    """
+
+    def __init__(
+        self,
+        rows: Iterator[Iterable[object]],
+        *,
+        label: str = "CSV",
+        close: Optional[Callable[[], None]] = None,
+        max_errors: int = MAX_REPORTED_ROW_ERRORS,
+    ) -> None:
+        self._rows = rows
+        self._close = close
+        self._fieldnames: Optional[list[str]] = None
+        self.label = label
+        self.line_num = 0
+        self.errors: list[TabularRowError] = []
+        self.error_count = 0
+        self.max_errors = max_errors
+
+    def __enter__(self) -> "TabularReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        close, self._close = self._close, None
+        if close is not None:
+            close()
+
+    def _next_cells(self) -> Optional[list[str]]:
+        while True:
+            try:
+                cells = next(self._rows)
+            except StopIteration:
+                return None
+            except UnicodeDecodeError as exc:
+                raise TabularImportError(
+                    f"{self.label} import files must be UTF-8 encoded."
+                ) from exc
+            except csv.Error as exc:
+                self.line_num += 1
+                self._record_error(f"could not be parsed ({exc}).")
+                continue
+            self.line_num += 1
+            return [_cell_text(cell) for cell in cells]
+
+    def _record_error(self, message: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append(TabularRowError(self.line_num, message))
+
+    @property
+    def fieldnames(self) -> list[str]:
+        if self._fieldnames is None:
+            self._fieldnames = []
+            while True:
+                cells = self._next_cells()
+                if cells is None:
+                    break
+                if any(cell.strip() for cell in cells):
+                    self._fieldnames = normalize_headers(cells)
+                    break
+        return self._fieldnames
+
+    def __iter__(self) -> "TabularReader":
+        return self
+
+    def __next__(self) -> dict[str, str]:
+        headers = self.fieldnames
+        while True:
+            cells = self._next_cells()
+            if cells is None:
+                self.close()
+                raise StopIteration
+            if not any(cell.strip() for cell in cells):
+                continue
+            if len(cells) > len(headers) and any(
+                cell.strip() for cell in cells[len(headers):]
+            ):
+                self._record_error(
+                    f"has {len(cells)} values but the header has {len(headers)} columns."
+                )
+                continue
+            cells.extend([""] * (len(headers) - len(cells)))
+            return dict(zip(headers, cells))
+
+    def rows(self) -> Iterator[list[str]]:
+        """Yield raw rows as lists of strings, without header handling.
 
-    _, ext = os.path.splitext(file_storage.filename)
+        For files that are not a single header plus records, such as exports
+        with several sections.  Do not combine with ``fieldnames``.
+        """
+
+        while True:
+            cells = self._next_cells()
+            if cells is None:
+                self.close()
+                return
+            yield cells
+
+    def format_errors(self, limit: int = 5) -> str:
+        preview = "; ".join(str(error) for error in self.errors[:limit])
+        hidden = self.error_count - min(limit, len(self.errors))
+        return preview + (f" (and {hidden} more)" if hidden > 0 else "")
+
+
+def open_tabular_stream(stream, filename: str, *, close_stream: bool = False) -> TabularReader:
+    """Return a :class:`TabularReader` over a binary ``stream``.
+
+    The format is chosen from the extension of ``filename``.
+    """
+
+    _, ext = os.path.splitext(filename or "")
     ext = ext.lower()
 
-    if ext == ".csv":
-        try:
-            return file_storage.stream.read().decode("utf-8-sig")
-        except UnicodeDecodeError as exc:
-            raise TabularImportError("CSV import files must be UTF-8 encoded.") from exc
+    if ext in (".csv", ".tsv"):
+        text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+        reader = csv.reader(text, delimiter="\t" if ext == ".tsv" else ",")
 
-    if ext == ".tsv":
-        try:
-            text = file_storage.stream.read().decode("utf-8-sig")
-        except UnicodeDecodeError as exc:
-            raise TabularImportError("TSV import files must be UTF-8 encoded.") from exc
-        reader = csv.reader(io.StringIO(text), delimiter="\t")
-        return _rows_to_csv_text(reader)
+        def close_text() -> None:
+            if close_stream:
+                text.close()
+            else:
+                text.detach()
+
+        return TabularReader(reader, label=ext[1:].upper(), close=close_text)
 
     if ext == ".xlsx":
         try:
@@ -51,22 +211,71 @@ def parse_tabular_upload(file_storage: FileStorage) -> str:
         except ImportError as exc:  # pragma: no cover - dependency is required at runtime
             raise TabularImportError("XLSX uploads require openpyxl to be installed.") from exc
 
-        data = file_storage.stream.read()
-        workbook = load_workbook(filename=io.BytesIO(data), read_only=True, data_only=True)
+        try:
+            workbook = load_workbook(filename=stream, read_only=True, data_only=True)
+        except (zipfile.BadZipFile, KeyError, OSError, ValueError) as exc:
+            raise TabularImportError("The XLSX file could not be read.") from exc
         sheet = workbook.active
-        return _rows_to_csv_text(sheet.iter_rows(values_only=True))
+
+        def close_workbook() -> None:
+            workbook.close()
+            if close_stream:
+                stream.close()
+
+        return TabularReader(
+            sheet.iter_rows(values_only=True), label="XLSX", close=close_workbook
+        )
 
     raise TabularImportError("Unsupported file type. Upload a CSV, TSV, or XLSX file.")
 
 
-def preview_csv_text(csv_text: str, max_rows: int = 50) -> tuple[list[str], list[list[str]]]:
-    """Return headers and a preview of rows from CSV text."""
+def open_tabular_upload(file_storage: FileStorage) -> TabularReader:
+    """Return a streaming reader for a CSV, TSV, or XLSX upload."""
+
+    if not file_storage or not file_storage.filename:
+        raise TabularImportError("No file uploaded.")
+    return open_tabular_stream(file_storage.stream, file_storage.filename)
+
+
+def open_tabular_file(path: str) -> TabularReader:
+    """Return a streaming reader for a CSV, TSV, or XLSX file on disk."""
+
+    handle = open(path, "rb")
+    try:
+        return open_tabular_stream(handle, path, close_stream=True)
+    except Exception:
+        handle.close()
+        raise
+
+
+def copy_to_csv(reader: TabularReader, handle: TextIO) -> int:
+    """Write the header and rows of ``reader`` to ``handle`` as CSV.
+
+    Returns the number of data rows written.  Used to stage an upload in its
+    normalized form so later steps can re-read it as plain CSV.
+    """
+
+    headers = reader.fieldnames
+    writer = csv.writer(handle)
+    if not headers:
+        return 0
+    writer.writerow(headers)
+    count = 0
+    for row in reader:
+        writer.writerow([row[header] for header in headers])
+        count += 1
+    return count
+
+
+def preview_rows(
+    reader: TabularReader, max_rows: int = 50
+) -> tuple[list[str], list[list[str]]]:
+    """Return the headers and up to ``max_rows`` leading rows of ``reader``."""
 
-    reader = csv.reader(io.StringIO(csv_text))
-    headers = next(reader, [])
-    preview_rows: list[list[str]] = []
-    for idx, row in enumerate(reader):
-        if idx >= max_rows:
+    headers = reader.fieldnames
+    sample: list[list[str]] = []
+    for row in reader:
+        sample.append([row[header] for header in headers])
+        if len(sample) >= max_rows:
             break
-        preview_rows.append(["" if cell is None else str(cell) for cell in row])
-    return headers, preview_rows
+    return headers, sample
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+"""Measure gate part-number decoding throughput.
+
+The part numbers exercised by ``tests/test_gate_parser.py`` are used as the
+workload so the benchmark tracks the same formats the test suite covers.
+"""
+from __future__ import annotations
+
+import argparse
+import ast
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from invapp import gate_parser  # noqa: E402
+
+FIXTURE_PATH = PROJECT_ROOT / "tests" / "test_gate_parser.py"
+
+
+def load_fixture_part_numbers(path: Path = FIXTURE_PATH) -> list[str]:
+    """Collect the literal part numbers passed to the parser in the test module."""
+
+    tree = ast.parse(path.read_text(encoding="utf-8"))
+    part_numbers: list[str] = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call):
+            func_name = getattr(node.func, "id", None)
+            if func_name == "parse_gate_part_number":
+                part_numbers.extend(
+                    arg.value
+                    for arg in node.args
+                    if isinstance(arg, ast.Constant) and isinstance(arg.value, str)
+                )
+        elif isinstance(node, ast.Dict):
+            for key, value in zip(node.keys, node.values):
+                if not (isinstance(key, ast.Constant) and key.value == "part_number"):
+                    continue
+                if isinstance(value, ast.Constant) and isinstance(value.value, str):
+                    part_numbers.append(value.value)
+    return sorted(set(part_numbers))
+
+
+def _run(label: str, workload: list[str], parse, *, clear_cache: bool) -> dict:
+    if clear_cache:
+        gate_parser.clear_gate_parser_cache()
+    started = time.perf_counter()
+    parse(workload)
+    elapsed = time.perf_counter() - started
+    rate = len(workload) / elapsed if elapsed else float("inf")
+    return {"label": label, "count": len(workload), "seconds": elapsed, "per_second": rate}
+
+
+def _parse_uncached(workload: list[str]) -> None:
+    for part_number in workload:
+        try:
+            gate_parser._parse_normalized(part_number.strip().upper())
+        except gate_parser.GatePartNumberError:
+            pass
+
+
+def _parse_single(workload: list[str]) -> None:
+    for part_number in workload:
+        try:
+            gate_parser.parse_gate_part_number(part_number)
+        except gate_parser.GatePartNumberError:
+            pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        default=2000,
+        help="How many times the fixture list is repeated (default: 2000).",
+    )
+    args = parser.parse_args()
+
+    fixtures = load_fixture_part_numbers()
+    if not fixtures:
+        raise SystemExit(f"No part numbers found in {FIXTURE_PATH}")
+    workload = fixtures * max(1, args.iterations)
+
+    results = [
+        _run("uncached decode", workload, _parse_uncached, clear_cache=True),
+        _run("memoized single", workload, _parse_single, clear_cache=True),
+        _run(
+            "memoized batch",
+            workload,
+            gate_parser.parse_gate_part_numbers,
+            clear_cache=True,
+        ),
+    ]
+
+    print(f"{len(fixtures)} fixture part numbers x {args.iterations} iterations")
+    for result in results:
+        print(
+            f"{result['label']:<18} {result['count']:>9} parses "
+            f"{result['seconds'] * 1000:>9.1f} ms {result['per_second']:>12,.0f}/s"
+        )
+    info = gate_parser.gate_parser_cache_info()
+    print(f"cache: hits={info.hits} misses={info.misses} size={info.currsize}/{info.maxsize}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+"""Measure physical inventory ERP matching against a synthetic item master.
+
+An in-memory SQLite database is seeded with ``--items`` items and an ERP export
+of ``--rows`` rows is generated (mostly exact matches, plus duplicate names that
+need a secondary column, and a share of unknown values).  The benchmark reports
+the cold run that builds the item key table and parses the upload, followed by
+warm "test matching" runs that reuse both.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import random
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from invapp import create_app  # noqa: E402
+from invapp.extensions import db  # noqa: E402
+from invapp.models import Item  # noqa: E402
+from invapp.services import physical_inventory  # noqa: E402
+from invapp.services.physical_inventory import (  # noqa: E402
+    NormalizationOptions,
+    ParsedUpload,
+    match_upload_rows,
+)
+
+
+def _seed_items(count: int) -> None:
+    rows = []
+    for index in range(count):
+        # Every 50th name is shared by two items so the secondary column matters.
+        name = f"Part {index // 2 if index % 50 < 2 else index:06d}"
+        rows.append(
+            {
+                "sku": f"BM-{index:06d}",
+                "name": name,
+                "description": f"Description {index:06d}",
+            }
+        )
+    db.session.bulk_insert_mappings(Item, rows)
+    db.session.commit()
+
+
+def _build_upload(row_count: int, item_count: int, seed: int) -> str:
+    rng = random.Random(seed)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["Item Name", "Item Description", "On Hand"])
+    for _ in range(row_count):
+        index = rng.randrange(item_count)
+        if rng.random() < 0.05:
+            writer.writerow([f"Unknown {index}", "", rng.randint(0, 50)])
+            continue
+        name = f"Part {index // 2 if index % 50 < 2 else index:06d}"
+        writer.writerow([f" {name.lower()} ", f"Description {index:06d}", rng.randint(0, 50)])
+    return buffer.getvalue()
+
+
+def _timed(label: str, func) -> tuple[str, float, dict]:
+    started = time.perf_counter()
+    result = func()
+    return label, time.perf_counter() - started, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=30000, help="Items to seed (default: 30000).")
+    parser.add_argument("--rows", type=int, default=50000, help="ERP rows (default: 50000).")
+    parser.add_argument(
+        "--warm-runs", type=int, default=3, help="Repeated test-matching runs (default: 3)."
+    )
+    parser.add_argument("--seed", type=int, default=1, help="Random seed (default: 1).")
+    args = parser.parse_args()
+
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"})
+    with app.app_context():
+        db.create_all()
+        _seed_items(args.items)
+        csv_text = _build_upload(args.rows, args.items, args.seed)
+        options = NormalizationOptions()
+
+        def _match(upload):
+            return match_upload_rows(
+                upload,
+                primary_upload_column="Item Name",
+                primary_item_field="name",
+                quantity_column="On Hand",
+                options=options,
+                secondary_upload_column="Item Description",
+                secondary_item_field="description",
+            )
+
+        timings = []
+        physical_inventory.clear_match_key_tables()
+        upload = None
+
+        def _cold():
+            nonlocal upload
+            upload = ParsedUpload.from_csv_text(csv_text)
+            return _match(upload)
+
+        timings.append(_timed("cold (parse + key tables)", _cold))
+        for run in range(1, max(0, args.warm_runs) + 1):
+            timings.append(_timed(f"warm run {run}", lambda: _match(upload)))
+
+    print(f"{args.rows} ERP rows against {args.items} items")
+    for label, seconds, result in timings:
+        print(
+            f"{label:<26} {seconds * 1000:>9.1f} ms  "
+            f"matched={result['matched_count']} "
+            f"unmatched={result['unmatched_count']} "
+            f"ambiguous={result['ambiguous_count']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+"""Measure offline ZPL rasterization throughput for the built-in label templates.
+
+Each registered label template is rendered with its designer sample data (or an
+empty context) at 203 and 300 dpi.  Parsing/drawing and PNG encoding are timed
+separately, and a final pass through ``LabelPreviewCache`` shows the cost of a
+cache hit.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from invapp.printing import labels, previews, zpl_raster  # noqa: E402
+
+
+def load_workload() -> list[tuple[str, str]]:
+    """Return ``(template name, zpl)`` pairs for every registered template."""
+
+    samples = {
+        config.template_name: config.sample_context for config in labels.iter_designer_labels()
+    }
+    workload = []
+    for name, template in sorted(labels.LABEL_DEFINITIONS.items()):
+        workload.append((name, template.render(samples.get(name, {}))))
+    return workload
+
+
+def _time(callable_, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        callable_()
+    return (time.perf_counter() - started) / iterations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        default=20,
+        help="Renders per template and resolution (default: 20).",
+    )
+    args = parser.parse_args()
+    iterations = max(1, args.iterations)
+
+    workload = load_workload()
+    print(f"{len(workload)} templates x {iterations} iterations")
+    print(f"{'template':<34} {'dpi':>4} {'raster ms':>10} {'png ms':>8} {'labels/s':>9}")
+    for dpi in zpl_raster.SUPPORTED_DPI:
+        total = 0.0
+        for name, zpl in workload:
+            bitmap = zpl_raster.rasterize(zpl, dpi=dpi)
+            raster = _time(lambda: zpl_raster.rasterize(zpl, dpi=dpi), iterations)
+            encode = _time(lambda: zpl_raster.encode_png(bitmap, dpi=dpi), iterations)
+            total += raster + encode
+            print(
+                f"{name:<34} {dpi:>4} {raster * 1000:>10.2f} {encode * 1000:>8.2f} "
+                f"{1 / (raster + encode):>9.1f}"
+            )
+        print(f"{'all templates':<34} {dpi:>4} {'':>10} {'':>8} {len(workload) / total:>9.1f}")
+
+    cache = previews.LabelPreviewCache()
+    name, zpl = workload[0]
+    key = ("benchmark", name, zpl_raster.DEFAULT_DPI)
+    cache.put(key, zpl_raster.render_zpl_png(zpl))
+    hit = _time(lambda: cache.get(key), iterations * 100)
+    print(f"cache hit: {hit * 1_000_000:.2f} us")
+
+
+if __name__ == "__main__":
+    main()
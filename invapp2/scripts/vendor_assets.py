@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+"""Download pinned third-party browser assets into ``invapp/static/vendor``.
+
+Each asset is fetched once from its pinned URL, and its SHA-256 is checked
+against ``invapp/static/vendor/vendor.lock.json``.  When an asset has no
+recorded digest yet (a new pin), ``--update-lock`` records it.  The file names
+carry the version, so the static route can serve them with immutable caching.
+
+Run it on a machine with internet access and commit the downloaded files and
+the lock file.  The plant-floor servers never reach the CDN.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import sys
+import urllib.request
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+VENDOR_DIR = PROJECT_ROOT / "invapp" / "static" / "vendor"
+LOCK_PATH = VENDOR_DIR / "vendor.lock.json"
+
+VENDOR_ASSETS = (
+    {
+        "name": "zxing-browser",
+        "version": "0.1.5",
+        "url": "https://unpkg.com/@zxing/browser@0.1.5/umd/zxing-browser.min.js",
+        "filename": "zxing-browser-0.1.5.min.js",
+    },
+)
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def load_lock() -> dict[str, str]:
+    if not LOCK_PATH.exists():
+        return {}
+    return json.loads(LOCK_PATH.read_text())
+
+
+def sync_assets(*, update_lock: bool = False, check_only: bool = False) -> int:
+    lock = load_lock()
+    failures = 0
+    for asset in VENDOR_ASSETS:
+        target = VENDOR_DIR / asset["filename"]
+        expected = lock.get(asset["filename"])
+        if target.exists():
+            digest = _sha256(target.read_bytes())
+            if expected and digest != expected:
+                print(f"[error] {target.name}: digest {digest} does not match lock {expected}")
+                failures += 1
+            elif not expected and update_lock:
+                lock[asset["filename"]] = digest
+                print(f"[lock] {target.name}: recorded {digest}")
+            else:
+                print(f"[ok] {target.name}")
+            continue
+        if check_only:
+            print(f"[missing] {target.name}")
+            failures += 1
+            continue
+
+        print(f"[fetch] {asset['url']}")
+        try:
+            with urllib.request.urlopen(asset["url"], timeout=30) as response:
+                data = response.read()
+        except OSError as exc:
+            print(f"[error] {asset['name']}: {exc}")
+            failures += 1
+            continue
+        digest = _sha256(data)
+        if expected and digest != expected:
+            print(f"[error] {asset['name']}: downloaded digest {digest} != lock {expected}")
+            failures += 1
+            continue
+        if not expected:
+            if not update_lock:
+                print(f"[error] {asset['name']}: no locked digest; rerun with --update-lock")
+                failures += 1
+                continue
+            lock[asset["filename"]] = digest
+        VENDOR_DIR.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(data)
+        print(f"[ok] {target.name} ({len(data)} bytes, sha256 {digest})")
+
+    if update_lock:
+        VENDOR_DIR.mkdir(parents=True, exist_ok=True)
+        LOCK_PATH.write_text(json.dumps(lock, indent=2, sort_keys=True) + "\n")
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--update-lock",
+        action="store_true",
+        help="Record digests for assets that are not in the lock file yet.",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Only verify that every pinned asset is present and matches the lock.",
+    )
+    args = parser.parse_args()
+    failures = sync_assets(update_lock=args.update_lock, check_only=args.check)
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
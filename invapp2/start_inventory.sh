@@ -28,6 +28,7 @@ fi
 HOST="${HOST:-0.0.0.0}"
 PORT="${PORT:-8000}"
 WORKERS="${GUNICORN_WORKERS:-2}"
+THREADS="${GUNICORN_THREADS:-1}"
 TIMEOUT="${GUNICORN_TIMEOUT:-600}"
 
 if [ "${ENABLE_OPS_MONITOR:-1}" != "0" ]; then
@@ -49,5 +50,17 @@ fi
 
 cd "$PROJECT_ROOT"
 
+if ! python scripts/vendor_assets.py --check >/dev/null; then
+  echo "[warning] Vendored browser assets are missing; barcode scanning will not work until scripts/vendor_assets.py is run"
+fi
+
+echo "[setup] Fingerprinting static assets"
+python -m flask --app app assets build
+
+echo "[setup] Precompiling templates into the shared bytecode cache"
+python -m flask --app app templates compile
+
 echo "[run] Starting Hyperion Operations Console Host via Gunicorn"
-exec gunicorn --bind "$HOST:$PORT" --workers "$WORKERS" --timeout "$TIMEOUT" "$APP_MODULE"
+# GUNICORN_WORKERS/GUNICORN_THREADS also size each worker's database pool.
+export GUNICORN_WORKERS="$WORKERS" GUNICORN_THREADS="$THREADS"
+exec gunicorn --bind "$HOST:$PORT" --workers "$WORKERS" --threads "$THREADS" --timeout "$TIMEOUT" "$APP_MODULE"
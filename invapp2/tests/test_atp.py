@@ -0,0 +1,181 @@
+import os
+import sys
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from invapp import create_app
+from invapp.extensions import db
+from invapp.models import (
+    AtpAllocation,
+    AtpDirtyMark,
+    AtpItem,
+    Item,
+    Location,
+    Movement,
+    Order,
+    OrderComponent,
+    OrderLine,
+    OrderStatus,
+    Reservation,
+)
+from invapp.services import atp
+
+
+@pytest.fixture
+def app():
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"})
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.post("/auth/login", data={"username": "superuser", "password": "joshbaldus"})
+    return client
+
+
+@pytest.fixture
+def plant(app):
+    finished = Item(sku="FG-ATP", name="Gate")
+    panel = Item(sku="PANEL", name="Panel")
+    post = Item(sku="POST", name="Post")
+    location = Location(code="ATP-MAIN")
+    db.session.add_all([finished, panel, post, location])
+    db.session.flush()
+
+    def make_order(number, priority, status=OrderStatus.OPEN, promised=None, quantity=1):
+        order = Order(
+            order_number=number, priority=priority, status=status, promised_date=promised
+        )
+        line = OrderLine(item=finished, quantity=quantity)
+        order.order_lines.append(line)
+        line.components.append(OrderComponent(component_item=panel, quantity=4))
+        line.components.append(OrderComponent(component_item=post, quantity=1))
+        db.session.add(order)
+        return order, line
+
+    urgent, _ = make_order("ATP-1", 1, promised=date(2026, 1, 5))
+    later, later_line = make_order("ATP-2", 2, promised=date(2026, 2, 1))
+    waiting, _ = make_order("ATP-3", 3, status=OrderStatus.WAITING_MATERIAL)
+    make_order("ATP-CLOSED", 0, status=OrderStatus.CLOSED)
+    db.session.add_all(
+        [
+            Movement(item=panel, location=location, quantity=10, movement_type="RECEIPT"),
+            Movement(item=post, location=location, quantity=5, movement_type="RECEIPT"),
+            # The later order holds a reservation that outranks priority.
+            Reservation(order_line=later_line, item=panel, quantity=4),
+        ]
+    )
+    db.session.commit()
+    return {
+        "panel": panel.id,
+        "post": post.id,
+        "location": location.id,
+        "urgent": urgent.id,
+        "later": later.id,
+        "waiting": waiting.id,
+    }
+
+
+def _allocation(order_id, item_id):
+    return AtpAllocation.query.filter_by(order_id=order_id, item_id=item_id).one()
+
+
+def test_rebuild_allocates_reservations_then_priority(app, plant):
+    atp.rebuild_atp()
+
+    # 10 panels: 4 reserved by ATP-2, then ATP-1 (priority 1) gets 4, ATP-3 the last 2.
+    assert _allocation(plant["later"], plant["panel"]).allocated == Decimal("4")
+    assert _allocation(plant["urgent"], plant["panel"]).allocated == Decimal("4")
+    waiting = _allocation(plant["waiting"], plant["panel"])
+    assert waiting.allocated == Decimal("2")
+    assert waiting.shortage == Decimal("2")
+    assert _allocation(plant["waiting"], plant["post"]).shortage == Decimal("0")
+
+    panel = db.session.get(AtpItem, plant["panel"])
+    assert (panel.on_hand, panel.demand, panel.shortage, panel.short_orders) == (
+        Decimal("10"),
+        Decimal("12"),
+        Decimal("2"),
+        1,
+    )
+    post = db.session.get(AtpItem, plant["post"])
+    assert post.available == Decimal("2")
+    assert AtpAllocation.query.count() == 6
+    assert AtpDirtyMark.query.count() == 0
+
+
+def test_refresh_recomputes_only_marked_items(app, plant):
+    atp.rebuild_atp()
+    post_computed = db.session.get(AtpItem, plant["post"]).computed_at
+
+    db.session.add(
+        Movement(
+            item_id=plant["panel"],
+            location_id=plant["location"],
+            quantity=2,
+            movement_type="RECEIPT",
+        )
+    )
+    db.session.commit()
+    assert AtpDirtyMark.query.filter_by(item_id=plant["panel"]).count() == 1
+
+    result = atp.refresh_atp()
+    assert result["items"] == 1
+    assert _allocation(plant["waiting"], plant["panel"]).shortage == Decimal("0")
+    assert db.session.get(AtpItem, plant["post"]).computed_at == post_computed
+    assert AtpDirtyMark.query.count() == 0
+
+    # Closing an order releases its stock to the rest of the queue.
+    db.session.add(
+        Movement(
+            item_id=plant["panel"],
+            location_id=plant["location"],
+            quantity=-4,
+            movement_type="ADJUST",
+        )
+    )
+    db.session.commit()
+    atp.refresh_atp()
+    assert _allocation(plant["waiting"], plant["panel"]).shortage == Decimal("4")
+
+    order = db.session.get(Order, plant["urgent"])
+    order.status = OrderStatus.CLOSED
+    db.session.commit()
+    atp.refresh_atp()
+    assert AtpAllocation.query.filter_by(order_id=plant["urgent"]).count() == 0
+    assert _allocation(plant["waiting"], plant["panel"]).shortage == Decimal("0")
+
+
+def test_shortage_view_and_api(client, plant):
+    response = client.get("/orders/shortages")
+    assert response.status_code == 200
+    html = response.get_data(as_text=True)
+    assert "PANEL" in html and "ATP-3" in html
+    assert "ATP-1" not in html
+
+    payload = client.get(f"/orders/api/atp/orders/{plant['waiting']}").get_json()
+    assert payload["short"] is True
+    assert {row["sku"]: row["shortage"] for row in payload["components"]} == {
+        "PANEL": 2.0,
+        "POST": 0.0,
+    }
+
+    item_payload = client.get(f"/orders/api/atp/items/{plant['panel']}").get_json()
+    assert item_payload["shortage"] == 2.0
+    assert [row["order_number"] for row in item_payload["orders"]] == [
+        "ATP-1",
+        "ATP-2",
+        "ATP-3",
+    ]
+
+    shortages = client.get("/orders/api/atp/shortages").get_json()["shortages"]
+    assert [(row["order_number"], row["sku"]) for row in shortages] == [("ATP-3", "PANEL")]
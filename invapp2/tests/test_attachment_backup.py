@@ -0,0 +1,84 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from invapp.services.attachment_backup import AttachmentStore
+
+
+def _write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return path
+
+
+def _object_count(store):
+    return sum(1 for path in store.objects_dir.rglob("*") if path.is_file())
+
+
+def test_snapshots_store_each_content_once_and_skip_unchanged_files(tmp_path):
+    uploads = tmp_path / "uploads"
+    _write(uploads / "a.pdf", b"alpha")
+    _write(uploads / "nested" / "copy-of-a.pdf", b"alpha")
+    _write(uploads / "b.jpg", b"bravo" * 100)
+    store = AttachmentStore(tmp_path / "store")
+
+    first = store.snapshot("run1", {"ITEM": uploads})
+    assert first.stats.files == 3
+    assert first.stats.hashed == 3
+    assert first.stats.new_objects == 2
+    assert _object_count(store) == 2
+
+    second = store.snapshot("run2", {"ITEM": uploads})
+    assert second.stats.hashed == 0
+    assert second.stats.new_objects == 0
+
+    changed = _write(uploads / "b.jpg", b"charlie")
+    os.utime(changed, ns=(1, 1))
+    third = store.snapshot("run3", {"ITEM": uploads})
+    assert third.stats.hashed == 1
+    assert third.stats.new_objects == 1
+    assert third.stats.new_bytes == len(b"charlie")
+
+
+def test_restore_rebuilds_point_in_time_snapshot(tmp_path):
+    uploads = tmp_path / "uploads"
+    _write(uploads / "doc.pdf", b"version one")
+    store = AttachmentStore(tmp_path / "store")
+    store.snapshot("run1", {"ITEM": uploads})
+
+    _write(uploads / "doc.pdf", b"version two!")
+    _write(uploads / "new.pdf", b"later file")
+    store.snapshot("run2", {"ITEM": uploads})
+
+    target = tmp_path / "restored"
+    assert store.restore("run1", {"ITEM": target}) == 1
+    assert (target / "doc.pdf").read_bytes() == b"version one"
+    assert not (target / "new.pdf").exists()
+
+    assert store.restore("run2", {"ITEM": target}) == 2
+    assert (target / "doc.pdf").read_bytes() == b"version two!"
+    assert (target / "new.pdf").read_bytes() == b"later file"
+
+
+def test_prune_drops_expired_manifests_and_unreferenced_objects(tmp_path):
+    uploads = tmp_path / "uploads"
+    store = AttachmentStore(tmp_path / "store")
+    now = datetime(2024, 6, 1)
+
+    _write(uploads / "doc.pdf", b"old contents")
+    store.snapshot("run1", {"ITEM": uploads}, now=now - timedelta(days=60))
+    os.utime(store.manifest_path("run1"), (1, 1))
+    _write(uploads / "doc.pdf", b"new contents")
+    store.snapshot("run2", {"ITEM": uploads}, now=now)
+
+    removed = store.prune(retention_days=30, keep_min=1, now=now)
+
+    assert removed["manifests"] == 1
+    assert removed["objects"] == 1
+    assert not store.manifest_path("run1").exists()
+    assert _object_count(store) == 1
+    target = tmp_path / "restored"
+    store.restore("run2", {"ITEM": target})
+    assert (target / "doc.pdf").read_bytes() == b"new contents"
@@ -0,0 +1,216 @@
+import io
+import os
+import sys
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from invapp import create_app
+from invapp.extensions import db
+from invapp.models import PurchaseRequest, PurchaseRequestAttachment, WorkInstruction
+from invapp.services import attachment_store
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app(
+        {
+            "TESTING": True,
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+            "PURCHASING_ATTACHMENT_UPLOAD_FOLDER": str(tmp_path / "purchasing"),
+        }
+    )
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.post(
+        "/auth/login",
+        data={"username": "superuser", "password": "joshbaldus"},
+        follow_redirects=True,
+    )
+    return client
+
+
+def _purchase_request():
+    purchase_request = PurchaseRequest(title="Bearings", requested_by="Production")
+    db.session.add(purchase_request)
+    db.session.commit()
+    return purchase_request
+
+
+def _upload(client, request_id, payload, name="quote.pdf"):
+    return client.post(
+        f"/purchasing/{request_id}/attachments",
+        data={"attachment": (io.BytesIO(payload), name)},
+        content_type="multipart/form-data",
+    )
+
+
+def _stored_files(app):
+    folder = app.config["PURCHASING_ATTACHMENT_UPLOAD_FOLDER"]
+    return sorted(name for name in os.listdir(folder) if not name.startswith("."))
+
+
+def test_identical_uploads_share_one_file_until_last_release(app, client):
+    first = _purchase_request()
+    second = _purchase_request()
+    _upload(client, first.id, b"%PDF quote")
+    _upload(client, second.id, b"%PDF quote", name="copy.pdf")
+
+    attachments = PurchaseRequestAttachment.query.order_by(PurchaseRequestAttachment.id).all()
+    assert len(attachments) == 2
+    assert attachments[0].filename == attachments[1].filename
+    assert attachments[1].original_name == "copy.pdf"
+    assert _stored_files(app) == [attachments[0].filename]
+
+    client.post(f"/purchasing/{first.id}/attachments/{attachments[0].id}/delete")
+    assert _stored_files(app) == [attachments[1].filename]
+
+    client.post(f"/purchasing/{second.id}/attachments/{attachments[1].id}/delete")
+    assert _stored_files(app) == []
+
+
+def test_store_upload_enforces_limit_while_streaming(app):
+    folder = app.config["PURCHASING_ATTACHMENT_UPLOAD_FOLDER"]
+    upload = FileStorage(stream=io.BytesIO(b"x" * 4096), filename="big.pdf")
+
+    with pytest.raises(attachment_store.AttachmentTooLarge):
+        attachment_store.store_upload("purchasing", upload, max_bytes=1024)
+
+    assert os.listdir(folder) == []
+
+
+def test_download_supports_range_requests(app, client):
+    purchase_request = _purchase_request()
+    _upload(client, purchase_request.id, b"0123456789")
+    attachment = PurchaseRequestAttachment.query.one()
+
+    response = client.get(
+        f"/purchasing/{purchase_request.id}/attachments/{attachment.id}/download",
+        headers={"Range": "bytes=2-5"},
+    )
+
+    assert response.status_code == 206
+    assert response.data == b"2345"
+    assert "quote.pdf" in response.headers["Content-Disposition"]
+
+
+def test_release_waits_for_commit(app, client):
+    purchase_request = _purchase_request()
+    _upload(client, purchase_request.id, b"%PDF quote")
+    attachment = PurchaseRequestAttachment.query.one()
+
+    attachment_store.release("purchasing", PurchaseRequestAttachment, attachment.filename)
+    db.session.delete(attachment)
+    db.session.flush()
+    db.session.rollback()
+    assert _stored_files(app) == [attachment.filename]
+
+    attachment = PurchaseRequestAttachment.query.one()
+    attachment_store.release("purchasing", PurchaseRequestAttachment, attachment.filename)
+    db.session.delete(attachment)
+    db.session.commit()
+    assert _stored_files(app) == []
+    assert attachment_store.release_failures() == []
+
+
+def test_deduplicated_upload_survives_concurrent_release(app, client):
+    purchase_request = _purchase_request()
+    _upload(client, purchase_request.id, b"%PDF quote")
+    existing = PurchaseRequestAttachment.query.one()
+    folder = app.config["PURCHASING_ATTACHMENT_UPLOAD_FOLDER"]
+
+    upload = FileStorage(stream=io.BytesIO(b"%PDF quote"), filename="copy.pdf")
+    stored = attachment_store.store_upload("purchasing", upload)
+    assert stored.deduplicated
+    # Another worker releases the last committed reference in the meantime.
+    os.remove(os.path.join(folder, existing.filename))
+
+    db.session.add(
+        PurchaseRequestAttachment(
+            request_id=purchase_request.id,
+            filename=stored.filename,
+            original_name=stored.original_name,
+        )
+    )
+    db.session.commit()
+    assert _stored_files(app) == [stored.filename]
+    assert not [name for name in os.listdir(folder) if name.startswith(".upload-")]
+
+
+def test_downloads_are_not_publicly_cacheable(app, client):
+    purchase_request = _purchase_request()
+    _upload(client, purchase_request.id, b"%PDF private")
+    attachment = PurchaseRequestAttachment.query.one()
+    url = f"/purchasing/{purchase_request.id}/attachments/{attachment.id}/download"
+
+    for prefix in (None, "/protected-attachments/"):
+        app.config["ATTACHMENT_ACCEL_REDIRECT_PREFIX"] = prefix
+        cache_control = client.get(url).headers["Cache-Control"]
+        assert "private" in cache_control
+        assert "public" not in cache_control
+        assert "max-age" not in cache_control
+
+
+def test_download_is_offloaded_with_accel_redirect(app, client):
+    app.config["ATTACHMENT_ACCEL_REDIRECT_PREFIX"] = "/protected-attachments/"
+    purchase_request = _purchase_request()
+    _upload(client, purchase_request.id, b"%PDF offloaded")
+    attachment = PurchaseRequestAttachment.query.one()
+
+    response = client.get(
+        f"/purchasing/{purchase_request.id}/attachments/{attachment.id}/download"
+    )
+
+    assert response.status_code == 200
+    assert response.data == b""
+    assert response.headers["X-Accel-Redirect"] == (
+        f"/protected-attachments/purchasing/{attachment.filename}"
+    )
+    assert "quote.pdf" in response.headers["Content-Disposition"]
+
+
+def test_work_instructions_download_through_the_attachment_store(app, client, tmp_path):
+    app.config["WORK_INSTRUCTION_UPLOAD_FOLDER"] = str(tmp_path / "work")
+    response = client.post(
+        "/work/instructions/upload",
+        data={"file": (io.BytesIO(b"%PDF steps"), "Line 3 setup.pdf")},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 302
+    instruction = WorkInstruction.query.one()
+    download_url = f"/work/instructions/{instruction.id}/download"
+    assert download_url in client.get("/work/instructions").get_data(as_text=True)
+
+    response = client.get(download_url)
+    assert response.status_code == 200
+    assert response.data == b"%PDF steps"
+    assert response.headers["Content-Disposition"].startswith("inline")
+
+    app.config["ATTACHMENT_ACCEL_REDIRECT_PREFIX"] = "/protected-attachments/"
+    response = client.get(download_url)
+    assert response.headers["X-Accel-Redirect"] == (
+        f"/protected-attachments/work_instruction/{instruction.filename}"
+    )
+
+
+def test_failed_work_instruction_upload_is_reported(app, client):
+    app.config["WORK_INSTRUCTION_UPLOAD_FOLDER"] = None
+    response = client.post(
+        "/work/instructions/upload",
+        data={"file": (io.BytesIO(b"%PDF steps"), "setup.pdf")},
+        content_type="multipart/form-data",
+        follow_redirects=True,
+    )
+    assert response.status_code == 200
+    assert b"Attachment upload folder is not configured." in response.data
+    assert WorkInstruction.query.count() == 0
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+import io
 import os
 import sys
+import tarfile
 from pathlib import Path
 
 import pytest
@@ -11,6 +13,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 from invapp import create_app
 from invapp.extensions import db
 from invapp.models import Role, User
+from invapp.services import backup_service
 
 
 @pytest.fixture
@@ -80,3 +83,43 @@ def test_auto_backup_downloads_file(client, app, tmp_path: Path):
     response = client.get(f"/admin/settings/backups/auto/download/{backup_name}")
     assert response.status_code == 200
     assert response.data == b"backup-data"
+
+
+def test_auto_backups_list_download_and_delete_directory_dumps(client, app, tmp_path: Path):
+    _create_admin_user(app, "jane", "pw123")
+    _login(client, "jane", "pw123")
+
+    dump_name = "backup_2024-01-01_0101_copy1.dumpdir"
+    dump_dir = tmp_path / dump_name
+    dump_dir.mkdir()
+    (dump_dir / "toc.dat").write_bytes(b"toc")
+    (dump_dir / "3001.dat.gz").write_bytes(b"x" * 1500)
+    (tmp_path / "notes.dumpdir.txt").write_text("ignored")
+    (tmp_path / "stray_folder").mkdir()
+
+    app.config["BACKUP_DIR_AUTO"] = str(tmp_path)
+
+    backups = backup_service.list_auto_backup_files(app)
+    assert [entry["filename"] for entry in backups] == [dump_name]
+    assert backups[0]["is_directory"] is True
+    assert backups[0]["size_bytes"] == 1503
+    assert b"Download (.tar)" in client.get("/admin/settings/backups/auto").data
+
+    response = client.get(f"/admin/settings/backups/auto/download/{dump_name}")
+    assert response.status_code == 200
+    assert f'filename="{dump_name}.tar"' in response.headers["Content-Disposition"]
+    with tarfile.open(fileobj=io.BytesIO(response.data)) as archive:
+        assert sorted(archive.getnames()) == [
+            dump_name,
+            f"{dump_name}/3001.dat.gz",
+            f"{dump_name}/toc.dat",
+        ]
+        assert archive.extractfile(f"{dump_name}/3001.dat.gz").read() == b"x" * 1500
+
+    with client.session_transaction() as sess:
+        token = sess["auto_backup_csrf"]
+    response = client.post(
+        f"/admin/settings/backups/auto/delete/{dump_name}", data={"csrf_token": token}
+    )
+    assert response.status_code == 302
+    assert not dump_dir.exists()
@@ -0,0 +1,97 @@
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import NullPool
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from invapp import create_app
+from invapp.extensions import db
+from invapp.services import db_pool
+from invapp.services.db_pool import InstrumentedQueuePool, PoolMetrics
+
+
+@pytest.fixture
+def app():
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"})
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def test_pool_options_follow_thread_count_and_pgbouncer_mode():
+    base = {
+        "SQLALCHEMY_DATABASE_URI": "postgresql+psycopg2://inv@db/invdb",
+        "GUNICORN_WORKERS": 3,
+        "GUNICORN_THREADS": 4,
+        "DB_POOL_BACKGROUND_CONNECTIONS": 2,
+    }
+    config = dict(base)
+    options = db_pool.configure_engine_options(config)
+    assert options["poolclass"] is InstrumentedQueuePool
+    assert (options["pool_size"], options["max_overflow"]) == (6, 4)
+    assert options["pool_pre_ping"] is False
+    assert db_pool.pool_sizing(config)["max_connections"] == 30
+
+    explicit = {**base, "DB_POOL_SIZE": "2", "DB_MAX_OVERFLOW": "0", "DB_POOL_PRE_PING": "1"}
+    options = db_pool.configure_engine_options(explicit)
+    assert (options["pool_size"], options["max_overflow"]) == (2, 0)
+    assert options["pool_pre_ping"] is True
+
+    bouncer = db_pool.configure_engine_options({**base, "DB_PGBOUNCER": True})
+    assert bouncer["poolclass"] is NullPool
+    assert "pool_size" not in bouncer
+
+    sqlite = db_pool.configure_engine_options({"SQLALCHEMY_DATABASE_URI": "sqlite:///x.db"})
+    assert "poolclass" not in sqlite
+
+
+def test_instrumented_pool_counts_waits_timeouts_and_invalidations(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    metrics = PoolMetrics(slow_checkout_ms=10)
+    db_pool.instrument_engine(engine, metrics)
+
+    held = engine.connect()
+    held.execute(text("SELECT 1"))
+    with pytest.raises(PoolTimeoutError):
+        engine.connect()
+    held.invalidate()
+    held.close()
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+    stats = metrics.snapshot()
+    assert stats["timeouts"] == 1
+    assert stats["slow_checkouts"] >= 1
+    assert stats["wait_ms_max"] >= 40
+    assert stats["invalidations"] == 1
+    assert stats["connects"] == 2
+    assert stats["checkouts"] == 2
+    assert stats["peak_checked_out"] == 1
+
+    engine.dispose()
+    assert engine.pool.metrics is metrics
+
+
+def test_admin_tools_shows_pool_card(app):
+    client = app.test_client()
+    client.post("/auth/login", data={"username": "superuser", "password": "joshbaldus"})
+
+    response = client.get("/admin/tools")
+
+    assert response.status_code == 200
+    assert b"Database Pool" in response.data
+    status = db_pool.pool_status(app)
+    assert status["checkouts"] > 0
+    assert status["pool_class"] == "StaticPool"
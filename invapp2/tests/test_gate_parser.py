@@ -7,7 +7,12 @@ sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
 from invapp import create_app
 from invapp.extensions import db
-from invapp.gate_parser import GatePartNumberError, parse_gate_part_number
+from invapp.gate_parser import (
+    GatePartNumberError,
+    clear_gate_parser_cache,
+    gate_parser_cache_info,
+    parse_gate_part_number,
+)
 
 
 @pytest.fixture
@@ -159,3 +164,44 @@ def test_full_format_examples_unaffected():
     assert int(parsed_full_bk.door_height_inches) == 83
     assert parsed_full_bk.parsed_format == "FULL"
 
+
+
+def test_memoized_decoder_returns_independent_copies():
+    clear_gate_parser_cache()
+    first = parse_gate_part_number("MBF82R482MADB")
+    first.adders.append("Mutated")
+    second = parse_gate_part_number(" mbf82r482madb ")
+
+    assert second.adders == ["Gate Arm", "Dark Brown Barrels"]
+    assert gate_parser_cache_info().hits == 1
+
+
+def test_memoized_decoder_repeats_errors():
+    clear_gate_parser_cache()
+    for _ in range(2):
+        with pytest.raises(GatePartNumberError, match="even number of panels"):
+            parse_gate_part_number("BSE700B780")
+    assert gate_parser_cache_info().hits == 1
+
+
+def test_parse_gate_part_numbers_api_batches_results(client):
+    response = client.post(
+        "/orders/api/parse_gate_part_numbers",
+        json={"part_numbers": ["DKR700N780", "BSE700B780", "DWF000284"]},
+    )
+
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert payload["parsed_count"] == 2
+    assert payload["error_count"] == 1
+    vinyl, invalid, legacy = payload["results"]
+    assert vinyl["ok"] and vinyl["material"] == "Vinyl"
+    assert not invalid["ok"] and "even number" in invalid["error"]
+    assert legacy["parsed_format"] == "LEGACY_NUMERIC"
+
+
+def test_parse_gate_part_numbers_api_rejects_invalid_payload(client):
+    response = client.post(
+        "/orders/api/parse_gate_part_numbers", json={"part_numbers": "DKR700N780"}
+    )
+    assert response.status_code == 400
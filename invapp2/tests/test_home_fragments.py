@@ -0,0 +1,146 @@
+import os
+import sys
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import event
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from invapp import create_app
+from invapp.extensions import db
+from invapp.home_fragments import FragmentCache, get_home_fragment_cache
+from invapp.models import Item, Location, Movement, Order, OrderStatus, Role, User
+
+
+@pytest.fixture
+def app():
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"})
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def _login_admin(client):
+    client.post(
+        "/auth/login",
+        data={"username": "superuser", "password": "joshbaldus"},
+        follow_redirects=True,
+    )
+
+
+def _count_queries(app):
+    statements: list[str] = []
+
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db.engine
+    event.listen(engine, "before_cursor_execute", _before_execute)
+    return engine, _before_execute, statements
+
+
+def test_home_defers_uncached_cubes_to_json_endpoint(client):
+    _login_admin(client)
+    home = client.get("/")
+    assert home.status_code == 200
+    assert b'data-cube-src="/api/home_cubes/orders"' in home.data
+
+    response = client.get("/api/home_cubes/orders")
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert payload["key"] == "orders"
+    assert "due within 3 days" in payload["html"]
+
+    home = client.get("/")
+    assert b'data-cube-src="/api/home_cubes/orders"' not in home.data
+    assert b"due within 3 days" in home.data
+
+
+def test_cube_fragment_is_reused_until_data_changes(app, client):
+    _login_admin(client)
+    item = Item(sku="HF-1", name="Fragment part", min_stock=5)
+    db.session.add(item)
+    db.session.commit()
+
+    first = client.get("/api/home_cubes/inventory").get_json()["html"]
+    assert "HF-1" in first
+    assert "Out of stock" in first
+
+    engine, listener, statements = _count_queries(app)
+    try:
+        cached = client.get("/api/home_cubes/inventory").get_json()["html"]
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert cached == first
+    assert not any("FROM movement" in statement for statement in statements)
+
+    location = Location(code="HF-LOC")
+    db.session.add(location)
+    db.session.flush()
+    db.session.add(
+        Movement(item_id=item.id, location_id=location.id, quantity=2, movement_type="ADJUST")
+    )
+    db.session.commit()
+
+    refreshed = client.get("/api/home_cubes/inventory").get_json()["html"]
+    assert "2 on hand" in refreshed
+
+
+def test_order_writes_invalidate_orders_cube(app, client):
+    _login_admin(client)
+    before = client.get("/api/home_cubes/orders").get_json()
+    assert "HF-ORDER" not in before["html"]
+
+    db.session.add(
+        Order(
+            order_number="HF-ORDER",
+            status=OrderStatus.OPEN,
+            promised_date=date.today() + timedelta(days=1),
+        )
+    )
+    db.session.commit()
+
+    after = client.get("/api/home_cubes/orders").get_json()
+    assert after["version"] != before["version"]
+    assert "HF-ORDER" in after["html"]
+
+
+def test_cube_endpoint_rejects_unknown_cubes(client):
+    _login_admin(client)
+    assert client.get("/api/home_cubes/unknown").status_code == 404
+
+
+def test_fragments_are_keyed_by_permission_set(app, client):
+    user = User(username="hf-viewer")
+    user.set_password("pw")
+    user.roles = Role.query.filter(Role.name.in_(["admin", "viewer"])).all()
+    db.session.add(user)
+    db.session.commit()
+
+    _login_admin(client)
+    assert client.get("/api/home_cubes/orders").status_code == 200
+    client.get("/auth/logout")
+    client.post("/auth/login", data={"username": "hf-viewer", "password": "pw"})
+    assert client.get("/api/home_cubes/orders").status_code == 200
+    signatures = {key[1] for key in get_home_fragment_cache()._entries}
+    assert len(signatures) == 2
+
+
+def test_fragment_cache_expires_and_evicts():
+    cache = FragmentCache(ttl_seconds=0, max_entries=1)
+    cache.put(("orders",), "<p>a</p>")
+    assert cache.get(("orders",)) is None
+
+    cache = FragmentCache(ttl_seconds=60, max_entries=1)
+    cache.put(("orders",), "<p>a</p>")
+    cache.put(("inventory",), "<p>b</p>")
+    assert cache.get(("orders",)) is None
+    assert cache.get(("inventory",)) == "<p>b</p>"
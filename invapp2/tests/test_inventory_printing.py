@@ -97,7 +97,7 @@ def _seed_move_inventory(app):
 def test_move_succeeds_even_if_printer_fails(client, app, monkeypatch):
     item_id, from_location_id, to_location_id = _seed_move_inventory(app)
 
-    def fail_connection(_addr):
+    def fail_connection(_addr, timeout=None):
         raise OSError("printer down")
 
     monkeypatch.setattr(zebra.socket, "create_connection", fail_connection)
@@ -0,0 +1,142 @@
+import logging
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine, text
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from invapp import create_app
+from invapp.extensions import db
+from invapp.models import Item, Location
+from invapp.services.db_schema import ensure_item_dictionary_schema
+
+
+@pytest.fixture
+def app():
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"})
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.post("/auth/login", data={"username": "superuser", "password": "joshbaldus"})
+    return client
+
+
+def _records(payload, kind):
+    fields = payload["fields"][kind]
+    return {row[0]: dict(zip(fields, row)) for row in payload[kind]}
+
+
+def test_dictionary_serves_snapshot_then_only_changes(client):
+    location = Location(code="1-A-01", description="Rack A")
+    db.session.add(location)
+    db.session.commit()
+    bolt = Item(sku="BOLT-1", name="Bolt", unit="ea", default_location_id=location.id)
+    nut = Item(sku="NUT-1", name="Nut")
+    db.session.add_all([bolt, nut])
+    db.session.commit()
+
+    snapshot = client.get("/inventory/api/dictionary").get_json()
+    assert snapshot["full"] is True
+    items = _records(snapshot, "items")
+    assert {item["sku"] for item in items.values()} >= {"BOLT-1", "NUT-1"}
+    assert items[bolt.id]["default_location_id"] == location.id
+    assert _records(snapshot, "locations")[location.id]["code"] == "1-A-01"
+
+    version = snapshot["version"]
+    unchanged = client.get(f"/inventory/api/dictionary?since={version}").get_json()
+    assert unchanged["full"] is False
+    assert unchanged["items"] == [] and unchanged["locations"] == []
+
+    bolt.min_stock = 5  # not a dictionary field
+    db.session.commit()
+    assert client.get(f"/inventory/api/dictionary?since={version}").get_json()["items"] == []
+
+    bolt.name = "Hex Bolt"
+    removed_id = nut.id
+    db.session.delete(nut)
+    db.session.commit()
+
+    delta = client.get(f"/inventory/api/dictionary?since={version}").get_json()
+    assert delta["full"] is False
+    assert delta["version"] > version
+    assert [item["name"] for item in _records(delta, "items").values()] == ["Hex Bolt"]
+    assert delta["deleted"] == {"items": [removed_id], "locations": []}
+
+    # Tokens from the future (e.g. after a database restore) force a resync.
+    stale = client.get(f"/inventory/api/dictionary?since={delta['version'] + 100}").get_json()
+    assert stale["full"] is True
+
+
+def test_schema_helper_adds_versions_and_lower_sku_index(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE item (id INTEGER PRIMARY KEY, sku VARCHAR NOT NULL)"))
+        conn.execute(text("CREATE TABLE location (id INTEGER PRIMARY KEY, code VARCHAR)"))
+        conn.execute(text("INSERT INTO item (id, sku) VALUES (1, 'A-1')"))
+
+    added = ensure_item_dictionary_schema(engine, logging.getLogger(__name__))
+
+    assert added == ["item.change_version", "location.change_version"]
+    with engine.connect() as conn:
+        indexes = set(
+            conn.execute(
+                text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'item'")
+            ).scalars()
+        )
+        assert {"ix_item_change_version", "ix_item_sku_lower"} <= indexes
+        assert conn.execute(text("SELECT change_version FROM item")).scalar() == 0
+    assert ensure_item_dictionary_schema(engine, logging.getLogger(__name__)) == []
+
+
+def test_bulk_deletes_leave_tombstones_and_restamp_items(client):
+    rack = Location(code="2-B-01")
+    db.session.add(rack)
+    db.session.commit()
+    stocked = Item(sku="PIN-1", name="Pin", default_location_id=rack.id)
+    loose = Item(sku="CLIP-1", name="Clip")
+    db.session.add_all([stocked, loose])
+    db.session.commit()
+    item_ids = sorted([stocked.id, loose.id])
+    rack_id, stocked_id = rack.id, stocked.id
+    version = client.get("/inventory/api/dictionary").get_json()["version"]
+
+    response = client.post("/inventory/locations/delete-all", data={"confirm_delete": "DELETE"})
+    assert response.status_code == 302
+    delta = client.get(f"/inventory/api/dictionary?since={version}").get_json()
+    assert delta["deleted"] == {"items": [], "locations": [rack_id]}
+    items = _records(delta, "items")
+    assert list(items) == [stocked_id]
+    assert items[stocked_id]["default_location_id"] is None
+
+    version = delta["version"]
+    assert client.post("/inventory/items/delete-all").status_code == 302
+    delta = client.get(f"/inventory/api/dictionary?since={version}").get_json()
+    assert sorted(delta["deleted"]["items"]) == item_ids
+
+
+def test_one_flush_takes_one_dictionary_version(app):
+    before = db.session.execute(text("SELECT value FROM dictionary_version")).scalar()
+    db.session.add_all([Item(sku=f"BULK-{index}", name="Bulk") for index in range(5)])
+    db.session.add(Location(code="BULK-LOC"))
+    db.session.commit()
+
+    after = db.session.execute(text("SELECT value FROM dictionary_version")).scalar()
+    assert after == before + 1
+    assert {item.change_version for item in Item.query.filter(Item.sku.like("BULK-%"))} == {
+        after
+    }
+
+    db.session.bulk_insert_mappings(
+        Item, [{"sku": f"MAP-{index}", "name": "Mapped"} for index in range(5)]
+    )
+    db.session.commit()
+    assert db.session.execute(text("SELECT value FROM dictionary_version")).scalar() == after + 1
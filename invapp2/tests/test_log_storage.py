@@ -0,0 +1,142 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from invapp import create_app
+from invapp.extensions import db
+from invapp.models import AccessLog, AccessLogHourly, ErrorReport, OpsEventLog
+from invapp.services import log_storage
+
+
+NOW = datetime(2024, 6, 15, 12, 30)
+
+
+@pytest.fixture
+def app():
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"})
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _access(occurred_at, ip="10.0.0.1", event_type=AccessLog.EVENT_REQUEST):
+    return AccessLog(event_type=event_type, ip_address=ip, occurred_at=occurred_at)
+
+
+def test_rollup_aggregates_completed_hours_and_summary_adds_recent_rows(app):
+    db.session.add_all(
+        [
+            _access(NOW - timedelta(hours=2, minutes=10)),
+            _access(NOW - timedelta(hours=2, minutes=5), ip="10.0.0.2"),
+            _access(NOW - timedelta(hours=1), event_type=AccessLog.EVENT_LOGIN_SUCCESS),
+            _access(NOW - timedelta(minutes=5)),
+        ]
+    )
+    db.session.commit()
+
+    assert log_storage.rollup_access_log(db.engine, now=NOW) == 3
+    hours = {
+        (row.hour, row.event_type, row.ip_address): row.total
+        for row in AccessLogHourly.query.all()
+    }
+    assert hours == {
+        (datetime(2024, 6, 15, 10), "request", "10.0.0.1"): 1,
+        (datetime(2024, 6, 15, 10), "request", "10.0.0.2"): 1,
+        (datetime(2024, 6, 15, 11), "login_success", "10.0.0.1"): 1,
+    }
+
+    # A late row for the last rolled-up hour is picked up on the next run.
+    db.session.add(_access(NOW - timedelta(minutes=50)))
+    db.session.commit()
+    log_storage.rollup_access_log(db.engine, now=NOW)
+    assert AccessLogHourly.query.filter_by(event_type="request", ip_address="10.0.0.1").count() == 2
+
+    ip_summary, event_summary = log_storage.access_log_summary(days=30, now=NOW)
+    assert ip_summary == [("10.0.0.1", 4), ("10.0.0.2", 1)]
+    assert event_summary == [("login_success", 1), ("request", 4)]
+
+
+def test_rollup_skips_gaps_longer_than_its_window(app):
+    db.session.add_all(
+        [_access(NOW - timedelta(days=12)), _access(NOW - timedelta(days=2))]
+    )
+    db.session.commit()
+
+    log_storage.rollup_access_log(db.engine, now=NOW, max_hours=24)
+    log_storage.rollup_access_log(db.engine, now=NOW, max_hours=24)
+
+    hours = sorted(row.hour for row in AccessLogHourly.query.all())
+    assert hours == [
+        log_storage.floor_hour(NOW - timedelta(days=12)),
+        log_storage.floor_hour(NOW - timedelta(days=2)),
+    ]
+
+
+def test_summary_without_rollups_reads_raw_rows_in_window(app):
+    db.session.add_all([_access(NOW - timedelta(days=40)), _access(NOW - timedelta(days=1))])
+    db.session.commit()
+
+    ip_summary, event_summary = log_storage.access_log_summary(days=30, now=NOW)
+    assert ip_summary == [("10.0.0.1", 1)]
+    assert event_summary == [("request", 1)]
+
+
+def test_retention_prunes_each_log_table(app):
+    old = NOW - timedelta(days=400)
+    db.session.add_all(
+        [
+            _access(old),
+            _access(NOW),
+            OpsEventLog(level="INFO", message="old", created_at=NOW - timedelta(days=31)),
+            OpsEventLog(level="INFO", message="new", created_at=NOW),
+            ErrorReport(message="old", occurred_at=old),
+            ErrorReport(message="new", occurred_at=NOW),
+            AccessLogHourly(hour=NOW - timedelta(days=800), event_type="request", total=3),
+        ]
+    )
+    db.session.commit()
+
+    # Audit and error history is kept unless retention is switched on.
+    removed = log_storage.apply_retention(db.engine, app.config, now=NOW)
+    assert removed == {"ops_event_log": 1, "access_log_hourly": 1}
+    assert AccessLog.query.count() == 2
+    assert ErrorReport.query.count() == 2
+
+    app.config.update(ACCESS_LOG_RETENTION_DAYS=180, ERROR_REPORT_RETENTION_DAYS=180)
+    removed = log_storage.apply_retention(db.engine, app.config, now=NOW)
+
+    assert removed == {
+        "access_log": 1,
+        "ops_event_log": 0,
+        "error_report": 1,
+        "access_log_hourly": 0,
+    }
+    assert AccessLog.query.count() == 1
+    assert [row.message for row in OpsEventLog.query.all()] == ["new"]
+    assert [row.message for row in ErrorReport.query.all()] == ["new"]
+
+
+def test_partition_planning_and_bound_parsing():
+    planned = log_storage.plan_partitions(
+        "access_log", datetime(2024, 7, 1), now=NOW, months_ahead=2
+    )
+    assert planned == [
+        ("access_log_p202407", datetime(2024, 7, 1), datetime(2024, 8, 1)),
+        ("access_log_p202408", datetime(2024, 8, 1), datetime(2024, 9, 1)),
+    ]
+    assert log_storage.plan_partitions(
+        "access_log", datetime(2024, 9, 1), now=NOW, months_ahead=2
+    ) == []
+    assert log_storage.add_months(datetime(2024, 12, 1), 1) == datetime(2025, 1, 1)
+
+    bound = "FOR VALUES FROM (MINVALUE) TO ('2024-07-01 00:00:00')"
+    assert log_storage.parse_upper_bound(bound) == datetime(2024, 7, 1)
+    assert log_storage.parse_upper_bound("DEFAULT") is None
+    assert log_storage.ensure_log_partitions(create_engine("sqlite://")) == []
@@ -0,0 +1,128 @@
+import os
+import sys
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from invapp import create_app
+from invapp.extensions import db
+from invapp.mdi import materials_cache
+from invapp.models import PurchaseRequest
+
+
+@pytest.fixture
+def app():
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"})
+    with app.app_context():
+        db.create_all()
+        db.session.query(PurchaseRequest).delete()
+        db.session.commit()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.post(
+        "/auth/login",
+        data={"username": "superuser", "password": "joshbaldus"},
+        follow_redirects=True,
+    )
+    return client
+
+
+@pytest.fixture
+def built_cards(monkeypatch):
+    built = []
+    original = materials_cache.build_materials_base_card
+
+    def counting(record):
+        built.append(record.id)
+        return original(record)
+
+    monkeypatch.setattr(materials_cache, "build_materials_base_card", counting)
+    return built
+
+
+def _add_request(title, status=PurchaseRequest.STATUS_NEW, quantity=Decimal("2")):
+    record = PurchaseRequest(
+        title=title,
+        requested_by="Planner",
+        status=status,
+        quantity=quantity,
+        created_at=datetime(2024, 3, 4, 8, 30),
+    )
+    db.session.add(record)
+    db.session.commit()
+    return record
+
+
+def test_board_refresh_reuses_cards_until_request_changes(app, client, built_cards):
+    first = _add_request("PN-100 - Bearings")
+    second = _add_request("PN-200 - Fasteners")
+
+    response = client.get("/api/mdi_entries?category=Materials")
+    payload = response.get_json()
+    assert sorted(built_cards) == sorted([first.id, second.id])
+    assert {card["item_part_number"] for card in payload} == {"PN-100", "PN-200"}
+    assert payload[0]["created_at"] == "2024-03-04T08:30:00"
+    assert payload[0]["date_logged"] == "2024-03-04"
+
+    built_cards.clear()
+    client.get("/api/mdi_entries?category=Materials")
+    assert built_cards == []
+
+    first.title = "PN-101 - Bearings"
+    db.session.commit()
+
+    payload = client.get("/api/mdi_entries?category=Materials").get_json()
+    assert built_cards == [first.id]
+    assert {card["item_part_number"] for card in payload} == {"PN-101", "PN-200"}
+
+    meeting = client.get("/mdi/meeting")
+    assert meeting.status_code == 200
+    assert b"PN-101 - Bearings" in meeting.data
+
+
+def test_cards_are_rebuilt_when_updated_at_changes_elsewhere(app, built_cards):
+    record = _add_request("PN-300 - Gaskets")
+    materials_cache.load_materials_cards(PurchaseRequest.query, for_api=False)
+    built_cards.clear()
+
+    db.session.execute(
+        PurchaseRequest.__table__.update()
+        .where(PurchaseRequest.id == record.id)
+        .values(title="PN-301 - Gaskets", updated_at=datetime(2030, 1, 1))
+    )
+    db.session.commit()
+
+    cards = materials_cache.load_materials_cards(PurchaseRequest.query, for_api=False)
+    assert built_cards == [record.id]
+    assert cards[0]["item_part_number"] == "PN-301"
+    assert cards[0]["created_at"] is None
+
+
+def test_summary_is_cached_until_requests_change(app, client, monkeypatch):
+    _add_request("PN-400 - Hoses", quantity=Decimal("5"))
+    calls = []
+    original = materials_cache.build_materials_summary
+
+    def counting():
+        calls.append(1)
+        return original()
+
+    monkeypatch.setattr(materials_cache, "build_materials_summary", counting)
+
+    assert client.get("/api/mdi/materials/summary").get_json()["total_count"] == 1
+    assert client.get("/api/mdi/materials/summary").get_json()["total_count"] == 1
+    assert len(calls) == 1
+
+    _add_request("PN-401 - Clamps", status=PurchaseRequest.STATUS_ORDERED)
+    payload = client.get("/api/mdi/materials/summary").get_json()
+    assert payload["total_count"] == 2
+    assert len(calls) == 2
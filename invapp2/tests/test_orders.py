@@ -19,6 +19,7 @@ from invapp.routes import orders as orders_routes
 from sqlalchemy.exc import IntegrityError
 
 from invapp.models import (
+    Batch,
     BillOfMaterial,
     BillOfMaterialComponent,
     Item,
@@ -844,3 +845,145 @@ def test_bulk_import_allows_partial_quantity_and_skips_zero():
 
     assert errors == []
     assert bom_rows == {"FG-1": {"CMP-1": Decimal("0.5"), "CMP-3": Decimal("1.25")}}
+
+
+def _build_component_order(order_number, component_count):
+    finished = Item(sku=f'{order_number}-FG', name='Gate')
+    locations = [Location(code=f'{order_number}-L{index}') for index in range(2)]
+    order = Order(order_number=order_number, status=OrderStatus.OPEN)
+    line = OrderLine(item=finished, quantity=2)
+    order.order_lines.append(line)
+    step = RoutingStep(sequence=1, work_cell='Assembly', description='Assemble')
+    order.routing_steps.append(step)
+    db.session.add_all([finished, *locations, order])
+    db.session.flush()
+
+    for index in range(component_count):
+        item = Item(sku=f'{order_number}-C{index}', name=f'Component {index}')
+        db.session.add(item)
+        db.session.flush()
+        batch = Batch(item_id=item.id, lot_number=f'LOT-{index}')
+        db.session.add(batch)
+        db.session.flush()
+        receipt = Movement(
+            item_id=item.id,
+            batch_id=batch.id,
+            location_id=locations[0].id,
+            quantity=10,
+            movement_type='RECEIPT',
+        )
+        loose = Movement(
+            item_id=item.id,
+            location_id=locations[1].id,
+            quantity=3,
+            movement_type='RECEIPT',
+        )
+        issue = Movement(
+            item_id=item.id,
+            batch_id=batch.id,
+            location_id=locations[0].id,
+            quantity=-2,
+            movement_type='ISSUE',
+        )
+        component = OrderComponent(order_line=line, component_item=item, quantity=1)
+        usage = RoutingStepComponent(routing_step=step, order_component=component)
+        db.session.add_all([receipt, loose, issue, component, usage])
+        db.session.flush()
+        db.session.add(
+            RoutingStepConsumption(routing_step_component=usage, movement=issue, quantity=2)
+        )
+    db.session.commit()
+    return order.id
+
+
+def _count_statements(app, func):
+    from sqlalchemy import event
+
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db.get_engine(app)
+    event.listen(engine, 'before_cursor_execute', _record)
+    try:
+        result = func()
+    finally:
+        event.remove(engine, 'before_cursor_execute', _record)
+    return result, len(statements)
+
+
+def test_order_detail_availability_is_batched(client, app):
+    with app.app_context():
+        small_id = _build_component_order('ORD-AV-S', 2)
+        large_id = _build_component_order('ORD-AV-L', 12)
+
+    client.get(f'/orders/{small_id}')
+    response, small_queries = _count_statements(app, lambda: client.get(f'/orders/{small_id}'))
+    assert response.status_code == 200
+    response, large_queries = _count_statements(app, lambda: client.get(f'/orders/{large_id}'))
+    assert response.status_code == 200
+    assert large_queries == small_queries
+
+    with app.app_context():
+        order = Order.query.get(large_id)
+        context = orders_routes._prepare_order_detail(order)
+        usage = order.routing_steps[0].component_usages[0]
+        options = context['component_options'][usage.id]
+        assert [option['label'] for option in options] == [
+            'LOT-0 @ ORD-AV-L-L0 (avail 8)',
+            'Unbatched @ ORD-AV-L-L1 (avail 3)',
+        ]
+        assert options[0]['value'] == f"{options[0]['batch_id']}::{options[0]['location_id']}"
+        assert context['component_consumptions'][usage.id] == [
+            {'batch_label': 'LOT-0', 'location_label': 'ORD-AV-L-L0', 'quantity': Decimal('2')}
+        ]
+
+
+def test_update_routing_checks_batched_balances(client, app):
+    with app.app_context():
+        order_id = _build_component_order('ORD-AV-R', 3)
+        order = Order.query.get(order_id)
+        step = order.routing_steps[0]
+        step_id = step.id
+        selections = {}
+        for usage in step.component_usages:
+            location_id = next(
+                movement.location_id
+                for movement in Movement.query.filter_by(
+                    item_id=usage.bom_component.component_item_id, batch_id=None
+                )
+            )
+            selections[f'usage_{usage.id}'] = f'none::{location_id}'
+
+    # Each component needs 2 (1 per unit x 2 units) and the loose position holds 3.
+    response = client.post(
+        f'/orders/{order_id}/routing',
+        data={'completed_steps': str(step_id), **selections},
+    )
+    assert response.status_code == 302
+    with app.app_context():
+        assert RoutingStep.query.get(step_id).completed is True
+
+    client.post(f'/orders/{order_id}/routing', data={})
+    # Consume the loose stock so the next completion falls short.
+    with app.app_context():
+        for key, value in selections.items():
+            usage = RoutingStepComponent.query.get(int(key.split('_', 1)[1]))
+            db.session.add(
+                Movement(
+                    item_id=usage.bom_component.component_item_id,
+                    location_id=int(value.split('::', 1)[1]),
+                    quantity=-2,
+                    movement_type='ADJUST',
+                )
+            )
+        db.session.commit()
+
+    response = client.post(
+        f'/orders/{order_id}/routing',
+        data={'completed_steps': str(step_id), **selections},
+    )
+    assert response.status_code == 400
+    assert b'Not enough stock in selected batch' in response.data
+    assert b'available 1' in response.data
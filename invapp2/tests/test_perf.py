@@ -0,0 +1,105 @@
+import os
+import sys
+from datetime import timedelta
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from invapp import create_app, perf
+from invapp.extensions import db
+from invapp.models import (
+    Item,
+    Location,
+    Movement,
+    Order,
+    OrderComponent,
+    ProductionDailyCustomerTotal,
+    ProductionDailyMetric,
+    ProductionDailyRecord,
+)
+
+
+@pytest.fixture
+def app():
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"})
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def test_seed_is_repeatable_and_extends_existing_data(app):
+    added = perf.seed_perf_data(items=40, locations=12, movements=200, orders=6, seed=7)
+    assert added["items"] == 40
+    assert added["locations"] == 12
+    assert added["movements"] == 200
+    assert added["orders"] == 6
+    assert added["order_lines"] >= 6
+    assert OrderComponent.query.count() == added["order_components"]
+
+    perf.seed_perf_data(items=10, locations=3, orders=2, seed=7)
+    skus = [sku for (sku,) in db.session.query(Item.sku).filter(Item.sku.like("PERF-%"))]
+    assert len(skus) == len(set(skus)) == 50
+    assert Location.query.filter(Location.code.like("PERF-%")).count() == 15
+    assert Order.query.filter(Order.order_number.like("PERF-ORD-%")).count() == 8
+
+
+def test_seed_adds_production_days_before_existing_history(app):
+    added = perf.seed_perf_data(production_days=40, seed=3)
+    assert added["production_days"] == 40
+    assert ProductionDailyCustomerTotal.query.count() == added["production_customer_totals"] > 0
+    assert ProductionDailyMetric.query.count() == 40
+
+    first = db.session.query(db.func.min(ProductionDailyRecord.entry_date)).scalar()
+    perf.seed_perf_data(production_days=5, seed=3)
+    dates = [day for (day,) in db.session.query(ProductionDailyRecord.entry_date)]
+    assert len(dates) == len(set(dates)) == 45
+    assert min(dates) == first - timedelta(days=5)
+    assert ProductionDailyMetric.query.count() == 45
+
+
+def test_benchmarks_report_queries_and_leave_data_untouched(app):
+    perf.seed_perf_data(items=30, locations=10, movements=120, orders=4, production_days=30)
+    movements_before = Movement.query.count()
+
+    report = perf.run_benchmarks(app, perf.login_client(app), repeat=2, warmup=0)
+
+    assert set(report["results"]) == {case.name for case in perf.BENCHMARK_CASES}
+    for name, result in report["results"].items():
+        assert result["status"] in (200, 302), name
+        assert result["queries"] > 0, name
+        assert result["p95_ms"] >= result["p50_ms"] > 0
+    assert report["meta"]["database"] == "sqlite"
+    assert report["meta"]["dataset"]["movements"] == movements_before
+    assert report["meta"]["dataset"]["production_days"] == 30
+    assert report["results"]["production_history"]["status"] == 200
+    assert report["results"]["production_export"]["status"] == 200
+    assert Movement.query.count() == movements_before
+
+
+def test_compare_flags_query_growth_and_latency_beyond_tolerance():
+    base = {
+        "results": {
+            "list_stock": {"status": 200, "p50_ms": 100.0, "queries": 14, "peak_rss_mb": 80},
+            "history": {"status": 200, "p50_ms": 2.0, "queries": 15, "peak_rss_mb": 80},
+        }
+    }
+    current = {
+        "results": {
+            "list_stock": {"status": 200, "p50_ms": 140.0, "queries": 16, "peak_rss_mb": 85},
+            "history": {"status": 200, "p50_ms": 5.0, "queries": 15, "peak_rss_mb": 80},
+            "new_case": {"status": 200, "p50_ms": 1.0, "queries": 1, "peak_rss_mb": 80},
+        }
+    }
+
+    regressions = perf.compare_to_baseline(current, base, tolerance=0.25)
+
+    assert regressions == [
+        "list_stock: 16 queries per request (baseline 14)",
+        "list_stock: p50 140.0 ms (baseline 100.0 ms)",
+    ]
+    assert perf.compare_to_baseline(current, base, tolerance=0.5) == [
+        "list_stock: 16 queries per request (baseline 14)"
+    ]
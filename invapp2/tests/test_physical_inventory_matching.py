@@ -11,7 +11,10 @@ from invapp.extensions import db
 from invapp.models import Item
 from invapp.services.physical_inventory import (
     NormalizationOptions,
+    ParsedUpload,
     get_item_text_fields,
+    get_match_key_table,
+    get_parsed_upload,
     match_upload_rows,
 )
 
@@ -121,3 +124,73 @@ def test_sku_excluded_from_item_fields(app):
     with app.app_context():
         field_names = {field["name"] for field in get_item_text_fields()}
         assert "sku" not in field_names
+
+
+def test_key_table_is_reused_until_items_change(app):
+    with app.app_context():
+        db.session.add(Item(sku="SKU-6", name="Bracket"))
+        db.session.commit()
+
+        options = NormalizationOptions()
+        table = get_match_key_table("name", options)
+        assert get_match_key_table("name", options) is table
+        assert get_match_key_table("name", NormalizationOptions(remove_spaces=True)) is not table
+
+        item = Item.query.filter_by(sku="SKU-6").one()
+        item.name = "Bracket XL"
+        db.session.commit()
+
+        rebuilt = get_match_key_table("name", options)
+        assert rebuilt is not table
+        assert "bracket xl" in rebuilt.by_key
+        assert "bracket" not in rebuilt.by_key
+
+
+def test_secondary_field_resolves_ambiguous_match(app):
+    with app.app_context():
+        first = Item(sku="SKU-7", name="Hinge", description="Left")
+        second = Item(sku="SKU-8", name="Hinge", description="Right")
+        db.session.add_all([first, second])
+        db.session.commit()
+
+        upload = ParsedUpload(
+            ["Name", "Desc", "Qty"],
+            [
+                {"Name": "Hinge", "Desc": "right", "Qty": "4"},
+                {"Name": "Hinge", "Desc": "", "Qty": "1"},
+            ],
+        )
+        result = match_upload_rows(
+            upload,
+            primary_upload_column="Name",
+            primary_item_field="name",
+            quantity_column="Qty",
+            options=NormalizationOptions(),
+            secondary_upload_column="Desc",
+            secondary_item_field="description",
+        )
+
+        assert result["matched_count"] == 1
+        assert result["matched_rows"][0]["item_id"] == second.id
+        assert result["matched_rows"][0]["matched_on_secondary"] is True
+        assert result["ambiguous_count"] == 1
+
+
+def test_parsed_upload_is_cached_per_token():
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return "Name,Qty\nWidget,2\n"
+
+    first = get_parsed_upload("token-a", 1.0, loader)
+    assert get_parsed_upload("token-a", 1.0, loader) is first
+    assert len(loads) == 1
+
+    options = NormalizationOptions()
+    column = first.normalized_column("Name", options)
+    assert column == ["widget"]
+    assert first.normalized_column("Name", options) is column
+
+    assert get_parsed_upload("token-a", 2.0, loader) is not first
+    assert len(loads) == 2
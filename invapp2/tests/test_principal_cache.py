@@ -0,0 +1,148 @@
+import os
+import sys
+
+import pytest
+from sqlalchemy import event
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from invapp import create_app
+from invapp.extensions import db
+from invapp.models import Role, User
+from invapp.permissions import current_principal_roles, principal_has_any_role
+from invapp.principals import (
+    EMERGENCY_PRINCIPAL,
+    PrincipalCache,
+    PrincipalSnapshot,
+    build_snapshot,
+    current_principal,
+    get_principal_cache,
+)
+
+
+@pytest.fixture
+def app():
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"})
+    with app.app_context():
+        db.create_all()
+        user = User(username="casey")
+        user.set_password("pw")
+        viewer = Role.query.filter_by(name="viewer").first()
+        user.roles = [viewer]
+        db.session.add(user)
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def _login(client, username="casey", password="pw"):
+    return client.post("/auth/login", data={"username": username, "password": password})
+
+
+def _count_user_queries(app):
+    statements: list[str] = []
+
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM "user"' in statement or "FROM user " in statement:
+            statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", _before_execute)
+    return engine, _before_execute, statements
+
+
+def test_authenticated_requests_reuse_cached_principal(app, client):
+    _login(client)
+    client.get("/")
+
+    engine, listener, statements = _count_user_queries(app)
+    try:
+        response = client.get("/")
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert response.status_code == 200
+    assert len(statements) == 1
+    assert "user_roles" not in statements[0]
+    assert "updated_at" in statements[0]
+
+
+def test_role_change_invalidates_cached_principal(app, client):
+    _login(client)
+    assert client.get("/settings/printers").status_code == 403
+
+    with app.app_context():
+        user = User.query.filter_by(username="casey").one()
+        user.roles.append(Role.query.filter_by(name="admin").one())
+        db.session.commit()
+
+    assert client.get("/settings/printers").status_code == 200
+
+
+def _restore_stale_snapshot(app, snapshot):
+    # Simulate another worker whose cache still holds the pre-edit snapshot.
+    with app.app_context():
+        get_principal_cache().put(snapshot)
+
+
+def test_role_revoked_elsewhere_is_rejected_from_stale_cache(app, client):
+    _login(client)
+    with app.app_context():
+        user = User.query.filter_by(username="casey").one()
+        user.roles.append(Role.query.filter_by(name="admin").one())
+        db.session.commit()
+        admin_snapshot = build_snapshot(user)
+    assert client.get("/settings/printers").status_code == 200
+
+    with app.app_context():
+        user = User.query.filter_by(username="casey").one()
+        user.roles = [Role.query.filter_by(name="viewer").one()]
+        db.session.commit()
+    _restore_stale_snapshot(app, admin_snapshot)
+
+    assert client.get("/settings/printers").status_code == 403
+
+
+def test_user_deleted_elsewhere_is_logged_out_from_stale_cache(app, client):
+    _login(client)
+    with app.app_context():
+        user = User.query.filter_by(username="casey").one()
+        snapshot = build_snapshot(user)
+        db.session.delete(user)
+        db.session.commit()
+    _restore_stale_snapshot(app, snapshot)
+
+    response = client.get("/settings/printers")
+    assert response.status_code == 302
+    assert "/auth/login" in response.headers["Location"]
+    with app.app_context():
+        assert get_principal_cache().get(snapshot.id) is None
+
+
+def test_principal_cache_expires_and_evicts():
+    cache = PrincipalCache(ttl_seconds=0, max_entries=1)
+    snapshot = PrincipalSnapshot(id=1, username="a", role_names=("viewer",))
+    cache.put(snapshot)
+    assert cache.get(1) is None
+
+    cache = PrincipalCache(ttl_seconds=60, max_entries=1)
+    cache.put(snapshot)
+    cache.put(PrincipalSnapshot(id=2, username="b", role_names=()))
+    assert cache.get(1) is None
+    assert cache.get(2).username == "b"
+
+
+def test_emergency_principal_resolves_without_database(app):
+    app.config["DATABASE_AVAILABLE"] = False
+    with app.test_request_context("/"):
+        assert current_principal() is EMERGENCY_PRINCIPAL
+        assert "admin" in current_principal_roles()
+        assert principal_has_any_role(("quality",), require_auth=True)
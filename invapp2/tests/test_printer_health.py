@@ -0,0 +1,218 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from invapp import create_app
+from invapp.extensions import db
+from invapp.models import Printer
+from invapp.printing import zebra
+from invapp.services import status_bus
+from invapp.printing.health import (
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    PrinterHealthRegistry,
+    get_printer_health,
+)
+
+
+@pytest.fixture
+def app():
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"})
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.post(
+        "/auth/login",
+        data={"username": "superuser", "password": "joshbaldus"},
+        follow_redirects=True,
+    )
+    return client
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_circuit_opens_after_threshold_and_recovers_through_half_open():
+    clock = FakeClock()
+    registry = PrinterHealthRegistry(failure_threshold=2, reset_seconds=30, clock=clock)
+
+    registry.record_failure("zebra-1", 9100, "timed out")
+    assert registry.allow("zebra-1", 9100)
+    registry.record_failure("zebra-1", 9100, "timed out")
+    assert registry.status("zebra-1", 9100)["state"] == STATE_OPEN
+    assert not registry.allow("zebra-1", 9100)
+
+    clock.now += 31
+    assert registry.allow("zebra-1", 9100)
+    assert registry.status("zebra-1", 9100)["state"] == STATE_HALF_OPEN
+    assert not registry.allow("zebra-1", 9100), "only one trial while half-open"
+
+    registry.record_failure("zebra-1", 9100, "refused")
+    assert registry.status("zebra-1", 9100)["state"] == STATE_OPEN
+    assert not registry.allow("zebra-1", 9100)
+
+    clock.now += 31
+    assert registry.allow("zebra-1", 9100)
+    registry.record_success("zebra-1", 9100)
+    status = registry.status("zebra-1", 9100)
+    assert status["state"] == STATE_CLOSED
+    assert status["consecutive_failures"] == 0
+    assert status["skipped"] == 3
+
+
+def test_probe_all_records_each_target_once():
+    calls = []
+
+    def connect(host, port, timeout):
+        calls.append((host, port))
+        if host == "down.local":
+            raise OSError("connection refused")
+
+    registry = PrinterHealthRegistry(failure_threshold=1, connect=connect)
+    online = registry.probe_all(
+        [("up.local", 9100, "Up"), ("UP.local", None, None), ("down.local", 9101, "Down")]
+    )
+
+    assert online == 1
+    assert calls == [("up.local", 9100), ("down.local", 9101)]
+    assert registry.status("up.local", 9100)["name"] == "Up"
+    assert registry.status("down.local", 9101)["state"] == STATE_OPEN
+    assert registry.status("down.local", 9101)["last_error"] == "connection refused"
+
+
+def test_send_zpl_skips_printers_with_open_circuit(app, monkeypatch):
+    registry = get_printer_health()
+    for _ in range(app.config["PRINTER_HEALTH_FAILURE_THRESHOLD"]):
+        registry.record_failure("offline.local", 9100, "timed out")
+
+    attempts = []
+
+    def fake_create_connection(addr, timeout=None):
+        attempts.append(addr)
+        raise OSError("should not connect")
+
+    monkeypatch.setattr(zebra.socket, "create_connection", fake_create_connection)
+
+    assert zebra.send_zpl("^XA^XZ", host="offline.local", port=9100) is False
+    assert attempts == []
+
+
+def test_send_zpl_reports_outcomes_to_registry(app, monkeypatch):
+    class DummySocket:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc, tb):
+            return False
+
+        def sendall(self, data):
+            pass
+
+    def fake_create_connection(addr, timeout=None):
+        if addr[0] == "bad.local":
+            raise OSError("no route to host")
+        return DummySocket()
+
+    monkeypatch.setattr(zebra.socket, "create_connection", fake_create_connection)
+
+    assert zebra.send_zpl("^XA^XZ", host="good.local", port=9100) is True
+    assert zebra.send_zpl("^XA^XZ", host="bad.local", port=9100) is False
+
+    registry = get_printer_health()
+    assert registry.status("good.local", 9100)["state"] == STATE_CLOSED
+    assert registry.status("bad.local", 9100)["consecutive_failures"] == 1
+    assert registry.status("good.local", 9100)["last_latency_ms"] is not None
+
+
+def test_printer_pages_show_health_status(client, app):
+    db.session.add(Printer(name="Dock Zebra", host="dock.local", port=9100))
+    db.session.commit()
+
+    def refuse(host, port, timeout):
+        raise OSError("refused")
+
+    registry = get_printer_health()
+    registry._connect = refuse
+    registry.failure_threshold = 1
+
+    payload = client.post("/settings/printers/health").get_json()
+    row = payload["printers"][0]
+    assert row["name"] == "Dock Zebra"
+    assert row["state"] == STATE_OPEN
+    assert row["last_error"] == "refused"
+
+    page = client.get("/settings/printers/")
+    assert page.status_code == 200
+    assert b"Printer Health" in page.data
+    assert b"printer-open" in page.data
+
+    tools = client.get("/admin/tools")
+    assert tools.status_code == 200
+    assert b"Printer: Dock Zebra" in tools.data
+    assert b"1 consecutive failure" in tools.data
+
+
+def test_circuit_transitions_are_published_for_the_ops_monitor(tmp_path):
+    sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
+    from ops_monitor.metrics import read_printer_health
+
+    db_url = f"sqlite:///{tmp_path / 'monitor.db'}"
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": db_url})
+    with app.app_context():
+        db.create_all()
+        db.session.add_all(
+            [
+                Printer(name="Bay Zebra", host="Bay.local", port=9100),
+                Printer(name="Office Zebra", host="office.local", port=9100),
+            ]
+        )
+        db.session.commit()
+        status_bus.flush_pending()  # drain startup events queued before this test
+
+        registry = get_printer_health()
+        for _ in range(registry.failure_threshold + 2):
+            registry.record_failure("bay.local", 9100, "timed out")
+        registry.record_failure("zebra-default.local", 9100, "refused")
+        registry.failure_threshold = 1
+        registry.record_failure("zebra-default.local", 9100, "refused")
+        registry.record_success("zebra-default.local", 9100)
+
+        messages = [
+            event["message"]
+            for event in status_bus.get_recent_events()
+            if event["source"] == "printer_health"
+            and event["context"]["host"] in {"bay.local", "zebra-default.local"}
+        ]
+        assert messages == [
+            "Printer bay.local:9100 is offline: timed out",
+            "Printer zebra-default.local:9100 is offline: refused",
+            "Printer zebra-default.local:9100 is back online",
+        ]
+        status_bus.flush_pending()
+
+        entries = read_printer_health(db_url)
+        db.session.remove()
+        db.drop_all()
+
+    by_name = {entry.name: entry for entry in entries}
+    assert by_name["Bay Zebra"].state == STATE_OPEN
+    assert by_name["Bay Zebra"].last_error == "timed out"
+    assert by_name["Office Zebra"].label == "No failures reported"
+    assert by_name["Default printer"].connection == "zebra-default.local:9100"
+    assert by_name["Default printer"].state == STATE_CLOSED
@@ -0,0 +1,148 @@
+import os
+import sys
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from invapp import create_app
+from invapp.extensions import db
+from invapp.models import (
+    ProductionCustomer,
+    ProductionDailyCustomerTotal,
+    ProductionDailyMetric,
+    ProductionDailyRecord,
+    ProductionOutputFormula,
+)
+from invapp.routes import production
+from invapp.services import production_metrics
+
+
+@pytest.fixture
+def app():
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"})
+    with app.app_context():
+        db.create_all()
+        production._ensure_default_customers()
+        production._ensure_output_formula()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.post(
+        "/auth/login",
+        data={"username": "superuser", "password": "joshbaldus"},
+        follow_redirects=True,
+    )
+    return client
+
+
+def _customer():
+    return (
+        ProductionCustomer.query.filter_by(is_other_bucket=False)
+        .order_by(ProductionCustomer.name)
+        .first()
+    )
+
+
+def _add_day(entry_date, packaged, controllers=0):
+    record = ProductionDailyRecord(
+        entry_date=entry_date,
+        day_of_week=entry_date.strftime("%A"),
+        gates_employees=1,
+        gates_hours_ot=Decimal("0"),
+        controllers_4_stop=controllers,
+    )
+    db.session.add(record)
+    db.session.flush()
+    db.session.add(
+        ProductionDailyCustomerTotal(
+            record=record, customer=_customer(), gates_produced=0, gates_packaged=packaged
+        )
+    )
+    db.session.commit()
+    return record
+
+
+def _history(app, start, end):
+    with app.test_request_context():
+        return production._build_history_context(start, end)
+
+
+def _series(context, label):
+    return next(s["data"] for s in context["line_datasets"] if s["label"] == label)
+
+
+def test_history_reads_stored_rows_and_restarts_cumulatives_mid_month(app, monkeypatch):
+    _add_day(date(2024, 5, 6), packaged=4, controllers=1)
+    _add_day(date(2024, 5, 7), packaged=6, controllers=2)
+    _add_day(date(2024, 5, 8), packaged=5)
+    _add_day(date(2024, 6, 3), packaged=7)
+
+    context = _history(app, date(2024, 5, 7), date(2024, 6, 3))
+    assert ProductionDailyMetric.query.count() == 4
+    assert context["chart_labels"] == ["2024-05-07", "2024-05-08", "2024-06-03"]
+    assert _series(context, "Gates Packaged") == [6, 11, 7]
+    assert _series(context, "Controllers") == [2, 2, 0]
+    assert [row["packaged_sum"] for row in context["table_rows"]] == [6, 5, 7]
+    assert context["table_rows"][0]["gates_output_per_hour"] == "0.75"
+
+    computed = []
+    monkeypatch.setattr(
+        production_metrics,
+        "compute_day_metrics",
+        lambda *args: computed.append(args) or pytest.fail("recomputed"),
+    )
+    _history(app, date(2024, 5, 1), date(2024, 6, 30))
+    assert computed == []
+
+
+def test_writes_invalidate_rest_of_month_and_saves_refresh(app, client):
+    first = _add_day(date(2024, 5, 6), packaged=4)
+    _add_day(date(2024, 5, 7), packaged=6)
+    _add_day(date(2024, 6, 3), packaged=7)
+    production_metrics.rebuild_daily_metrics()
+    assert ProductionDailyMetric.query.count() == 3
+
+    first.customer_totals[0].gates_packaged = 10
+    db.session.commit()
+    remaining = [metric.entry_date for metric in ProductionDailyMetric.query.all()]
+    assert remaining == [date(2024, 6, 3)]
+
+    response = client.post(
+        "/production/daily-entry/additional",
+        data={
+            "entry_date": "2024-05-07",
+            "additional_employees": "1",
+            "additional_hours_ot": "0",
+        },
+    )
+    assert response.status_code == 302
+    may = (
+        ProductionDailyMetric.query.filter(ProductionDailyMetric.entry_date < date(2024, 6, 1))
+        .order_by(ProductionDailyMetric.entry_date)
+        .all()
+    )
+    assert [metric.packaged_total for metric in may] == [10, 6]
+    assert may[-1].cumulative_packaged == 16
+
+
+def test_formula_change_rebuilds_every_row(app, client):
+    _add_day(date(2024, 5, 6), packaged=4)
+    production_metrics.rebuild_daily_metrics()
+
+    setting = ProductionOutputFormula.query.first()
+    setting.formula = "packaged * 2"
+    setting.variables = []
+    db.session.commit()
+    assert ProductionDailyMetric.query.count() == 0
+
+    context = _history(app, date(2024, 5, 1), date(2024, 5, 31))
+    assert context["table_rows"][0]["gates_output_per_hour"] == "8.00"
+    assert ProductionDailyMetric.query.one().output_value == 8.0
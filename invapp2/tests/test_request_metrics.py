@@ -0,0 +1,129 @@
+import os
+import sys
+import time
+
+import pytest
+from jinja2 import DictLoader, Environment
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from invapp import create_app
+from invapp.extensions import db
+from invapp.models import AccessLog
+from invapp.request_metrics import RequestMetrics, TimedTemplate
+
+
+@pytest.fixture
+def app():
+    app = create_app(
+        {
+            "TESTING": True,
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+            "METRICS_TOKEN": "scrape-secret",
+        }
+    )
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.post("/auth/login", data={"username": "superuser", "password": "joshbaldus"})
+    return client
+
+
+def test_requests_are_timed_with_sql_render_and_size(client):
+    assert client.get("/inventory/items").status_code == 200
+    client.get("/inventory/items")
+
+    summary = client.get("/metrics.json").get_json()
+    entry = next(
+        row
+        for row in summary["endpoints"]
+        if row["endpoint"] == "inventory.list_items" and row["method"] == "GET"
+    )
+    assert entry["count"] == 2
+    assert entry["statuses"] == {"200": 2}
+    assert entry["avg_sql_statements"] > 0
+    assert entry["avg_render_ms"] > 0
+    assert entry["avg_response_bytes"] > 0
+    assert entry["p95_ms"] >= entry["p50_ms"] > 0
+    assert not any(row["endpoint"].startswith("request_metrics") for row in summary["endpoints"])
+
+    text = client.get("/metrics").get_data(as_text=True)
+    assert "# TYPE invapp_http_request_duration_seconds histogram" in text
+    assert 'endpoint="inventory.list_items",method="GET",le="+Inf"} 2' in text
+    assert 'invapp_http_requests_total{worker="' in text
+    assert 'status="200"} 2' in text
+    assert "invapp_db_statements_total{" in text
+
+    # Scrapes are not written to the access log.
+    assert AccessLog.query.filter(AccessLog.path.like("/metrics%")).count() == 0
+
+
+def test_scrape_requires_loopback_or_token(client):
+    proxied = client.get("/metrics", headers={"X-Forwarded-For": "203.0.113.9"})
+    assert proxied.status_code == 404
+    remote = client.get("/metrics", environ_base={"REMOTE_ADDR": "10.1.2.3"})
+    assert remote.status_code == 404
+
+    authorized = client.get(
+        "/metrics",
+        environ_base={"REMOTE_ADDR": "10.1.2.3"},
+        headers={"Authorization": "Bearer scrape-secret"},
+    )
+    assert authorized.status_code == 200
+    wrong = client.get(
+        "/metrics.json",
+        environ_base={"REMOTE_ADDR": "10.1.2.3"},
+        headers={"Authorization": "Bearer nope"},
+    )
+    assert wrong.status_code == 404
+
+
+def test_histogram_quantiles_use_bucket_bounds():
+    metrics = RequestMetrics()
+    for duration in (0.003, 0.02, 0.02, 0.3):
+        metrics.observe("orders.orders_home", "GET", 200, duration)
+    metrics.observe("orders.orders_home", "GET", 500, 12.0)
+
+    entry = metrics.summary()["endpoints"][0]
+    assert entry["count"] == 5
+    assert entry["errors"] == 1
+    assert entry["p50_ms"] == 25.0
+    assert entry["p95_ms"] is None  # beyond the last finite bucket
+    assert 'le="0.025"} 3' in metrics.render_prometheus()
+
+
+def test_templates_report_self_time_with_blocks_attributed_to_owner(app):
+    env = Environment(
+        loader=DictLoader(
+            {
+                "layout.html": "{{ pause(0.01) }}<main>{% block body %}|{% endblock %}</main>",
+                "page.html": (
+                    '{% extends "layout.html" %}'
+                    "{% block body %}{{ super() }}{{ pause(0.05) }}{% include 'row.html' %}{% endblock %}"
+                ),
+                "row.html": "{{ pause(0.002) }}row",
+            }
+        )
+    )
+    env.template_class = TimedTemplate
+    env.globals["pause"] = lambda seconds: time.sleep(seconds) or ""
+
+    assert env.get_template("page.html").render() == "<main>|row</main>"
+
+    metrics = app.extensions["request_metrics"]
+    templates = {row["template"]: row for row in metrics.summary()["templates"]}
+    assert templates["page.html"]["renders"] == 1
+    assert templates["layout.html"]["renders"] == 1
+    # The body block renders inside layout.html but is page.html's own code.
+    assert templates["page.html"]["self_ms"] >= 50
+    assert 10 <= templates["layout.html"]["self_ms"] < 50
+    assert 2 <= templates["row.html"]["self_ms"] < 10
+    assert templates["page.html"]["total_ms"] >= 62
+    assert 'invapp_template_self_seconds_total{worker="' in metrics.render_prometheus()
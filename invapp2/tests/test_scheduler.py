@@ -0,0 +1,107 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from invapp import create_app
+from invapp.extensions import db
+from invapp.services import scheduler as scheduler_module
+from invapp.services.scheduler import FileLock, JobRegistry, LeaderScheduler
+
+
+class FakeScheduler:
+    def __init__(self):
+        self.jobs = {}
+        self.running = False
+
+    def add_job(self, func, trigger=None, id=None, args=None, **kwargs):
+        self.jobs[id] = (func, args or [])
+
+    def get_job(self, job_id):
+        return None
+
+    def start(self):
+        self.running = True
+
+    def shutdown(self, wait=True):
+        self.running = False
+
+
+@pytest.fixture
+def app():
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"})
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def test_file_lock_admits_one_holder_at_a_time(tmp_path):
+    path = tmp_path / "scheduler.lock"
+    first, second = FileLock(path), FileLock(path)
+
+    assert first.acquire()
+    assert not second.acquire()
+    first.release()
+    assert second.acquire()
+    assert path.read_text() == str(os.getpid())
+    second.release()
+
+
+def test_only_the_lock_holder_runs_jobs_and_standby_takes_over(app, tmp_path):
+    ran = []
+    hook_calls = []
+    registry = JobRegistry()
+    registry.register("sample", lambda app: ran.append(app.name), minutes=5)
+    registry.add_hook(
+        lambda app, scheduler: hook_calls.append(("start", scheduler)),
+        lambda app: hook_calls.append(("stop", None)),
+    )
+    lock_path = tmp_path / "leader.lock"
+    workers = [
+        LeaderScheduler(app, registry, FileLock(lock_path), scheduler_factory=FakeScheduler)
+        for _ in range(2)
+    ]
+
+    assert workers[0].tick() is True
+    assert workers[1].tick() is False
+    leader_scheduler = workers[0]._scheduler
+    assert leader_scheduler.running
+    assert set(leader_scheduler.jobs) == {"sample"}
+    assert hook_calls == [("start", leader_scheduler)]
+
+    func, args = leader_scheduler.jobs["sample"]
+    func(*args)
+    assert ran == [app.name]
+    assert workers[0].status()["jobs"][0]["runs"] == 1
+
+    workers[0].stop()
+    assert not leader_scheduler.running
+    assert hook_calls[-1] == ("stop", None)
+    assert workers[1].tick() is True
+    assert workers[1].status()["is_leader"] is True
+    workers[1].stop()
+
+
+def test_create_app_registers_periodic_jobs(app, monkeypatch, tmp_path):
+    monkeypatch.setenv("BACKUP_DIR", str(tmp_path))
+    registry = scheduler_module.get_job_registry(app)
+    assert {"log-partitions", "log-retention", "access-log-rollup"} <= set(registry.jobs)
+    assert registry.hooks
+
+    fake = FakeScheduler()
+    registry.hooks[0].start(app, fake)
+    assert app.extensions["backup_scheduler"] is fake
+    assert {"automated-backup", "automated-backup-refresh"} <= set(fake.jobs)
+    assert not fake.running
+    registry.hooks[0].stop(app)
+    assert "backup_scheduler" not in app.extensions
+
+
+def test_advisory_lock_key_is_stable_signed_bigint():
+    key = scheduler_module.lock_key("invapp-scheduler")
+    assert key == scheduler_module.lock_key("invapp-scheduler")
+    assert -(2**63) <= key < 2**63
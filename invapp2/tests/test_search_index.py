@@ -0,0 +1,202 @@
+import os
+import sys
+import threading
+
+import pytest
+from sqlalchemy import event
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from invapp import create_app
+from invapp.extensions import db
+from invapp.models import Item, Location
+from invapp.services import search_index
+
+
+@pytest.fixture
+def app():
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"})
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.post(
+        "/auth/login",
+        data={"username": "superuser", "password": "joshbaldus"},
+        follow_redirects=True,
+    )
+    return client
+
+
+def _skus(rows):
+    return [row["sku"] for row in rows]
+
+
+def test_rank_match_orders_primary_before_other_fields():
+    assert search_index.rank_match("abc", ("abc", "")) == 0
+    assert search_index.rank_match("abc", ("abc-1", "")) == 1
+    assert search_index.rank_match("abc", ("x-abc", "")) == 2
+    assert search_index.rank_match("abc", ("zzz", "has abc")) == 3
+    assert search_index.rank_match("abc", ("zzz", "none")) is None
+
+
+def test_index_refreshes_incrementally_after_commits(app):
+    db.session.add_all(
+        [
+            Item(sku="BRK-100", name="Bracket"),
+            Item(sku="HNG-200", name="Hinge", description="Brass bracket hinge"),
+        ]
+    )
+    db.session.commit()
+
+    assert _skus(search_index.search_items("brk", limit=10)) == ["BRK-100"]
+    index = search_index.get_search_index("item")
+    built_at = index._built_at
+
+    item = Item.query.filter_by(sku="BRK-100").one()
+    item.name = "Angle support"
+    db.session.add(Item(sku="BRK-050", name="Small bracket"))
+    db.session.commit()
+
+    assert _skus(search_index.search_items("bracket", limit=10)) == ["BRK-050", "HNG-200"]
+    assert _skus(search_index.search_items("angle", limit=10)) == ["BRK-100"]
+    assert index._built_at == built_at
+
+    db.session.delete(Item.query.filter_by(sku="BRK-050").one())
+    db.session.commit()
+    assert _skus(search_index.search_items("brk", limit=10)) == ["BRK-100"]
+
+
+def test_rolled_back_writes_do_not_reach_the_index(app):
+    db.session.add(Item(sku="KEEP-1", name="Keeper"))
+    db.session.commit()
+    assert _skus(search_index.search_items("keep", limit=10)) == ["KEEP-1"]
+
+    db.session.add(Item(sku="KEEP-2", name="Discarded"))
+    db.session.flush()
+    db.session.rollback()
+
+    assert not search_index.get_search_index("item")._dirty
+    assert _skus(search_index.search_items("keep", limit=10)) == ["KEEP-1"]
+
+
+def test_sql_fallback_shares_ranking(app):
+    db.session.add_all(
+        [
+            Item(sku="ZZ-9", name="Misc", description="Contains ab"),
+            Item(sku="XAB-2", name="Other"),
+            Item(sku="AB-1", name="Widget"),
+            Item(sku="ab", name="Exact"),
+        ]
+    )
+    db.session.commit()
+
+    indexed = _skus(search_index.search_items("ab", limit=10))
+    app.config["SEARCH_INDEX_ENABLED"] = False
+    fallback = _skus(search_index.search_items("ab", limit=10))
+
+    assert indexed == ["ab", "AB-1", "XAB-2", "ZZ-9"]
+    assert fallback == indexed
+
+
+def test_inventory_item_search_uses_shared_ranking(client, app):
+    db.session.add_all(
+        [
+            Item(sku="ALPHA-1", name="Gear"),
+            Item(sku="GEAR-1", name="Spur"),
+            Item(sku="B-GEAR", name="Bevel"),
+            Item(sku="Q-1", name="Misc", description="gear lube"),
+        ]
+    )
+    db.session.commit()
+
+    response = client.get("/inventory/api/items/search?q=gear")
+    assert response.status_code == 200
+    skus = [row["sku"] for row in response.get_json()["results"]]
+    assert skus == ["GEAR-1", "B-GEAR", "ALPHA-1"]
+
+
+def test_location_index_tracks_new_locations(client, app):
+    db.session.add(Location(code="RACK-1", description="North wall"))
+    db.session.commit()
+    assert client.get("/inventory/api/locations/search?q=rack").get_json()[0]["code"] == "RACK-1"
+
+    db.session.add(Location(code="RACK-0", description="South wall"))
+    db.session.commit()
+    data = client.get("/inventory/api/locations/search?q=wall").get_json()
+    assert [entry["code"] for entry in data] == ["RACK-0", "RACK-1"]
+    assert data[0]["label"] == "RACK-0 — South wall"
+
+
+def test_writes_from_another_worker_reach_the_index(tmp_path):
+    uri = f"sqlite:///{tmp_path / 'shared.db'}"
+    worker_a = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": uri})
+    worker_b = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": uri})
+    with worker_a.app_context():
+        db.create_all()
+        db.session.add(Item(sku="CLAMP-1", name="Clamp"))
+        db.session.commit()
+        assert _skus(search_index.search_items("clamp", limit=10)) == ["CLAMP-1"]
+        db.session.remove()
+
+    with worker_b.app_context():
+        db.session.add(Item(sku="CLAMP-2", name="Clamp"))
+        db.session.add(Location(code="BAY-9"))
+        Item.query.filter_by(sku="CLAMP-1").one().min_stock = 7
+        db.session.commit()
+        db.session.remove()
+
+    with worker_a.app_context():
+        built_at = search_index.get_search_index("item")._built_at
+        rows = search_index.search_items("clamp", limit=10)
+        assert _skus(rows) == ["CLAMP-1", "CLAMP-2"]
+        assert rows[0]["min_stock"] == 7
+        assert search_index.get_search_index("item")._built_at == built_at
+        assert [row["code"] for row in search_index.search_locations("bay", limit=5)] == ["BAY-9"]
+        db.session.remove()
+        db.drop_all()
+
+
+def test_background_rebuild_keeps_requests_off_the_build(app):
+    release = threading.Event()
+    document = search_index.SearchDocument(
+        id=1, primary="GEAR-1", fields=("gear-1",), payload={}
+    )
+
+    def slow_loader(ids):
+        release.wait(5)
+        return [document]
+
+    index = search_index.SearchIndex("test", slow_loader, run_in_background=True)
+    assert index.search("gear", limit=5) is None
+
+    release.set()
+    for thread in threading.enumerate():
+        if thread.name == "search-index-test":
+            thread.join(5)
+    assert index.search("gear", limit=5) == [document]
+
+
+def test_loaders_chunk_id_lists(app, monkeypatch):
+    db.session.add_all([Item(sku=f"CH-{number}", name="Chunk") for number in range(5)])
+    db.session.commit()
+    ids = [item.id for item in Item.query]
+    monkeypatch.setattr(search_index, "LOAD_CHUNK_SIZE", 2)
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        documents = search_index._load_item_documents(ids)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+    assert len(documents) == 5
+    assert len(statements) == 3
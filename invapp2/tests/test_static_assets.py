@@ -0,0 +1,135 @@
+import gzip
+import os
+import re
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from invapp import create_app
+from invapp.extensions import db
+from invapp.static_assets import load_manifest
+
+
+TEMPLATE_DIR = Path(__file__).resolve().parent.parent / "invapp" / "templates"
+STATIC_REFERENCE = re.compile(
+    r"url_for\(\s*['\"](?:(\w+)\.)?static['\"]\s*,\s*filename\s*=\s*['\"]([^'\"]+)['\"]\s*\)"
+)
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app(
+        {
+            "TESTING": True,
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+            "STATIC_BUILD_DIR": str(tmp_path / "static-build"),
+        }
+    )
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def built_app(app):
+    result = app.test_cli_runner().invoke(args=["assets", "build"])
+    assert result.exit_code == 0, result.output
+    return app
+
+
+@pytest.fixture
+def client(built_app):
+    client = built_app.test_client()
+    client.post("/auth/login", data={"username": "superuser", "password": "joshbaldus"})
+    return client
+
+
+def _template_references(app):
+    assets = app.extensions["static_assets"]
+    references = set()
+    for template in TEMPLATE_DIR.rglob("*.html"):
+        for blueprint, filename in STATIC_REFERENCE.findall(template.read_text()):
+            endpoint = f"{blueprint}.static" if blueprint else "static"
+            references.add((template.name, assets.endpoints[endpoint] + filename))
+    return references
+
+
+def test_manifest_covers_every_template_reference(built_app):
+    manifest = load_manifest(built_app.config["STATIC_BUILD_DIR"])
+    references = _template_references(built_app)
+    assert references
+
+    missing = sorted(
+        f"{template}: {name}"
+        for template, name in references
+        # Vendored builds are fetched by scripts/vendor_assets.py at deploy time.
+        if name not in manifest and not name.startswith("vendor/")
+    )
+    assert not missing
+
+    build_dir = Path(built_app.config["STATIC_BUILD_DIR"])
+    static_dir = Path(built_app.static_folder)
+    for original, hashed in manifest.items():
+        assert hashed != original
+        assert (build_dir / hashed).read_bytes() == (static_dir / original).read_bytes()
+    assert not any(name.startswith("work_instructions/") for name in manifest)
+
+
+def test_templates_emit_hashed_urls(built_app, client):
+    manifest = built_app.extensions["static_assets"].manifest
+    html = client.get("/inventory/").get_data(as_text=True)
+    assert f'/static/{manifest["style.css"]}' in html
+    assert 'href="/static/style.css"' not in html
+
+    mdi_html = client.get("/mdi/safety").get_data(as_text=True)
+    assert manifest["mdi/css/styles.css"].split("/", 1)[1] in mdi_html
+
+
+def test_hashed_assets_are_immutable_and_precompressed(built_app, client):
+    manifest = built_app.extensions["static_assets"].manifest
+    original = (Path(built_app.static_folder) / "style.css").read_bytes()
+    url = f"/static/{manifest['style.css']}"
+
+    response = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.mimetype == "text/css"
+    assert response.cache_control.immutable
+    assert response.cache_control.max_age == 31536000
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert gzip.decompress(response.get_data()) == original
+    response.close()
+
+    plain = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers
+    assert plain.get_data() == original
+    plain.close()
+
+    unhashed = client.get("/static/style.css")
+    assert not unhashed.cache_control.immutable
+    unhashed.close()
+
+
+def test_hashed_assets_from_earlier_builds_stay_servable(built_app, client):
+    build_dir = Path(built_app.config["STATIC_BUILD_DIR"])
+    (build_dir / "style.0123456789ab.css").write_text("body { color: red; }")
+
+    response = client.get("/static/style.0123456789ab.css")
+    assert response.status_code == 200
+    assert response.get_data() == b"body { color: red; }"
+    assert response.cache_control.immutable
+    response.close()
+
+    assert client.get("/static/style.fedcba987654.css").status_code == 404
+
+
+def test_unbuilt_app_keeps_plain_static_urls(app):
+    client = app.test_client()
+    client.post("/auth/login", data={"username": "superuser", "password": "joshbaldus"})
+    html = client.get("/inventory/").get_data(as_text=True)
+    assert 'href="/static/style.css"' in html
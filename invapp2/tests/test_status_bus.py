@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import os
 import sys
+from datetime import datetime, timedelta
 
 import pytest
 
@@ -9,6 +10,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
 from invapp import create_app
 from invapp.extensions import db
+from invapp.models import OpsEventLog
 from invapp.services import status_bus
 
 
@@ -31,3 +33,65 @@ def test_status_bus_dedupe(app):
         matching = [event for event in events if event["message"] == "repeatable warning"]
         assert matching
         assert matching[-1]["count"] == 2
+
+
+def test_log_event_persists_in_batches_outside_request_session(app):
+    with app.app_context():
+        status_bus.log_event("error", "printer offline", source="printing")
+        status_bus.log_event("info", "printer online", source="printing")
+
+        assert not db.session.new
+        assert OpsEventLog.query.filter_by(source="printing").count() == 0
+
+        assert status_bus.flush_pending() >= 2
+        messages = {
+            row.message for row in OpsEventLog.query.filter_by(source="printing").all()
+        }
+        assert messages == {"printer offline", "printer online"}
+        assert status_bus.get_status_bus_stats()["pending"] == 0
+
+
+def test_pending_events_are_bounded(app):
+    writer = status_bus.StatusBusWriter(app, buffer_size=2, run_in_background=False)
+    for index in range(5):
+        writer.enqueue({"level": "INFO", "message": f"event {index}"})
+
+    stats = writer.stats()
+    assert stats["pending"] == 2
+    assert stats["dropped"] == 3
+
+
+def test_dedupe_entries_expire_and_are_capped(app):
+    with app.app_context():
+        app.config["STATUS_BUS_DEDUPE_TTL_SECONDS"] = 0
+        status_bus.log_event("warning", "expiring warning", dedupe_key="expiring")
+        status_bus.log_event("warning", "expiring warning", dedupe_key="expiring")
+        matching = [
+            event
+            for event in status_bus.get_recent_events()
+            if event["message"] == "expiring warning"
+        ]
+        assert [event["count"] for event in matching[-2:]] == [1, 1]
+
+        app.config["STATUS_BUS_DEDUPE_TTL_SECONDS"] = 60
+        app.config["STATUS_BUS_DEDUPE_MAX_ENTRIES"] = 3
+        for index in range(10):
+            status_bus.log_event("warning", f"capped {index}", dedupe_key=f"capped-{index}")
+        assert status_bus.get_status_bus_stats()["dedupe_entries"] <= 3
+
+
+def test_ops_events_prune_command_applies_log_retention(app):
+    with app.app_context():
+        now = datetime.utcnow()
+        db.session.add_all(
+            [
+                OpsEventLog(level="INFO", message="old", created_at=now - timedelta(days=90)),
+                OpsEventLog(level="INFO", message="recent", created_at=now - timedelta(days=1)),
+            ]
+        )
+        db.session.commit()
+
+        result = app.test_cli_runner().invoke(args=["ops-events-prune"])
+        assert result.exit_code == 0, result.output
+        assert "ops_event_log\t1" in result.output
+        assert [row.message for row in OpsEventLog.query.all()] == ["recent"]
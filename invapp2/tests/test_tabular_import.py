@@ -0,0 +1,137 @@
+import io
+import os
+import re
+import sys
+
+import pytest
+from openpyxl import Workbook
+from werkzeug.datastructures import FileStorage
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from invapp import create_app
+from invapp.extensions import db
+from invapp.models import Item, Location, Movement
+from invapp.utils.tabular_import import (
+    TabularImportError,
+    copy_to_csv,
+    open_tabular_upload,
+    preview_rows,
+)
+
+
+@pytest.fixture
+def app():
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"})
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.post(
+        "/auth/login",
+        data={"username": "superuser", "password": "joshbaldus"},
+        follow_redirects=True,
+    )
+    return client
+
+
+def _upload(data, filename):
+    return FileStorage(stream=io.BytesIO(data), filename=filename)
+
+
+def _xlsx_bytes(rows):
+    workbook = Workbook()
+    sheet = workbook.active
+    for row in rows:
+        sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def test_csv_rows_stream_with_normalized_headers_and_row_errors():
+    data = (
+        "\ufeff SKU ,Qty,,Qty,\n"
+        "A-1,2,x,3\n"
+        "\n"
+        "B-2,4,,5,,extra\n"
+        "C-3\n"
+    ).encode("utf-8")
+
+    with open_tabular_upload(_upload(data, "stock.CSV")) as reader:
+        assert reader.fieldnames == ["SKU", "Qty", "Column 3", "Qty (2)"]
+        rows = [(reader.line_num, row) for row in reader]
+
+    assert rows == [
+        (2, {"SKU": "A-1", "Qty": "2", "Column 3": "x", "Qty (2)": "3"}),
+        (5, {"SKU": "C-3", "Qty": "", "Column 3": "", "Qty (2)": ""}),
+    ]
+    assert [str(error) for error in reader.errors] == [
+        "Row 4: has 6 values but the header has 4 columns."
+    ]
+
+
+def test_tsv_and_xlsx_read_the_same_rows():
+    tsv = _upload(b"sku\tquantity\nA-1\t2\n", "counts.tsv")
+    xlsx = _upload(_xlsx_bytes([["sku", "quantity"], ["A-1", 2], [None, None]]), "counts.xlsx")
+
+    for upload in (tsv, xlsx):
+        with open_tabular_upload(upload) as reader:
+            assert preview_rows(reader) == (["sku", "quantity"], [["A-1", "2"]])
+
+
+def test_invalid_uploads_raise_import_errors():
+    with pytest.raises(TabularImportError, match="Unsupported file type"):
+        open_tabular_upload(_upload(b"sku\n", "stock.pdf"))
+    with pytest.raises(TabularImportError, match="XLSX file could not be read"):
+        open_tabular_upload(_upload(b"not a workbook", "stock.xlsx"))
+
+    reader = open_tabular_upload(_upload(b"sku\n\xff\xfe\n", "stock.csv"))
+    with pytest.raises(TabularImportError, match="UTF-8"):
+        copy_to_csv(reader, io.StringIO())
+
+
+def test_stock_import_accepts_xlsx_and_reports_skipped_rows(app, client):
+    item = Item(sku="SKU-1", name="Widget")
+    location = Location(code="A1")
+    db.session.add_all([item, location])
+    db.session.commit()
+
+    data = _xlsx_bytes(
+        [
+            ["sku", "location_code", "quantity"],
+            ["SKU-1", "A1", 3],
+            ["SKU-1", "A1", 1, "stray"],
+        ]
+    )
+    response = client.post(
+        "/inventory/stock/import",
+        data={"file": (io.BytesIO(data), "stock.xlsx")},
+        content_type="multipart/form-data",
+    )
+    page = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert "Skipped 1 malformed rows: Row 3: has 4 values" in page
+    import_token = re.search(r'name="import_token" value="([^"]+)"', page).group(1)
+
+    response = client.post(
+        "/inventory/stock/import",
+        data={
+            "step": "mapping",
+            "import_token": import_token,
+            "mapping_sku": "sku",
+            "mapping_location_code": "location_code",
+            "mapping_quantity": "quantity",
+        },
+    )
+    assert response.status_code == 302
+    movement = Movement.query.one()
+    assert movement.item_id == item.id
+    assert movement.location_id == location.id
+    assert movement.quantity == 3
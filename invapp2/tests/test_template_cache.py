@@ -0,0 +1,49 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from invapp import create_app
+from invapp.template_cache import compile_templates
+
+
+def _app(cache_dir):
+    return create_app(
+        {
+            "TESTING": True,
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+            "JINJA_BYTECODE_CACHE_DIR": str(cache_dir),
+        }
+    )
+
+
+def test_compile_fills_cache_shared_with_other_workers(tmp_path, monkeypatch):
+    first = _app(tmp_path)
+    result = compile_templates(first)
+    assert "base.html" in result.compiled
+    assert not result.failed
+    assert len(list(tmp_path.glob("invapp-*.cache"))) == len(result.compiled)
+
+    second = _app(tmp_path)
+
+    def _no_compile(*args, **kwargs):
+        pytest.fail("template compiled despite cached bytecode")
+
+    monkeypatch.setattr(second.jinja_env, "compile", _no_compile)
+    with second.app_context():
+        assert second.jinja_env.get_template("base.html") is not None
+
+
+def test_templates_compile_command(tmp_path):
+    app = _app(tmp_path)
+    result = app.test_cli_runner().invoke(args=["templates", "compile", "--clear"])
+    assert result.exit_code == 0, result.output
+    assert f"into {tmp_path}." in result.output
+
+
+def test_cache_can_be_disabled(tmp_path):
+    app = _app("")
+    assert app.jinja_env.bytecode_cache is None
+    assert compile_templates(app).compiled
@@ -0,0 +1,77 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from invapp import create_app, perf
+from invapp.extensions import db
+
+
+@pytest.fixture
+def app():
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"})
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.post("/auth/login", data={"username": "superuser", "password": "joshbaldus"})
+    return client
+
+
+def test_pages_do_not_load_decoder_from_cdn(client):
+    for path in ("/", "/inventory/"):
+        response = client.get(path)
+        assert response.status_code == 200
+        html = response.get_data(as_text=True)
+        assert "unpkg.com" not in html
+        assert 'data-decoder-src="/static/vendor/zxing-browser-' in html
+
+
+def test_first_paint_pages_have_no_external_blocking_resources(client):
+    audit = perf.audit_first_paint(client)
+
+    assert set(audit) == set(perf.FIRST_PAINT_PATHS)
+    for path, result in audit.items():
+        assert result["status"] == 200, path
+        assert result["external_blocking"] == 0, path
+        assert not any("zxing" in src for src in result["blocking_scripts"]), path
+
+    regressed = {path: dict(result) for path, result in audit.items()}
+    regressed["/"] = dict(
+        audit["/"],
+        blocking_scripts=audit["/"]["blocking_scripts"] + ["https://unpkg.com/@zxing/browser@latest"],
+        external_blocking=1,
+    )
+    assert perf.compare_to_baseline({"first_paint": regressed}, {"first_paint": audit}) == [
+        "/: 1 external render-blocking resources (baseline 0)",
+        f"/: {len(regressed['/']['blocking_scripts'])} blocking scripts "
+        f"(baseline {len(audit['/']['blocking_scripts'])})",
+    ]
+
+
+def test_vendor_assets_are_served_immutable(app, client):
+    vendor_dir = os.path.join(app.static_folder, "vendor")
+    os.makedirs(vendor_dir, exist_ok=True)
+    path = os.path.join(vendor_dir, "test-asset-1.0.0.js")
+    with open(path, "w") as handle:
+        handle.write("window.testAsset = true;\n")
+    try:
+        response = client.get("/static/vendor/test-asset-1.0.0.js")
+        assert response.status_code == 200
+        assert response.cache_control.immutable
+        assert response.cache_control.max_age == 31536000
+        response.close()
+
+        other = client.get("/static/style.css")
+        assert not other.cache_control.immutable
+        other.close()
+    finally:
+        os.remove(path)
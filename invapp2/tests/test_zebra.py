@@ -115,7 +115,8 @@ def test_print_receiving_label_sends_zpl(monkeypatch):
             def sendall(self, data):
                 sent["data"] = data
 
-        def fake_create_connection(addr):
+        def fake_create_connection(addr, timeout=None):
+            sent["timeout"] = timeout
             return DummySocket(addr)
 
         monkeypatch.setattr(zebra.socket, "create_connection", fake_create_connection)
@@ -125,4 +126,5 @@ def test_print_receiving_label_sends_zpl(monkeypatch):
     expected = zebra.build_receiving_label("ABC123", "Widget", 5)
     assert sent["addr"] == ("printer.local", 9101)
     assert sent["data"] == expected.encode("utf-8")
+    assert sent["timeout"] == zebra.DEFAULT_SEND_TIMEOUT_SECONDS
     assert result.ok is True
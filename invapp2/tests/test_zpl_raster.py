@@ -0,0 +1,191 @@
+import os
+import struct
+import sys
+import zlib
+from pathlib import Path
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from invapp import create_app
+from invapp.extensions import db
+from invapp.printing import labels, previews, zpl_raster
+from invapp.printing.zebra import render_receiving_label_png
+
+GOLDEN_DIR = Path(__file__).resolve().parent / "golden" / "zpl"
+UPDATE_GOLDEN = os.getenv("UPDATE_GOLDEN") == "1"
+
+FEATURE_ZPL = "\n".join(
+    [
+        "^XA",
+        "^PW600",
+        "^LL400",
+        "^FO10,10^GB580,380,3,B,0^FS",
+        "^FO20,20^GB120,40,40,B,0^FS",
+        "^FO160,20^A0,N,30^FB420,1,0,R,0^FDRight aligned^FS",
+        "^FO20,80^A0,N,28,20^FB560,2,6,C,0^FDCentered text that wraps onto a second line^FS",
+        "^FO20,170^BY3^BCN,80,Y,N,N^FDZPL-42^FS",
+        "^FO420,170^BCN,60,N,N,N^FD7^FS",
+        "^FO560,150^A0,R,24^FDROT R^FS",
+        "^FO520,330^A0,I,24^FDINV^FS",
+        "^FO20,300^A0,N,24^FDEsc \\^ caret^FS",
+        "^XZ",
+    ]
+)
+
+
+def _receiving_zpl():
+    context = labels.build_receiving_label_context(
+        "SKU-100",
+        "Hex bolt 1/4-20 zinc plated",
+        25,
+        po_number="PO-7788",
+        lot_number="LOT-42",
+    )
+    return labels.render_template_by_name("LotBatchLabelTemplate", context)
+
+
+def _item_zpl():
+    context = labels.build_item_label_context(
+        {"sku": "BRK-200", "name": "Mounting bracket", "description": "Steel, powder coat"}
+    )
+    return labels.render_template_by_name("InventoryItemLabelTemplate", context)
+
+
+GOLDEN_CASES = {
+    "features_203": (lambda: FEATURE_ZPL, 203),
+    "receiving_203": (_receiving_zpl, 203),
+    "receiving_300": (_receiving_zpl, 300),
+    "item_203": (_item_zpl, 203),
+}
+
+
+def decode_png(data: bytes) -> tuple[int, int, int, bytes]:
+    """Decode the unfiltered 1-bit PNGs written by ``zpl_raster``."""
+
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    offset = 8
+    idat = b""
+    width = height = bit_depth = dpm = 0
+    while offset < len(data):
+        (length,) = struct.unpack(">I", data[offset : offset + 4])
+        tag = data[offset + 4 : offset + 8]
+        body = data[offset + 8 : offset + 8 + length]
+        offset += 12 + length
+        if tag == b"IHDR":
+            width, height, bit_depth = struct.unpack(">IIB", body[:9])
+        elif tag == b"pHYs":
+            dpm = struct.unpack(">I", body[:4])[0]
+        elif tag == b"IDAT":
+            idat += body
+    raw = zlib.decompress(idat)
+    stride = (width * bit_depth + 7) // 8 + 1
+    assert len(raw) == stride * height
+    assert all(raw[row * stride] == 0 for row in range(height))
+    rows = b"".join(raw[row * stride + 1 : (row + 1) * stride] for row in range(height))
+    return width, height, round(dpm * 0.0254), rows
+
+
+@pytest.mark.parametrize("name", sorted(GOLDEN_CASES))
+def test_golden_images(name):
+    build_zpl, dpi = GOLDEN_CASES[name]
+    rendered = zpl_raster.render_zpl_png(build_zpl(), dpi=dpi)
+    golden_path = GOLDEN_DIR / f"{name}.png"
+    if UPDATE_GOLDEN or not golden_path.exists():
+        GOLDEN_DIR.mkdir(parents=True, exist_ok=True)
+        golden_path.write_bytes(rendered)
+        if not UPDATE_GOLDEN:
+            pytest.fail(f"Golden image {golden_path.name} was missing and has been created.")
+
+    assert decode_png(rendered) == decode_png(golden_path.read_bytes())
+
+
+def test_300_dpi_scales_203_dpi_layouts():
+    width, height, dpi, _ = decode_png(zpl_raster.render_zpl_png(_receiving_zpl(), dpi=300))
+    assert (width, height, dpi) == (1200, 1800, 300)
+    with pytest.raises(zpl_raster.ZPLRenderError):
+        zpl_raster.render_zpl_png(_receiving_zpl(), dpi=600)
+
+
+def test_code128_symbol_structure():
+    assert all(sum(map(int, pattern)) == 11 for pattern in zpl_raster.CODE128_PATTERNS[:-1])
+    widths = zpl_raster.code128_modules("ABC-123")
+    assert sum(widths) == 11 * (len("ABC-123") + 3) + 2
+    assert "".join(map(str, widths[:6])) == zpl_raster.CODE128_PATTERNS[104]
+    assert "".join(map(str, widths[-7:])) == zpl_raster.CODE128_PATTERNS[106]
+    with pytest.raises(zpl_raster.ZPLRenderError):
+        zpl_raster.code128_modules("tab\there")
+
+
+def test_escaped_carets_stay_in_field_data():
+    canvas = zpl_raster.parse_zpl(FEATURE_ZPL)
+    texts = [op[3] for op in canvas.operations if op[0] == "text"]
+    assert "Esc ^ caret" in texts
+
+
+@pytest.fixture
+def app():
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"})
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def test_previews_are_cached_by_template_version_and_context(app, monkeypatch):
+    calls = []
+    original = previews.render_zpl_png
+
+    def counting_render(zpl, *, dpi):
+        calls.append(dpi)
+        return original(zpl, dpi=dpi)
+
+    monkeypatch.setattr(previews, "render_zpl_png", counting_render)
+
+    first = render_receiving_label_png("SKU-1", "Widget", 3)
+    again = render_receiving_label_png("SKU-1", "Widget", 3)
+    assert first == again
+    assert calls == [203]
+
+    render_receiving_label_png("SKU-1", "Widget", 4)
+    render_receiving_label_png("SKU-1", "Widget", 3, dpi=300)
+    assert calls == [203, 203, 300]
+
+    template = labels.get_template_by_name("LotBatchLabelTemplate")
+    edited = labels.LabelDefinition(
+        name=template.name,
+        layout={**template.layout, "elements": template.layout["elements"][:1]},
+        fields=template.fields,
+    )
+    assert previews.template_version(edited) != previews.template_version(template)
+    context = labels.build_receiving_label_context("SKU-1", "Widget", 3)
+    previews.render_template_preview(edited, context)
+    assert calls == [203, 203, 300, 203]
+    assert previews.get_label_preview_cache().hits == 1
+
+
+def test_designer_preview_endpoint_returns_png(app):
+    client = app.test_client()
+    client.post(
+        "/auth/login",
+        data={"username": "superuser", "password": "joshbaldus"},
+        follow_redirects=True,
+    )
+    label = labels.iter_designer_labels()[0]
+    layout = labels.build_designer_state(label.id)
+
+    response = client.post(
+        "/settings/printers/designer/preview",
+        json={"label_id": label.id, "layout": layout},
+    )
+    assert response.status_code == 200
+    assert response.mimetype == "image/png"
+    assert response.data.startswith(b"\x89PNG")
+
+    bad = client.post(
+        "/settings/printers/designer/preview",
+        json={"label_id": label.id, "layout": layout, "dpi": 150},
+    )
+    assert bad.status_code == 400
@@ -9,8 +9,10 @@ from typing import Iterable, Optional
 
 import psutil
 import json
+import urllib.request
 
 from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
 
 
 @dataclass
@@ -76,12 +78,58 @@ class ErrorSnapshot:
     status: str
 
 
+@dataclass
+class DbPoolStatus:
+    server_connections: dict[str, int]
+    last_event_at: datetime | None
+    last_event: str | None
+    last_event_context: dict | None
+    status: str
+
+
+@dataclass
+class EndpointTiming:
+    endpoint: str
+    method: str
+    count: int
+    errors: int
+    avg_ms: float
+    p95_ms: float | None
+    avg_sql_statements: float
+
+
+@dataclass
+class PrinterHealthEntry:
+    name: str
+    connection: str
+    state: str
+    label: str
+    last_error: str | None
+    changed_at: datetime | None
+
+
 @dataclass
 class NetworkStatus:
     status: str
     raw: str
 
 
+_ENGINES: dict[str, Engine] = {}
+
+
+def get_engine(db_url: str) -> Engine:
+    """Engine reused across refreshes instead of one connect/dispose per panel."""
+
+    engine = _ENGINES.get(db_url)
+    if engine is None:
+        options = {}
+        if not db_url.startswith("sqlite"):
+            options = {"pool_size": 1, "max_overflow": 1, "pool_recycle": 300}
+        engine = create_engine(db_url, **options)
+        _ENGINES[db_url] = engine
+    return engine
+
+
 def read_network_status(
     status_path: Path = Path("/var/lib/hyperion/network_status.txt"),
 ) -> NetworkStatus:
@@ -190,7 +238,7 @@ def read_recent_access(
     pages: list[str] = []
 
     try:
-        engine = create_engine(db_url, pool_pre_ping=True)
+        engine = get_engine(db_url)
         with engine.connect() as conn:
             user_rows = conn.execute(
                 text(
@@ -221,7 +269,6 @@ def read_recent_access(
             for row in page_rows:
                 timestamp = row.occurred_at.strftime("%H:%M:%S") if row.occurred_at else "--:--:--"
                 pages.append(f"{timestamp} {row.identity}: {row.path or '-'}")
-        engine.dispose()
     except Exception as exc:
         return AccessSnapshot(users=[], pages=[], status=f"DB error: {exc.__class__.__name__}")
 
@@ -233,7 +280,7 @@ def read_ops_events(db_url: str | None, *, limit: int = 12) -> list[OpsEventEntr
     if not db_url:
         return []
     try:
-        engine = create_engine(db_url, pool_pre_ping=True)
+        engine = get_engine(db_url)
         with engine.connect() as conn:
             rows = conn.execute(
                 text(
@@ -263,7 +310,6 @@ def read_ops_events(db_url: str | None, *, limit: int = 12) -> list[OpsEventEntr
                         context=context if isinstance(context, dict) else None,
                     )
                 )
-        engine.dispose()
         return results
     except Exception:
         return []
@@ -301,7 +347,7 @@ def read_backup_status(db_url: str | None, *, default_frequency: int = 4) -> Bac
     restore_last_message = None
     restore_last_username = None
     try:
-        engine = create_engine(db_url, pool_pre_ping=True)
+        engine = get_engine(db_url)
         with engine.connect() as conn:
             row = conn.execute(
                 text(
@@ -372,7 +418,6 @@ def read_backup_status(db_url: str | None, *, default_frequency: int = 4) -> Bac
                 restore_last_filename = restore_row.backup_filename
                 restore_last_message = restore_row.message
                 restore_last_username = restore_row.username
-        engine.dispose()
     except Exception:
         pass
 
@@ -403,7 +448,7 @@ def read_recent_errors(db_url: str | None, *, limit: int = 5) -> ErrorSnapshot:
         return ErrorSnapshot(entries=[], status="DB_URL not set")
     entries: list[str] = []
     try:
-        engine = create_engine(db_url, pool_pre_ping=True)
+        engine = get_engine(db_url)
         with engine.connect() as conn:
             rows = conn.execute(
                 text(
@@ -420,7 +465,6 @@ def read_recent_errors(db_url: str | None, *, limit: int = 5) -> ErrorSnapshot:
                 timestamp = row.occurred_at.strftime("%H:%M:%S") if row.occurred_at else "--:--:--"
                 message = (row.message or "").splitlines()[0]
                 entries.append(f"{timestamp} {message}")
-        engine.dispose()
         return ErrorSnapshot(entries=entries, status="Recent exceptions")
     except Exception as exc:
         return ErrorSnapshot(entries=[], status=f"Error log unavailable: {exc.__class__.__name__}")
@@ -430,7 +474,7 @@ def read_sequence_repair_summary(db_url: str | None) -> dict | None:
     if not db_url:
         return None
     try:
-        engine = create_engine(db_url, pool_pre_ping=True)
+        engine = get_engine(db_url)
         with engine.connect() as conn:
             row = conn.execute(
                 text(
@@ -443,7 +487,6 @@ def read_sequence_repair_summary(db_url: str | None) -> dict | None:
                     """
                 )
             ).first()
-        engine.dispose()
         if row:
             context = row.context_json
             if isinstance(context, str):
@@ -458,11 +501,184 @@ def read_sequence_repair_summary(db_url: str | None) -> dict | None:
     return None
 
 
+def read_db_pool_status(db_url: str | None) -> DbPoolStatus:
+    """Server-side connection states plus the latest pool warning from the app.
+
+    Each gunicorn worker keeps its own pool, so the monitor reads the shared
+    view: ``pg_stat_activity`` for this database (PostgreSQL only) and the
+    newest ``db_pool`` event (exhaustion/invalidation) the workers published.
+    """
+
+    empty = DbPoolStatus({}, None, None, None, "DB_URL not set")
+    if not db_url:
+        return empty
+    server_connections: dict[str, int] = {}
+    try:
+        engine = get_engine(db_url)
+        with engine.connect() as conn:
+            if engine.dialect.name == "postgresql":
+                rows = conn.execute(
+                    text(
+                        """
+                        SELECT COALESCE(state, 'unknown') AS state, COUNT(*) AS total
+                        FROM pg_stat_activity
+                        WHERE datname = current_database() AND pid <> pg_backend_pid()
+                        GROUP BY 1
+                        """
+                    )
+                )
+                server_connections = {row.state: int(row.total) for row in rows}
+            row = conn.execute(
+                text(
+                    """
+                    SELECT created_at, message, context_json
+                    FROM ops_event_log
+                    WHERE source = 'db_pool'
+                    ORDER BY created_at DESC
+                    LIMIT 1
+                    """
+                )
+            ).first()
+    except Exception as exc:
+        return DbPoolStatus({}, None, None, None, f"DB error: {exc.__class__.__name__}")
+    context = None
+    if row is not None:
+        context = row.context_json
+        if isinstance(context, str):
+            try:
+                context = json.loads(context)
+            except json.JSONDecodeError:
+                context = None
+    return DbPoolStatus(
+        server_connections=server_connections,
+        last_event_at=row.created_at if row is not None else None,
+        last_event=row.message if row is not None else None,
+        last_event_context=context if isinstance(context, dict) else None,
+        status="ok",
+    )
+
+
+def read_printer_health(
+    db_url: str | None, *, default_port: int = 9100, event_limit: int = 200
+) -> list[PrinterHealthEntry]:
+    """Enabled printers with the latest circuit transition the workers published.
+
+    The health registry lives in each worker, which publishes a
+    ``printer_health`` event whenever a printer goes offline or comes back.
+    Printers with no recent event have not failed since the events were pruned.
+    Printers that only appear in events (the system default) are listed too.
+    """
+
+    if not db_url:
+        return []
+    try:
+        engine = get_engine(db_url)
+        with engine.connect() as conn:
+            printers = conn.execute(
+                text(
+                    """
+                    SELECT name, host, port
+                    FROM printer
+                    WHERE enabled = :enabled
+                    ORDER BY name
+                    """
+                ),
+                {"enabled": True},
+            ).all()
+            events = conn.execute(
+                text(
+                    """
+                    SELECT created_at, context_json
+                    FROM ops_event_log
+                    WHERE source = 'printer_health'
+                    ORDER BY created_at DESC
+                    LIMIT :limit
+                    """
+                ),
+                {"limit": event_limit},
+            ).all()
+    except Exception:
+        return []
+
+    latest: dict[str, tuple[datetime | None, dict]] = {}
+    for row in events:
+        context = row.context_json
+        if isinstance(context, str):
+            try:
+                context = json.loads(context)
+            except json.JSONDecodeError:
+                continue
+        if isinstance(context, dict) and context.get("key"):
+            latest.setdefault(context["key"].lower(), (row.created_at, context))
+
+    entries: list[PrinterHealthEntry] = []
+    for printer in printers:
+        host = (printer.host or "").strip().lower()
+        key = f"{host}:{printer.port or default_port}"
+        changed_at, context = latest.pop(key, (None, {}))
+        entries.append(
+            PrinterHealthEntry(
+                name=printer.name,
+                connection=key,
+                state=context.get("state", "closed"),
+                label=context.get("label", "No failures reported"),
+                last_error=context.get("last_error"),
+                changed_at=changed_at,
+            )
+        )
+    for key, (changed_at, context) in sorted(latest.items()):
+        entries.append(
+            PrinterHealthEntry(
+                name=context.get("name") or "Default printer",
+                connection=key,
+                state=context.get("state", "closed"),
+                label=context.get("label", "Online"),
+                last_error=context.get("last_error"),
+                changed_at=changed_at,
+            )
+        )
+    return entries
+
+
+def read_request_metrics(
+    port: int,
+    *,
+    host: str = "127.0.0.1",
+    token: str | None = None,
+    limit: int = 5,
+    timeout: float = 0.5,
+) -> list[EndpointTiming]:
+    """Slowest endpoints from the app's ``/metrics.json`` (one worker's view)."""
+
+    request = urllib.request.Request(f"http://{host}:{port}/metrics.json")
+    if token:
+        request.add_header("Authorization", f"Bearer {token}")
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            payload = json.load(response)
+    except (OSError, ValueError):
+        return []
+    timings = [
+        EndpointTiming(
+            endpoint=entry["endpoint"],
+            method=entry["method"],
+            count=entry["count"],
+            errors=entry.get("errors", 0),
+            avg_ms=entry["avg_ms"],
+            p95_ms=entry.get("p95_ms"),
+            avg_sql_statements=entry.get("avg_sql_statements", 0.0),
+        )
+        for entry in payload.get("endpoints", [])
+    ]
+    timings.sort(key=lambda timing: timing.avg_ms, reverse=True)
+    return timings[:limit]
+
+
 def read_boot_status(db_url: str | None) -> str | None:
     if not db_url:
         return None
     try:
-        engine = create_engine(db_url, pool_pre_ping=True)
+        engine = get_engine(db_url)
         with engine.connect() as conn:
             row = conn.execute(
                 text(
@@ -475,7 +691,6 @@ def read_boot_status(db_url: str | None) -> str | None:
                     """
                 )
             ).first()
-        engine.dispose()
         if row and row.created_at:
             timestamp = row.created_at.strftime("%Y-%m-%d %H:%M UTC")
             return f"{row.message} ({timestamp})"
@@ -41,7 +41,10 @@ from .metrics import (
     read_process_metrics,
     read_recent_access,
     read_recent_errors,
+    read_request_metrics,
     read_boot_status,
+    read_db_pool_status,
+    read_printer_health,
     read_sequence_repair_summary,
     summarize_connections,
 )
@@ -364,10 +367,60 @@ def build_health_panel(state: dict, focused: bool) -> Panel:
             f"{summary.get('skipped', 0)} skipped, "
             f"{summary.get('failed', 0)} failed"
         )
+    pool = state.get("db_pool_status")
+    if pool is not None:
+        if pool.server_connections:
+            states = ", ".join(
+                f"{count} {name}" for name, count in sorted(pool.server_connections.items())
+            )
+            lines.append(f"[b]DB connections[/b]: {states}")
+        if pool.last_event:
+            when = pool.last_event_at.strftime("%H:%M:%S") if pool.last_event_at else "--:--:--"
+            detail = ""
+            context = pool.last_event_context or {}
+            if context.get("checked_out") is not None:
+                detail = (
+                    f" (pid {context.get('pid')}: {context.get('checked_out')} in use, "
+                    f"{context.get('timeouts', 0)} timeouts, "
+                    f"max wait {context.get('wait_ms_max', 0)} ms)"
+                )
+            lines.append(f"[b]Pool[/b]: {when} {pool.last_event}{detail}")
+        elif pool.status != "ok":
+            lines.append(f"[b]Pool[/b]: {pool.status}")
+    timings = state.get("endpoint_timings") or []
+    if timings:
+        lines.append("[b]Slowest endpoints[/b] (avg / p95, SQL per request):")
+        for timing in timings:
+            p95 = f"{timing.p95_ms:.0f}" if timing.p95_ms is not None else ">10000"
+            errors = f", {timing.errors} errors" if timing.errors else ""
+            lines.append(
+                f"  {timing.endpoint} {timing.method}: {timing.avg_ms:.0f}/{p95} ms, "
+                f"{timing.avg_sql_statements:.1f} SQL, n={timing.count}{errors}"
+            )
     title_style = "bold yellow" if focused else None
     return Panel("\n".join(lines), title="Health", title_style=title_style, box=box.ROUNDED, padding=(1, 1))
 
 
+def build_printers_panel(printers: list, focused: bool) -> Panel:
+    lines = []
+    for printer in printers:
+        color = {"open": "red", "half_open": "yellow"}.get(printer.state, "green")
+        line = f"[{color}]{printer.label}[/{color}] {printer.name} ({printer.connection})"
+        if printer.changed_at:
+            line += f" since {printer.changed_at.strftime('%H:%M:%S')}"
+        if printer.state != "closed" and printer.last_error:
+            line += f": {printer.last_error}"
+        lines.append(line)
+    title_style = "bold yellow" if focused else None
+    return Panel(
+        "\n".join(lines) or "(no printers configured)",
+        title="Printers",
+        title_style=title_style,
+        box=box.ROUNDED,
+        padding=(1, 1),
+    )
+
+
 def build_errors_panel(error_snapshot, focused: bool) -> Panel:
     lines = error_snapshot.entries or ["(no recent exceptions)"]
     title_style = "bold yellow" if focused else None
@@ -400,7 +453,8 @@ def render_layout(state: dict) -> Layout:
         Layout(name="health"),
         Layout(name="access", size=12),
     )
-    layout["right"].split_column(Layout(name="logs"), Layout(name="events"), Layout(name="errors", size=8))
+    layout["right"].split_column(Layout(name="logs"), Layout(name="events"), Layout(name="bottom", size=8))
+    layout["bottom"].split_row(Layout(name="errors"), Layout(name="printers"))
 
     layout["header"].update(build_header(state.get("service_name", "Operations"), state.get("status", "Unknown")))
     focused_panel = state.get("focused_panel")
@@ -422,6 +476,7 @@ def render_layout(state: dict) -> Layout:
     )
     layout["events"].update(build_events_panel(state.get("events", []), focused_panel == "events"))
     layout["errors"].update(build_errors_panel(state.get("error_snapshot"), focused_panel == "errors"))
+    layout["printers"].update(build_printers_panel(state.get("printers", []), focused_panel == "printers"))
     layout["footer"].update(build_controls_panel(state.get("verbose", False)))
     return layout
 
@@ -441,7 +496,7 @@ def monitor_loop(
     log_window = int(os.getenv("OPS_MONITOR_LOG_WINDOW", "18"))
     log_follow = True
     log_scroll = 0
-    focused_panels = ["metrics", "logs", "events", "errors", "backup", "health", "access"]
+    focused_panels = ["metrics", "logs", "events", "errors", "printers", "backup", "health", "access"]
     focus_index = 0
     resize_pending = False
 
@@ -454,6 +509,8 @@ def monitor_loop(
     verbose = False
     tracked_pid = target_pid
     db_url = os.getenv("OPS_MONITOR_DB_URL") or os.getenv("DB_URL")
+    metrics_token = os.getenv("METRICS_TOKEN")
+    printer_port = int(os.getenv("ZEBRA_PRINTER_PORT", "9100"))
     db_url_masked = mask_db_url(db_url)
     gunicorn_bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
     gunicorn_workers = os.getenv("GUNICORN_WORKERS", "2")
@@ -521,6 +578,9 @@ def monitor_loop(
                 error_snapshot = read_recent_errors(db_url)
                 sequence_summary = read_sequence_repair_summary(db_url)
                 boot_status = read_boot_status(db_url)
+                db_pool_status = read_db_pool_status(db_url)
+                printers = read_printer_health(db_url, default_port=printer_port)
+                endpoint_timings = read_request_metrics(app_port, token=metrics_token)
                 network_status = read_network_status()
                 log_lines = log_snapshot.lines
                 total_lines = len(log_lines)
@@ -623,6 +683,9 @@ def monitor_loop(
                     "gunicorn_timeout": gunicorn_timeout,
                     "boot_status": boot_status or status_message,
                     "sequence_summary": sequence_summary,
+                    "db_pool_status": db_pool_status,
+                    "printers": printers,
+                    "endpoint_timings": endpoint_timings,
                     "network_status": network_status,
                     "log_follow": log_follow,
                     "log_scroll": log_scroll,